@@ -2,8 +2,8 @@
 Fraud Detection Feature Definitions for Feast
 """
 from datetime import timedelta
-from feast import Entity, FeatureView, Field, FileSource, FeatureService
-from feast.types import Float32, Int64, String
+from feast import Entity, FeatureView, Field, FileSource, FeatureService, PushSource
+from feast.types import Float32, Float64, Int64, String
 from feast.value_type import ValueType
 
 # Define entities with value_type
@@ -52,9 +52,81 @@ transaction_features = FeatureView(
     tags={"team": "fraud_detection", "type": "transaction"},
 )
 
+
+def velocity_schema(prefix: str):
+    """Schema of the sliding-window velocity features for one entity (see src/features/streaming_features.py)
+
+    A row is the entity's state after one of its transactions, stamped just after it, so a
+    lookup for a transaction sees the entity up to and including its previous transaction.
+    """
+    fields = []
+    for window in ["1h", "24h"]:
+        fields += [
+            Field(name=f"{prefix}_txn_count_{window}", dtype=Int64, description=f"Transactions in the last {window}"),
+            Field(name=f"{prefix}_amt_sum_{window}", dtype=Float64, description=f"Amount sum over the last {window}"),
+            Field(name=f"{prefix}_amt_mean_{window}", dtype=Float64, description=f"Mean amount over the last {window}"),
+            Field(name=f"{prefix}_amt_max_{window}", dtype=Float64, description=f"Max amount over the last {window}"),
+        ]
+    fields.append(Field(name=f"{prefix}_amt_zscore_7d", dtype=Float64, description="Amount z-score vs previous 7 days"))
+    fields.append(Field(name=f"{prefix}_secs_since_last", dtype=Float64, description="Seconds since previous transaction (capped at 7 days)"))
+    return fields
+
+
+# Velocity feature sources: batch Parquet for training/backfill, push sources for the streaming engine
+customer_velocity_source = FileSource(
+    name="customer_velocity_source",
+    path="../data/processed/customer_velocity.parquet",
+    timestamp_field="timestamp",
+)
+
+customer_velocity_push = PushSource(
+    name="customer_velocity_push",
+    batch_source=customer_velocity_source,
+)
+
+merchant_velocity_source = FileSource(
+    name="merchant_velocity_source",
+    path="../data/processed/merchant_velocity.parquet",
+    timestamp_field="timestamp",
+)
+
+merchant_velocity_push = PushSource(
+    name="merchant_velocity_push",
+    batch_source=merchant_velocity_source,
+)
+
+# Customer velocity feature view - sliding-window aggregates per card
+customer_velocity_features = FeatureView(
+    name="customer_velocity_features",
+    entities=[customer],
+    ttl=timedelta(days=7),
+    schema=velocity_schema("cust"),
+    online=True,
+    source=customer_velocity_push,
+    tags={"team": "fraud_detection", "type": "velocity"},
+)
+
+# Merchant velocity feature view - sliding-window aggregates per merchant
+merchant_velocity_features = FeatureView(
+    name="merchant_velocity_features",
+    entities=[merchant],
+    ttl=timedelta(days=7),
+    schema=velocity_schema("merch"),
+    online=True,
+    source=merchant_velocity_push,
+    tags={"team": "fraud_detection", "type": "velocity"},
+)
+
 # Feature service for fraud detection model
 fraud_detection_v1 = FeatureService(
     name="fraud_detection_v1",
     features=[transaction_features],
     description="Fraud detection features v1 - basic transaction data"
 )
+
+# Feature service with customer and merchant velocity features
+fraud_detection_v2 = FeatureService(
+    name="fraud_detection_v2",
+    features=[transaction_features, customer_velocity_features, merchant_velocity_features],
+    description="Fraud detection features v2 - transaction data plus velocity aggregates"
+)
@@ -0,0 +1,109 @@
+"""
+Evaluate a model on a labelled dataset in one streaming pass
+
+Scores the dataset chunk by chunk (or reads precomputed scores), accumulates a
+score histogram and reports ROC-AUC, PR-AUC and metrics at the decision, best-F1
+and minimum-cost thresholds. Metrics and the threshold sweep are logged to the
+MLflow run that produced the model.
+
+Usage:
+    python scripts/batch/evaluate_model.py
+    python scripts/batch/evaluate_model.py --model-uri models:/fraud_detector/3 --workers 8
+    python scripts/batch/evaluate_model.py --data data/predictions/test_scores --score-column fraud_probability \\
+        --model-uri models:/fraud_detector/3
+"""
+from pathlib import Path
+import argparse
+import json
+import logging
+import sys
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.models.evaluate import StreamingEvaluator, evaluate_parquet, log_evaluation
+from src.models.inference import DEFAULT_THRESHOLD
+from src.utils.config import get_section, load_config
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "data_path": "data/processed/X_test_with_timestamps.parquet",
+    "model_uri": "models:/fraud_detector/latest",
+    "bins": 100_000,
+    "threshold": None,
+    "cost_false_positive": 1.0,
+    "cost_false_negative": 1.0,
+    "sweep_step": 0.01,
+    "workers": 1,
+    "batch_size": 250_000,
+}
+
+TRAINING_DEFAULTS = {"tracking_uri": "sqlite:///mlflow.db"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming model evaluation")
+    parser.add_argument("--data", help="Labelled Parquet file/dataset (overrides model_params.yaml)")
+    parser.add_argument("--model-uri", help="Model path or MLflow URI")
+    parser.add_argument("--score-column", help="Use precomputed probabilities from this column")
+    parser.add_argument("--threshold", type=float, help="Decision threshold for the headline metrics")
+    parser.add_argument("--workers", type=int, help="Worker processes")
+    parser.add_argument("--no-log", action="store_true", help="Do not log to MLflow")
+    parser.add_argument("--output", help="Write the report as JSON")
+    args = parser.parse_args()
+
+    config = load_config("model_params")
+    settings = get_section(config, "evaluation", DEFAULTS)
+    training = get_section(config, "training", TRAINING_DEFAULTS)
+    model_uri = args.model_uri or settings["model_uri"]
+
+    threshold = args.threshold if args.threshold is not None else settings["threshold"]
+    run_id = None
+    if model_uri.startswith(("models:/", "runs:/")):
+        import mlflow
+        from src.utils.mlflow_utils import get_decision_threshold, get_model_run_id, resolve_model_version
+        mlflow.set_tracking_uri(training["tracking_uri"])
+        run_id = get_model_run_id(model_uri)
+        resolved = resolve_model_version(model_uri)
+        if resolved is not None:
+            model_uri = f"models:/{resolved[0]}/{resolved[1]}"  # Every worker loads the same version
+            if threshold is None:
+                threshold = get_decision_threshold(*resolved, default=DEFAULT_THRESHOLD)
+    threshold = DEFAULT_THRESHOLD if threshold is None else threshold
+    logger.info(f"Evaluating {model_uri} at threshold {threshold}")
+
+    evaluator = StreamingEvaluator(
+        bins=settings["bins"],
+        threshold=threshold,
+        cost_false_positive=settings["cost_false_positive"],
+        cost_false_negative=settings["cost_false_negative"],
+    )
+    report = evaluate_parquet(
+        args.data or str(PROJECT_ROOT / settings["data_path"]),
+        evaluator,
+        model_uri=model_uri,
+        score_column=args.score_column,
+        workers=args.workers or settings["workers"],
+        batch_size=settings["batch_size"],
+    )
+
+    print(f"\nRows {report['rows']:,} ({report['positives']:,.0f} fraud)  "
+          f"ROC-AUC {report['roc_auc']:.4f}  PR-AUC {report['pr_auc']:.4f}")
+    for label, key in (("decision", "at_threshold"), ("best F1", "best_f1"), ("min cost", "min_cost")):
+        m = report[key]
+        print(f"  {label:<9} t={m['threshold']:.4f}  precision {m['precision']:.4f}  recall {m['recall']:.4f}  "
+              f"F1 {m['f1']:.4f}  cost {m['cost']:,.0f}")
+
+    if run_id and not args.no_log:
+        log_evaluation(evaluator, run_id, sweep_step=settings["sweep_step"], report=report)
+    elif not args.no_log:
+        logger.warning(f"{model_uri} is not tracked in MLflow; metrics were not logged")
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        logger.info(f"Wrote report to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Load new offline feature rows into the online store
+
+Each feature view remembers the newest event time it has loaded (its high-water mark)
+and which Parquet files it has read; a run only reads files that changed and rows past
+the mark, keeps the latest row per entity and writes them in bulk.
+
+Usage:
+    python scripts/batch/materialize_features.py
+    python scripts/batch/materialize_features.py --full --views transaction_features
+    python scripts/batch/materialize_features.py --interval 300
+"""
+from datetime import datetime
+from pathlib import Path
+import argparse
+import json
+import logging
+import sys
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.features import IncrementalMaterializer, MaterializationJob, get_fraud_feature_store
+from src.utils.config import get_section, load_config
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "repo_path": "feature_store",
+    "state_path": None,
+    "batch_size": 10000,
+    "views": None,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental online store materialization")
+    parser.add_argument("--repo-path", help="Feast repository (overrides batch_config.yaml)")
+    parser.add_argument("--state", help="High-water mark file")
+    parser.add_argument("--views", nargs="+", help="Feature views to materialize")
+    parser.add_argument("--batch-size", type=int, help="Entities per online store transaction")
+    parser.add_argument("--end", help="Newest event time to load, ISO format (default: now)")
+    parser.add_argument("--full", action="store_true", help="Ignore high-water marks and reload each view's TTL window")
+    parser.add_argument("--interval", type=float, help="Keep running, materializing every INTERVAL seconds")
+    args = parser.parse_args()
+
+    config = get_section(load_config("batch_config"), "materialization", DEFAULTS)
+    repo_path = Path(args.repo_path or config["repo_path"])
+    if not repo_path.is_absolute():
+        repo_path = PROJECT_ROOT / repo_path
+    state_path = args.state or config["state_path"]
+    if state_path and not Path(state_path).is_absolute():
+        state_path = str(PROJECT_ROOT / state_path)
+
+    # Writes go to the online backend of configs/online_store.yaml
+    feature_store = get_fraud_feature_store(repo_path=str(repo_path), cache_size=0)
+    materializer = IncrementalMaterializer(
+        feature_store,
+        state_path=state_path,
+        batch_size=args.batch_size or config["batch_size"],
+        views=args.views or config["views"],
+    )
+
+    if args.interval:
+        if args.full or args.end:
+            parser.error("--full and --end apply to single runs, not --interval")
+        job = MaterializationJob(materializer, interval_s=args.interval)
+        job.start()
+        logger.info(f"Materializing every {args.interval}s (Ctrl-C to stop)")
+        try:
+            job.join()
+        except KeyboardInterrupt:
+            job.stop()
+        return
+
+    report = materializer.run(end=datetime.fromisoformat(args.end) if args.end else None, full=args.full)
+    logger.info(f"Read {report['rows_read']:,} rows, wrote {report['rows_written']:,} entities in "
+                f"{report['seconds']:.2f}s ({report['rows_per_sec']:,.0f} rows/s)")
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
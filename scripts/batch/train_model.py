@@ -0,0 +1,103 @@
+"""
+Train the fraud model with a parallel hyperparameter search
+
+Loads the processed Parquet training set, cross-validates every candidate of the
+search grid in configs/model_params.yaml on time-ordered folds across worker
+processes, logs each trial to MLflow and registers the best model.
+
+Usage:
+    python scripts/batch/train_model.py
+    python scripts/batch/train_model.py --negative-sample-rate 0.05 --max-candidates 8
+    python scripts/batch/train_model.py --families logistic --no-register
+"""
+from pathlib import Path
+import argparse
+import json
+import logging
+import sys
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.models.train import TrainingPipeline, load_training_data
+from src.utils.config import get_section, load_config
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "data_path": "data/processed/X_train_with_timestamps.parquet",
+    "start": None,
+    "end": None,
+    "tracking_uri": "sqlite:///mlflow.db",
+    "experiment_name": "fraud_detection",
+    "model_name": "fraud_detector",
+    "workers": None,
+    "cv_splits": 4,
+    "cv_gap": 0,
+    "negative_sample_rate": 1.0,
+    "scoring": "average_precision",
+    "max_candidates": None,
+    "seed": 42,
+    "drift_profile_rows": 200_000,
+}
+
+# The notebook's model, used when model_params.yaml has no search section
+DEFAULT_SEARCH = {"logistic": {"C": [1.0]}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fraud model training with hyperparameter search")
+    parser.add_argument("--data", help="Parquet training set (overrides model_params.yaml)")
+    parser.add_argument("--families", nargs="+", help="Only search these model families")
+    parser.add_argument("--workers", type=int, help="Trial processes")
+    parser.add_argument("--cv-splits", type=int, help="Time-ordered CV folds")
+    parser.add_argument("--negative-sample-rate", type=float, help="Fraction of legitimate rows kept")
+    parser.add_argument("--max-candidates", type=int, help="Random subset of the grid to try")
+    parser.add_argument("--no-register", action="store_true", help="Search only; skip MLflow logging and registration")
+    parser.add_argument("--output", help="Write the ranked trial results as JSON")
+    args = parser.parse_args()
+
+    config = load_config("model_params")
+    training = get_section(config, "training", DEFAULTS)
+    search_space = config.get("search") or DEFAULT_SEARCH
+    if args.families:
+        unknown = set(args.families) - set(search_space)
+        if unknown:
+            parser.error(f"No search grid for {sorted(unknown)} in model_params.yaml")
+        search_space = {family: search_space[family] for family in args.families}
+
+    data_path = args.data or str(PROJECT_ROOT / training["data_path"])
+    data = load_training_data(data_path, start=training["start"], end=training["end"])
+
+    pipeline = TrainingPipeline(
+        search_space,
+        workers=args.workers or training["workers"],
+        cv_splits=args.cv_splits or training["cv_splits"],
+        cv_gap=training["cv_gap"],
+        negative_sample_rate=args.negative_sample_rate or training["negative_sample_rate"],
+        scoring=training["scoring"],
+        max_candidates=args.max_candidates or training["max_candidates"],
+        seed=training["seed"],
+        model_name=training["model_name"],
+        log_to_mlflow=not args.no_register,
+        profile_rows=training["drift_profile_rows"],
+    )
+    if not args.no_register:
+        from src.utils.mlflow_utils import setup_mlflow
+        setup_mlflow(training["tracking_uri"], training["experiment_name"])
+    summary = pipeline.run(data)
+
+    print(f"\n{'trial':>5}  {'family':<24} {training['scoring']:>18} {'seconds':>8} {'peak MiB':>9}  params")
+    for result in summary["trials"]:
+        print(f"{result['trial_id']:>5}  {result['family']:<24} {result[training['scoring']]:>18.4f} "
+              f"{result['wall_seconds']:>8.1f} {result['peak_memory_mb']:>9.1f}  {result['params']}")
+    if "model_uri" in summary:
+        print(f"\nRegistered {training['model_name']} from run {summary['run_id']} ({summary['model_uri']})")
+    if args.output:
+        Path(args.output).write_text(json.dumps(summary["trials"], indent=2, default=str))
+        logger.info(f"Wrote trial results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""
+Shared helpers for the benchmark scripts
+Synthetic transactions, throwaway models and Feast repositories, and result files keyed
+by git commit so runs can be compared across commits (see compare_results.py)
+
+Everything here works offline: models are fitted on synthetic data and the Feast
+repository uses the local SQLite online store.
+"""
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+import datetime
+import hashlib
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+DEFAULT_RESULTS_DIR = PROJECT_ROOT / "benchmark_results"
+DEFAULT_WORK_DIR = PROJECT_ROOT / ".benchmarks"
+
+# Encoded value ranges of the Kaggle credit card fraud dataset (LabelEncoder codes)
+N_CATEGORIES = 14
+N_STATES = 51
+N_MERCHANTS = 693
+
+
+def generate_transactions(n: int, seed: int = 0, fraud_rate: float = 0.006,
+                          start: str = "2024-01-01", days: int = 30) -> "pd.DataFrame":
+    """
+    Synthetic processed transactions (prepare_feast_data output layout)
+
+    Amounts are log-normal with fraud skewed towards large purchases; customers and
+    merchants repeat so velocity features and cache hits behave like real traffic.
+
+    Args:
+        n: Number of transactions
+        seed: Random seed; the same seed always yields the same rows
+        fraud_rate: Fraction of rows labelled is_fraud
+        start: First event date (UTC)
+        days: Span of event times
+
+    Returns:
+        DataFrame with the preprocessing OUTPUT_COLUMNS
+    """
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    is_fraud = rng.random(n) < fraud_rate
+    amt = np.round(np.where(is_fraud, rng.lognormal(5.5, 0.9, n), rng.lognormal(3.6, 1.1, n)), 2)
+    seconds = np.sort(rng.integers(0, days * 86400, n))
+    timestamp = pd.Timestamp(start, tz="UTC") + pd.to_timedelta(seconds, unit="s")
+    customers = rng.integers(4 * 10**15, 5 * 10**15, max(n // 20, 1))
+    return pd.DataFrame({
+        "timestamp": timestamp,
+        "trans_num": [f"bench{seed}-{i:08d}" for i in range(n)],
+        "cc_num": rng.choice(customers, n).astype(str).astype(object),
+        "merchant": pd.Series(rng.integers(0, N_MERCHANTS, n)).map("fraud_merchant_{}".format).astype(object),
+        "amt": amt,
+        "city_pop": np.round(rng.lognormal(8.5, 2.0, n)).astype(np.int64) + 20,
+        "category_encoded": rng.integers(0, N_CATEGORIES, n),
+        "gender_encoded": rng.integers(0, 2, n),
+        "state_encoded": rng.integers(0, N_STATES, n),
+        "unix_time": timestamp.astype("int64") // 10**9,
+        "is_fraud": is_fraud.astype(np.int64),
+    })
+
+
+def transaction_requests(df: "pd.DataFrame") -> List[Dict[str, Any]]:
+    """TransactionRequest JSON bodies for rows of generate_transactions()"""
+    columns = ["trans_num", "cc_num", "merchant", "amt", "city_pop",
+               "category_encoded", "gender_encoded", "state_encoded"]
+    return [
+        {"trans_num": t, "cc_num": c, "merchant": m, "amt": float(a), "city_pop": int(p),
+         "category_encoded": int(cat), "gender_encoded": int(g), "state_encoded": int(s)}
+        for t, c, m, a, p, cat, g, s in df[columns].itertuples(index=False)
+    ]
+
+
+def fit_model(kind: str = "logistic", n: int = 20_000, seed: int = 0):
+    """
+    Fit a small model on synthetic transactions
+
+    Args:
+        kind: logistic, random_forest or gradient_boosting
+        n: Training rows
+        seed: Random seed
+
+    Returns:
+        Fitted estimator
+    """
+    from src.models.inference import FEATURE_COLUMNS
+
+    df = generate_transactions(n, seed=seed, fraud_rate=0.05)
+    features, labels = df[FEATURE_COLUMNS].to_numpy(dtype=np.float64), df["is_fraud"].to_numpy()
+    if kind == "logistic":
+        from sklearn.linear_model import LogisticRegression
+        model = LogisticRegression(max_iter=1000)
+    elif kind == "random_forest":
+        from sklearn.ensemble import RandomForestClassifier
+        model = RandomForestClassifier(n_estimators=100, max_depth=10, n_jobs=1, random_state=seed)
+    elif kind == "gradient_boosting":
+        from sklearn.ensemble import GradientBoostingClassifier
+        model = GradientBoostingClassifier(n_estimators=100, max_depth=3, random_state=seed)
+    else:
+        raise ValueError(f"Unknown model kind: {kind}")
+    return model.fit(features, labels)
+
+
+def write_model(directory: Path, kind: str = "logistic", version: str = "1") -> Path:
+    """Fit a model and save it as '<version>.pkl' for a local model source"""
+    import joblib
+
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{version}.pkl"
+    joblib.dump(fit_model(kind), path)
+    return path
+
+
+def build_feast_repo(work_dir: Path, n: int = 50_000, seed: int = 0) -> Path:
+    """
+    Create (or reuse) a Feast repository with synthetic data applied and materialized
+
+    The repository copies feature_store/features.py and feature_store.yaml, so it
+    exercises the real feature definitions against the local SQLite online store.
+    A repository built for the same row count and seed is reused.
+
+    Args:
+        work_dir: Parent directory for benchmark workspaces
+        n: Transactions to generate
+        seed: Random seed
+
+    Returns:
+        Path of the Feast repository (pass to FraudFeatureStore)
+    """
+    from src.features.batch_features import build_velocity_features
+    from src.features.feast_utils import FraudFeatureStore
+
+    workspace = Path(work_dir) / f"feast-{n}-{seed}"
+    repo = workspace / "feature_store"
+    marker = workspace / "READY"
+    if marker.exists():
+        return repo
+    shutil.rmtree(workspace, ignore_errors=True)
+    (repo / "data").mkdir(parents=True)
+    for name in ("features.py", "feature_store.yaml"):
+        shutil.copy(PROJECT_ROOT / "feature_store" / name, repo / name)
+
+    # Same relative layout as the project: feature_store/../data/processed
+    processed = workspace / "data" / "processed"
+    processed.mkdir(parents=True)
+    df = generate_transactions(n, seed=seed)
+    transactions_path = processed / "X_train_with_timestamps.parquet"
+    df.to_parquet(transactions_path, index=False)
+    build_velocity_features(str(transactions_path), str(processed))
+
+    feast_cli = shutil.which("feast")
+    if feast_cli is None:
+        raise RuntimeError("The feast CLI is required to build the benchmark feature repository")
+    subprocess.run([feast_cli, "apply"], cwd=repo, check=True, capture_output=True)
+    store = FraudFeatureStore(repo_path=str(repo), cache_size=0)
+    first, last = df["timestamp"].min(), df["timestamp"].max()
+    store.materialize((first - datetime.timedelta(days=1)).strftime("%Y-%m-%d"),
+                      (last + datetime.timedelta(days=1)).strftime("%Y-%m-%d"))
+    marker.write_text(json.dumps({"rows": n, "seed": seed}))
+    return repo
+
+
+def git_commit() -> Dict[str, Any]:
+    """Current commit and whether the working tree has uncommitted changes"""
+    def git(*args: str) -> Optional[str]:
+        try:
+            return subprocess.run(["git", *args], cwd=PROJECT_ROOT, capture_output=True,
+                                  text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    commit = git("rev-parse", "--short=12", "HEAD") or "unknown"
+    status = git("status", "--porcelain", "--untracked-files=no")
+    return {"commit": commit, "dirty": bool(status), "subject": git("log", "-1", "--format=%s")}
+
+
+def environment() -> Dict[str, Any]:
+    """Machine and library details recorded with every result"""
+    import sklearn
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "sklearn": sklearn.__version__,
+    }
+
+
+def save_results(suite: str, results: Dict[str, Any], config: Dict[str, Any],
+                 output: Optional[str] = None, results_dir: Path = DEFAULT_RESULTS_DIR) -> Path:
+    """
+    Write a result file '<results_dir>/<suite>/<commit>[-dirty].json'
+
+    Args:
+        suite: Benchmark suite name
+        results: Measurements
+        config: Parameters the suite ran with (compared runs should share them)
+        output: Explicit output path instead of the default location
+        results_dir: Root of the default location
+
+    Returns:
+        Path written
+    """
+    git = git_commit()
+    document = {
+        "suite": suite,
+        "git": git,
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "config": config,
+        "config_hash": hashlib.sha1(json.dumps(config, sort_keys=True).encode()).hexdigest()[:10],
+        "environment": environment(),
+        "results": results,
+    }
+    if output:
+        path = Path(output)
+    else:
+        path = Path(results_dir) / suite / f"{git['commit']}{'-dirty' if git['dirty'] else ''}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(document, indent=2))
+    return path
+
+
+def percentiles(latencies_s: List[float]) -> Dict[str, float]:
+    """Latency summary in milliseconds"""
+    values = np.asarray(latencies_s, dtype=np.float64) * 1000
+    if values.size == 0:
+        return {"count": 0}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"count": int(values.size), "mean_ms": float(values.mean()), "p50_ms": float(p50),
+            "p95_ms": float(p95), "p99_ms": float(p99), "max_ms": float(values.max())}
+
+
+async def start_app(model_dir: Path, feast_repo: Optional[Path] = None, coalesce: bool = False):
+    """
+    Start the API in-process on the running event loop, serving models from model_dir
+
+    MLflow is not contacted: the model manager reads a local model directory and the
+    artifact cache, shared parameters and polling are disabled. Feast is initialized
+    from feast_repo when given, otherwise left out.
+
+    Returns:
+        The src.api.app module (use .app as the ASGI application)
+    """
+    import src.api.app as api
+    from src.features.feast_utils import FraudFeatureStore
+
+    api.model_manager_config.update(source="local", local_dir=str(model_dir), settle_seconds=0,
+                                    cache_dir=None, shared_params_dir=None, poll_interval_seconds=0)
+    api.batching_config["coalesce_enabled"] = coalesce
+
+    def init_feature_store(raise_errors: bool = True):
+        if feast_repo is not None:
+            api.feature_store = FraudFeatureStore(repo_path=str(feast_repo),
+                                                  cache_size=api.feature_cache_config["size"])
+
+    api.init_feature_store = init_feature_store
+    api.startup_config["feature_store_init"] = "eager"
+    await api.startup_event()
+    return api
@@ -0,0 +1,90 @@
+"""
+Compare two benchmark result files
+
+Lines up every latency (lower is better) and throughput (higher is better) figure in
+two results of the same suite, prints the relative change and exits non-zero when any
+figure regressed by more than --threshold, so it can gate a CI job.
+
+Usage:
+    python scripts/benchmarks/compare_results.py benchmark_results/load/abc123.json benchmark_results/load/def456.json
+    python scripts/benchmarks/compare_results.py --suite micro abc123 def456
+"""
+from pathlib import Path
+from typing import Dict, Iterator, Tuple
+import argparse
+import json
+import sys
+
+from bench_utils import DEFAULT_RESULTS_DIR
+
+# Metric name suffixes and whether a larger value is better
+LOWER_IS_BETTER = ("_ms", "us_per_call")
+HIGHER_IS_BETTER = ("_per_sec",)
+# Figures too noisy to gate on, or restating another one (calls/sec = 1 / us_per_call)
+IGNORED = ("max_ms", "best_us_per_call", "mean_ms", "calls_per_sec", "rows_per_sec")
+
+
+def resolve(reference: str, suite: str) -> Path:
+    """A result file path, or a commit id looked up under benchmark_results/<suite>/"""
+    path = Path(reference)
+    if path.exists():
+        return path
+    matches = sorted((DEFAULT_RESULTS_DIR / suite).glob(f"{reference}*.json"))
+    if not matches:
+        raise FileNotFoundError(f"No {suite} results for {reference} in {DEFAULT_RESULTS_DIR / suite}")
+    return matches[0]
+
+
+def flatten(results: Dict, prefix: str = "") -> Iterator[Tuple[str, float, bool]]:
+    """(metric path, value, higher_is_better) for every comparable figure"""
+    for key, value in results.items():
+        name = f"{prefix}/{key}" if prefix else str(key)
+        if isinstance(value, dict):
+            yield from flatten(value, name)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool) and not key.endswith(IGNORED):
+            if key.endswith(LOWER_IS_BETTER):
+                yield name, float(value), False
+            elif key.endswith(HIGHER_IS_BETTER):
+                yield name, float(value), True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline", help="Result file or commit id")
+    parser.add_argument("candidate", help="Result file or commit id")
+    parser.add_argument("--suite", default="load", help="Suite used to resolve commit ids")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative change counted as a regression")
+    args = parser.parse_args()
+
+    baseline = json.loads(resolve(args.baseline, args.suite).read_text())
+    candidate = json.loads(resolve(args.candidate, args.suite).read_text())
+    if baseline["suite"] != candidate["suite"]:
+        sys.exit(f"Cannot compare suite {baseline['suite']} with {candidate['suite']}")
+    if baseline["config_hash"] != candidate["config_hash"]:
+        print(f"Warning: runs used different settings\n  {baseline['config']}\n  {candidate['config']}")
+    if baseline["environment"] != candidate["environment"]:
+        print("Warning: runs come from different environments")
+
+    before = {name: (value, higher) for name, value, higher in flatten(baseline["results"])}
+    regressions = 0
+    print(f"{'metric':<60}{baseline['git']['commit']:>14}{candidate['git']['commit']:>14}{'change':>10}")
+    for name, value, higher in flatten(candidate["results"]):
+        if name not in before or before[name][0] == 0:
+            continue
+        old = before[name][0]
+        change = (value - old) / old
+        worse = -change if higher else change
+        flag = ""
+        if worse > args.threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        elif worse < -args.threshold:
+            flag = "  improved"
+        print(f"{name:<60}{old:>14.4g}{value:>14.4g}{change:>+10.1%}{flag}")
+
+    print(f"\n{regressions} regression(s) beyond {args.threshold:.0%}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+In-process API load test
+
+Drives the FastAPI app through httpx's ASGI transport (no network, no separate server)
+with a fixed number of concurrent clients per level and reports latency percentiles
+and throughput for /predict, /predict/batch, /predict/bulk (NDJSON) and
+/predict/with-feast. The model is a
+synthetic one served from a temporary directory; /predict/with-feast reads a synthetic
+Feast repository built under --work-dir (see bench_utils.build_feast_repo), so the run
+is entirely offline.
+
+Every request uses a distinct transaction until the synthetic data runs out, so the
+feature cache sees realistic (mostly cold) traffic.
+
+Usage:
+    python scripts/benchmarks/load_test.py
+    python scripts/benchmarks/load_test.py --concurrency 1 16 64 --requests 4000 --skip-feast
+"""
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List
+import argparse
+import asyncio
+import json
+import logging
+import tempfile
+import time
+
+from bench_utils import (
+    DEFAULT_WORK_DIR,
+    build_feast_repo,
+    generate_transactions,
+    percentiles,
+    save_results,
+    start_app,
+    transaction_requests,
+    write_model,
+)
+
+ENDPOINTS = {
+    "predict": "/predict",
+    "predict_batch": "/predict/batch",
+    "predict_bulk": "/predict/bulk",
+    "predict_with_feast": "/predict/with-feast",
+}
+
+
+class RequestBodies:
+    """Cycles through request bodies, continuing where the previous level stopped"""
+
+    def __init__(self, bodies: List[Dict[str, Any]], batch_size: int = 1, ndjson: bool = False):
+        self.bodies = bodies
+        self.batch_size = batch_size
+        self.ndjson = ndjson
+        self.cursor = 0
+
+    def next(self) -> Dict[str, Any]:
+        """Keyword arguments for client.post"""
+        if self.batch_size == 1:
+            body = self.bodies[self.cursor % len(self.bodies)]
+            self.cursor += 1
+            return {"json": body}
+        start = self.cursor % len(self.bodies)
+        self.cursor += self.batch_size
+        rows = self.bodies[start:start + self.batch_size]
+        rows = rows + self.bodies[:self.batch_size - len(rows)]
+        if self.ndjson:
+            return {"content": "\n".join(json.dumps(row) for row in rows),
+                    "headers": {"Content-Type": "application/x-ndjson"}}
+        return {"json": {"transactions": rows}}
+
+
+async def run_level(client, path: str, bodies: RequestBodies, concurrency: int, total: int) -> Dict[str, Any]:
+    """
+    Send total requests from concurrency clients, each waiting for its previous response
+
+    Returns:
+        Latency percentiles (ms), requests/sec, rows/sec and status code counts
+    """
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    sent = 0
+
+    async def client_loop():
+        nonlocal sent
+        while sent < total:
+            sent += 1
+            request = bodies.next()
+            start = time.perf_counter()
+            try:
+                response = await client.post(path, **request)
+                statuses[str(response.status_code)] += 1
+            except Exception as e:
+                statuses[type(e).__name__] += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    ok = statuses.get("200", 0)
+    return {
+        **percentiles(latencies),
+        "concurrency": concurrency,
+        "requests": total,
+        "elapsed_s": elapsed,
+        "requests_per_sec": total / elapsed,
+        "rows_per_sec": ok * bodies.batch_size / elapsed,
+        "error_rate": 1 - ok / total,
+        "status_counts": dict(statuses),
+    }
+
+
+async def load_test(args) -> Dict[str, Any]:
+    import httpx
+    import pandas as pd
+
+    feast_repo = None
+    if "predict_with_feast" in args.endpoints:
+        feast_repo = build_feast_repo(Path(args.work_dir), n=args.feast_rows)
+        data = pd.read_parquet(feast_repo.parent / "data" / "processed" / "X_train_with_timestamps.parquet")
+        data = data.sample(frac=1.0, random_state=0)
+    else:
+        data = generate_transactions(args.feast_rows)
+    bodies = transaction_requests(data)
+    if args.feast_miss_rate > 0:
+        # Transactions the online store has never seen exercise the request-data fallback
+        unknown = transaction_requests(generate_transactions(int(len(bodies) * args.feast_miss_rate), seed=99))
+        bodies = [body for pair in zip(bodies, unknown) for body in pair] + bodies[len(unknown):]
+    if args.retry_rate > 0:
+        # Processor retries: the same transaction sent again shortly after the first attempt
+        import numpy as np
+        retried = np.random.default_rng(0).random(len(bodies)) < args.retry_rate
+        bodies = [b for body, retry in zip(bodies, retried) for b in ([body, body] if retry else [body])]
+
+    model_dir = Path(tempfile.mkdtemp(prefix="load-test-model-"))
+    write_model(model_dir, kind=args.model)
+    api = await start_app(model_dir, feast_repo, coalesce=args.coalesce)
+
+    results: Dict[str, Any] = {}
+    transport = httpx.ASGITransport(app=api.app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=60) as client:
+            for endpoint in args.endpoints:
+                path = ENDPOINTS[endpoint]
+                batch_size = args.batch_size if endpoint in ("predict_batch", "predict_bulk") else 1
+                source = RequestBodies(bodies, batch_size, ndjson=endpoint == "predict_bulk")
+                await run_level(client, path, source, 4, args.warmup)
+                results[endpoint] = {}
+                for concurrency in args.concurrency:
+                    level = await run_level(client, path, source, concurrency, args.requests)
+                    results[endpoint][str(concurrency)] = level
+                    print(f"{endpoint:<20} c={concurrency:<4} {level['requests_per_sec']:>9,.0f} req/s  "
+                          f"p50 {level['p50_ms']:7.2f}ms  p95 {level['p95_ms']:7.2f}ms  "
+                          f"p99 {level['p99_ms']:7.2f}ms  errors {level['error_rate']:.1%}")
+    finally:
+        await api.shutdown_event()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="In-process API load test")
+    parser.add_argument("--endpoints", nargs="+", choices=list(ENDPOINTS), default=list(ENDPOINTS))
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per endpoint and concurrency level")
+    parser.add_argument("--warmup", type=int, default=200, help="Unmeasured requests per endpoint")
+    parser.add_argument("--batch-size", type=int, default=100, help="Transactions per /predict/batch and /predict/bulk call")
+    parser.add_argument("--model", default="logistic", choices=["logistic", "random_forest", "gradient_boosting"])
+    parser.add_argument("--coalesce", action="store_true", help="Enable /predict request coalescing")
+    parser.add_argument("--skip-feast", action="store_true", help="Leave out /predict/with-feast")
+    parser.add_argument("--feast-rows", type=int, default=50_000, help="Rows in the synthetic feature repository")
+    parser.add_argument("--feast-miss-rate", type=float, default=0.0,
+                        help="Fraction of requests for transactions absent from the online store")
+    parser.add_argument("--retry-rate", type=float, default=0.0,
+                        help="Fraction of transactions sent twice in a row (exercises the score cache)")
+    parser.add_argument("--work-dir", default=str(DEFAULT_WORK_DIR), help="Where the Feast repository is built")
+    parser.add_argument("--output", help="Result file (default: benchmark_results/load/<commit>.json)")
+    args = parser.parse_args()
+    if args.skip_feast and "predict_with_feast" in args.endpoints:
+        args.endpoints.remove("predict_with_feast")
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger("src").setLevel(logging.WARNING)
+
+    results = asyncio.run(load_test(args))
+    config = {key: getattr(args, key) for key in
+              ("endpoints", "concurrency", "requests", "warmup", "batch_size", "model", "coalesce",
+               "feast_rows", "feast_miss_rate", "retry_rate")}
+    path = save_results("load", results, config, args.output)
+    print(f"\nResults written to {path}")
+
+
+if __name__ == "__main__":
+    main()
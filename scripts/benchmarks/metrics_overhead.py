@@ -0,0 +1,164 @@
+"""
+Instrumentation overhead benchmark
+
+Measures what the serving metrics cost: nanoseconds per histogram observation, per
+stage timer and for all bookkeeping of one /predict request, then end-to-end /predict
+and /predict/batch latency through the ASGI app with metrics enabled and disabled. Many short rounds alternate between the two settings
+so drift in machine load affects both equally, and overhead is reported on medians,
+which are less sensitive to scheduling noise than means. Uses a small
+LogisticRegression written to a temporary model directory; no MLflow or Feast needed.
+
+Usage:
+    python scripts/benchmarks/metrics_overhead.py
+    python scripts/benchmarks/metrics_overhead.py --requests 5000 --rounds 5 --output overhead.json
+"""
+from pathlib import Path
+import argparse
+import asyncio
+import json
+import statistics
+import tempfile
+import time
+import timeit
+
+from bench_utils import start_app, write_model
+
+TRANSACTION = {
+    "trans_num": "bench-0001",
+    "cc_num": "4000123412341234",
+    "merchant": "bench_merchant",
+    "amt": 125.5,
+    "city_pop": 50000,
+    "category_encoded": 3,
+    "gender_encoded": 1,
+    "state_encoded": 10,
+}
+
+
+def micro_benchmarks(number: int = 200_000) -> dict:
+    """Cost of the recording primitives, in nanoseconds per call"""
+    from src.utils.metrics import RequestTimer, ServingMetrics, current_request
+
+    metrics = ServingMetrics()
+    histogram = metrics.stages
+    labels = ("/predict", "scoring")
+
+    def timed_stage():
+        with metrics.stage("scoring"):
+            pass
+
+    def request_bookkeeping():
+        # Everything recorded for one /predict call, without the request itself
+        timer = RequestTimer("/predict")
+        token = current_request.set(timer)
+        timer.handler_start = time.perf_counter()
+        with metrics.stage("feature_assembly"):
+            pass
+        metrics.observe_batch(1)
+        with metrics.stage("scoring"):
+            pass
+        timer.handler_end = time.perf_counter()
+        metrics.observe_stage("validation", timer.handler_start - timer.start, "/predict")
+        metrics.observe_stage("serialization", time.perf_counter() - timer.handler_end, "/predict")
+        metrics.latency.observe(time.perf_counter() - timer.start, ("/predict",))
+        metrics.requests.inc(("/predict", "POST", "200"))
+        current_request.reset(token)
+
+    def empty():
+        pass
+
+    baseline = timeit.timeit(empty, number=number)
+    return {
+        "histogram_observe_ns": (timeit.timeit(lambda: histogram.observe(0.0004, labels), number=number)
+                                 - baseline) / number * 1e9,
+        "counter_inc_ns": (timeit.timeit(lambda: metrics.requests.inc(("/predict", "POST", "200")),
+                                         number=number) - baseline) / number * 1e9,
+        "stage_timer_ns": (timeit.timeit(timed_stage, number=number) - baseline) / number * 1e9,
+        "per_request_ns": (timeit.timeit(request_bookkeeping, number=number // 4) - baseline / 4)
+                          / (number // 4) * 1e9,
+    }
+
+
+async def drive(client, path: str, body: dict, n: int) -> list:
+    """Send n sequential requests and return per-request latencies in seconds"""
+    latencies = []
+    for _ in range(n):
+        start = time.perf_counter()
+        response = await client.post(path, json=body)
+        latencies.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            raise RuntimeError(f"{path} returned {response.status_code}: {response.text}")
+    return latencies
+
+
+def summarize(latencies: list) -> dict:
+    ordered = sorted(latencies)
+    return {
+        "mean_us": statistics.fmean(ordered) * 1e6,
+        "p50_us": ordered[len(ordered) // 2] * 1e6,
+        "p99_us": ordered[int(len(ordered) * 0.99)] * 1e6,
+    }
+
+
+async def end_to_end(requests: int, rounds: int, batch_size: int) -> dict:
+    """Latency through the full ASGI stack with metrics on and off"""
+    import httpx
+
+    model_dir = Path(tempfile.mkdtemp(prefix="metrics-bench-"))
+    write_model(model_dir)
+    api = await start_app(model_dir)
+
+    batch = {"transactions": [dict(TRANSACTION, trans_num=f"bench-{i}") for i in range(batch_size)]}
+    cases = {"predict": ("/predict", TRANSACTION), "predict_batch": ("/predict/batch", batch)}
+    samples = {(case, enabled): [] for case in cases for enabled in (True, False)}
+    transport = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for case, (path, body) in cases.items():
+            await drive(client, path, body, 200)  # Warm-up
+        for _ in range(rounds):
+            for enabled in (True, False):
+                api.serving_metrics.enabled = enabled
+                for case, (path, body) in cases.items():
+                    samples[(case, enabled)].extend(await drive(client, path, body, requests // rounds))
+    api.serving_metrics.enabled = True
+    await api.shutdown_event()
+
+    results = {}
+    for case in cases:
+        on, off = summarize(samples[(case, True)]), summarize(samples[(case, False)])
+        results[case] = {
+            "metrics_on": on,
+            "metrics_off": off,
+            "overhead_us": on["p50_us"] - off["p50_us"],
+            "overhead_pct": 100 * (on["p50_us"] - off["p50_us"]) / off["p50_us"],
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure serving instrumentation overhead")
+    parser.add_argument("--requests", type=int, default=3000, help="Requests per endpoint and setting")
+    parser.add_argument("--rounds", type=int, default=30, help="Alternating on/off rounds")
+    parser.add_argument("--batch-size", type=int, default=100, help="Transactions per /predict/batch call")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = {"micro": micro_benchmarks(),
+               "end_to_end": asyncio.run(end_to_end(args.requests, args.rounds, args.batch_size))}
+
+    print("\nRecording primitives")
+    for name, value in results["micro"].items():
+        print(f"  {name:<22} {value:8.0f} ns")
+    print(f"\n{'endpoint':<16}{'off p50':>10}{'on p50':>10}{'off p99':>10}{'on p99':>10}{'p50 overhead':>20}")
+    for case, r in results["end_to_end"].items():
+        print(f"{case:<16}{r['metrics_off']['p50_us']:>8.0f}us{r['metrics_on']['p50_us']:>8.0f}us"
+              f"{r['metrics_off']['p99_us']:>8.0f}us{r['metrics_on']['p99_us']:>8.0f}us"
+              f"{r['overhead_us']:>11.1f}us ({r['overhead_pct']:.1f}%)")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
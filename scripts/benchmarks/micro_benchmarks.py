@@ -0,0 +1,190 @@
+"""
+Serving-path micro-benchmarks
+
+Times the building blocks of a prediction in isolation:
+- feature assembly: request parsing (Pydantic models against the codec fast path),
+  the model input matrix and response encoding
+- model scoring: sklearn predict_proba against the FraudScorer kernels, per model type
+  and batch size
+- Feast online lookups: single and multi-entity reads, v1 and v2 feature services,
+  with and without the in-process feature cache
+
+Results are written as JSON keyed by git commit (see bench_utils.save_results).
+
+Usage:
+    python scripts/benchmarks/micro_benchmarks.py
+    python scripts/benchmarks/micro_benchmarks.py --skip-feast --models logistic
+"""
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+import argparse
+import logging
+import statistics
+import timeit
+
+import numpy as np
+
+from bench_utils import (
+    DEFAULT_WORK_DIR,
+    build_feast_repo,
+    fit_model,
+    generate_transactions,
+    save_results,
+    transaction_requests,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def measure(fn: Callable[[], Any], repeat: int = 5, min_time: float = 0.2, rows: int = 1) -> Dict[str, float]:
+    """
+    Time fn with enough loops per repeat to last at least min_time seconds
+
+    Returns:
+        Median and best microseconds per call, calls/sec and rows/sec
+    """
+    timer = timeit.Timer(fn)
+    loops, elapsed = timer.autorange()
+    loops = max(1, int(loops * min_time / max(elapsed, 1e-9)))
+    per_call = [t / loops for t in timer.repeat(repeat=repeat, number=loops)]
+    median = statistics.median(per_call)
+    return {
+        "us_per_call": median * 1e6,
+        "best_us_per_call": min(per_call) * 1e6,
+        "calls_per_sec": 1 / median,
+        "rows_per_sec": rows / median,
+        "loops": loops,
+    }
+
+
+def feature_assembly_benchmarks(requests: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """Request parsing, feature matrix construction and response encoding"""
+    import json
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from src.api.app import transaction_features
+    from src.api.codec import PredictionEncoder, parse_batch, parse_ndjson, parse_transaction
+    from src.api.schemas import BatchPredictionRequest, PredictionResponse, TransactionRequest
+
+    single = TransactionRequest(**requests[0])
+    batch = [TransactionRequest(**body) for body in requests[:100]]
+    batch_body = {"transactions": requests[:100]}
+    single_json = json.dumps(requests[0]).encode()
+    batch_json = json.dumps(batch_body).encode()
+    ndjson = "\n".join(json.dumps(body) for body in requests[:100]).encode()
+    content_type = "application/json"
+
+    labels = np.zeros(100, dtype=np.int64)
+    probabilities = np.linspace(0.001, 0.999, 100)
+    trans_nums = [body["trans_num"] for body in requests[:100]]
+    encoder = PredictionEncoder()
+
+    def response_model_encode():
+        # What FastAPI did per /predict response: build, revalidate and JSON-encode the model
+        response = PredictionResponse(trans_num=trans_nums[0], is_fraud=False,
+                                      fraud_probability=float(probabilities[0]), model_version="fraud_detector/1")
+        validated = PredictionResponse.model_validate(response.model_dump())
+        return JSONResponse(jsonable_encoder(validated)).body
+
+    return {
+        "validate_request": measure(lambda: TransactionRequest.model_validate_json(single_json)),
+        "validate_batch_100": measure(lambda: BatchPredictionRequest.model_validate_json(batch_json), rows=100),
+        "parse_request": measure(lambda: parse_transaction(single_json, content_type)),
+        "parse_batch_100": measure(lambda: parse_batch(batch_json, content_type), rows=100),
+        "parse_ndjson_100": measure(lambda: parse_ndjson(ndjson), rows=100),
+        "assemble_1": measure(lambda: transaction_features([single])),
+        "assemble_100": measure(lambda: transaction_features(batch), rows=100),
+        "response_model_encode": measure(response_model_encode),
+        "encode_response": measure(lambda: encoder.prediction(trans_nums[0], False, probabilities[0], "fraud_detector/1")),
+        "encode_batch_100": measure(
+            lambda: encoder.batch(trans_nums, labels, probabilities, "fraud_detector/1"), rows=100),
+    }
+
+
+def scoring_benchmarks(kinds: List[str], batch_sizes: List[int]) -> Dict[str, Dict[str, float]]:
+    """sklearn predict_proba against FraudScorer (linear or shared-parameter kernels)"""
+    from src.models.inference import FEATURE_COLUMNS, FraudScorer
+    from src.models.shared_params import build_kernel, export_model_params
+
+    df = generate_transactions(max(batch_sizes), seed=1)
+    features = np.ascontiguousarray(df[FEATURE_COLUMNS].to_numpy(dtype=np.float64))
+    results = {}
+    for kind in kinds:
+        model = fit_model(kind)
+        scorers = {"sklearn": FraudScorer(model, fast_path=False), "scorer": FraudScorer(model)}
+        if not scorers["scorer"].fast_path:
+            exported = export_model_params(model)
+            if exported is not None:
+                # As served from a shared segment: the kernel, with sklearn above kernel.max_rows
+                kernel = build_kernel(*exported)
+                scorers["scorer"] = FraudScorer(None, kernel=kernel, model_loader=lambda: model)
+                scorers["kernel"] = FraudScorer(None, kernel=build_kernel(*exported))
+                scorers["kernel"].kernel.max_rows = None
+        for name, scorer in scorers.items():
+            for size in batch_sizes:
+                rows = features[:size]
+                results[f"{kind}/{name}/batch_{size}"] = measure(lambda: scorer.score(rows), rows=size)
+    return results
+
+
+def feast_benchmarks(repo: Path, entities: int = 32) -> Dict[str, Dict[str, float]]:
+    """Online lookups through FraudFeatureStore, uncached and cached"""
+    import pandas as pd
+    from src.features.feast_utils import FraudFeatureStore
+    from src.models.inference import FEATURE_COLUMNS
+
+    data = pd.read_parquet(repo.parent / "data" / "processed" / "X_train_with_timestamps.parquet",
+                           columns=["trans_num", "cc_num", "merchant"])
+    rows = data.sample(entities, random_state=0).to_dict("records")
+    v1_rows = [{"trans_num": row["trans_num"]} for row in rows]
+
+    uncached = FraudFeatureStore(repo_path=str(repo), cache_size=0)
+    cached = FraudFeatureStore(repo_path=str(repo), cache_size=10_000)
+    cached.get_online_feature_matrix(v1_rows, columns=FEATURE_COLUMNS)  # Fill the cache
+    return {
+        "v1_single": measure(lambda: uncached.get_online_feature_matrix(v1_rows[:1], columns=FEATURE_COLUMNS)),
+        f"v1_{entities}_entities": measure(
+            lambda: uncached.get_online_feature_matrix(v1_rows, columns=FEATURE_COLUMNS), rows=entities),
+        "v2_single": measure(lambda: uncached.get_online_feature_matrix(rows[:1], "fraud_detection_v2")),
+        "v1_single_cached": measure(lambda: cached.get_online_feature_matrix(v1_rows[:1], columns=FEATURE_COLUMNS)),
+        f"v1_{entities}_entities_cached": measure(
+            lambda: cached.get_online_feature_matrix(v1_rows, columns=FEATURE_COLUMNS), rows=entities),
+    }
+
+
+def print_table(title: str, results: Dict[str, Dict[str, float]]):
+    print(f"\n{title}")
+    for name, r in results.items():
+        print(f"  {name:<40} {r['us_per_call']:>10.1f} us/call {r['rows_per_sec']:>14,.0f} rows/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serving-path micro-benchmarks")
+    parser.add_argument("--models", nargs="+", default=["logistic", "random_forest", "gradient_boosting"])
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 64, 1024])
+    parser.add_argument("--skip-feast", action="store_true", help="Skip Feast online lookups")
+    parser.add_argument("--feast-rows", type=int, default=50_000, help="Rows in the synthetic feature repository")
+    parser.add_argument("--work-dir", default=str(DEFAULT_WORK_DIR), help="Where the Feast repository is built")
+    parser.add_argument("--output", help="Result file (default: benchmark_results/micro/<commit>.json)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    requests = transaction_requests(generate_transactions(100, seed=2))
+    results = {
+        "feature_assembly": feature_assembly_benchmarks(requests),
+        "scoring": scoring_benchmarks(args.models, args.batch_sizes),
+    }
+    if not args.skip_feast:
+        repo = build_feast_repo(Path(args.work_dir), n=args.feast_rows)
+        results["feast"] = feast_benchmarks(repo)
+
+    for section, section_results in results.items():
+        print_table(section, section_results)
+    config = {"models": args.models, "batch_sizes": args.batch_sizes,
+              "feast": not args.skip_feast, "feast_rows": args.feast_rows}
+    path = save_results("micro", results, config, args.output)
+    print(f"\nResults written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Online store backend benchmark
+
+Compares Feast's SQLite online store with the alternative backends of
+src/features/online_backends.py on the synthetic benchmark repository:
+- load: full incremental materialization of every view (rows/sec)
+- lookups: FraudFeatureStore.get_online_feature_matrix without the feature cache, for
+  the v1 (one view) and v2 (three views) services at several entity counts
+- concurrent: lookups/sec from several threads sharing one FraudFeatureStore
+
+Redis is served by the in-process stand-in server (src/features/resp_server.py)
+unless --redis-url points at a real one; the stand-in runs in the benchmark's own
+interpreter, so its figures include its Python overhead and understate a real server.
+
+Usage:
+    python scripts/benchmarks/online_store_benchmark.py
+    python scripts/benchmarks/online_store_benchmark.py --backends sqlite mmap --redis-url redis://localhost:6379/0
+"""
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import argparse
+import logging
+import shutil
+import tempfile
+import threading
+import time
+
+from bench_utils import DEFAULT_WORK_DIR, build_feast_repo, save_results
+from micro_benchmarks import measure, print_table
+
+BACKENDS = ["sqlite", "mmap", "redis"]
+
+
+def create_backend(name: str, work_dir: Path, redis_url: Optional[str]):
+    """(backend or None for Feast's store, stand-in server to stop or None)"""
+    from src.features.online_backends import MmapOnlineBackend, RedisOnlineBackend
+    from src.features.resp_server import LocalRespServer
+
+    if name == "sqlite":
+        return None, None
+    if name == "mmap":
+        return MmapOnlineBackend(str(work_dir / "online_store.kv")), None
+    server = None
+    if redis_url is None:
+        server = LocalRespServer().start()
+        redis_url = server.url
+    backend = RedisOnlineBackend(redis_url)
+    backend.client.flushdb()
+    return backend, server
+
+
+def concurrent_lookups(fs, rows: List[Dict[str, Any]], threads: int, seconds: float) -> Dict[str, float]:
+    """Lookups/sec with threads callers repeating the same lookup"""
+    from src.models.inference import FEATURE_COLUMNS
+
+    stop = threading.Event()
+    counts = [0] * threads
+
+    def worker(index: int):
+        while not stop.is_set():
+            fs.get_online_feature_matrix(rows, columns=FEATURE_COLUMNS)
+            counts[index] += 1
+
+    with ThreadPoolExecutor(threads) as pool:
+        started = time.perf_counter()
+        for index in range(threads):
+            pool.submit(worker, index)
+        time.sleep(seconds)
+        stop.set()
+    elapsed = time.perf_counter() - started
+    return {"threads": threads, "lookups_per_sec": sum(counts) / elapsed,
+            "rows_per_sec": sum(counts) * len(rows) / elapsed}
+
+
+def benchmark_backend(name: str, repo: Path, args) -> Dict[str, Any]:
+    import pandas as pd
+    from src.features.feast_utils import FraudFeatureStore
+    from src.models.inference import FEATURE_COLUMNS
+
+    work_dir = Path(tempfile.mkdtemp(prefix=f"online-store-{name}-"))
+    # The SQLite load rewrites the online store; keep the shared repository untouched
+    repo_copy = work_dir / "repo"
+    shutil.copytree(repo.parent, repo_copy)
+    feature_repo = repo_copy / repo.name
+    backend, server = create_backend(name, work_dir, args.redis_url)
+    try:
+        fs = FraudFeatureStore(repo_path=str(feature_repo), cache_size=0, online_backend=backend)
+        data = pd.read_parquet(repo_copy / "data" / "processed" / "X_train_with_timestamps.parquet",
+                               columns=["trans_num", "cc_num", "merchant", "timestamp"])
+        end = (data["timestamp"].max() + pd.Timedelta(days=1)).isoformat()
+        report = fs.materialize_incremental(end_date=end, full=True, state_path=str(work_dir / "state.json"))
+        results: Dict[str, Any] = {"load": {
+            "rows": report["rows_read"],
+            "entities": report["rows_written"],
+            "seconds": report["seconds"],
+            "rows_loaded_per_sec": report["rows_read"] / report["seconds"],
+        }}
+
+        rows = data.sample(max(args.entities), random_state=0)[["trans_num", "cc_num", "merchant"]].to_dict("records")
+        v1_rows = [{"trans_num": row["trans_num"]} for row in rows]
+        lookups = {}
+        for n in args.entities:
+            lookups[f"v1_{n}"] = measure(
+                lambda: fs.get_online_feature_matrix(v1_rows[:n], columns=FEATURE_COLUMNS), rows=n)
+            lookups[f"v2_{n}"] = measure(
+                lambda: fs.get_online_feature_matrix(rows[:n], "fraud_detection_v2"), rows=n)
+        results["lookups"] = lookups
+        results["concurrent"] = {
+            str(threads): concurrent_lookups(fs, v1_rows[:32], threads, args.concurrent_seconds)
+            for threads in args.threads
+        }
+        return results
+    finally:
+        if backend is not None:
+            backend.close()
+        if server is not None:
+            server.stop()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Online store backend benchmark")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=BACKENDS)
+    parser.add_argument("--entities", nargs="+", type=int, default=[1, 32, 256], help="Entities per lookup")
+    parser.add_argument("--threads", nargs="+", type=int, default=[1, 8], help="Concurrent lookup threads")
+    parser.add_argument("--concurrent-seconds", type=float, default=2.0)
+    parser.add_argument("--redis-url", help="Real Redis server (default: in-process stand-in)")
+    parser.add_argument("--feast-rows", type=int, default=50_000, help="Rows in the synthetic feature repository")
+    parser.add_argument("--work-dir", default=str(DEFAULT_WORK_DIR), help="Where the Feast repository is built")
+    parser.add_argument("--output", help="Result file (default: benchmark_results/online_store/<commit>.json)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    repo = build_feast_repo(Path(args.work_dir), n=args.feast_rows)
+    results = {}
+    for name in args.backends:
+        results[name] = benchmark_backend(name, repo, args)
+        load = results[name]["load"]
+        print(f"\n{name}: loaded {load['rows']:,} rows in {load['seconds']:.2f}s "
+              f"({load['rows_loaded_per_sec']:,.0f} rows/s)")
+        print_table(f"{name} lookups", results[name]["lookups"])
+        for threads, level in results[name]["concurrent"].items():
+            print(f"  {threads:>2} threads x 32 entities {level['lookups_per_sec']:>12,.0f} lookups/s")
+
+    config = {"backends": args.backends, "entities": args.entities, "threads": args.threads,
+              "redis": "external" if args.redis_url else "stand-in", "feast_rows": args.feast_rows}
+    path = save_results("online_store", results, config, args.output)
+    print(f"\nResults written to {path}")
+
+
+if __name__ == "__main__":
+    main()
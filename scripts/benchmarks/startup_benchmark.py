@@ -0,0 +1,128 @@
+"""
+API cold-start benchmark
+
+Starts the API in fresh interpreter processes and reports where startup time goes:
+importing src.api.app, model load (from the registry or the local artifact cache),
+the startup event, the first prediction and Feast initialization. ready_s is the time
+from the first import until the first prediction; process_wall_s also includes
+interpreter start-up and, with background Feast init, waiting for it to finish.
+
+Usage:
+    python scripts/benchmarks/startup_benchmark.py --runs 3
+    python scripts/benchmarks/startup_benchmark.py --output startup.json
+"""
+from pathlib import Path
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+# Runs inside a fresh interpreter; prints phase timings as JSON on the last line
+CHILD = r"""
+import time
+t0 = time.perf_counter()
+import asyncio, json, sys
+import numpy as np
+t1 = time.perf_counter()
+import src.api.app as app
+t2 = time.perf_counter()
+app.model_manager_config.update(cache_dir=sys.argv[1] or None, poll_interval_seconds=0)
+app.startup_config["feature_store_init"] = "eager" if sys.argv[2] == "1" else "background"
+loop = asyncio.new_event_loop()
+loop.run_until_complete(app.startup_event())
+t3 = time.perf_counter()
+handle = app.model_manager.current
+t4 = t5 = t3
+if handle is not None:
+    t4 = time.perf_counter()
+    handle.scorer.score(np.array([[100.0, 50000, 3, 1, 10]]))
+    t5 = time.perf_counter()
+# Let a background Feast initialization finish so its duration is reported too
+loop.run_until_complete(loop.shutdown_default_executor())
+print(json.dumps({
+    "base_imports_s": t1 - t0,
+    "import_app_s": t2 - t1,
+    "model_load_s": app.startup_timings.get("model_load_s", 0.0),
+    "feature_store_init_s": app.startup_timings.get("feature_store_init_s", 0.0),
+    "startup_event_s": t3 - t2,
+    "first_prediction_s": t5 - t4,
+    "ready_s": t5 - t0,
+    "model_from_cache": bool(handle and handle.from_cache),
+    "modules": len(sys.modules),
+    "mlflow_imported": "mlflow" in sys.modules,
+    "feast_imported": "feast" in sys.modules,
+}))
+"""
+
+
+def run_child(cache_dir: str, eager_feast: bool) -> dict:
+    """Start the API once in a fresh process and return its phase timings"""
+    launched = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD, cache_dir, "1" if eager_feast else "0"],
+        cwd=PROJECT_ROOT, capture_output=True, text=True,
+        env={**os.environ, "PYTHONPATH": str(PROJECT_ROOT)},
+    )
+    # Includes interpreter start-up, which the child cannot time itself
+    wall = time.perf_counter() - launched
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-2000:])
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings["process_wall_s"] = wall
+    return timings
+
+
+def summarize(runs: list) -> dict:
+    """Median of numeric fields, last value of the rest"""
+    summary = {}
+    for key, value in runs[-1].items():
+        if isinstance(value, float):
+            summary[key] = statistics.median(run[key] for run in runs)
+        else:
+            summary[key] = value
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Break API startup time down by phase")
+    parser.add_argument("--runs", type=int, default=3, help="Process starts per scenario")
+    parser.add_argument("--eager-feast", action="store_true", help="Block startup on Feast initialization")
+    parser.add_argument("--output", help="Write results as JSON")
+    args = parser.parse_args()
+
+    cache_dir = tempfile.mkdtemp(prefix="model_cache_")
+    results = {}
+    try:
+        scenarios = [
+            ("no_cache", lambda: ""),
+            # First run fills the cache, the measured runs start from it
+            ("cold_cache", lambda: shutil.rmtree(cache_dir, ignore_errors=True) or cache_dir),
+            ("warm_cache", lambda: cache_dir),
+        ]
+        for name, prepare in scenarios:
+            runs = [run_child(prepare(), args.eager_feast) for _ in range(args.runs)]
+            results[name] = summarize(runs)
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    phases = ["base_imports_s", "import_app_s", "model_load_s", "startup_event_s",
+              "first_prediction_s", "ready_s", "feature_store_init_s", "process_wall_s"]
+    print(f"{'phase':<22}" + "".join(f"{name:>14}" for name in results))
+    for phase in phases:
+        print(f"{phase:<22}" + "".join(f"{results[name][phase]:>14.3f}" for name in results))
+    for flag in ("model_from_cache", "mlflow_imported", "feast_imported", "modules"):
+        print(f"{flag:<22}" + "".join(f"{str(results[name][flag]):>14}" for name in results))
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
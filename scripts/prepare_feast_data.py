@@ -1,65 +1,93 @@
 """
 Reprocess fraud detection data while preserving timestamps for Feast
+
+Streams the raw CSVs in chunks and writes month-partitioned Parquet datasets
+(features, entity keys, timestamps and is_fraud) that the Feast FileSource reads,
+then builds the per-customer and per-merchant velocity feature files from the training set.
 """
-import pandas as pd
-import numpy as np
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import LabelEncoder
-
-# Load raw data
-print("Loading raw data...")
-train_df = pd.read_csv('../data/raw/fraudTrain.csv', index_col=0)
-test_df = pd.read_csv('../data/raw/fraudTest.csv', index_col=0)
-
-print(f"Train shape: {train_df.shape}")
-print(f"Test shape: {test_df.shape}")
-
-# Convert timestamp to datetime
-train_df['timestamp'] = pd.to_datetime(train_df['trans_date_trans_time'])
-test_df['timestamp'] = pd.to_datetime(test_df['trans_date_trans_time'])
-
-# Select features to keep
-feature_cols = ['amt', 'city_pop', 'category', 'gender', 'state']
-timestamp_cols = ['timestamp', 'trans_num', 'cc_num', 'merchant']
-target_col = 'is_fraud'
-
-# Encode categorical variables
-print("\nEncoding categorical variables...")
-le_category = LabelEncoder()
-le_gender = LabelEncoder()
-le_state = LabelEncoder()
-
-train_df['category_encoded'] = le_category.fit_transform(train_df['category'])
-train_df['gender_encoded'] = le_gender.fit_transform(train_df['gender'])
-train_df['state_encoded'] = le_state.fit_transform(train_df['state'])
-
-test_df['category_encoded'] = le_category.transform(test_df['category'])
-test_df['gender_encoded'] = le_gender.transform(test_df['gender'])
-test_df['state_encoded'] = le_state.transform(test_df['state'])
-
-# Prepare feature columns (with timestamps)
-encoded_features = ['amt', 'city_pop', 'category_encoded', 'gender_encoded', 'state_encoded']
-all_cols = timestamp_cols + encoded_features
-
-# Create train/test splits WITH timestamps and entity keys
-X_train = train_df[all_cols]
-y_train = train_df[target_col]
-
-X_test = test_df[all_cols]
-y_test = test_df[target_col]
-
-# Save processed data
-print("\nSaving processed data with timestamps...")
-X_train.to_csv('../data/processed/X_train_with_timestamps.csv', index=False)
-y_train.to_csv('../data/processed/y_train.csv', index=False)
-
-X_test.to_csv('../data/processed/X_test_with_timestamps.csv', index=False)
-y_test.to_csv('../data/processed/y_test.csv', index=False)
-
-print(f"\n✅ Done! Created files with {len(all_cols)} columns:")
-print(f"   - Timestamps: {timestamp_cols}")
-print(f"   - Features: {encoded_features}")
-print(f"\nX_train shape: {X_train.shape}")
-print(f"X_test shape: {X_test.shape}")
-print(f"\nFirst few rows:")
-print(X_train.head())
+from pathlib import Path
+import argparse
+import logging
+import sys
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.data.batch.ingestion import DEFAULT_CHUNKSIZE
+from src.data.batch.preprocessing import CategoricalEncoders, fit_encoders, process_raw_file
+from src.features.batch_features import build_velocity_features
+from src.utils.config import get_section, load_config
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "ingestion": {
+        "raw_train": "data/raw/fraudTrain.csv",
+        "raw_test": "data/raw/fraudTest.csv",
+        "chunksize": DEFAULT_CHUNKSIZE,
+    },
+    "preprocessing": {
+        "encoders_path": "data/processed/encoders.json",
+        "refit_encoders": False,
+        "train_output": "data/processed/X_train_with_timestamps.parquet",
+        "test_output": "data/processed/X_test_with_timestamps.parquet",
+        "compression": "zstd",
+    },
+    "velocity_features": {
+        "enabled": True,
+        "output_dir": "data/processed",
+        "verify_entities": 50,
+    },
+}
+
+
+def resolve(path: str) -> str:
+    """Resolve a config path against the project root"""
+    return str(PROJECT_ROOT / path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert raw transaction CSVs to Parquet for Feast")
+    parser.add_argument("--chunksize", type=int, help="Rows per chunk (overrides batch_config.yaml)")
+    parser.add_argument("--refit-encoders", action="store_true", help="Refit encoders on the training CSV")
+    args = parser.parse_args()
+
+    config = load_config("batch_config")
+    ingestion = get_section(config, "ingestion", DEFAULTS["ingestion"])
+    preprocessing = get_section(config, "preprocessing", DEFAULTS["preprocessing"])
+    velocity = get_section(config, "velocity_features", DEFAULTS["velocity_features"])
+    chunksize = args.chunksize or ingestion["chunksize"]
+
+    encoders_path = resolve(preprocessing["encoders_path"])
+    if Path(encoders_path).exists() and not (args.refit_encoders or preprocessing["refit_encoders"]):
+        logger.info(f"Loading encoders from {encoders_path}")
+        encoders = CategoricalEncoders.load(encoders_path)
+    else:
+        logger.info("Fitting encoders on the training data...")
+        encoders = fit_encoders(resolve(ingestion["raw_train"]), chunksize)
+        encoders.save(encoders_path)
+        logger.info(f"Saved encoders to {encoders_path}")
+
+    for split in ("train", "test"):
+        process_raw_file(
+            resolve(ingestion[f"raw_{split}"]),
+            resolve(preprocessing[f"{split}_output"]),
+            encoders,
+            chunksize=chunksize,
+            compression=preprocessing["compression"],
+        )
+
+    if velocity["enabled"]:
+        build_velocity_features(
+            resolve(preprocessing["train_output"]),
+            resolve(velocity["output_dir"]),
+            compression=preprocessing["compression"],
+            verify_entities=velocity["verify_entities"],
+        )
+
+    logger.info("Done")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Start the streaming fraud scoring consumer
+
+Usage:
+    python scripts/streaming/start_consumer.py
+    python scripts/streaming/start_consumer.py --source jsonl --path data/streaming/transactions.jsonl --no-follow
+"""
+import argparse
+import logging
+import signal
+import sys
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(PROJECT_DIR))
+
+from src.data.streaming.consumer import create_source
+from src.data.streaming.processor import StreamingPipeline, create_sink
+from src.models.inference import DEFAULT_THRESHOLD, FraudScorer, load_model
+from src.utils.config import get_section, load_config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("start_consumer")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Score transactions from a stream")
+    parser.add_argument("--config", default="streaming_config", help="Config name in configs/")
+    parser.add_argument("--source", choices=["kafka", "jsonl"], help="Override source type")
+    parser.add_argument("--path", help="Override JSONL source path")
+    parser.add_argument("--no-follow", action="store_true", help="Stop at end of the JSONL file")
+    parser.add_argument("--sink-path", help="Override JSONL sink path")
+    parser.add_argument("--model-uri", help="Override model URI")
+    parser.add_argument("--max-records", type=int, help="Stop after this many records")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    config = load_config(args.config)
+    source_config = get_section(config, "source", {"type": "jsonl"})
+    sink_config = get_section(config, "sink", {"type": "jsonl"})
+    pipeline_config = get_section(config, "pipeline", {
+        "batch_size": 256,
+        "max_wait_ms": 50,
+        "workers": 2,
+        "queue_size": 8,
+        "commit_interval_s": 1.0,
+        "metrics_interval_s": 10,
+        "use_feature_store": False,
+    })
+    velocity_config = get_section(config, "velocity_features", {
+        "enabled": False,
+        "push": True,
+        "max_entities": 1_000_000,
+        "flush_interval_s": 1.0,
+    })
+    model_config = get_section(config, "model", {
+        "uri": "models:/fraud_detector/latest",
+        "decision_threshold": None,
+    })
+
+    if args.source:
+        source_config["type"] = args.source
+    if args.path:
+        source_config["path"] = args.path
+    if args.no_follow:
+        source_config["follow"] = False
+    if args.sink_path:
+        sink_config["path"] = args.sink_path
+    model_uri = args.model_uri or model_config["uri"]
+
+    threshold = model_config["decision_threshold"]
+    if model_uri.startswith("models:/"):
+        import mlflow
+        from src.utils.mlflow_utils import get_decision_threshold, resolve_model_version
+
+        mlflow.set_tracking_uri(f"sqlite:///{PROJECT_DIR / 'mlflow.db'}")
+        # Pin the version so the model and its decision_threshold tag belong together
+        model_name, version = resolve_model_version(model_uri)
+        model_uri = f"models:/{model_name}/{version}"
+        if threshold is None:
+            threshold = get_decision_threshold(model_name, version)
+    if threshold is None:
+        threshold = DEFAULT_THRESHOLD
+    logger.info(f"Loading model {model_uri} (decision threshold {threshold})...")
+    scorer = FraudScorer(load_model(model_uri), threshold=threshold)
+
+    feature_store = None
+    if pipeline_config["use_feature_store"] or (velocity_config["enabled"] and velocity_config["push"]):
+        from src.features import get_fraud_feature_store
+        feature_store = get_fraud_feature_store(repo_path=str(PROJECT_DIR / "feature_store"))
+
+    velocity_updater = None
+    if velocity_config["enabled"]:
+        from src.features.streaming_features import VelocityFeatureUpdater
+        velocity_updater = VelocityFeatureUpdater(
+            feature_store=feature_store if velocity_config["push"] else None,
+            max_entities=velocity_config["max_entities"],
+            flush_interval_s=velocity_config["flush_interval_s"],
+        )
+
+    source = create_source(source_config)
+    sink = create_sink(sink_config)
+    pipeline = StreamingPipeline(
+        source=source,
+        scorer=scorer,
+        sink=sink,
+        model_version=model_uri,
+        feature_store=feature_store if pipeline_config["use_feature_store"] else None,
+        velocity_updater=velocity_updater,
+        batch_size=pipeline_config["batch_size"],
+        max_wait_ms=pipeline_config["max_wait_ms"],
+        workers=pipeline_config["workers"],
+        queue_size=pipeline_config["queue_size"],
+        commit_interval_s=pipeline_config["commit_interval_s"],
+        metrics_interval_s=pipeline_config["metrics_interval_s"],
+    )
+    signal.signal(signal.SIGINT, lambda *_: pipeline.stop())
+    signal.signal(signal.SIGTERM, lambda *_: pipeline.stop())
+
+    logger.info(f"Consuming from {source_config['type']} source, writing to {sink_config['type']} sink")
+    try:
+        metrics = pipeline.run(max_records=args.max_records)
+    finally:
+        source.close()
+        sink.close()
+    logger.info(f"✅ Done: {metrics}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,54 @@
 """
 FastAPI application for fraud detection model serving
 """
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, Header, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-import mlflow
-import mlflow.sklearn
+from fastapi.responses import PlainTextResponse, Response
 import numpy as np
-from typing import Optional
+from typing import Dict, List, Optional, Sequence, Tuple
+import asyncio
+import hmac
 import logging
+import os
+import threading
+import time
 
-from .schemas import TransactionRequest, PredictionResponse, HealthResponse
-from src.features import get_fraud_feature_store
+from .batching import RequestCoalescer
+from .codec import (
+    ARROW_MEDIA_TYPE,
+    BULK_MEDIA_TYPES,
+    JSON_MEDIA_TYPE,
+    NDJSON_MEDIA_TYPE,
+    PayloadTooLarge,
+    PredictionEncoder,
+    bulk_parser,
+    encode_arrow,
+    media_type,
+    openapi_body,
+    parse_batch,
+    parse_transaction,
+)
+from .executor import BoundedExecutor, PoolSaturatedError
+from .middleware import InstrumentedRoute, MetricsMiddleware, mark_request_parsed, mark_response_encoding
+from .score_cache import ScoreCache
+from .schemas import (
+    TransactionRequest,
+    PredictionResponse,
+    BatchPredictionRequest,
+    BatchPredictionResponse,
+    HealthResponse,
+    ModelStatusResponse,
+    PinModelRequest,
+)
+from src.features import IncrementalMaterializer, MaterializationJob, get_fraud_feature_store
+from src.models.inference import FEATURE_COLUMNS
+from src.models.artifact_cache import ModelArtifactCache
+from src.models.drift import DriftMonitor, load_reference_profile
+from src.models.manager import ModelHandle, ModelManager, create_model_source
+from src.models.shadow import ShadowScorer
+from src.models.shared_params import SharedParamStore
+from src.utils.config import load_config, get_section
+from src.utils.metrics import ServingMetrics
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -22,6 +60,8 @@ app = FastAPI(
     description="Real-time fraud detection using MLflow and Feast",
     version="1.0.0"
 )
+# Routes declared below record handler entry/exit for the validation and serialization stages
+app.router.route_class = InstrumentedRoute
 
 # Add CORS middleware
 app.add_middleware(
@@ -33,73 +73,501 @@ app.add_middleware(
 )
 
 # Global variables for model and feature store
-model = None
-model_version = None
+model_manager: Optional[ModelManager] = None
 feature_store = None
+materialization_job: Optional[MaterializationJob] = None
+coalescer: Optional[RequestCoalescer] = None
+# Challenger models scored on the traffic the champion serves (shadow.enabled)
+shadow_scorer: Optional[ShadowScorer] = None
+# Seconds spent in each startup phase, for logs and scripts/benchmarks/startup_benchmark.py
+startup_timings: Dict[str, float] = {}
+
+# Serving configuration
+api_config = load_config("api_config")
+batching_config = get_section(api_config, "batching", {
+    "coalesce_enabled": False,
+    "max_wait_us": 500,
+    "max_batch_size": 64,
+    "max_request_size": 1000,
+    "max_bulk_size": 100000,
+})
+scoring_config = get_section(api_config, "scoring", {
+    "decision_threshold": None,
+    "fast_path": True,
+})
+feature_cache_config = get_section(api_config, "feature_cache", {
+    "size": 10000,
+    "max_ttl_seconds": None,
+})
+model_manager_config = get_section(api_config, "model_manager", {
+    "source": "mlflow",
+    "model_name": "fraud_detector",
+    "tracking_uri": "sqlite:///mlflow.db",
+    "local_dir": "models",
+    "poll_interval_seconds": 30,
+    "warmup_rows": 256,
+    "history_size": 3,
+    "cache_dir": ".model_cache",
+    "cache_versions": 3,
+    "prefer_cache": True,
+    "shared_params_dir": None,
+    "shared_params_versions": 3,
+})
+score_cache_config = get_section(api_config, "score_cache", {
+    "enabled": True,
+    "size": 50000,
+    "window_seconds": 60,
+})
+materialization_config = get_section(api_config, "materialization", {
+    "enabled": False,
+    "interval_seconds": 300,
+    "batch_size": 10000,
+})
+startup_config = get_section(api_config, "startup", {
+    "feature_store_init": "background",
+})
+metrics_config = get_section(api_config, "metrics", {
+    "enabled": True,
+})
+drift_config = get_section(api_config, "drift", {
+    "enabled": True,
+    "window_seconds": 300,
+    "windows": 12,
+    "min_rows": 500,
+})
+shadow_config = get_section(api_config, "shadow", {
+    "enabled": False,
+    "models": [],
+    "max_queue_rows": 20000,
+    "batch_size": 512,
+    "max_wait_ms": 50,
+    "log_dir": "data/shadow",
+    "max_rows_per_file": 1000000,
+})
+health_config = get_section(api_config, "health", {
+    "source_timeout_seconds": 2.0,
+    "source_check_interval_seconds": 15.0,
+})
+executor_config = get_section(api_config, "executor", {
+    "scoring_workers": 4,
+    "scoring_queue_depth": 64,
+    "feature_workers": 8,
+    "feature_queue_depth": 128,
+    "retry_after_seconds": 1,
+})
+
+# Worker pools keeping model scoring and Feast lookups off the event loop
+scoring_pool = BoundedExecutor(
+    "scoring",
+    max_workers=executor_config["scoring_workers"],
+    max_queue_depth=executor_config["scoring_queue_depth"],
+)
+feature_pool = BoundedExecutor(
+    "features",
+    max_workers=executor_config["feature_workers"],
+    max_queue_depth=executor_config["feature_queue_depth"],
+)
+
+# Responses replayed for retried transactions (keyed by endpoint, trans_num and model version)
+score_cache: Optional[ScoreCache] = None
+if score_cache_config["enabled"]:
+    score_cache = ScoreCache(score_cache_config["size"], score_cache_config["window_seconds"])
+
+# Live input and score distributions of the serving model, compared with its training profile
+drift_monitor: Optional[DriftMonitor] = None
+if drift_config["enabled"]:
+    drift_monitor = DriftMonitor(
+        window_seconds=drift_config["window_seconds"],
+        windows=drift_config["windows"],
+        min_rows=drift_config["min_rows"],
+    )
+
+# Request, stage and component metrics served on /metrics
+serving_metrics = ServingMetrics(enabled=metrics_config["enabled"])
+app.add_middleware(MetricsMiddleware, metrics=serving_metrics, routes=app.router.routes)
+
+
+def register_metric_collectors():
+    """Expose pool, feature cache and model manager state, read when /metrics is scraped"""
+    pools = (scoring_pool, feature_pool)
+
+    def pool_stat(key: str):
+        return lambda: {(pool.name,): pool.stats()[key] for pool in pools}
+
+    serving_metrics.collect("executor_in_flight", "Tasks running or queued per worker pool",
+                            pool_stat("in_flight"), ("pool",))
+    serving_metrics.collect("executor_queued", "Tasks waiting for a free worker thread",
+                            pool_stat("queued"), ("pool",))
+    serving_metrics.collect("executor_completed_total", "Tasks completed per worker pool",
+                            pool_stat("completed"), ("pool",), kind="counter")
+    serving_metrics.collect("executor_rejected_total", "Tasks rejected with 503 because the pool was full",
+                            pool_stat("rejected"), ("pool",), kind="counter")
+
+    def feature_cache_stat(*keys: str):
+        def collect():
+            stats = feature_store.cache_stats() if feature_store is not None else {"enabled": False}
+            if stats.get("enabled") is False:
+                return None
+            return {(key,): stats[key] for key in keys} if len(keys) > 1 else stats[keys[0]]
+        return collect
+
+    serving_metrics.collect("feature_cache_lookups_total", "Online feature cache lookups by result",
+                            feature_cache_stat("hits", "misses"), ("result",), kind="counter")
+    serving_metrics.collect("feature_cache_entries", "Entity rows held in the online feature cache",
+                            feature_cache_stat("size"))
+    serving_metrics.collect("feature_cache_removals_total", "Online feature cache entries removed by cause",
+                            feature_cache_stat("evictions", "expirations", "invalidations"), ("cause",),
+                            kind="counter")
+
+    def score_cache_stat(*keys: str):
+        def collect():
+            if score_cache is None:
+                return None
+            stats = score_cache.stats()
+            # A coalesced duplicate is also a cache miss; report it once
+            stats["misses"] -= stats["coalesced"]
+            return {(key,): stats[key] for key in keys} if len(keys) > 1 else stats[keys[0]]
+        return collect
+
+    serving_metrics.collect("score_cache_lookups_total", "Score cache lookups by result (coalesced: waited "
+                            "for an identical request in flight)", score_cache_stat("hits", "misses", "coalesced"),
+                            ("result",), kind="counter")
+    serving_metrics.collect("score_cache_entries", "Prediction responses held for replay",
+                            score_cache_stat("size"))
+    serving_metrics.collect("score_cache_removals_total", "Score cache entries removed by cause",
+                            score_cache_stat("evictions", "expirations", "invalidations"), ("cause",),
+                            kind="counter")
+
+    def model_info():
+        handle = model_manager.current if model_manager is not None else None
+        return {(handle.label, str(handle.scorer.fast_path).lower()): 1} if handle is not None else None
+
+    serving_metrics.collect("model_info", "Serving model version (value is always 1)",
+                            model_info, ("model_version", "fast_path"))
+    serving_metrics.collect("model_swaps_total", "Serving model swaps since startup",
+                            lambda: model_manager.swaps if model_manager is not None else None, kind="counter")
+    serving_metrics.collect("model_loaded", "1 when a model is serving",
+                            lambda: int(model_manager is not None and model_manager.current is not None))
+
+    def drift_psi():
+        if drift_monitor is None or not drift_monitor.active:
+            return None
+        return {(name,): psi for name, psi in drift_monitor.psi().items()}
+
+    def shadow_stat(*keys: str):
+        def collect():
+            if shadow_scorer is None:
+                return None
+            stats = shadow_scorer.stats()
+            return {(key,): stats[key] for key in keys} if len(keys) > 1 else stats[keys[0]]
+        return collect
+
+    serving_metrics.collect("shadow_rows_total", "Rows handed to challenger models by result (shed: dropped "
+                            "because shadow scoring was behind)", shadow_stat("submitted", "shed", "scored", "failed"),
+                            ("result",), kind="counter")
+    serving_metrics.collect("shadow_queued_rows", "Rows waiting for the shadow scoring process",
+                            shadow_stat("queued"))
+
+    serving_metrics.collect("drift_psi", "Population stability index of live inputs and scores against "
+                            "the serving model's training profile", drift_psi, ("feature",))
+
+
+register_metric_collectors()
+
+
+def feature_matrix(rows: Sequence[Sequence[float]]) -> np.ndarray:
+    """Build the model input matrix from feature rows already in training column order"""
+    with serving_metrics.stage("feature_assembly"):
+        return np.array(rows, dtype=np.float64)
+
+
+def transaction_features(transactions: List[TransactionRequest]) -> np.ndarray:
+    """Build the model input matrix (one row per transaction) in training column order"""
+    return feature_matrix([
+        [t.amt, t.city_pop, t.category_encoded, t.gender_encoded, t.state_encoded]
+        for t in transactions
+    ])
+
+
+# Prediction responses are encoded directly instead of through response_model
+response_encoder = PredictionEncoder()
+
+
+async def read_body(request: Request, parse, *args):
+    """Read the request body and parse it with a codec parser; the validation stage ends here"""
+    parsed = parse(await request.body(), *args)
+    mark_request_parsed()
+    return parsed
+
+
+def encoded_response(content: bytes, media_type: str = JSON_MEDIA_TYPE,
+                     headers: Optional[Dict[str, str]] = None) -> Response:
+    """Response for pre-encoded content (FastAPI skips response_model for Response objects)"""
+    return Response(content=content, media_type=media_type, headers=headers)
+
+
+async def replayable_response(endpoint: str, trans_num: str, row: Sequence[float],
+                              handle: ModelHandle, score) -> Response:
+    """Encoded prediction from score(), replayed from the score cache for retried transactions"""
+    if score_cache is None:
+        return encoded_response(await score())
+    content = await score_cache.get_or_score(ScoreCache.key(endpoint, trans_num, row, handle.label), score)
+    mark_response_encoding()
+    return encoded_response(content)
+
+
+def active_model() -> ModelHandle:
+    """The serving model; read once per request so a concurrent swap cannot split it"""
+    handle = model_manager.current if model_manager is not None else None
+    if handle is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+    return handle
+
+
+def score_features(features: np.ndarray, handle: Optional[ModelHandle] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Score a feature matrix, returning (labels, fraud probabilities)"""
+    scorer = (handle or active_model()).scorer
+    serving_metrics.observe_batch(len(features))
+    with serving_metrics.stage("scoring"):
+        predictions, probabilities = scorer.score(features)
+    if drift_monitor is not None:
+        drift_monitor.observe(features, probabilities)
+    return predictions, probabilities
+
+
+def shadow_record(trans_nums, features: np.ndarray, probabilities: np.ndarray, handle: ModelHandle):
+    """Queue champion-scored rows for the challenger models (returns immediately)"""
+    if shadow_scorer is not None:
+        shadow_scorer.submit(trans_nums, features, probabilities, handle.label)
+
+
+async def run_in_pool(pool: BoundedExecutor, fn, *args):
+    """Run blocking work on a worker pool, shedding load with 503 when it is saturated"""
+    try:
+        return await pool.run(fn, *args)
+    except PoolSaturatedError as e:
+        logger.warning(str(e))
+        raise HTTPException(
+            status_code=503,
+            detail=f"Server busy: {e}",
+            headers={"Retry-After": str(executor_config["retry_after_seconds"])}
+        )
+
+
+async def score_features_async(
+    features: np.ndarray,
+    handle: Optional[ModelHandle] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Score a feature matrix on the scoring pool"""
+    return await run_in_pool(scoring_pool, score_features, features, handle)
+
+
+def lookup_feast_features(trans_num: str, row: Sequence[float]) -> np.ndarray:
+    """Fetch features from the Feast online store, falling back to request data (blocking)"""
+    request_features = feature_matrix([row])
+    
+    try:
+        with serving_metrics.stage("feast_lookup"):
+            features = feature_store.get_online_feature_matrix(
+                [{"trans_num": trans_num}],
+                service_name="fraud_detection_v1",
+                columns=FEATURE_COLUMNS
+            )
+    except Exception as feast_error:
+        logger.warning(f"Feast lookup failed: {feast_error}, using request data")
+        serving_metrics.feast_fallback("error")
+        # Fallback to request data
+        return request_features
+    
+    # Entities missing from the online store are filled from the request
+    missing = np.isnan(features)
+    if missing.any():
+        serving_metrics.feast_fallback("missing")
+        features[missing] = request_features[missing]
+    return features
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Require X-Admin-Token to match ADMIN_TOKEN; admin routes are disabled without one"""
+    expected = os.getenv("ADMIN_TOKEN")
+    if not expected:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled: ADMIN_TOKEN is not set")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token.encode(), expected.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+def init_feature_store(raise_errors: bool = True):
+    """Create the Feast feature store (blocking); failures leave it None unless raise_errors"""
+    global feature_store
+    
+    started = time.perf_counter()
+    logger.info("Initializing Feast feature store...")
+    try:
+        feature_store = get_fraud_feature_store(
+            repo_path="feature_store",
+            cache_size=feature_cache_config["size"],
+            cache_max_ttl=feature_cache_config["max_ttl_seconds"]
+        )
+    except Exception as e:
+        logger.error(f"❌ Feature store initialization failed: {e}")
+        if raise_errors:
+            raise
+        return
+    startup_timings["feature_store_init_s"] = time.perf_counter() - started
+    logger.info(f"✅ Feature store initialized ({startup_timings['feature_store_init_s']:.2f}s)")
+    if materialization_config["enabled"]:
+        start_materialization_job()
+
+
+def load_drift_profile(handle: ModelHandle):
+    """Point the drift monitor at the training profile of a newly served model (blocking)"""
+    try:
+        profile = load_reference_profile(handle.uri)
+    except Exception as e:
+        logger.warning(f"Could not load drift profile for {handle.label}: {e}")
+        profile = None
+    current = model_manager.current if model_manager is not None else None
+    if current is not None and current.version != handle.version:
+        return  # Swapped again meanwhile; the newer model's load wins
+    drift_monitor.set_profile(profile, handle.label)
+    if profile is None:
+        logger.info(f"No drift profile for {handle.label}; drift monitoring paused")
+    else:
+        logger.info(f"✅ Drift monitoring against the {handle.label} training profile")
+
+
+def start_shadow_scoring():
+    """Start scoring the configured challenger versions in the background"""
+    global shadow_scorer
+    
+    source = model_manager.source
+    try:
+        challengers = [(source.label(str(v)), source.uri(str(v))) for v in shadow_config["models"]]
+    except Exception as e:
+        logger.error(f"❌ Shadow scoring disabled, could not resolve challengers: {e}")
+        return
+    shadow_scorer = ShadowScorer(
+        challengers,
+        log_dir=shadow_config["log_dir"],
+        max_queue_rows=shadow_config["max_queue_rows"],
+        batch_size=shadow_config["batch_size"],
+        max_wait_ms=shadow_config["max_wait_ms"],
+        max_rows_per_file=shadow_config["max_rows_per_file"],
+        tracking_uri=model_manager_config["tracking_uri"],
+    )
+    shadow_scorer.start()
+    logger.info(f"Loading shadow challengers {[label for label, _ in challengers]}")
+
+
+def start_materialization_job():
+    """Materialize new offline rows periodically in a background thread"""
+    global materialization_job
+    
+    materializer = IncrementalMaterializer(feature_store, batch_size=materialization_config["batch_size"])
+    materialization_job = MaterializationJob(materializer, interval_s=materialization_config["interval_seconds"])
+    materialization_job.start()
+    logger.info(f"✅ Incremental materialization every {materialization_config['interval_seconds']}s")
 
 
 @app.on_event("startup")
 async def startup_event():
     """Load model and initialize feature store on startup"""
-    global model, model_version, feature_store
+    global model_manager, coalescer
     
+    started = time.perf_counter()
     try:
-        # Set MLflow tracking URI
-        mlflow.set_tracking_uri("sqlite:///mlflow.db")
+        cache = None
+        if model_manager_config["cache_dir"]:
+            cache = ModelArtifactCache(model_manager_config["cache_dir"], model_manager_config["cache_versions"])
+        shared_store = None
+        if model_manager_config["shared_params_dir"]:
+            shared_store = SharedParamStore(
+                model_manager_config["shared_params_dir"], model_manager_config["shared_params_versions"]
+            )
+        model_manager = ModelManager(
+            create_model_source(model_manager_config),
+            threshold=scoring_config["decision_threshold"],
+            fast_path=scoring_config["fast_path"],
+            poll_interval_s=model_manager_config["poll_interval_seconds"],
+            warmup_rows=model_manager_config["warmup_rows"],
+            history_size=model_manager_config["history_size"],
+            cache=cache,
+            prefer_cache=model_manager_config["prefer_cache"],
+            shared_store=shared_store,
+        )
         
-        # Get model version from environment variable or auto-select latest
-        import os
-        requested_version = os.getenv("MODEL_VERSION", "auto")
+        if drift_monitor is not None:
+            # Profiles come from the registry; fetch them off the swap path
+            # A threshold refresh swaps in the same version; its profile is already loaded
+            model_manager.on_swap(lambda old, new: None if old is not None and old.version == new.version else
+                                  threading.Thread(target=load_drift_profile, args=(new,),
+                                                   name="drift-profile", daemon=True).start())
         
-        # Load the model
-        logger.info(f"Loading model from MLflow (version: {requested_version})...")
+        # MODEL_VERSION pins a version; "auto"/"latest" follow the newest one
+        requested_version = os.getenv("MODEL_VERSION", "auto")
+        logger.info(f"Loading model from {model_manager_config['source']} (version: {requested_version})...")
         try:
-            if requested_version == "auto" or requested_version == "latest":
-                # Automatically get the highest version number
-                client = mlflow.tracking.MlflowClient()
-                versions = client.search_model_versions("name='fraud_detector'")
-                if versions:
-                    # Get the highest version number
-                    latest_version = max([int(v.version) for v in versions])
-                    model_uri = f"models:/fraud_detector/{latest_version}"
-                    model = mlflow.sklearn.load_model(model_uri)
-                    model_version = f"fraud_detector/v{latest_version}"
-                    logger.info(f"✅ Model loaded: {model_version} (auto-selected highest version)")
-                else:
-                    raise Exception("No registered model versions found")
-            else:
-                # Load specific version
-                model_uri = f"models:/fraud_detector/{requested_version}"
-                model = mlflow.sklearn.load_model(model_uri)
-                model_version = f"fraud_detector/v{requested_version}"
-                logger.info(f"✅ Model loaded: {model_version}")
+            handle = await asyncio.to_thread(
+                model_manager.load,
+                None if requested_version in ("auto", "latest") else requested_version
+            )
+            logger.info(f"✅ Model loaded: {handle.label} ({'local cache' if handle.from_cache else 'source'}, "
+                        f"threshold {handle.scorer.threshold}, linear fast path: {handle.scorer.fast_path})")
         except Exception as e:
-            logger.warning(f"Could not load registered model: {e}")
-            logger.info("Attempting to load from latest run...")
-            # Fallback: load from latest run
-            client = mlflow.tracking.MlflowClient()
-            experiment = client.get_experiment_by_name("fraud_detection")
-            if experiment:
-                runs = client.search_runs(
-                    experiment_ids=[experiment.experiment_id],
-                    order_by=["start_time DESC"],
-                    max_results=1
-                )
-                if runs:
-                    run_id = runs[0].info.run_id
-                    model_uri = f"runs:/{run_id}/model"
-                    model = mlflow.sklearn.load_model(model_uri)
-                    model_version = f"run/{run_id[:8]}"
-                    logger.info(f"✅ Model loaded from run: {run_id}")
+            # Serve as unhealthy; the background poll picks up a model once one is available
+            logger.error(f"❌ Could not load model: {e}")
+        startup_timings["model_load_s"] = time.perf_counter() - started
+        if score_cache is not None:
+            model_manager.on_swap(lambda old, new: score_cache.clear()
+                                  if old is not None and old.version == new.version
+                                  else score_cache.invalidate_except(new.label))
+        model_manager.start()
+        
+        if shadow_config["enabled"] and shadow_config["models"]:
+            await asyncio.to_thread(start_shadow_scoring)
         
-        # Initialize Feast feature store
-        logger.info("Initializing Feast feature store...")
-        feature_store = get_fraud_feature_store(repo_path="feature_store")
-        logger.info("✅ Feature store initialized")
+        # Feast takes seconds to import and parse its registry; only /predict/with-feast needs it
+        if startup_config["feature_store_init"] == "background":
+            asyncio.get_running_loop().run_in_executor(None, init_feature_store, False)
+        else:
+            await asyncio.to_thread(init_feature_store, True)
         
     except Exception as e:
         logger.error(f"❌ Startup error: {e}")
         raise
+    
+    # Optionally coalesce concurrent /predict calls into micro-batches
+    if batching_config["coalesce_enabled"]:
+        coalescer = RequestCoalescer(
+            score_features_async,
+            max_batch_size=batching_config["max_batch_size"],
+            max_wait_us=batching_config["max_wait_us"],
+        )
+        await coalescer.start()
+        logger.info(
+            f"✅ Request coalescing enabled (max_batch_size={batching_config['max_batch_size']}, "
+            f"max_wait_us={batching_config['max_wait_us']})"
+        )
+    
+    startup_timings["startup_s"] = time.perf_counter() - started
+    logger.info(f"Startup phases: {startup_timings}")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background workers"""
+    if model_manager is not None:
+        model_manager.stop()
+    if materialization_job is not None:
+        materialization_job.stop()
+    if feature_store is not None:
+        feature_store.close()
+    if coalescer is not None:
+        await coalescer.stop()
+    if shadow_scorer is not None:
+        await asyncio.to_thread(shadow_scorer.stop)
+    scoring_pool.shutdown(wait=False)
+    feature_pool.shutdown(wait=False)
 
 
 @app.get("/", tags=["General"])
@@ -111,108 +579,278 @@ async def root():
         "endpoints": {
             "health": "/health",
             "predict": "/predict",
+            "predict_batch": "/predict/batch",
+            "predict_bulk": "/predict/bulk",
+            "model_admin": "/admin/model",
+            "metrics": "/metrics",
+            "drift": "/monitoring/drift",
+            "shadow": "/admin/shadow",
             "docs": "/docs"
         }
     }
 
 
+# Last model source check, shared by concurrent /health calls
+_source_health = {"checked_at": float("-inf"), "connected": False}
+
+
+async def model_source_connected() -> bool:
+    """Whether the model source (MLflow registry or model directory) answers, checked at most
+    once per source_check_interval_seconds and bounded by source_timeout_seconds"""
+    if model_manager is None:
+        return False
+    now = time.monotonic()
+    if now - _source_health["checked_at"] < health_config["source_check_interval_seconds"]:
+        return _source_health["connected"]
+    # Claim the check so concurrent calls return the previous result instead of piling up
+    _source_health["checked_at"] = now
+    try:
+        connected = await asyncio.wait_for(
+            asyncio.to_thread(model_manager.source.ping), health_config["source_timeout_seconds"]
+        )
+    except Exception as e:
+        logger.warning(f"Model source health check failed: {e!r}")
+        connected = False
+    _source_health["connected"] = bool(connected)
+    return _source_health["connected"]
+
+
 @app.get("/health", response_model=HealthResponse, tags=["General"])
 async def health_check():
     """Health check endpoint"""
+    loaded = model_manager is not None and model_manager.current is not None
     return {
-        "status": "healthy" if model is not None else "unhealthy",
-        "mlflow_connected": True,
+        "status": "healthy" if loaded else "unhealthy",
+        "mlflow_connected": await model_source_connected(),
         "feast_connected": feature_store is not None,
-        "model_loaded": model is not None
+        "model_loaded": loaded
     }
 
 
-@app.post("/predict", response_model=PredictionResponse, tags=["Prediction"])
-async def predict_fraud(transaction: TransactionRequest):
+@app.post("/predict", response_model=PredictionResponse, tags=["Prediction"],
+          openapi_extra=openapi_body({JSON_MEDIA_TYPE: TransactionRequest}))
+async def predict_fraud(request: Request):
     """Predict if a transaction is fraudulent"""
     
-    if model is None:
-        raise HTTPException(status_code=503, detail="Model not loaded")
+    trans_num, row = await read_body(request, parse_transaction, request.headers.get("content-type"))
+    handle = active_model()
     
-    try:
+    async def score() -> bytes:
         # Prepare features in the correct order for the model
-        features = np.array([[
-            transaction.amt,
-            transaction.city_pop,
-            transaction.category_encoded,
-            transaction.gender_encoded,
-            transaction.state_encoded
-        ]])
+        features = feature_matrix([row])
         
-        # Make prediction
-        prediction = model.predict(features)[0]
-        probability = model.predict_proba(features)[0][1]  # Probability of fraud
+        # Make prediction, sharing a model call with concurrent requests when coalescing
+        if coalescer is not None and coalescer.running:
+            prediction, probability = await coalescer.submit(features[0], handle)
+        else:
+            predictions, probabilities = await score_features_async(features, handle)
+            prediction, probability = predictions[0], probabilities[0]
+        shadow_record([trans_num], features, np.array([probability]), handle)
         
-        return PredictionResponse(
-            trans_num=transaction.trans_num,
-            is_fraud=bool(prediction),
-            fraud_probability=float(probability),
-            model_version=model_version or "unknown"
-        )
+        mark_response_encoding()
+        return response_encoder.prediction(trans_num, prediction, probability, handle.label)
+    
+    try:
+        return await replayable_response("/predict", trans_num, row, handle, score)
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Prediction error: {e}")
         raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
 
 
-@app.post("/predict/with-feast", response_model=PredictionResponse, tags=["Prediction"])
-async def predict_fraud_with_feast(transaction: TransactionRequest):
+@app.post("/predict/batch", response_model=BatchPredictionResponse, tags=["Prediction"],
+          openapi_extra=openapi_body({JSON_MEDIA_TYPE: BatchPredictionRequest}))
+async def predict_fraud_batch(request: Request):
+    """Predict fraud for a list of transactions with a single model call"""
+    
+    trans_nums, rows = await read_body(request, parse_batch, request.headers.get("content-type"))
+    handle = active_model()
+    
+    if len(rows) > batching_config["max_request_size"]:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(rows)} > {batching_config['max_request_size']}"
+        )
+    
+    try:
+        features = feature_matrix(rows)
+        predictions, probabilities = await score_features_async(features, handle)
+        shadow_record(trans_nums, features, probabilities, handle)
+        
+        mark_response_encoding()
+        return encoded_response(response_encoder.batch(trans_nums, predictions, probabilities, handle.label))
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Batch prediction error: {e}")
+        raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
+
+
+@app.post("/predict/bulk", tags=["Prediction"], response_class=Response,
+          responses={200: {"content": {NDJSON_MEDIA_TYPE: {}, ARROW_MEDIA_TYPE: {}},
+                           "description": "Predictions in the request's format"}},
+          openapi_extra=openapi_body({
+              NDJSON_MEDIA_TYPE: {"type": "string", "description": "One TransactionRequest JSON object per line"},
+              ARROW_MEDIA_TYPE: {"type": "string", "format": "binary", "description":
+                                 "Arrow IPC stream with trans_num and the model feature columns"},
+          }))
+async def predict_fraud_bulk(request: Request):
+    """Score newline-delimited JSON or an Arrow IPC stream of transactions with a single model call
+
+    NDJSON responses hold one PredictionResponse per line; Arrow responses have trans_num,
+    is_fraud and fraud_probability columns. Both carry the model version in X-Model-Version.
+    """
+    kind = media_type(request.headers.get("content-type"))
+    if kind not in BULK_MEDIA_TYPES:
+        raise HTTPException(
+            status_code=415,
+            detail=f"Unsupported bulk format {kind!r}, expected one of {', '.join(BULK_MEDIA_TYPES)}"
+        )
+    try:
+        trans_nums, rows = await read_body(request, bulk_parser(kind), batching_config["max_bulk_size"])
+    except PayloadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ImportError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    handle = active_model()
+    
+    try:
+        features = rows if isinstance(rows, np.ndarray) else feature_matrix(rows)
+        predictions, probabilities = await score_features_async(features, handle)
+        shadow_record(trans_nums, features, probabilities, handle)
+        
+        mark_response_encoding()
+        headers = {"X-Model-Version": handle.label}
+        if kind == ARROW_MEDIA_TYPE:
+            return encoded_response(encode_arrow(trans_nums, predictions, probabilities, handle.label), kind, headers)
+        content = response_encoder.ndjson(trans_nums, predictions, probabilities, handle.label)
+        return encoded_response(content, kind, headers)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Bulk prediction error: {e}")
+        raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
+
+
+@app.post("/predict/with-feast", response_model=PredictionResponse, tags=["Prediction"],
+          openapi_extra=openapi_body({JSON_MEDIA_TYPE: TransactionRequest}))
+async def predict_fraud_with_feast(request: Request):
     """Predict fraud using features from Feast online store"""
     
-    if model is None:
-        raise HTTPException(status_code=503, detail="Model not loaded")
+    trans_num, row = await read_body(request, parse_transaction, request.headers.get("content-type"))
+    handle = active_model()
     
     if feature_store is None:
         raise HTTPException(status_code=503, detail="Feature store not initialized")
     
-    try:
-        # Get features from Feast online store
-        entity_rows = [{
-            "trans_num": transaction.trans_num
-        }]
-        
-        try:
-            online_features = feature_store.get_online_features(
-                entity_rows=entity_rows,
-                features=["fraud_detection_v1"]
-            )
-            
-            # Extract feature values
-            features_dict = online_features.to_dict()
-            features = np.array([[
-                features_dict.get('amt', [transaction.amt])[0],
-                features_dict.get('city_pop', [transaction.city_pop])[0],
-                features_dict.get('category_encoded', [transaction.category_encoded])[0],
-                features_dict.get('gender_encoded', [transaction.gender_encoded])[0],
-                features_dict.get('state_encoded', [transaction.state_encoded])[0]
-            ]])
-        except Exception as feast_error:
-            logger.warning(f"Feast lookup failed: {feast_error}, using request data")
-            # Fallback to request data
-            features = np.array([[
-                transaction.amt,
-                transaction.city_pop,
-                transaction.category_encoded,
-                transaction.gender_encoded,
-                transaction.state_encoded
-            ]])
+    async def score() -> bytes:
+        # Get features from Feast online store (SQLite lookup runs on the feature pool)
+        features = await run_in_pool(feature_pool, lookup_feast_features, trans_num, row)
         
         # Make prediction
-        prediction = model.predict(features)[0]
-        probability = model.predict_proba(features)[0][1]
+        predictions, probabilities = await score_features_async(features, handle)
+        prediction, probability = predictions[0], probabilities[0]
+        shadow_record([trans_num], features, probabilities, handle)
         
-        return PredictionResponse(
-            trans_num=transaction.trans_num,
-            is_fraud=bool(prediction),
-            fraud_probability=float(probability),
-            model_version=model_version or "unknown"
-        )
+        mark_response_encoding()
+        return response_encoder.prediction(trans_num, prediction, probability, handle.label)
+    
+    try:
+        # Retried transactions get the first answer back without another lookup or model call
+        return await replayable_response("/predict/with-feast", trans_num, row, handle, score)
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Prediction error: {e}")
         raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
+
+
+@app.get("/metrics", response_class=PlainTextResponse, tags=["General"])
+async def metrics():
+    """Request, stage, pool, cache and model metrics in the Prometheus text format"""
+    return PlainTextResponse(serving_metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/monitoring/drift", tags=["General"])
+async def drift_report():
+    """PSI and KS drift statistics of live inputs and fraud probabilities against the serving
+    model's training profile, over the last window_seconds * windows of traffic"""
+    if drift_monitor is None:
+        raise HTTPException(status_code=404, detail="Drift monitoring is disabled")
+    return await asyncio.to_thread(drift_monitor.report)
+
+
+def require_manager() -> ModelManager:
+    """The model manager, or 503 before startup has created it"""
+    if model_manager is None:
+        raise HTTPException(status_code=503, detail="Model manager not initialized")
+    return model_manager
+
+
+@app.get("/admin/model", response_model=ModelStatusResponse, tags=["Admin"],
+         dependencies=[Depends(require_admin)])
+async def model_status():
+    """Active model version, load and warm-up times, pin state and rollback candidates"""
+    return require_manager().status()
+
+
+@app.get("/admin/shadow", tags=["Admin"],
+         dependencies=[Depends(require_admin)])
+async def shadow_status():
+    """Shadow scoring state, challenger versions and row counts (submitted, shed, scored, failed)"""
+    if shadow_scorer is None:
+        return {"enabled": False}
+    return {"enabled": True, **shadow_scorer.stats()}
+
+
+@app.post("/admin/model/pin", response_model=ModelStatusResponse, tags=["Admin"],
+          dependencies=[Depends(require_admin)])
+async def pin_model(request: PinModelRequest):
+    """Serve a specific version and stop following new ones"""
+    manager = require_manager()
+    try:
+        # Loading and warm-up run off the event loop; requests keep using the old model meanwhile
+        await asyncio.to_thread(manager.pin, request.version)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Could not load version {request.version}: {e}")
+    return manager.status()
+
+
+@app.post("/admin/model/unpin", response_model=ModelStatusResponse, tags=["Admin"],
+          dependencies=[Depends(require_admin)])
+async def unpin_model():
+    """Follow the newest version again (picked up on the next poll)"""
+    manager = require_manager()
+    manager.unpin()
+    return manager.status()
+
+
+@app.post("/admin/model/rollback", response_model=ModelStatusResponse, tags=["Admin"],
+          dependencies=[Depends(require_admin)])
+async def rollback_model():
+    """Swap back to the previously served version and pin it"""
+    manager = require_manager()
+    try:
+        await asyncio.to_thread(manager.rollback)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Rollback failed: {e}")
+    return manager.status()
+
+
+@app.post("/admin/model/refresh", response_model=ModelStatusResponse, tags=["Admin"],
+          dependencies=[Depends(require_admin)])
+async def refresh_model():
+    """Poll the model source now instead of waiting for the next interval"""
+    manager = require_manager()
+    try:
+        await asyncio.to_thread(manager.poll)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Refresh failed: {e}")
+    return manager.status()
@@ -0,0 +1,148 @@
+"""
+Request coalescing for the prediction endpoints
+Queues concurrent single-row predictions and scores them as one matrix
+"""
+import asyncio
+import inspect
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Set, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Scoring callable (sync or async): ((n, k) feature matrix, context) -> (labels, fraud probabilities)
+ScoreResult = Tuple[np.ndarray, np.ndarray]
+ScoreFn = Callable[[np.ndarray, Any], Union[ScoreResult, Awaitable[ScoreResult]]]
+
+# Queued request: feature row, scoring context, caller's future
+QueuedRow = Tuple[Sequence[float], Any, asyncio.Future]
+
+
+class RequestCoalescer:
+    """Micro-batches concurrent scoring requests into single model calls
+
+    Each row is submitted with a context (e.g. the model handle the request was
+    admitted with) that is passed to score_fn; rows are only batched with rows of
+    the same context, so a model swap never scores a request with another version.
+    """
+
+    def __init__(self, score_fn: ScoreFn, max_batch_size: int = 64, max_wait_us: int = 500):
+        """
+        Initialize the coalescer
+
+        Args:
+            score_fn: Function or coroutine function scoring a feature matrix in one
+                call, given the context the rows were submitted with
+            max_batch_size: Flush as soon as this many rows are queued
+            max_wait_us: Longest time the first queued row waits for others, in microseconds
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.score_fn = score_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_us / 1_000_000
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._flushes: Set[asyncio.Task] = set()
+
+    @property
+    def running(self) -> bool:
+        """Whether the background flush loop is active"""
+        return self._worker is not None and not self._worker.done()
+
+    async def start(self):
+        """Start the background flush loop on the running event loop"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the flush loop, failing any requests still queued"""
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+        while self._queue is not None and not self._queue.empty():
+            _, _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Coalescer stopped"))
+
+    async def submit(self, row: Sequence[float], context: Any = None) -> Tuple[bool, float]:
+        """
+        Queue a single feature row and wait for its score
+
+        Args:
+            row: Feature values in model input order
+            context: Passed to score_fn; rows are batched only with the same context
+
+        Returns:
+            Tuple of (is_fraud, fraud_probability)
+        """
+        if not self.running:
+            raise RuntimeError("Coalescer is not running")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((row, context, future))
+        return await future
+
+    async def _collect(self) -> List[QueuedRow]:
+        """Block for the first row, then gather more until the batch is full or the window closes"""
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        """Flush loop: collect a batch and hand it off so the next one can start filling"""
+        while True:
+            batch = await self._collect()
+            task = asyncio.get_running_loop().create_task(self._flush(batch))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch: List[QueuedRow]):
+        """Score a batch with one call per context and fan results back out to the callers"""
+        groups: Dict[int, List[QueuedRow]] = {}
+        for item in batch:
+            groups.setdefault(id(item[1]), []).append(item)
+        if len(groups) == 1:
+            await self._flush_group(batch)
+        else:
+            await asyncio.gather(*(self._flush_group(group) for group in groups.values()))
+
+    async def _flush_group(self, batch: List[QueuedRow]):
+        """Score rows sharing one context in a single call"""
+        futures = [future for _, _, future in batch]
+        try:
+            features = np.array([row for row, _, _ in batch], dtype=np.float64)
+            result = self.score_fn(features, batch[0][1])
+            if inspect.isawaitable(result):
+                result = await result
+            labels, probabilities = result
+        except Exception as e:
+            logger.error(f"Coalesced batch of {len(batch)} failed: {e}")
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for future, label, probability in zip(futures, labels, probabilities):
+            if not future.done():
+                future.set_result((bool(label), float(probability)))
@@ -0,0 +1,440 @@
+"""
+Lean request parsing and response encoding for the prediction endpoints
+
+The wire contract is the one declared in schemas.py; this module only avoids building
+Pydantic models on the hot path:
+- Request bodies are decoded with orjson (the json module when it is not installed) and
+  checked field by field straight into feature rows. Bodies the fast check does not
+  accept as-is (missing fields, numbers sent as strings, negative amounts, a non-JSON
+  content type) are validated by the Pydantic models instead, so clients get exactly
+  the responses and 422 errors FastAPI produced before
+- Responses are assembled from pre-encoded fragments, skipping response_model
+  validation and generic JSON encoding
+- Bulk clients can send newline-delimited JSON or an Arrow IPC stream (/predict/bulk)
+"""
+from functools import lru_cache
+from json.encoder import encode_basestring
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import email.message
+import json
+import math
+
+import numpy as np
+from fastapi.exceptions import RequestValidationError
+from pydantic import TypeAdapter, ValidationError
+
+from .schemas import BatchPredictionRequest, TransactionRequest
+from src.models.inference import FEATURE_COLUMNS
+
+try:
+    import orjson
+except ImportError:  # The standard library decoder gives the same results, slower
+    orjson = None
+
+JSON_MEDIA_TYPE = "application/json"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+# Accepted by /predict/bulk; the response uses the request's format
+BULK_MEDIA_TYPES = (NDJSON_MEDIA_TYPE, "application/jsonl", ARROW_MEDIA_TYPE)
+
+# Parsed request: transaction ids and feature rows in FEATURE_COLUMNS order
+Rows = List[List[float]]
+
+STRING_FIELDS = ("trans_num", "cc_num", "merchant")
+
+_transaction_adapter = TypeAdapter(TransactionRequest)
+_batch_adapter = TypeAdapter(BatchPredictionRequest)
+
+
+class PayloadTooLarge(ValueError):
+    """A bulk request holds more rows than the endpoint accepts"""
+
+
+def _feature_specs() -> Tuple[Tuple[str, bool, Optional[float]], ...]:
+    """(name, accepts float, minimum) per model feature, read from TransactionRequest"""
+    specs = []
+    for name in FEATURE_COLUMNS:
+        field = TransactionRequest.model_fields[name]
+        minimum = next((m.ge for m in field.metadata if getattr(m, "ge", None) is not None), None)
+        specs.append((name, field.annotation is float, minimum))
+    return tuple(specs)
+
+
+FEATURE_SPECS = _feature_specs()
+
+
+@lru_cache(maxsize=64)
+def media_type(content_type: Optional[str]) -> Optional[str]:
+    """'type/subtype' of a Content-Type header, without parameters"""
+    if not content_type:
+        return None
+    message = email.message.Message()
+    message["content-type"] = content_type
+    return message.get_content_type()
+
+
+def _is_json(content_type: Optional[str]) -> bool:
+    """Whether FastAPI would decode a body sent with this Content-Type as JSON"""
+    kind = media_type(content_type)
+    if kind is None or not kind.startswith("application/"):
+        return False
+    subtype = kind.split("/", 1)[1]
+    return subtype == "json" or subtype.endswith("+json")
+
+
+def _loads(data: bytes, exact: bool = False) -> Any:
+    """Decode JSON; exact uses the json module, which also keeps integers beyond 64 bits
+    (orjson turns them into floats)"""
+    if orjson is not None and not exact:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass  # json also accepts NaN/Infinity and non-UTF-8 encodings, and its errors are the documented ones
+    return json.loads(data)
+
+
+def _json_error(error: json.JSONDecodeError, loc: Tuple = ("body",)) -> RequestValidationError:
+    return RequestValidationError(
+        [{"type": "json_invalid", "loc": (*loc, error.pos), "msg": "JSON decode error",
+          "input": {}, "ctx": {"error": error.msg}}],
+        body=error.doc,
+    )
+
+
+def decode_json_body(body: bytes, content_type: Optional[str], exact: bool = False) -> Any:
+    """
+    Decode a request body the way FastAPI does for a Pydantic body parameter
+
+    Args:
+        body: Raw request body
+        content_type: Content-Type header
+        exact: Decode with the json module, as FastAPI does (for model validation)
+
+    Returns:
+        None for an empty body, the raw bytes when the content type is not JSON (both
+        then fail model validation with FastAPI's usual errors), else the decoded value
+    """
+    if not body:
+        return None
+    if not _is_json(content_type):
+        return body
+    try:
+        return _loads(body, exact)
+    except json.JSONDecodeError as e:
+        raise _json_error(e)
+
+
+def _validate(adapter: TypeAdapter, value: Any, loc: Tuple = ("body",)):
+    """Pydantic validation raising the RequestValidationError FastAPI would raise"""
+    if value is None and loc == ("body",):
+        raise RequestValidationError([{"type": "missing", "loc": loc, "msg": "Field required", "input": None}])
+    try:
+        return adapter.validate_python(value, from_attributes=True)
+    except ValidationError as e:
+        raise RequestValidationError(
+            [{**error, "loc": loc + tuple(error["loc"])} for error in e.errors(include_url=False)],
+            body=value,
+        )
+
+
+def fast_row(obj: Any) -> Optional[List[float]]:
+    """
+    Feature row of a decoded transaction whose fields all have their exact JSON types
+
+    Returns:
+        The row in FEATURE_COLUMNS order, or None when the object needs full model
+        validation (coercible or invalid values, missing fields)
+    """
+    if type(obj) is not dict:
+        return None
+    for name in STRING_FIELDS:
+        if type(obj.get(name)) is not str:
+            return None
+    row = []
+    for name, accepts_float, minimum in FEATURE_SPECS:
+        value = obj.get(name)
+        kind = type(value)
+        if kind is not int and not (accepts_float and kind is float):
+            return None
+        # "not >=" also sends NaN to the model, which rejects it
+        if minimum is not None and not value >= minimum:
+            return None
+        row.append(value)
+    return row
+
+
+def model_row(transaction: TransactionRequest) -> List[float]:
+    """Feature row of a validated TransactionRequest"""
+    return [getattr(transaction, name) for name in FEATURE_COLUMNS]
+
+
+def parse_transaction(body: bytes, content_type: Optional[str]) -> Tuple[str, List[float]]:
+    """
+    Parse a TransactionRequest body
+
+    Returns:
+        (trans_num, feature row)
+
+    Raises:
+        RequestValidationError: Exactly as FastAPI would for a TransactionRequest parameter
+    """
+    obj = decode_json_body(body, content_type)
+    row = fast_row(obj)
+    if row is not None:
+        return obj["trans_num"], row
+    transaction = _validate(_transaction_adapter, decode_json_body(body, content_type, exact=True))
+    return transaction.trans_num, model_row(transaction)
+
+
+def parse_batch(body: bytes, content_type: Optional[str]) -> Tuple[List[str], Rows]:
+    """
+    Parse a BatchPredictionRequest body
+
+    Returns:
+        (trans_nums, feature rows)
+
+    Raises:
+        RequestValidationError: Exactly as FastAPI would for a BatchPredictionRequest parameter
+    """
+    obj = decode_json_body(body, content_type)
+    transactions = obj.get("transactions") if type(obj) is dict else None
+    if type(transactions) is list and transactions:
+        rows = [fast_row(transaction) for transaction in transactions]
+        if None not in rows:
+            return [transaction["trans_num"] for transaction in transactions], rows
+    request = _validate(_batch_adapter, decode_json_body(body, content_type, exact=True))
+    return [t.trans_num for t in request.transactions], [model_row(t) for t in request.transactions]
+
+
+def parse_ndjson(body: bytes, max_rows: Optional[int] = None) -> Tuple[List[str], Rows]:
+    """
+    Parse newline-delimited TransactionRequest objects (blank lines are skipped)
+
+    Validation errors of every line are reported together, located as
+    ["body", <line index>, <field>].
+
+    Raises:
+        RequestValidationError: Invalid JSON or transactions, or no transactions at all
+        PayloadTooLarge: More than max_rows lines
+    """
+    lines = [line for line in body.splitlines() if line.strip()]
+    if max_rows is not None and len(lines) > max_rows:
+        raise PayloadTooLarge(f"Bulk request too large: {len(lines)} > {max_rows}")
+    if not lines:
+        raise RequestValidationError([{"type": "missing", "loc": ("body",), "msg": "Field required", "input": None}])
+
+    trans_nums, rows, errors = [], [], []
+    for index, line in enumerate(lines):
+        try:
+            obj = _loads(line)
+        except json.JSONDecodeError as e:
+            errors.extend(_json_error(e, ("body", index)).errors())
+            continue
+        row = fast_row(obj)
+        if row is None:
+            try:
+                transaction = _validate(_transaction_adapter, _loads(line, exact=True), ("body", index))
+            except RequestValidationError as e:
+                errors.extend(e.errors())
+                continue
+            obj, row = {"trans_num": transaction.trans_num}, model_row(transaction)
+        trans_nums.append(obj["trans_num"])
+        rows.append(row)
+    if errors:
+        raise RequestValidationError(errors)
+    return trans_nums, rows
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401
+    except ImportError as e:
+        raise ImportError("Arrow bulk requests need the pyarrow package") from e
+    return pyarrow
+
+
+def parse_arrow(body: bytes, max_rows: Optional[int] = None) -> Tuple[Any, np.ndarray]:
+    """
+    Parse an Arrow IPC stream with one row per transaction
+
+    Required columns: trans_num (string) and the model features; amt may be floating
+    point, the others must hold integers. cc_num, merchant and other columns are ignored.
+    Errors use the same locations as NDJSON (["body", <row>, <column>], or
+    ["body", <column>] for a missing or mistyped column).
+
+    Returns:
+        (trans_num column as an Arrow array, feature matrix)
+
+    Raises:
+        RequestValidationError: Unreadable stream, missing/mistyped columns or invalid values
+        PayloadTooLarge: More than max_rows rows
+    """
+    pa = _pyarrow()
+    try:
+        table = pa.ipc.open_stream(body).read_all()
+    except (pa.ArrowInvalid, OSError) as e:
+        raise RequestValidationError([{"type": "arrow_invalid", "loc": ("body",), "msg": "Arrow IPC stream decode error",
+                                       "input": {}, "ctx": {"error": str(e)}}])
+    if max_rows is not None and table.num_rows > max_rows:
+        raise PayloadTooLarge(f"Bulk request too large: {table.num_rows} > {max_rows}")
+    if table.num_rows == 0:
+        raise RequestValidationError([{"type": "missing", "loc": ("body",), "msg": "Field required", "input": None}])
+
+    errors: List[Dict[str, Any]] = []
+
+    def column_error(name: str, kind: str, msg: str):
+        errors.append({"type": kind, "loc": ("body", name), "msg": msg, "input": None})
+
+    names = set(table.column_names)
+    trans_nums = None
+    if "trans_num" not in names:
+        column_error("trans_num", "missing", "Field required")
+    else:
+        trans_nums = table.column("trans_num")
+        if not (pa.types.is_string(trans_nums.type) or pa.types.is_large_string(trans_nums.type)):
+            column_error("trans_num", "string_type", "Input should be a valid string")
+        elif trans_nums.null_count:
+            column_error("trans_num", "string_type", "Input should be a valid string, got null")
+
+    columns = []
+    for name, accepts_float, minimum in FEATURE_SPECS:
+        if name not in names:
+            column_error(name, "missing", "Field required")
+            continue
+        column = table.column(name)
+        if not (pa.types.is_integer(column.type) or pa.types.is_floating(column.type)):
+            column_error(name, "float_type" if accepts_float else "int_type",
+                         f"Input should be a valid {'number' if accepts_float else 'integer'}")
+            continue
+        if column.null_count:
+            column_error(name, "float_type" if accepts_float else "int_type",
+                         f"Input should be a valid {'number' if accepts_float else 'integer'}, got null")
+            continue
+        values = column.to_numpy().astype(np.float64, copy=False)
+        if not accepts_float and pa.types.is_floating(column.type):
+            fractional = np.flatnonzero(values != np.floor(values))
+            if fractional.size:
+                row = int(fractional[0])
+                errors.append({"type": "int_from_float", "loc": ("body", row, name),
+                               "msg": "Input should be a valid integer, got a number with a fractional part",
+                               "input": float(values[row])})
+                continue
+        if minimum is not None:
+            below = np.flatnonzero(~(values >= minimum))
+            if below.size:
+                row = int(below[0])
+                errors.append({"type": "greater_than_equal", "loc": ("body", row, name),
+                               "msg": f"Input should be greater than or equal to {minimum:g}",
+                               "input": float(values[row]), "ctx": {"ge": minimum}})
+                continue
+        columns.append(values)
+    if errors:
+        raise RequestValidationError(errors)
+    return trans_nums, np.column_stack(columns)
+
+
+class PredictionEncoder:
+    """Encodes PredictionResponse and BatchPredictionResponse JSON from pre-encoded fragments
+
+    Output is byte-for-byte what FastAPI's response_model serialization produced
+    (compact separators, non-ASCII kept as UTF-8, floats as repr()).
+    """
+
+    _TRUE = ',"is_fraud":true,"fraud_probability":'
+    _FALSE = ',"is_fraud":false,"fraud_probability":'
+
+    def __init__(self, max_versions: int = 16):
+        self.max_versions = max_versions
+        self._versions: Dict[str, Tuple[str, str]] = {}
+
+    def _version(self, version: str) -> Tuple[str, str]:
+        """(prediction object tail, batch tail) for a model version"""
+        fragments = self._versions.get(version)
+        if fragments is None:
+            if len(self._versions) >= self.max_versions:
+                self._versions.clear()
+            encoded = encode_basestring(version)
+            fragments = (',"model_version":' + encoded + '}', '],"model_version":' + encoded + '}')
+            self._versions[version] = fragments
+        return fragments
+
+    def _objects(self, trans_nums: Sequence[str], predictions: np.ndarray,
+                 probabilities: np.ndarray, version: str) -> List[str]:
+        if not np.isfinite(probabilities).all():
+            raise ValueError("Out of range float values are not JSON compliant")
+        tail, true, false = self._version(version)[0], self._TRUE, self._FALSE
+        return [
+            f'{{"trans_num":{encode_basestring(trans_num)}{true if is_fraud else false}{probability!r}{tail}'
+            for trans_num, is_fraud, probability in zip(trans_nums, predictions.tolist(), probabilities.tolist())
+        ]
+
+    def prediction(self, trans_num: str, is_fraud: Any, probability: float, version: str) -> bytes:
+        """One PredictionResponse"""
+        probability = float(probability)
+        if not math.isfinite(probability):
+            raise ValueError("Out of range float values are not JSON compliant")
+        return (f'{{"trans_num":{encode_basestring(trans_num)}{self._TRUE if is_fraud else self._FALSE}'
+                f'{probability!r}{self._version(version)[0]}').encode()
+
+    def batch(self, trans_nums: Sequence[str], predictions: np.ndarray,
+              probabilities: np.ndarray, version: str) -> bytes:
+        """A BatchPredictionResponse"""
+        objects = self._objects(trans_nums, predictions, probabilities, version)
+        return ('{"predictions":[' + ",".join(objects) + self._version(version)[1]).encode()
+
+    def ndjson(self, trans_nums: Sequence[str], predictions: np.ndarray,
+               probabilities: np.ndarray, version: str) -> bytes:
+        """One PredictionResponse per line, in request order"""
+        return ("\n".join(self._objects(trans_nums, predictions, probabilities, version)) + "\n").encode()
+
+
+def encode_arrow(trans_nums: Any, predictions: np.ndarray, probabilities: np.ndarray, version: str) -> bytes:
+    """
+    Arrow IPC stream of predictions: trans_num, is_fraud and fraud_probability columns,
+    with the model version in the schema metadata (key model_version)
+    """
+    pa = _pyarrow()
+    table = pa.table(
+        {
+            "trans_num": trans_nums,
+            "is_fraud": pa.array(np.asarray(predictions).astype(bool)),
+            "fraud_probability": pa.array(np.asarray(probabilities, dtype=np.float64)),
+        },
+        metadata={"model_version": version},
+    )
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _inline_refs(schema: Any, definitions: Dict[str, Any]) -> Any:
+    if isinstance(schema, dict):
+        ref = schema.get("$ref", "")
+        if ref.startswith("#/$defs/"):
+            return _inline_refs(definitions[ref[len("#/$defs/"):]], definitions)
+        return {key: _inline_refs(value, definitions) for key, value in schema.items()}
+    if isinstance(schema, list):
+        return [_inline_refs(value, definitions) for value in schema]
+    return schema
+
+
+def openapi_body(content: Dict[str, Any]) -> Dict[str, Any]:
+    """openapi_extra documenting a request body the endpoint reads itself
+
+    Args:
+        content: Media type -> Pydantic model class or JSON schema
+    """
+    documented = {}
+    for kind, schema in content.items():
+        if hasattr(schema, "model_json_schema"):
+            schema = schema.model_json_schema()
+            schema = _inline_refs(schema, schema.pop("$defs", {}))
+        documented[kind] = {"schema": schema}
+    return {"requestBody": {"required": True, "content": documented}}
+
+
+def bulk_parser(kind: str) -> Callable[..., Tuple[Any, Any]]:
+    """parse_ndjson or parse_arrow for a BULK_MEDIA_TYPES entry"""
+    return parse_arrow if kind == ARROW_MEDIA_TYPE else parse_ndjson
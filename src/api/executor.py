@@ -0,0 +1,96 @@
+"""
+Bounded worker pools for blocking work in the API
+Keeps model scoring and Feast lookups off the asyncio event loop
+"""
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+
+class PoolSaturatedError(Exception):
+    """Raised when a pool already holds as many tasks as it may queue"""
+
+
+class BoundedExecutor:
+    """Thread pool with a queue-depth limit enforced at submission time"""
+
+    def __init__(self, name: str, max_workers: int = 4, max_queue_depth: int = 64):
+        """
+        Initialize the pool
+
+        Args:
+            name: Pool name, used for thread names and error messages
+            max_workers: Number of worker threads
+            max_queue_depth: Tasks allowed to wait for a free worker before rejecting
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        if max_queue_depth < 0:
+            raise ValueError("max_queue_depth must be non-negative")
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue_depth = max_queue_depth
+        self.capacity = max_workers + max_queue_depth
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        # Incremented on the event loop, decremented by the worker future's done callback
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        """
+        Run a blocking function on the pool
+
+        Args:
+            fn: Function to call
+            *args: Positional arguments for fn
+
+        Returns:
+            Result of fn(*args)
+
+        Raises:
+            PoolSaturatedError: If running plus queued tasks already reach capacity
+        """
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                self._rejected += 1
+                raise PoolSaturatedError(
+                    f"{self.name} pool saturated ({self._in_flight} tasks, capacity {self.capacity})"
+                )
+            self._in_flight += 1
+        # Carry context variables (e.g. the request timer) into the worker thread, as asyncio.to_thread does
+        call = functools.partial(contextvars.copy_context().run, fn, *args)
+        try:
+            future = self._executor.submit(call)
+        except BaseException:
+            self._release()
+            raise
+        # A cancelled caller stops waiting but a started task keeps its worker busy; the slot
+        # is only freed once the task itself finishes (or is cancelled before it starts)
+        future.add_done_callback(lambda _: self._release())
+        return await asyncio.wrap_future(future)
+
+    def _release(self):
+        """Free a slot (worker thread or event loop)"""
+        with self._lock:
+            self._in_flight -= 1
+            self._completed += 1
+
+    def stats(self) -> Dict[str, int]:
+        """Current pool occupancy and lifetime counters"""
+        return {
+            "max_workers": self.max_workers,
+            "capacity": self.capacity,
+            "in_flight": self._in_flight,
+            "queued": max(0, self._in_flight - self.max_workers),
+            "completed": self._completed,
+            "rejected": self._rejected,
+        }
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting work and release the worker threads"""
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,114 @@
+"""
+Request instrumentation for the API
+ASGI middleware recording request counts, latency and the stages FastAPI runs around
+each endpoint (validation before it, serialization after it)
+"""
+from typing import Iterable, Optional, Set
+import asyncio
+import functools
+import time
+
+from fastapi.routing import APIRoute
+
+from src.utils.metrics import RequestTimer, ServingMetrics, current_request
+
+# Endpoint label for paths that match no route (404 probes must not create new series)
+UNMATCHED_ENDPOINT = "other"
+
+
+def _timed_endpoint(endpoint):
+    """Wrap an async endpoint to mark when FastAPI enters and leaves it"""
+
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        timer = current_request.get()
+        if timer is None:
+            return await endpoint(*args, **kwargs)
+        timer.handler_start = time.perf_counter()
+        try:
+            return await endpoint(*args, **kwargs)
+        finally:
+            if timer.handler_end is None:
+                timer.handler_end = time.perf_counter()
+
+    return wrapper
+
+
+def mark_request_parsed():
+    """End the validation stage here, for endpoints that read and validate their own body"""
+    timer = current_request.get()
+    if timer is not None:
+        timer.handler_start = time.perf_counter()
+
+
+def mark_response_encoding():
+    """Start the serialization stage here, for endpoints that encode their own response"""
+    timer = current_request.get()
+    if timer is not None:
+        timer.handler_end = time.perf_counter()
+
+
+class InstrumentedRoute(APIRoute):
+    """APIRoute whose endpoint records handler entry and exit on the request timer
+
+    Everything FastAPI does before the endpoint (reading the body, validating the request
+    model, resolving dependencies) is reported as the validation stage; everything after
+    it until the response starts (response model validation, JSON encoding) as
+    serialization. Endpoints doing that work themselves move the boundaries with
+    mark_request_parsed and mark_response_encoding.
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        if asyncio.iscoroutinefunction(endpoint):
+            endpoint = _timed_endpoint(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware (no per-request task or body buffering) feeding ServingMetrics"""
+
+    def __init__(self, app, metrics: ServingMetrics, routes: Optional[Iterable] = None):
+        """
+        Initialize the middleware
+
+        Args:
+            app: Next ASGI application
+            metrics: Metric set to record into
+            routes: Application routes; their paths become endpoint labels
+        """
+        self.app = app
+        self.metrics = metrics
+        self.routes = routes
+        self._paths: Optional[Set[str]] = None
+
+    def _endpoint(self, path: str) -> str:
+        if self._paths is None:
+            self._paths = {route.path for route in self.routes or [] if hasattr(route, "path")}
+        return path if path in self._paths else UNMATCHED_ENDPOINT
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.metrics.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        metrics = self.metrics
+        endpoint = self._endpoint(scope["path"])
+        timer = RequestTimer(endpoint)
+        token = current_request.set(timer)
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if timer.handler_end is not None:
+                    metrics.observe_stage("validation", timer.handler_start - timer.start, endpoint)
+                    metrics.observe_stage("serialization", time.perf_counter() - timer.handler_end, endpoint)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            metrics.latency.observe(time.perf_counter() - timer.start, (endpoint,))
+            metrics.requests.inc((endpoint, scope["method"], str(status)))
+            current_request.reset(token)
@@ -2,7 +2,7 @@
 Pydantic schemas for API request/response validation
 """
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
 
 class TransactionRequest(BaseModel):
@@ -49,9 +49,55 @@ class PredictionResponse(BaseModel):
         }
 
 
+class BatchPredictionRequest(BaseModel):
+    """Request schema for batch fraud prediction"""
+    transactions: List[TransactionRequest] = Field(..., min_length=1, description="Transactions to score")
+
+
+class BatchPredictionResponse(BaseModel):
+    """Response schema for batch fraud prediction"""
+    predictions: List[PredictionResponse]
+    model_version: str
+
+
 class HealthResponse(BaseModel):
     """Health check response"""
     status: str
     mlflow_connected: bool
     feast_connected: bool
     model_loaded: bool
+
+
+class ModelInfo(BaseModel):
+    """A loaded model version"""
+    version: str
+    label: str
+    uri: str
+    loaded_at: float = Field(..., description="Epoch seconds the version went live or was loaded")
+    load_seconds: float
+    warmup_seconds: float
+    threshold: float
+    fast_path: bool
+    from_cache: bool = Field(False, description="Loaded from the local artifact cache")
+    shared_segment: Optional[str] = Field(None, description="Shared parameter segment scored from, if any")
+
+
+class ModelStatusResponse(BaseModel):
+    """Model manager state"""
+    active: Optional[ModelInfo]
+    pinned: Optional[str]
+    previous: List[ModelInfo] = Field(..., description="Warm versions available for rollback, newest first")
+    swaps: int
+    polling: bool
+    poll_interval_s: float
+    last_poll: Optional[float]
+    last_error: Optional[str]
+    failed_versions: Dict[str, str]
+    shared_segments: Optional[List[Dict[str, Any]]] = Field(
+        None, description="Shared parameter segments on this host with size and live worker leases"
+    )
+
+
+class PinModelRequest(BaseModel):
+    """Request to pin a model version"""
+    version: str = Field(..., description="Version to serve, e.g. '3' for fraud_detector/v3")
@@ -0,0 +1,101 @@
+"""
+Score cache for idempotent replay of retried transactions
+Payment processors retry authorization calls, so the same trans_num is often scored
+several times within seconds. The first answer is kept per endpoint, trans_num, request
+features and model version, and replayed for duplicates inside the window
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, Sequence
+
+from src.utils.cache import MISSING, TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class ScoreCache:
+    """Bounded, time-windowed cache of encoded prediction responses
+
+    Duplicates arriving while the first request is still being scored wait for its
+    result instead of scoring again. Keys carry the model version, so a swap never
+    replays another version's answer; invalidate_except drops the other versions'
+    entries when the model changes.
+    """
+
+    def __init__(self, maxsize: int = 50000, window_seconds: float = 60.0):
+        """
+        Initialize the cache
+
+        Args:
+            maxsize: Maximum number of cached responses before least-recently-used eviction
+            window_seconds: How long a response is replayed for duplicates
+        """
+        self.window_seconds = window_seconds
+        self.cache = TTLCache(maxsize=maxsize, default_ttl=window_seconds)
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.coalesced = 0
+
+    @staticmethod
+    def key(endpoint: str, trans_num: str, features: Sequence[float], version: str) -> Hashable:
+        """Cache key; the request features make a reused trans_num with other data a miss"""
+        return endpoint, trans_num, tuple(features), version
+
+    async def get_or_score(self, key: Hashable, score: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Cached result for key, or the result of score() (cached on success)
+
+        Args:
+            key: Cache key (see ScoreCache.key)
+            score: Coroutine function computing the result when it is not cached
+
+        Returns:
+            The cached or newly computed result
+        """
+        value = self.cache.get(key)
+        if value is not MISSING:
+            return value
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            value = await asyncio.shield(pending)
+            if value is not None:
+                return value
+            # The first request failed or was cancelled; score this one independently
+            return await score()
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await score()
+        except BaseException:
+            future.set_result(None)
+            raise
+        finally:
+            self._inflight.pop(key, None)
+        self.cache.set(key, value)
+        future.set_result(value)
+        return value
+
+    def invalidate_except(self, version: str) -> int:
+        """Drop entries scored by any version other than version; returns the number dropped"""
+        dropped = self.cache.invalidate(lambda key: key[-1] != version)
+        if dropped:
+            logger.info(f"Score cache: dropped {dropped} responses of previous model versions")
+        return dropped
+
+    def clear(self) -> int:
+        """Drop every entry (e.g. when the live version's threshold changed); returns the number dropped"""
+        dropped = self.cache.invalidate()
+        if dropped:
+            logger.info(f"Score cache: dropped {dropped} responses scored with a previous threshold")
+        return dropped
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache size, hit/miss counters and duplicates that waited for an in-flight score"""
+        return {
+            **self.cache.stats(),
+            "coalesced": self.coalesced,
+            "in_flight": len(self._inflight),
+            "window_seconds": self.window_seconds,
+        }
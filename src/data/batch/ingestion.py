@@ -0,0 +1,58 @@
+"""
+Batch data ingestion
+Streams the raw transaction CSVs in fixed-size chunks with explicit dtypes
+"""
+from typing import Dict, Iterator, List, Optional
+
+import pandas as pd
+
+# Columns of fraudTrain.csv / fraudTest.csv used downstream, with compact dtypes.
+# Card numbers and IDs stay strings: they are entity keys, not numbers.
+RAW_DTYPES: Dict[str, str] = {
+    "trans_date_trans_time": "string",
+    "cc_num": "string",
+    "merchant": "string",
+    "category": "category",
+    "amt": "float64",
+    "gender": "category",
+    "state": "category",
+    "city_pop": "int64",
+    "trans_num": "string",
+    "unix_time": "int64",
+    "is_fraud": "int8",
+}
+
+DEFAULT_CHUNKSIZE = 250_000
+
+
+def iter_raw_chunks(
+    path: str,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    columns: Optional[List[str]] = None
+) -> Iterator[pd.DataFrame]:
+    """
+    Read a raw transactions CSV chunk by chunk
+
+    Peak memory is bounded by chunksize, not by file size.
+
+    Args:
+        path: CSV file (first column is the unnamed row index)
+        chunksize: Rows per chunk
+        columns: Subset of RAW_DTYPES columns to read. Defaults to all of them
+
+    Yields:
+        DataFrames of at most chunksize rows with RAW_DTYPES dtypes
+    """
+    columns = list(columns or RAW_DTYPES)
+    unknown = [column for column in columns if column not in RAW_DTYPES]
+    if unknown:
+        raise ValueError(f"Unknown raw columns: {unknown}")
+    reader = pd.read_csv(
+        path,
+        usecols=columns,
+        dtype={column: RAW_DTYPES[column] for column in columns},
+        chunksize=chunksize,
+    )
+    with reader:
+        for chunk in reader:
+            yield chunk.reset_index(drop=True)
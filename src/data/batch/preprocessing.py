@@ -0,0 +1,206 @@
+"""
+Batch preprocessing
+Persisted categorical encoders and chunked conversion of raw CSVs to partitioned Parquet
+"""
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+import json
+import logging
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.data.batch.ingestion import DEFAULT_CHUNKSIZE, iter_raw_chunks
+
+logger = logging.getLogger(__name__)
+
+# Raw categorical column -> encoded model column
+CATEGORICAL_COLUMNS = {
+    "category": "category_encoded",
+    "gender": "gender_encoded",
+    "state": "state_encoded",
+}
+
+# Code assigned to categories not seen when the encoders were fitted
+UNKNOWN_CODE = -1
+
+# Columns written to the processed dataset, in order
+OUTPUT_COLUMNS = [
+    "timestamp", "trans_num", "cc_num", "merchant",
+    "amt", "city_pop", "category_encoded", "gender_encoded", "state_encoded",
+    "unix_time", "is_fraud",
+]
+
+# Hive-style partition column (YYYY-MM of the transaction timestamp)
+PARTITION_COLUMN = "trans_month"
+
+
+class CategoricalEncoders:
+    """Label encoders for the categorical columns, fitted chunk by chunk and saved as JSON
+
+    Codes match sklearn's LabelEncoder: classes sorted, code = position.
+    """
+
+    def __init__(self, classes: Optional[Dict[str, List[str]]] = None):
+        """
+        Initialize the encoders
+
+        Args:
+            classes: Raw column -> sorted class list
+        """
+        self.classes: Dict[str, List[str]] = classes or {}
+        self._lookup = {
+            column: {value: code for code, value in enumerate(values)}
+            for column, values in self.classes.items()
+        }
+
+    @classmethod
+    def fit(cls, chunks: Iterable[pd.DataFrame]) -> "CategoricalEncoders":
+        """
+        Fit on a stream of chunks, keeping only the distinct values in memory
+
+        Args:
+            chunks: DataFrames containing the CATEGORICAL_COLUMNS
+
+        Returns:
+            Fitted encoders
+        """
+        seen: Dict[str, set] = {column: set() for column in CATEGORICAL_COLUMNS}
+        for chunk in chunks:
+            for column in CATEGORICAL_COLUMNS:
+                seen[column].update(chunk[column].dropna().unique().tolist())
+        return cls({column: sorted(str(value) for value in values) for column, values in seen.items()})
+
+    def transform(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """
+        Add the encoded columns to a chunk
+
+        Args:
+            chunk: DataFrame containing the CATEGORICAL_COLUMNS
+
+        Returns:
+            The same DataFrame with *_encoded int64 columns added
+        """
+        for column, encoded in CATEGORICAL_COLUMNS.items():
+            codes = chunk[column].astype("string").map(self._lookup[column])
+            unknown = int(codes.isna().sum())
+            if unknown:
+                logger.warning(f"{unknown} rows with unseen {column} values encoded as {UNKNOWN_CODE}")
+            chunk[encoded] = codes.fillna(UNKNOWN_CODE).astype(np.int64)
+        return chunk
+
+    def save(self, path: str):
+        """Write the class lists as JSON"""
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.classes, f, indent=2)
+
+    @classmethod
+    def load(cls, path: str) -> "CategoricalEncoders":
+        """Read encoders written by save()"""
+        with open(path) as f:
+            return cls(json.load(f))
+
+
+def transform_chunk(chunk: pd.DataFrame, encoders: CategoricalEncoders) -> pd.DataFrame:
+    """
+    Turn a raw chunk into the processed layout, vectorized over the whole chunk
+
+    Args:
+        chunk: Raw chunk from iter_raw_chunks
+        encoders: Fitted categorical encoders
+
+    Returns:
+        DataFrame with OUTPUT_COLUMNS plus the partition column
+    """
+    chunk = encoders.transform(chunk)
+    # Feast compares event timestamps as UTC-aware values
+    chunk["timestamp"] = pd.to_datetime(chunk["trans_date_trans_time"], format="%Y-%m-%d %H:%M:%S", utc=True)
+    out = chunk[OUTPUT_COLUMNS].copy()
+    for key in ("trans_num", "cc_num", "merchant"):
+        out[key] = out[key].astype(object)  # Plain str keys, matching Feast entity dataframes
+    out[PARTITION_COLUMN] = out["timestamp"].dt.strftime("%Y-%m")
+    return out
+
+
+def write_parquet_dataset(
+    chunks: Iterable[pd.DataFrame],
+    output_path: str,
+    compression: str = "zstd",
+    overwrite: bool = True
+) -> int:
+    """
+    Append processed chunks to a month-partitioned Parquet dataset
+
+    Args:
+        chunks: Processed chunks (transform_chunk output)
+        output_path: Dataset directory (e.g. data/processed/X_train_with_timestamps.parquet)
+        compression: Parquet compression codec
+        overwrite: Remove an existing dataset first
+
+    Returns:
+        Number of rows written
+    """
+    root = Path(output_path)
+    if overwrite and root.exists():
+        shutil.rmtree(root) if root.is_dir() else root.unlink()
+    root.mkdir(parents=True, exist_ok=True)
+
+    rows = 0
+    for i, chunk in enumerate(chunks):
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        pq.write_to_dataset(
+            table,
+            root_path=str(root),
+            partition_cols=[PARTITION_COLUMN],
+            basename_template=f"part-{i:05d}-{{i}}.parquet",
+            compression=compression,
+        )
+        rows += len(chunk)
+    return rows
+
+
+def fit_encoders(raw_path: str, chunksize: int = DEFAULT_CHUNKSIZE) -> CategoricalEncoders:
+    """
+    Fit categorical encoders on a raw CSV, reading only the categorical columns
+
+    Args:
+        raw_path: Raw CSV (normally fraudTrain.csv)
+        chunksize: Rows per chunk
+
+    Returns:
+        Fitted encoders
+    """
+    return CategoricalEncoders.fit(iter_raw_chunks(raw_path, chunksize, columns=list(CATEGORICAL_COLUMNS)))
+
+
+def process_raw_file(
+    raw_path: str,
+    output_path: str,
+    encoders: CategoricalEncoders,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    compression: str = "zstd"
+) -> int:
+    """
+    Convert a raw CSV to a partitioned Parquet dataset chunk by chunk
+
+    Args:
+        raw_path: Raw CSV
+        output_path: Dataset directory to (re)create
+        encoders: Fitted categorical encoders
+        chunksize: Rows per chunk
+        compression: Parquet compression codec
+
+    Returns:
+        Number of rows written
+    """
+    start = time.perf_counter()
+    chunks = (transform_chunk(chunk, encoders) for chunk in iter_raw_chunks(raw_path, chunksize))
+    rows = write_parquet_dataset(chunks, output_path, compression=compression)
+    elapsed = time.perf_counter() - start
+    logger.info(f"Wrote {rows:,} rows to {output_path} in {elapsed:.1f}s ({rows / max(elapsed, 1e-9):,.0f} rows/s)")
+    return rows
@@ -0,0 +1,298 @@
+"""
+Streaming sources for transaction events
+Pluggable record sources (Kafka, JSONL file tail, in-memory) with explicit offset commits
+"""
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+import json
+import threading
+import time
+
+
+@dataclass
+class Record:
+    """A single raw event read from a source"""
+    value: bytes
+    offset: int
+    partition: int = 0
+    timestamp: Optional[float] = None  # Event time in epoch seconds, when the source knows it
+    key: Optional[bytes] = None
+    next_offset: Optional[int] = None  # Offset after this record, when not simply offset + 1
+
+    @property
+    def commit_offset(self) -> int:
+        """Offset to commit once this record has been processed"""
+        return self.offset + 1 if self.next_offset is None else self.next_offset
+
+
+class StreamSource(ABC):
+    """Interface every transaction source implements
+
+    Offsets passed to commit() are the *next* offset to read per partition, so a restarted
+    consumer resumes after the last record whose result reached the sink.
+    """
+
+    @abstractmethod
+    def poll(self, max_records: int, timeout: float) -> List[Record]:
+        """
+        Read up to max_records, waiting at most timeout seconds for the first one
+
+        Args:
+            max_records: Maximum number of records to return
+            timeout: Seconds to wait when nothing is available
+
+        Returns:
+            List of records, possibly empty
+        """
+
+    @abstractmethod
+    def commit(self, offsets: Dict[int, int]):
+        """
+        Durably record progress
+
+        Args:
+            offsets: Partition -> next offset to read
+        """
+
+    def lag(self) -> Optional[int]:
+        """Records (or bytes, for file sources) between the read position and the end"""
+        return None
+
+    @property
+    def exhausted(self) -> bool:
+        """True when the source will never produce more records"""
+        return False
+
+    def close(self):
+        """Release connections and file handles"""
+
+
+class InMemorySource(StreamSource):
+    """List-backed source for tests and local experiments"""
+
+    def __init__(self, values: Optional[Iterable[Any]] = None, closed: bool = True):
+        """
+        Initialize the source
+
+        Args:
+            values: Initial events; dicts are JSON-encoded, str/bytes are used as-is
+            closed: When True, the source is exhausted once every value has been read.
+                Use append() and close_input() to feed an open source
+        """
+        self._records: List[Record] = []
+        self._position = 0
+        self._closed = closed
+        self._cond = threading.Condition()
+        self.committed: Dict[int, int] = {}
+        for value in values or []:
+            self.append(value)
+
+    def append(self, value: Any, timestamp: Optional[float] = None):
+        """Add an event to the end of the stream"""
+        if isinstance(value, dict):
+            value = json.dumps(value)
+        if isinstance(value, str):
+            value = value.encode()
+        with self._cond:
+            self._records.append(Record(
+                value=value,
+                offset=len(self._records),
+                timestamp=timestamp if timestamp is not None else time.time(),
+            ))
+            self._cond.notify_all()
+
+    def close_input(self):
+        """Mark the stream as finished"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def poll(self, max_records: int, timeout: float) -> List[Record]:
+        with self._cond:
+            if self._position >= len(self._records) and not self._closed:
+                self._cond.wait(timeout)
+            batch = self._records[self._position:self._position + max_records]
+            self._position += len(batch)
+            return batch
+
+    def commit(self, offsets: Dict[int, int]):
+        self.committed.update(offsets)
+
+    def lag(self) -> Optional[int]:
+        return len(self._records) - self._position
+
+    @property
+    def exhausted(self) -> bool:
+        return self._closed and self._position >= len(self._records)
+
+
+class JsonlFileSource(StreamSource):
+    """Tails a newline-delimited JSON file; offsets are byte positions
+
+    Committed offsets are written to a sidecar '<path>.offset' file so a restarted
+    consumer resumes where the last one committed.
+    """
+
+    def __init__(self, path: str, follow: bool = True, offset_path: Optional[str] = None,
+                 start_from: str = "committed"):
+        """
+        Initialize the source
+
+        Args:
+            path: JSONL file to read
+            follow: Keep waiting for appended lines at end of file (like tail -f)
+            offset_path: Where committed offsets are stored. Defaults to '<path>.offset'
+            start_from: 'committed' to resume from the stored offset, 'beginning' to reread
+        """
+        self.path = Path(path)
+        self.follow = follow
+        self.offset_path = Path(offset_path) if offset_path else self.path.with_name(self.path.name + ".offset")
+        self._position = 0
+        if start_from == "committed" and self.offset_path.exists():
+            self._position = int(self.offset_path.read_text().strip() or 0)
+        self._file = None
+        self._eof = False
+
+    def _open(self) -> bool:
+        if self._file is None:
+            if not self.path.exists():
+                return False
+            self._file = open(self.path, "rb")
+            self._file.seek(self._position)
+        return True
+
+    def poll(self, max_records: int, timeout: float) -> List[Record]:
+        deadline = time.monotonic() + timeout
+        records: List[Record] = []
+        while True:
+            if self._open():
+                while len(records) < max_records:
+                    start = self._file.tell()
+                    line = self._file.readline()
+                    if not line or (self.follow and not line.endswith(b"\n")):
+                        # End of file, or a partial line still being written: retry later
+                        self._file.seek(start)
+                        break
+                    self._position = self._file.tell()
+                    if line.strip():
+                        records.append(Record(value=line, offset=start, next_offset=self._position))
+            self._eof = len(records) < max_records
+            if records or not self.follow or time.monotonic() >= deadline:
+                return records
+            time.sleep(min(0.05, max(0.0, deadline - time.monotonic())))
+
+    def commit(self, offsets: Dict[int, int]):
+        if 0 not in offsets:
+            return
+        tmp = self.offset_path.with_name(self.offset_path.name + ".tmp")
+        tmp.write_text(str(offsets[0]))
+        tmp.replace(self.offset_path)
+
+    def lag(self) -> Optional[int]:
+        if not self.path.exists():
+            return 0
+        return max(0, self.path.stat().st_size - self._position)
+
+    @property
+    def exhausted(self) -> bool:
+        return not self.follow and self._eof
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class KafkaSource(StreamSource):
+    """Kafka topic source with manual offset commits (requires kafka-python)"""
+
+    def __init__(self, topic: str, bootstrap_servers: str = "localhost:9092",
+                 group_id: str = "fraud-scorer", auto_offset_reset: str = "earliest", **consumer_config):
+        """
+        Initialize the source
+
+        Args:
+            topic: Topic carrying transaction events
+            bootstrap_servers: Kafka bootstrap servers
+            group_id: Consumer group whose offsets are committed
+            auto_offset_reset: Where to start without a committed offset
+            **consumer_config: Extra KafkaConsumer settings
+        """
+        try:
+            from kafka import KafkaConsumer, TopicPartition
+            from kafka.structs import OffsetAndMetadata
+        except ImportError as e:
+            raise ImportError("KafkaSource requires kafka-python: pip install kafka-python") from e
+        self._topic_partition = TopicPartition
+        self._offset_and_metadata = OffsetAndMetadata
+        self.topic = topic
+        self._consumer = KafkaConsumer(
+            topic,
+            bootstrap_servers=bootstrap_servers,
+            group_id=group_id,
+            auto_offset_reset=auto_offset_reset,
+            enable_auto_commit=False,
+            **consumer_config,
+        )
+
+    def poll(self, max_records: int, timeout: float) -> List[Record]:
+        batches = self._consumer.poll(timeout_ms=int(timeout * 1000), max_records=max_records)
+        return [
+            Record(
+                value=message.value,
+                offset=message.offset,
+                partition=message.partition,
+                timestamp=message.timestamp / 1000 if message.timestamp else None,
+                key=message.key,
+            )
+            for messages in batches.values()
+            for message in messages
+        ]
+
+    def commit(self, offsets: Dict[int, int]):
+        self._consumer.commit({
+            self._topic_partition(self.topic, partition): self._offset_and_metadata(offset, None)
+            for partition, offset in offsets.items()
+        })
+
+    def lag(self) -> Optional[int]:
+        assigned = self._consumer.assignment()
+        if not assigned:
+            return None
+        end_offsets = self._consumer.end_offsets(list(assigned))
+        return sum(max(0, end - self._consumer.position(tp)) for tp, end in end_offsets.items())
+
+    def close(self):
+        self._consumer.close()
+
+
+def create_source(config: Dict[str, Any]) -> StreamSource:
+    """
+    Build a source from the 'source' section of streaming_config.yaml
+
+    Args:
+        config: Source configuration with a 'type' of kafka, jsonl or memory
+
+    Returns:
+        Configured StreamSource
+    """
+    source_type = config.get("type", "jsonl")
+    if source_type == "kafka":
+        kafka = config.get("kafka") or {}
+        return KafkaSource(
+            topic=kafka.get("topic", "transactions"),
+            bootstrap_servers=kafka.get("bootstrap_servers", "localhost:9092"),
+            group_id=kafka.get("group_id", "fraud-scorer"),
+            auto_offset_reset=kafka.get("auto_offset_reset", "earliest"),
+        )
+    if source_type == "jsonl":
+        return JsonlFileSource(
+            path=config.get("path", "data/streaming/transactions.jsonl"),
+            follow=config.get("follow", True),
+            start_from=config.get("start_from", "committed"),
+        )
+    if source_type == "memory":
+        return InMemorySource(config.get("values"))
+    raise ValueError(f"Unknown source type: {source_type}")
@@ -0,0 +1,490 @@
+"""
+Streaming scoring pipeline
+decode -> feature assembly -> micro-batched model scoring -> sink, with at-least-once commits
+"""
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import json
+import logging
+import queue
+import threading
+import time
+
+import numpy as np
+
+from src.data.streaming.consumer import Record, StreamSource
+from src.models.inference import FEATURE_COLUMNS, FraudScorer
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of the stream on the internal queues
+_DONE = object()
+
+
+# ---------------------------------------------------------------------------
+# Pipeline stages (generators)
+# ---------------------------------------------------------------------------
+
+def micro_batches(
+    source: StreamSource,
+    batch_size: int,
+    max_wait: float,
+    stop_event: threading.Event
+) -> Iterator[List[Record]]:
+    """
+    Group source records into micro-batches
+
+    A batch is emitted when it holds batch_size records or max_wait seconds after its
+    first record arrived, whichever comes first.
+
+    Args:
+        source: Source to poll
+        batch_size: Maximum records per batch
+        max_wait: Seconds a partial batch may wait for more records
+        stop_event: Set to end the stream
+
+    Yields:
+        Lists of records in source order
+    """
+    batch: List[Record] = []
+    deadline = None
+    while not stop_event.is_set():
+        timeout = max_wait if deadline is None else max(0.0, deadline - time.monotonic())
+        records = source.poll(batch_size - len(batch), timeout)
+        if records and deadline is None:
+            deadline = time.monotonic() + max_wait
+        batch.extend(records)
+        if batch and (len(batch) >= batch_size or time.monotonic() >= deadline or source.exhausted):
+            yield batch
+            batch, deadline = [], None
+        if not batch and source.exhausted:
+            return
+    if batch:
+        yield batch
+
+
+def decode(records: Iterable[Record]) -> Iterator[Tuple[Record, Optional[Dict[str, Any]]]]:
+    """
+    Parse JSON transaction events
+
+    Args:
+        records: Raw records
+
+    Yields:
+        (record, transaction dict) pairs; the dict is None for undecodable or incomplete events
+    """
+    for record in records:
+        try:
+            event = json.loads(record.value)
+            if not isinstance(event, dict) or "trans_num" not in event:
+                raise ValueError("missing trans_num")
+            for column in FEATURE_COLUMNS:
+                float(event[column])
+        except (ValueError, KeyError, TypeError) as e:
+            logger.debug(f"Dropping undecodable record at offset {record.offset}: {e}")
+            yield record, None
+            continue
+        yield record, event
+
+
+def assemble_features(
+    decoded: Iterable[Tuple[Record, Optional[Dict[str, Any]]]],
+    feature_store=None
+) -> Tuple[List[Record], List[Dict[str, Any]], np.ndarray, int]:
+    """
+    Build the model input matrix for a decoded micro-batch
+
+    Args:
+        decoded: Output of decode()
+        feature_store: Optional FraudFeatureStore; online values override event values
+
+    Returns:
+        Tuple of (valid records, valid events, (n, k) feature matrix, invalid count)
+    """
+    records, events, invalid = [], [], 0
+    for record, event in decoded:
+        if event is None:
+            invalid += 1
+        else:
+            records.append(record)
+            events.append(event)
+    features = np.array(
+        [[float(event[column]) for column in FEATURE_COLUMNS] for event in events],
+        dtype=np.float64,
+    ).reshape(len(events), len(FEATURE_COLUMNS))
+    if feature_store is not None and events:
+        try:
+            online = feature_store.get_online_feature_matrix(
+                [{"trans_num": event["trans_num"]} for event in events],
+                columns=FEATURE_COLUMNS,
+            )
+            found = ~np.isnan(online)
+            features[found] = online[found]
+        except Exception as e:
+            logger.warning(f"Feast lookup failed for batch of {len(events)}: {e}, using event data")
+    return records, events, features, invalid
+
+
+@dataclass
+class ScoredBatch:
+    """Scores for one micro-batch plus the offsets it covers"""
+    seq: int
+    offsets: Dict[int, int]
+    results: List[Dict[str, Any]]
+    n_records: int
+    n_invalid: int
+    event_times: List[float] = field(default_factory=list)
+
+
+def score_batch(
+    seq: int,
+    records: List[Record],
+    scorer: FraudScorer,
+    model_version: str,
+    feature_store=None
+) -> ScoredBatch:
+    """
+    Run decode, feature assembly and scoring for one micro-batch
+
+    Args:
+        seq: Batch sequence number, used for ordered commits
+        records: Raw records of the batch
+        scorer: Scorer applied to the feature matrix in one call
+        model_version: Version string attached to every result
+        feature_store: Optional FraudFeatureStore for online features
+
+    Returns:
+        ScoredBatch
+    """
+    valid, events, features, invalid = assemble_features(decode(records), feature_store)
+    results = []
+    if events:
+        labels, probabilities = scorer.score(features)
+        results = [
+            {
+                "trans_num": event["trans_num"],
+                "is_fraud": bool(label),
+                "fraud_probability": float(probability),
+                "model_version": model_version,
+                "partition": record.partition,
+                "offset": record.offset,
+            }
+            for record, event, label, probability in zip(valid, events, labels, probabilities)
+        ]
+    offsets: Dict[int, int] = {}
+    for record in records:
+        offsets[record.partition] = max(offsets.get(record.partition, 0), record.commit_offset)
+    return ScoredBatch(
+        seq=seq,
+        offsets=offsets,
+        results=results,
+        n_records=len(records),
+        n_invalid=invalid,
+        event_times=[record.timestamp for record in records if record.timestamp is not None],
+    )
+
+
+# ---------------------------------------------------------------------------
+# Sinks
+# ---------------------------------------------------------------------------
+
+class StreamSink(ABC):
+    """Destination for scored results"""
+
+    @abstractmethod
+    def write(self, results: List[Dict[str, Any]]):
+        """Persist a list of results; must be durable before returning"""
+
+    def close(self):
+        """Flush and release resources"""
+
+
+class InMemorySink(StreamSink):
+    """Collects results in a list (for tests and local runs)"""
+
+    def __init__(self):
+        self.results: List[Dict[str, Any]] = []
+
+    def write(self, results: List[Dict[str, Any]]):
+        self.results.extend(results)
+
+
+class JsonlSink(StreamSink):
+    """Appends results as newline-delimited JSON"""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a")
+
+    def write(self, results: List[Dict[str, Any]]):
+        if results:
+            self._file.write("".join(json.dumps(result) + "\n" for result in results))
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def create_sink(config: Dict[str, Any]) -> StreamSink:
+    """Build a sink from the 'sink' section of streaming_config.yaml"""
+    sink_type = config.get("type", "jsonl")
+    if sink_type == "jsonl":
+        return JsonlSink(config.get("path", "data/streaming/scores.jsonl"))
+    if sink_type == "memory":
+        return InMemorySink()
+    raise ValueError(f"Unknown sink type: {sink_type}")
+
+
+# ---------------------------------------------------------------------------
+# Offsets and metrics
+# ---------------------------------------------------------------------------
+
+class OffsetTracker:
+    """Commits only offsets whose batch and every earlier batch reached the sink"""
+
+    def __init__(self):
+        self._next_seq = 0
+        self._pending: Dict[int, Dict[int, int]] = {}
+        self._committable: Dict[int, int] = {}
+
+    def complete(self, seq: int, offsets: Dict[int, int]):
+        """Mark a batch as durably written"""
+        self._pending[seq] = offsets
+        while self._next_seq in self._pending:
+            for partition, offset in self._pending.pop(self._next_seq).items():
+                self._committable[partition] = max(self._committable.get(partition, 0), offset)
+            self._next_seq += 1
+
+    def committable(self) -> Dict[int, int]:
+        """Partition -> next offset that is safe to commit"""
+        return dict(self._committable)
+
+
+class PipelineMetrics:
+    """Throughput, lag and latency counters for a pipeline run"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = time.monotonic()
+        self.records_in = 0
+        self.records_scored = 0
+        self.records_invalid = 0
+        self.batches = 0
+        self.commits = 0
+        self.source_lag: Optional[int] = None
+        self.last_event_latency: Optional[float] = None
+
+    def record_batch(self, batch: ScoredBatch):
+        with self._lock:
+            self.batches += 1
+            self.records_in += batch.n_records
+            self.records_scored += len(batch.results)
+            self.records_invalid += batch.n_invalid
+            if batch.event_times:
+                self.last_event_latency = time.time() - min(batch.event_times)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current counters plus records/sec since start"""
+        with self._lock:
+            elapsed = max(time.monotonic() - self.started_at, 1e-9)
+            return {
+                "records_in": self.records_in,
+                "records_scored": self.records_scored,
+                "records_invalid": self.records_invalid,
+                "batches": self.batches,
+                "commits": self.commits,
+                "elapsed_s": elapsed,
+                "records_per_sec": self.records_in / elapsed,
+                "source_lag": self.source_lag,
+                "event_latency_s": self.last_event_latency,
+            }
+
+
+# ---------------------------------------------------------------------------
+# Pipeline
+# ---------------------------------------------------------------------------
+
+class StreamingPipeline:
+    """Reads a source, scores micro-batches on worker threads and writes to a sink
+
+    Stages are connected by bounded queues, so a slow sink or scorer back-pressures the
+    reader instead of buffering without limit. Offsets are committed after results are
+    written, giving at-least-once delivery.
+    """
+
+    def __init__(
+        self,
+        source: StreamSource,
+        scorer: FraudScorer,
+        sink: StreamSink,
+        model_version: str = "unknown",
+        feature_store=None,
+        batch_size: int = 256,
+        max_wait_ms: float = 50,
+        workers: int = 2,
+        queue_size: int = 8,
+        commit_interval_s: float = 1.0,
+        metrics_interval_s: float = 10.0,
+        velocity_updater=None
+    ):
+        """
+        Initialize the pipeline
+
+        Args:
+            source: Record source
+            scorer: Model scorer
+            sink: Result sink
+            model_version: Version string attached to every result
+            feature_store: Optional FraudFeatureStore for online features
+            batch_size: Maximum records per micro-batch
+            max_wait_ms: Longest a partial micro-batch waits for more records
+            workers: Number of scoring threads
+            queue_size: Micro-batches buffered between stages
+            commit_interval_s: Minimum seconds between offset commits
+            metrics_interval_s: Seconds between metrics log lines (0 disables)
+            velocity_updater: Optional VelocityFeatureUpdater fed every event in stream
+                order (on the reader thread) and pushed to the online store
+        """
+        self.source = source
+        self.scorer = scorer
+        self.sink = sink
+        self.model_version = model_version
+        self.feature_store = feature_store
+        self.batch_size = batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.workers = workers
+        self.commit_interval_s = commit_interval_s
+        self.metrics_interval_s = metrics_interval_s
+        self.velocity_updater = velocity_updater
+        self._inbox: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._outbox: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._error: Optional[BaseException] = None
+        self.tracker = OffsetTracker()
+        self.metrics = PipelineMetrics()
+
+    def stop(self):
+        """Ask the pipeline to finish in-flight batches and return from run()"""
+        self._stop.set()
+
+    def _put(self, q: queue.Queue, item):
+        """Blocking put that gives up once the pipeline is stopping on error"""
+        while True:
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                if self._error is not None:
+                    return
+
+    def _fail(self, error: BaseException):
+        """Record the first error and make every stage wind down"""
+        if self._error is None:
+            self._error = error
+        self._stop.set()
+
+    def _read(self, max_records: Optional[int]):
+        try:
+            seq, total = 0, 0
+            for batch in micro_batches(self.source, self.batch_size, self.max_wait, self._stop):
+                if self.velocity_updater is not None:
+                    self._update_velocity(batch)
+                self._put(self._inbox, (seq, batch))
+                self.metrics.source_lag = self.source.lag()
+                seq += 1
+                total += len(batch)
+                if max_records is not None and total >= max_records:
+                    break
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            # On error the sentinels may be dropped; scorers then exit on their own
+            if self.velocity_updater is not None and self._error is None:
+                self.velocity_updater.flush()
+            for _ in range(self.workers):
+                self._put(self._inbox, _DONE)
+
+    def _update_velocity(self, records: List[Record]):
+        """Feed decodable events to the velocity engines in stream order"""
+        for record, event in decode(records):
+            if event is not None:
+                self.velocity_updater.observe(event, default_time=record.timestamp)
+        self.velocity_updater.maybe_flush()
+
+    def _score(self):
+        while self._error is None:
+            try:
+                item = self._inbox.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is _DONE:
+                self._put(self._outbox, _DONE)
+                return
+            seq, records = item
+            try:
+                scored = score_batch(seq, records, self.scorer, self.model_version, self.feature_store)
+            except BaseException as e:
+                logger.error(f"Scoring batch {seq} failed: {e}")
+                self._fail(e)
+                return
+            self._put(self._outbox, scored)
+
+    def _commit(self):
+        offsets = self.tracker.committable()
+        if offsets:
+            self.source.commit(offsets)
+            self.metrics.commits += 1
+
+    def run(self, max_records: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Run until the source is exhausted, stop() is called or max_records are read
+
+        Args:
+            max_records: Optional cap on records read
+
+        Returns:
+            Final metrics snapshot
+        """
+        threads = [threading.Thread(target=self._read, args=(max_records,), name="stream-reader", daemon=True)]
+        threads += [
+            threading.Thread(target=self._score, name=f"stream-scorer-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in threads:
+            thread.start()
+
+        finished, last_commit, last_log = 0, time.monotonic(), time.monotonic()
+        try:
+            while finished < self.workers and self._error is None:
+                try:
+                    item = self._outbox.get(timeout=0.1)
+                except queue.Empty:
+                    item = None
+                if item is _DONE:
+                    finished += 1
+                elif item is not None:
+                    self.sink.write(item.results)
+                    self.tracker.complete(item.seq, item.offsets)
+                    self.metrics.record_batch(item)
+                now = time.monotonic()
+                if now - last_commit >= self.commit_interval_s:
+                    self._commit()
+                    last_commit = now
+                if self.metrics_interval_s and now - last_log >= self.metrics_interval_s:
+                    logger.info(f"Stream metrics: {self.metrics.snapshot()}")
+                    last_log = now
+        except BaseException as e:
+            self._fail(e)
+            raise
+        finally:
+            self._stop.set()
+            for thread in threads:
+                thread.join(timeout=5)
+            # Safe even after a failure: only batches contiguous from the start are committed
+            self._commit()
+        if self._error is not None:
+            raise RuntimeError(f"Streaming pipeline failed: {self._error}") from self._error
+        return self.metrics.snapshot()
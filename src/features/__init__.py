@@ -2,5 +2,8 @@
 Feature Store Integration for Fraud Detection
 """
 from .feast_utils import FraudFeatureStore, get_fraud_feature_store
+from .materialization import IncrementalMaterializer, MaterializationJob
+from .training_dataset import TrainingDataset, TrainingDatasetBuilder
 
-__all__ = ['FraudFeatureStore', 'get_fraud_feature_store']
+__all__ = ['FraudFeatureStore', 'get_fraud_feature_store', 'IncrementalMaterializer', 'MaterializationJob',
+           'TrainingDataset', 'TrainingDatasetBuilder']
@@ -0,0 +1,203 @@
+"""
+Batch velocity features
+Point-in-time per-customer and per-merchant aggregates over the historical dataset,
+computed with vectorized group-wise window operations
+
+Values follow the definitions in streaming_features so the offline (training) and
+online (serving) paths agree; check_streaming_parity() replays the streaming engine
+over the same events to verify it.
+"""
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.features.streaming_features import (
+    ROW_VISIBLE_DELAY_S,
+    SECS_SINCE_LAST_CAP,
+    VELOCITY_ENTITIES,
+    VELOCITY_WINDOWS,
+    ZSCORE_MIN_STD,
+    ZSCORE_WINDOW,
+    VelocityFeatureEngine,
+    velocity_feature_names,
+)
+
+logger = logging.getLogger(__name__)
+
+# Columns read from the processed transactions dataset
+INPUT_COLUMNS = ["timestamp", "unix_time", "cc_num", "merchant", "amt"]
+
+# Tolerances between batch and streaming values: summation order differs, and z-scores
+# over near-constant histories amplify that rounding
+PARITY_ATOL = 1e-6
+PARITY_RTOL = 1e-6
+
+
+def _event_seconds(df: pd.DataFrame) -> pd.Series:
+    """Event time in epoch seconds, taken from the same field the streaming engine reads first"""
+    if "unix_time" in df.columns:
+        return df["unix_time"].astype(np.float64)
+    return df["timestamp"].map(pd.Timestamp.timestamp).astype(np.float64)
+
+
+def compute_entity_features(
+    df: pd.DataFrame,
+    key: str,
+    prefix: str,
+    windows: Optional[Dict[str, float]] = None
+) -> pd.DataFrame:
+    """
+    Compute velocity features for every transaction of one entity type
+
+    Transactions are sorted once by (key, event time, original order); every window is
+    then a single group-wise time-based rolling aggregate closed on the right, i.e.
+    (t - window, t] including the current row but not later rows with the same timestamp.
+    Rows are stamped ROW_VISIBLE_DELAY_S after their transaction, so a point-in-time join
+    of a transaction returns the state after the entity's previous one.
+
+    Args:
+        df: Transactions with key, amt, timestamp and unix_time (or timestamp only)
+        key: Entity key column (e.g. 'cc_num')
+        prefix: Feature name prefix (e.g. 'cust')
+        windows: Window name -> seconds. Defaults to VELOCITY_WINDOWS
+
+    Returns:
+        DataFrame with key, timestamp and the velocity_feature_names columns,
+        one row per input transaction in sorted order
+    """
+    windows = dict(windows or VELOCITY_WINDOWS)
+    events = pd.DataFrame({
+        key: df[key].astype(str).to_numpy(),
+        "timestamp": df["timestamp"].to_numpy(),
+        "seconds": _event_seconds(df).to_numpy(),
+        "amt": df["amt"].astype(np.float64).to_numpy(),
+        "order": np.arange(len(df)),
+    })
+    events = events.sort_values([key, "seconds", "order"], kind="mergesort", ignore_index=True)
+    # Second-resolution datetimes for time-based windows; epoch offsets are preserved exactly
+    events["event_time"] = pd.to_datetime(events["seconds"], unit="s")
+    events["amt_sq"] = events["amt"] * events["amt"]
+
+    grouped = events.groupby(key, sort=False)
+    visible_at = events["timestamp"] + pd.Timedelta(seconds=ROW_VISIBLE_DELAY_S)
+    out = pd.DataFrame({key: events[key], "timestamp": visible_at})
+
+    def rolling(column: str, seconds: float, how: str) -> np.ndarray:
+        result = grouped.rolling(f"{int(seconds)}s", on="event_time", closed="right")[column].agg(how)
+        return result.to_numpy()  # Groups come back in sorted order, which is the row order
+
+    for window, seconds in windows.items():
+        count = rolling("amt", seconds, "count")
+        total = rolling("amt", seconds, "sum")
+        out[f"{prefix}_txn_count_{window}"] = count.astype(np.int64)
+        out[f"{prefix}_amt_sum_{window}"] = total
+        out[f"{prefix}_amt_mean_{window}"] = total / count
+        out[f"{prefix}_amt_max_{window}"] = rolling("amt", seconds, "max")
+
+    # Z-score against earlier events in the history window: drop the current row from the aggregates
+    amount = events["amt"].to_numpy()
+    n = rolling("amt", ZSCORE_WINDOW[1], "count") - 1
+    total = rolling("amt", ZSCORE_WINDOW[1], "sum") - amount
+    squares = rolling("amt_sq", ZSCORE_WINDOW[1], "sum") - amount * amount
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = total / n
+        variance = squares / n - mean * mean
+        zscore = (amount - mean) / np.sqrt(variance)
+    valid = (n >= 2) & (variance > ZSCORE_MIN_STD * ZSCORE_MIN_STD)
+    out[f"{prefix}_amt_zscore_{ZSCORE_WINDOW[0]}"] = np.where(valid, zscore, 0.0)
+
+    gaps = grouped["seconds"].diff().to_numpy()
+    out[f"{prefix}_secs_since_last"] = np.minimum(np.nan_to_num(gaps, nan=SECS_SINCE_LAST_CAP), SECS_SINCE_LAST_CAP)
+
+    return out[[key, "timestamp"] + velocity_feature_names(prefix, windows)]
+
+
+def build_velocity_features(
+    transactions_path: str,
+    output_dir: str,
+    entities: Optional[List[str]] = None,
+    compression: str = "zstd",
+    verify_entities: int = 0
+) -> Dict[str, int]:
+    """
+    Build the velocity feature Parquet files the Feast velocity sources read
+
+    Args:
+        transactions_path: Processed transactions dataset (prepare_feast_data output)
+        output_dir: Directory for '<entity>_velocity.parquet'
+        entities: Subset of VELOCITY_ENTITIES. Defaults to all
+        compression: Parquet compression codec
+        verify_entities: Replay this many entities per type through the streaming
+            engine and raise if any value differs (0 disables the check)
+
+    Returns:
+        Entity type -> rows written
+    """
+    df = pd.read_parquet(transactions_path, columns=INPUT_COLUMNS)
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    written = {}
+    for entity in entities or list(VELOCITY_ENTITIES):
+        spec = VELOCITY_ENTITIES[entity]
+        start = time.perf_counter()
+        features = compute_entity_features(df, spec["key"], spec["prefix"])
+        elapsed = time.perf_counter() - start
+        if verify_entities:
+            check_streaming_parity(df, features, entity, max_entities=verify_entities)
+        path = Path(output_dir) / f"{entity}_velocity.parquet"
+        features.to_parquet(path, compression=compression, index=False)
+        written[entity] = len(features)
+        logger.info(f"Wrote {len(features):,} {entity} velocity rows to {path} "
+                    f"({len(features) / max(elapsed, 1e-9):,.0f} rows/s)")
+    return written
+
+
+def check_streaming_parity(
+    df: pd.DataFrame,
+    features: pd.DataFrame,
+    entity: str,
+    max_entities: int = 50
+) -> Dict[str, Any]:
+    """
+    Replay transactions through VelocityFeatureEngine and compare with batch values
+
+    Args:
+        df: Transactions passed to compute_entity_features
+        features: Its output
+        entity: Entity type in VELOCITY_ENTITIES
+        max_entities: Number of entity keys to replay
+
+    Returns:
+        Rows compared and the largest absolute difference
+
+    Raises:
+        ValueError: If any feature differs beyond PARITY_ATOL / PARITY_RTOL
+    """
+    spec = VELOCITY_ENTITIES[entity]
+    key, prefix = spec["key"], spec["prefix"]
+    keys = set(features[key].drop_duplicates().head(max_entities))
+    batch = features[features[key].isin(keys)]
+
+    # Replay in stream (time) order, then line rows up with the batch (key, time) order
+    events = pd.DataFrame({key: df[key].astype(str), "seconds": _event_seconds(df), "amt": df["amt"]})
+    events = events[events[key].isin(keys)].sort_values("seconds", kind="mergesort")
+    engine = VelocityFeatureEngine(prefix)
+    streamed = pd.DataFrame([
+        {key: entity_key, **engine.update(entity_key, seconds, amount)}
+        for entity_key, seconds, amount in events.itertuples(index=False)
+    ]).sort_values(key, kind="mergesort")
+
+    names = velocity_feature_names(prefix)
+    expected = streamed[names].to_numpy(dtype=np.float64)
+    actual = batch[names].to_numpy(dtype=np.float64)
+    diff = np.abs(expected - actual)
+    max_diff = float(diff.max()) if diff.size else 0.0
+    if not np.allclose(actual, expected, atol=PARITY_ATOL, rtol=PARITY_RTOL):
+        worst = names[int(np.argmax(diff.max(axis=0)))]
+        raise ValueError(f"{entity} velocity features differ from the streaming engine "
+                         f"(max diff {max_diff:.3g} in {worst})")
+    logger.info(f"{entity} velocity parity OK over {len(batch):,} rows (max diff {max_diff:.3g})")
+    return {"rows": len(batch), "max_diff": max_diff}
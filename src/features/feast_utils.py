@@ -2,30 +2,100 @@
 Feature Store Utilities
 Provides helper functions for interacting with Feast feature store
 """
-from typing import List, Dict, Optional
-import pandas as pd
-from feast import FeatureStore
+from typing import TYPE_CHECKING, Any, List, Dict, Optional, Sequence, Tuple, Union
+import numpy as np
 from pathlib import Path
 
+from src.utils.cache import MISSING, TTLCache
+
+# feast (several seconds to import) and pandas are imported when first used
+if TYPE_CHECKING:
+    import pandas as pd
+    from feast import FeatureService
+    from src.features.online_backends import OnlineBackend, ViewCodec
+    from src.features.training_dataset import TrainingDataset
+
 
 class FraudFeatureStore:
     """Wrapper for Feast FeatureStore with fraud detection specific methods"""
     
-    def __init__(self, repo_path: str = "../feature_store"):
+    def __init__(
+        self,
+        repo_path: str = "../feature_store",
+        cache_size: int = 10000,
+        cache_max_ttl: Optional[float] = None,
+        online_backend: Optional['OnlineBackend'] = None
+    ):
         """
         Initialize the feature store
         
         Args:
             repo_path: Path to the feature store repository
+            cache_size: Maximum entity rows kept in the online feature cache. 0 disables it
+            cache_max_ttl: Upper bound in seconds on cache entry lifetime. None uses the
+                feature view TTLs as they are
+            online_backend: Serve online features from this backend (see
+                src/features/online_backends.py) instead of Feast's online store
         """
+        from feast import FeatureStore
+        
         self.repo_path = Path(repo_path)
         self.store = FeatureStore(repo_path=str(self.repo_path))
+        self.cache = TTLCache(maxsize=cache_size) if cache_size > 0 else None
+        self.cache_max_ttl = cache_max_ttl
+        self.online_backend = online_backend
+        self._codecs: Dict[str, 'ViewCodec'] = {}
+        # Feature list -> [(view codec, feature names, output names)] for backend reads
+        self._backend_plans: Dict[Tuple[str, ...], List[Tuple['ViewCodec', List[str], List[str]]]] = {}
+        self._view_ttls: Dict[str, Optional[float]] = {}
+        # Feature views read by each cache namespace, for targeted invalidation
+        self._namespace_views: Dict[Tuple, List[str]] = {}
+        # Feature service name -> (FeatureService, ordered feature names, feature views)
+        self._service_layouts: Dict[Tuple[str, Optional[Tuple[str, ...]]], Tuple['FeatureService', List[str], List[str]]] = {}
+    
+    def _resolve_features(
+        self,
+        features: List[str]
+    ) -> Tuple[Union['FeatureService', List[str]], List[str]]:
+        """
+        Resolve a feature list into what Feast expects plus the feature views it reads
+        
+        A single entry without ':' names a feature service; anything else is a list of
+        '<feature_view>:<feature>' references.
+        
+        Args:
+            features: Feature service name or feature references
+            
+        Returns:
+            Tuple of (features argument for Feast, feature view names)
+        """
+        if len(features) == 1 and ":" not in features[0]:
+            service = self.store.get_feature_service(features[0])
+            views = [projection.name for projection in service.feature_view_projections]
+            return service, views
+        views = sorted({ref.split(":", 1)[0].split("@", 1)[0] for ref in features})
+        return list(features), views
+    
+    def _view_ttl(self, view_name: str) -> Optional[float]:
+        """TTL of a feature view in seconds (None when the view never expires)"""
+        if view_name not in self._view_ttls:
+            ttl = self.store.get_feature_view(view_name).ttl
+            seconds = ttl.total_seconds() if ttl else 0
+            self._view_ttls[view_name] = seconds if seconds > 0 else None
+        return self._view_ttls[view_name]
+    
+    def _cache_ttl(self, view_names: List[str]) -> Optional[float]:
+        """Cache lifetime for rows spanning several views: the shortest view TTL, capped"""
+        ttls = [ttl for ttl in (self._view_ttl(name) for name in view_names) if ttl is not None]
+        if self.cache_max_ttl is not None:
+            ttls.append(self.cache_max_ttl)
+        return min(ttls) if ttls else None
     
     def get_historical_features(
         self,
-        entity_df: pd.DataFrame,
+        entity_df: 'pd.DataFrame',
         features: Optional[List[str]] = None
-    ) -> pd.DataFrame:
+    ) -> 'pd.DataFrame':
         """
         Get historical features for training
         
@@ -39,22 +109,56 @@ class FraudFeatureStore:
         if features is None:
             # Use the default feature service
             features = ["fraud_detection_v1"]
+        feast_features, _ = self._resolve_features(features)
         
         training_df = self.store.get_historical_features(
             entity_df=entity_df,
-            features=features,
+            features=feast_features,
         ).to_df()
         
         return training_df
     
+    def build_training_dataset(
+        self,
+        entity_df: 'pd.DataFrame',
+        service_name: str = "fraud_detection_v1",
+        output_dir: Optional[str] = None,
+        cache_dir: Optional[str] = None,
+        **kwargs
+    ) -> 'TrainingDataset':
+        """
+        Point-in-time join of a feature service onto entity rows, reusing cached results
+        
+        Unlike get_historical_features, only the time segments whose entity rows or
+        source partitions changed since an earlier build are joined again (see
+        src/features/training_dataset.py), and the result stays on disk as Parquet.
+        
+        Args:
+            entity_df: DataFrame with entity keys, timestamps and columns to carry through
+            service_name: Feature service to join
+            output_dir: Also write the result as a Parquet dataset directory
+            cache_dir: Segment cache (default: data/training_cache in the feature repository)
+            **kwargs: TrainingDatasetBuilder.build arguments (e.g. timestamp_column)
+            
+        Returns:
+            TrainingDataset (to_df(), to_table() or iter_batches())
+        """
+        from src.features.training_dataset import TrainingDatasetBuilder
+        
+        builder = TrainingDatasetBuilder(self, cache_dir=cache_dir)
+        return builder.build(entity_df, service_name, output_dir=output_dir, **kwargs)
+    
     def get_online_features(
         self,
         entity_rows: List[Dict],
         features: Optional[List[str]] = None
-    ) -> pd.DataFrame:
+    ) -> 'pd.DataFrame':
         """
         Get online features for real-time prediction
         
+        Rows already in the in-process cache are served from it; only the misses go to
+        the online store, in a single call.
+        
         Args:
             entity_rows: List of entity dictionaries with keys
             features: List of features to retrieve
@@ -64,13 +168,276 @@ class FraudFeatureStore:
         """
         if features is None:
             features = ["fraud_detection_v1"]
+        
+        import pandas as pd
+        
+        return pd.DataFrame(self._get_online_rows(entity_rows, features))
+    
+    def _get_online_rows(self, entity_rows: List[Dict], features: List[str]) -> List[Dict[str, Any]]:
+        """Fetch one feature dict per entity row, going through the cache"""
+        feast_features, view_names = self._resolve_features(features)
+        namespace = tuple(features)
+        self._namespace_views[namespace] = view_names
+        keys = [(namespace, self._entity_key(row)) for row in entity_rows]
+        rows: List[Any] = [MISSING] * len(entity_rows)
+        if self.cache is not None:
+            rows = [self.cache.get(key) for key in keys]
+        missing = [i for i, row in enumerate(rows) if row is MISSING]
+        if not missing:
+            return rows
+        
+        if self.online_backend is not None:
+            response = self._backend_response(features, [entity_rows[i] for i in missing])
+        else:
+            response = self.store.get_online_features(
+                features=feast_features,
+                entity_rows=[entity_rows[i] for i in missing],
+            ).to_dict()
+        ttl = self._cache_ttl(view_names) if self.cache is not None else None
+        for position, i in enumerate(missing):
+            row = {name: values[position] for name, values in response.items()}
+            rows[i] = row
+            if self.cache is not None:
+                self.cache.set(keys[i], row, ttl=ttl)
+        return rows
+    
+    @staticmethod
+    def _entity_key(row: Dict) -> Tuple:
+        """Hashable, order-independent key for an entity row"""
+        return tuple(sorted(row.items()))
+    
+    def resolve_feature_service(
+        self,
+        service_name: str = "fraud_detection_v1",
+        columns: Optional[Sequence[str]] = None
+    ) -> List[str]:
+        """
+        Resolve a feature service into a fixed feature column order
+        
+        The layout is computed once per service and column order and reused afterwards.
+        
+        Args:
+            service_name: Name of the feature service
+            columns: Desired column order (e.g. the model's input columns). Must be a
+                subset of the service's features. None keeps the service definition order
             
-        feature_vector = self.store.get_online_features(
-            features=features,
-            entity_rows=entity_rows,
-        ).to_df()
+        Returns:
+            Ordered feature names
+        """
+        return self._service_layout(service_name, columns)[1]
+    
+    def _service_layout(
+        self,
+        service_name: str,
+        columns: Optional[Sequence[str]]
+    ) -> Tuple['FeatureService', List[str], List[str]]:
+        """Resolve and memoize (service, ordered feature names, feature views)"""
+        layout_key = (service_name, tuple(columns) if columns is not None else None)
+        layout = self._service_layouts.get(layout_key)
+        if layout is None:
+            service = self.store.get_feature_service(service_name)
+            names = [
+                feature.name
+                for projection in service.feature_view_projections
+                for feature in projection.features
+            ]
+            if columns is not None:
+                unknown = [name for name in columns if name not in names]
+                if unknown:
+                    raise ValueError(f"Features {unknown} are not in feature service {service_name}")
+                names = list(columns)
+            views = [projection.name for projection in service.feature_view_projections]
+            layout = (service, names, views)
+            self._service_layouts[layout_key] = layout
+        return layout
+    
+    def get_online_feature_matrix(
+        self,
+        entity_rows: List[Dict],
+        service_name: str = "fraud_detection_v1",
+        columns: Optional[Sequence[str]] = None
+    ) -> np.ndarray:
+        """
+        Get online features as a contiguous float64 matrix, without building DataFrames
         
-        return feature_vector
+        Args:
+            entity_rows: List of entity dictionaries with keys
+            service_name: Feature service to read
+            columns: Column order of the result (see resolve_feature_service)
+            
+        Returns:
+            (len(entity_rows), n_features) C-contiguous float64 array. Features missing
+            from the online store are NaN
+        """
+        service, names, view_names = self._service_layout(service_name, columns)
+        matrix = np.empty((len(entity_rows), len(names)), dtype=np.float64)
+        namespace = ("matrix", service_name, tuple(names))
+        self._namespace_views[namespace] = view_names
+        keys = [(namespace, self._entity_key(row)) for row in entity_rows]
+        
+        missing = []
+        for i, key in enumerate(keys):
+            row = self.cache.get(key) if self.cache is not None else MISSING
+            if row is MISSING:
+                missing.append(i)
+            else:
+                matrix[i] = row
+        if not missing:
+            return matrix
+        
+        if self.online_backend is not None:
+            matrix[missing] = self._backend_matrix(service_name, names, [entity_rows[i] for i in missing])
+        else:
+            response = self.store.get_online_features(
+                features=service,
+                entity_rows=[entity_rows[i] for i in missing],
+            ).to_dict()
+            for j, name in enumerate(names):
+                matrix[missing, j] = [np.nan if value is None else value for value in response[name]]
+        if self.cache is not None:
+            ttl = self._cache_ttl(view_names)
+            for i in missing:
+                self.cache.set(keys[i], matrix[i].copy(), ttl=ttl)
+        return matrix
+    
+    def view_codec(self, view_name: str) -> 'ViewCodec':
+        """Key and record layout of a feature view in the online backend"""
+        codec = self._codecs.get(view_name)
+        if codec is None:
+            from src.features.online_backends import ViewCodec
+            codec = ViewCodec(self.store.project, self.store.get_feature_view(view_name))
+            self._codecs[view_name] = codec
+        return codec
+    
+    def _backend_plan(self, features: List[str]) -> List[Tuple['ViewCodec', List[str], List[str]]]:
+        """Views to read for a feature list: (codec, feature names, output column names)"""
+        plan_key = tuple(features)
+        plan = self._backend_plans.get(plan_key)
+        if plan is None:
+            plan = []
+            if len(features) == 1 and ":" not in features[0]:
+                service = self.store.get_feature_service(features[0])
+                for projection in service.feature_view_projections:
+                    names = [feature.name for feature in projection.features]
+                    plan.append((self.view_codec(projection.name), names, names))
+            else:
+                grouped: Dict[str, List[str]] = {}
+                for ref in features:
+                    view_name, name = ref.split(":", 1)
+                    grouped.setdefault(view_name.split("@", 1)[0], []).append(name)
+                plan = [(self.view_codec(view), names, names) for view, names in grouped.items()]
+            self._backend_plans[plan_key] = plan
+        return plan
+    
+    def _backend_fetch(self, codecs: List['ViewCodec'], entity_rows: List[Dict]) -> List[np.ndarray]:
+        """One multi-get for every view's records; one (rows, view features) array per codec"""
+        keys = [codec.key(row) for codec in codecs for row in entity_rows]
+        records = self.online_backend.get_many(keys)
+        n = len(entity_rows)
+        return [codec.unpack(records[i * n:(i + 1) * n]) for i, codec in enumerate(codecs)]
+    
+    def _backend_response(self, features: List[str], entity_rows: List[Dict]) -> Dict[str, List[Any]]:
+        """Online backend rows in the layout of Feast's OnlineResponse.to_dict()"""
+        plan = self._backend_plan(features)
+        blocks = self._backend_fetch([codec for codec, _, _ in plan], entity_rows)
+        response: Dict[str, List[Any]] = {}
+        owners = {key: codec for codec, _, _ in plan for key in codec.join_keys}
+        for key in dict.fromkeys(key for row in entity_rows for key in row):
+            values = [row.get(key) for row in entity_rows]
+            if key in owners:
+                values = [owners[key].join_key_value(key, value) for value in values]
+            response[key] = values
+        for (codec, names, outputs), block in zip(plan, blocks):
+            for name, output in zip(names, outputs):
+                column = block[:, codec.index[name]].tolist()
+                response[output] = [codec.to_python(name, value) for value in column]
+        return response
+    
+    def _backend_matrix(self, service_name: str, names: List[str], entity_rows: List[Dict]) -> np.ndarray:
+        """Online backend values of a feature service in the given column order"""
+        plan = self._backend_plan([service_name])
+        blocks = self._backend_fetch([codec for codec, _, _ in plan], entity_rows)
+        matrix = np.full((len(entity_rows), len(names)), np.nan)
+        positions = {name: j for j, name in enumerate(names)}
+        for (codec, view_names, _), block in zip(plan, blocks):
+            used = [(positions[name], codec.index[name]) for name in view_names if name in positions]
+            if used:
+                columns, indices = zip(*used)
+                matrix[:, list(columns)] = block[:, list(indices)]
+        return matrix
+    
+    def invalidate_cache(self, feature_view: Optional[str] = None) -> int:
+        """
+        Drop cached online features
+        
+        Args:
+            feature_view: Only drop rows that read this feature view. None drops everything
+            
+        Returns:
+            Number of cache entries dropped
+        """
+        if self.cache is None:
+            return 0
+        if feature_view is None:
+            return self.cache.invalidate()
+        
+        def reads_view(key) -> bool:
+            return feature_view in self._namespace_views.get(key[0], ())
+        
+        return self.cache.invalidate(reads_view)
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters of the online feature cache"""
+        return self.cache.stats() if self.cache is not None else {"enabled": False}
+    
+    def push_features(self, push_source_name: str, df: 'pd.DataFrame'):
+        """
+        Write rows to the online store through a Feast push source
+        
+        With an online backend the latest row per entity is written to it directly
+        instead. Cached rows for the pushed entities are invalidated in every feature
+        view fed by the push source.
+        
+        Args:
+            push_source_name: Name of the PushSource
+            df: Rows with the entity join keys, timestamp and feature columns
+        """
+        views = [view for view in self.store.list_feature_views()
+                 if view.stream_source is not None and view.stream_source.name == push_source_name]
+        if self.online_backend is not None:
+            for view in views:
+                self._write_backend(view, df)
+        else:
+            self.store.push(push_source_name, df)
+        if self.cache is None:
+            return
+        for view in views:
+            pushed = {
+                (join_key, value)
+                for join_key in view.join_keys if join_key in df.columns
+                for value in df[join_key].tolist()
+            }
+            
+            def stale(key, view_name=view.name) -> bool:
+                return (view_name in self._namespace_views.get(key[0], ())
+                        and any(item in pushed for item in key[1]))
+            
+            self.cache.invalidate(stale)
+    
+    def _write_backend(self, view, df: 'pd.DataFrame') -> int:
+        """Write the latest row per entity of df to the online backend"""
+        import pandas as pd
+        
+        codec = self.view_codec(view.name)
+        timestamp_field = view.batch_source.timestamp_field
+        df = df.sort_values(timestamp_field, kind="stable").drop_duplicates(codec.join_keys, keep="last")
+        event_ts = pd.to_datetime(df[timestamp_field], utc=True).astype("int64").to_numpy() / 1e9
+        return self.online_backend.write_view(
+            codec,
+            [df[key].tolist() for key in codec.join_keys],
+            event_ts,
+            df[codec.features].to_numpy(dtype=np.float64, na_value=np.nan),
+        )
     
     def materialize(
         self,
@@ -80,12 +447,19 @@ class FraudFeatureStore:
         """
         Materialize features to online store for serving
         
+        With an online backend, each view's TTL window up to end_date is loaded by the
+        incremental materializer instead (start_date is not used).
+        
         Args:
             start_date: Start date in ISO format (YYYY-MM-DD)
             end_date: End date in ISO format (YYYY-MM-DD)
         """
         from datetime import datetime
         
+        if self.online_backend is not None:
+            self.materialize_incremental(end_date=end_date, full=True)
+            return
+        
         start_dt = datetime.fromisoformat(start_date)
         end_dt = datetime.fromisoformat(end_date)
         
@@ -93,7 +467,42 @@ class FraudFeatureStore:
             start_date=start_dt,
             end_date=end_dt
         )
+        # Online values may have changed for any entity
+        self.invalidate_cache()
         print(f"Materialized features from {start_date} to {end_date}")
+
+    def materialize_incremental(
+        self,
+        end_date: Optional[str] = None,
+        full: bool = False,
+        views: Optional[Sequence[str]] = None,
+        state_path: Optional[str] = None,
+        batch_size: int = 10000
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Materialize only the offline rows added since the previous run of each view
+
+        Args:
+            end_date: Newest event time to load in ISO format (default: now)
+            full: Ignore the high-water marks and reload each view's TTL window
+            views: Feature views to materialize (default: all online views)
+            state_path: High-water mark file (default: data/materialization_state.json
+                in the feature repository)
+            batch_size: Entities per online store transaction
+
+        Returns:
+            Per-view report (see IncrementalMaterializer.run)
+        """
+        from datetime import datetime
+        from src.features.materialization import IncrementalMaterializer
+
+        materializer = IncrementalMaterializer(self, state_path=state_path, batch_size=batch_size, views=views)
+        return materializer.run(end=datetime.fromisoformat(end_date) if end_date else None, full=full)
+
+    def close(self):
+        """Release online backend connections and mappings"""
+        if self.online_backend is not None:
+            self.online_backend.close()
     
     def list_feature_views(self) -> List[str]:
         """List all available feature views"""
@@ -114,6 +523,25 @@ class FraudFeatureStore:
 
 
 # Convenience function
-def get_fraud_feature_store(repo_path: str = "../feature_store") -> FraudFeatureStore:
-    """Get an instance of the fraud detection feature store"""
-    return FraudFeatureStore(repo_path=repo_path)
+def get_fraud_feature_store(
+    repo_path: str = "../feature_store",
+    online_store_config: Optional[Dict[str, Any]] = None,
+    **kwargs
+) -> FraudFeatureStore:
+    """
+    Get an instance of the fraud detection feature store
+    
+    Args:
+        repo_path: Path to the feature store repository
+        online_store_config: Online backend settings. Defaults to configs/online_store.yaml;
+            ignored when online_backend is passed
+        **kwargs: FraudFeatureStore arguments
+    """
+    if "online_backend" not in kwargs:
+        from src.features.online_backends import create_online_backend
+        from src.utils.config import load_config
+        
+        if online_store_config is None:
+            online_store_config = load_config("online_store")
+        kwargs["online_backend"] = create_online_backend(online_store_config)
+    return FraudFeatureStore(repo_path=repo_path, **kwargs)
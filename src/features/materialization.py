@@ -0,0 +1,753 @@
+"""
+Incremental materialization into the online store
+Loads only the offline rows added since the previous run of each feature view and
+writes the latest value per entity to the online store in bulk
+
+Each feature view keeps a high-water mark (the newest event timestamp loaded) and the
+size, modification time and newest timestamp of every Parquet file of its batch
+source in a JSON state file. A run:
+1. skips source files that are unchanged and hold nothing past the mark
+2. scans the other files with a timestamp filter (Parquet row-group statistics let
+   pyarrow skip old row groups and partitions), so a year-long TTL window is read once,
+   on the first run
+3. keeps the latest row per entity and upserts it in batched transactions
+
+Rows that arrive later with a timestamp at or before the mark are not picked up (the
+same contract as `feast materialize-incremental`); run with full=True to reload the
+whole TTL window.
+"""
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from itertools import repeat
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+import fcntl
+import json
+import logging
+import os
+import sqlite3
+import struct
+import threading
+import time
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from feast import FeatureStore, FeatureView
+    from src.features.feast_utils import FraudFeatureStore
+    from src.features.online_backends import OnlineBackend
+
+logger = logging.getLogger(__name__)
+
+STATE_FORMAT = 1
+# Rows compared against Feast's own serializers before hand-encoded values are trusted
+PARITY_SAMPLE = 256
+
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Timezone-aware UTC datetime (naive values are taken as UTC)"""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return _utc(value).isoformat() if value is not None else None
+
+
+def _parse_time(value: Optional[str]) -> Optional[datetime]:
+    return _utc(datetime.fromisoformat(value)) if value else None
+
+
+class MaterializationState:
+    """Per-feature-view high-water marks and source file fingerprints in a JSON file
+
+    Writes are atomic (temporary file and rename). lock() serializes runs across
+    processes with an flock on '<path>.lock'.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+
+    def load(self) -> Dict[str, Any]:
+        """The saved state, or an empty one"""
+        try:
+            state = json.loads(self.path.read_text())
+        except FileNotFoundError:
+            return {"format": STATE_FORMAT, "views": {}}
+        if state.get("format") != STATE_FORMAT:
+            raise ValueError(f"Unsupported materialization state format in {self.path}")
+        return state
+
+    def save(self, state: Dict[str, Any]):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(state, indent=2, sort_keys=True))
+        os.replace(tmp, self.path)
+
+    def generations(self) -> Dict[str, int]:
+        """Write counter per feature view; changes whenever a run writes rows"""
+        return {name: view.get("generation", 0) for name, view in self.load().get("views", {}).items()}
+
+    @contextmanager
+    def lock(self, blocking: bool = True) -> Iterator[bool]:
+        """
+        Hold the run lock
+
+        Args:
+            blocking: Wait for another process's run to finish. Otherwise yield False
+                immediately when the lock is taken
+
+        Yields:
+            Whether the lock is held
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path.with_name(self.path.name + ".lock"), "a") as handle:
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def _varint(value: int) -> bytes:
+    """Protobuf base-128 varint (negative numbers as 64-bit two's complement)"""
+    value &= 0xFFFFFFFFFFFFFFFF
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+class ValueEncoder:
+    """Serializes feature columns to Feast ValueProto bytes without building protos
+
+    Supports the scalar types the fraud feature views use; field tags are read from the
+    ValueProto descriptor. Other types, and columns with missing values, go through
+    Feast's converters.
+    """
+
+    # Feast value type name -> (ValueProto field, protobuf wire type, fixed-width numpy format)
+    SCALARS = {
+        "INT32": ("int32_val", 0, None),
+        "INT64": ("int64_val", 0, None),
+        "DOUBLE": ("double_val", 1, "<f8"),
+        "FLOAT": ("float_val", 5, "<f4"),
+        "BOOL": ("bool_val", 0, None),
+        "STRING": ("string_val", 2, None),
+    }
+
+    def __init__(self):
+        from feast.protos.feast.types.Value_pb2 import Value
+
+        fields = Value.DESCRIPTOR.fields_by_name
+        self.tags = {
+            name: _varint((fields[field].number << 3) | wire)
+            for name, (field, wire, _) in self.SCALARS.items()
+        }
+
+    def encode(self, values: np.ndarray, value_type) -> Tuple[List[bytes], List[Optional[str]]]:
+        """
+        Serialize a column
+
+        Args:
+            values: Column values
+            value_type: Feast ValueType of the feature
+
+        Returns:
+            (serialized ValueProto per row, value_text per row as Feast's SQL stores write it)
+        """
+        name = value_type.name
+        if name not in self.SCALARS or _has_missing(values):
+            return self._encode_with_feast(values, value_type)
+        field, wire, fixed = self.SCALARS[name]
+        tag = self.tags[name]
+        if fixed is not None:
+            typed = np.asarray(values, dtype=fixed)
+            width = len(tag) + typed.itemsize
+            packed = np.empty(len(typed), dtype=[("tag", f"V{len(tag)}"), ("value", fixed)])
+            packed["tag"] = np.frombuffer(tag, dtype=f"V{len(tag)}")[0]
+            packed["value"] = typed
+            buffer = packed.tobytes()
+            # str() of the value as the proto holds it (float32 widened to a Python float)
+            return [buffer[i:i + width] for i in range(0, len(buffer), width)], [str(v) for v in typed.tolist()]
+        if name == "STRING":
+            texts = [str(v) for v in values]
+            encoded = [v.encode("utf8") for v in texts]
+            return [tag + _varint(len(v)) + v for v in encoded], texts
+        if name == "BOOL":
+            flags = [bool(v) for v in values]
+            return [tag + (b"\x01" if v else b"\x00") for v in flags], [str(v) for v in flags]
+        ints = np.asarray(values).astype(np.int64).tolist()
+        if name == "INT32":
+            ints = [int(np.int32(v)) for v in ints]
+        cache: Dict[int, bytes] = {}
+        out = []
+        for v in ints:
+            encoded = cache.get(v)
+            if encoded is None:
+                encoded = cache[v] = tag + _varint(v)
+            out.append(encoded)
+        return out, [str(v) for v in ints]
+
+    @staticmethod
+    def _encode_with_feast(values: np.ndarray, value_type) -> Tuple[List[bytes], List[Optional[str]]]:
+        from feast.infra.online_stores.helpers import extract_text_and_num
+        from feast.type_map import python_values_to_proto_values
+
+        protos = python_values_to_proto_values(list(values), value_type)
+        return [p.SerializeToString() for p in protos], [extract_text_and_num(p, False)[0] for p in protos]
+
+    def check(self, values: np.ndarray, value_type) -> bool:
+        """Whether encode() matches Feast's serialization on the first PARITY_SAMPLE values"""
+        sample = values[:PARITY_SAMPLE]
+        return self.encode(sample, value_type) == self._encode_with_feast(sample, value_type)
+
+
+def _has_missing(values: np.ndarray) -> bool:
+    if values.dtype.kind == "f":
+        return bool(np.isnan(values).any())
+    if values.dtype.kind == "O":
+        return any(v is None or v != v for v in values)
+    return False
+
+
+class EntityKeyEncoder:
+    """Serializes entity keys like feast's serialize_entity_key (format 3) for one join key"""
+
+    _TYPES = {"STRING": 2, "INT64": 4}
+
+    def __init__(self, join_key: str, value_type, serialization_version: int):
+        from feast.value_type import ValueType
+
+        self.join_key = join_key
+        self.value_type = value_type
+        self.serialization_version = serialization_version
+        self.supported = serialization_version >= 3 and value_type.name in self._TYPES
+        encoded_key = join_key.encode("utf8")
+        self.prefix = struct.pack("<III", 1, ValueType.STRING.value, len(encoded_key)) + encoded_key
+
+    def encode(self, values: Sequence[Any]) -> List[bytes]:
+        if not self.supported:
+            return self._encode_with_feast(values)
+        if self.value_type.name == "STRING":
+            head = self.prefix + struct.pack("<I", self._TYPES["STRING"])
+            encoded = [str(v).encode("utf8") for v in values]
+            return [head + struct.pack("<I", len(v)) + v for v in encoded]
+        head = self.prefix + struct.pack("<II", self._TYPES["INT64"], 8)
+        return [head + struct.pack("<q", v) for v in np.asarray(values).astype(np.int64).tolist()]
+
+    def _encode_with_feast(self, values: Sequence[Any]) -> List[bytes]:
+        from feast.infra.key_encoding_utils import serialize_entity_key
+        from feast.protos.feast.types.EntityKey_pb2 import EntityKey
+        from feast.type_map import python_values_to_proto_values
+
+        return [
+            serialize_entity_key(EntityKey(join_keys=[self.join_key], entity_values=[value]),
+                                 entity_key_serialization_version=self.serialization_version)
+            for value in python_values_to_proto_values(list(values), self.value_type)
+        ]
+
+    def check(self, values: Sequence[Any]) -> bool:
+        sample = list(values[:PARITY_SAMPLE])
+        return self.encode(sample) == self._encode_with_feast(sample)
+
+
+class SqliteOnlineWriter:
+    """Bulk upserts into Feast's SQLite online store tables
+
+    Rows are serialized by ValueEncoder/EntityKeyEncoder (checked against Feast's
+    serializers per column) and written with executemany, one transaction per batch,
+    with the same upsert statement Feast uses.
+    """
+
+    def __init__(self, store: 'FeatureStore'):
+        config = store.config
+        path = Path(config.online_store.path)
+        if not path.is_absolute() and config.repo_path:
+            path = Path(config.repo_path) / path
+        self.path = path
+        self.project = config.project
+        self.serialization_version = config.entity_key_serialization_version
+        self.values = ValueEncoder()
+
+    @classmethod
+    def supports(cls, store: 'FeatureStore') -> bool:
+        config = store.config
+        return (getattr(config.online_store, "type", None) == "sqlite"
+                and not getattr(config.registry, "enable_online_feature_view_versioning", False))
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(str(self.path), timeout=30)
+
+    def _columns(self, conn: sqlite3.Connection, table: str) -> List[str]:
+        return [row[1] for row in conn.execute(f'PRAGMA table_info("{table}")')]
+
+    def write(self, view: 'FeatureView', df: 'pd.DataFrame', event_ts: List[datetime],
+              created_ts: Optional[List[datetime]], batch_size: int) -> int:
+        """
+        Upsert one row per entity
+
+        Args:
+            view: Feature view being written
+            df: Latest row per entity with the join key and feature columns
+            event_ts: Naive UTC event timestamp per row
+            created_ts: Naive UTC created timestamp per row, or None
+            batch_size: Entities per transaction
+
+        Returns:
+            Entities written
+        """
+        if len(view.join_keys) != 1:
+            raise NotImplementedError("Bulk SQLite writes support a single join key")
+        join_key = view.join_keys[0]
+        entity_type = next(f.dtype for f in view.entity_columns if f.name == join_key).to_value_type()
+        keys_encoder = EntityKeyEncoder(join_key, entity_type, self.serialization_version)
+        if keys_encoder.supported and not keys_encoder.check(df[join_key].to_numpy()):
+            logger.warning(f"{view.name}: entity key encoding differs from Feast, using Feast's serializer")
+            keys_encoder.supported = False
+        keys = keys_encoder.encode(df[join_key].to_numpy())
+
+        columns: List[Tuple[str, List[bytes], List[Optional[str]]]] = []
+        for feature in view.features:
+            values = df[feature.name].to_numpy()
+            value_type = feature.dtype.to_value_type()
+            if self.values.check(values, value_type):
+                encoded, texts = self.values.encode(values, value_type)
+            else:
+                logger.warning(f"{view.name}.{feature.name}: value encoding differs from Feast, using Feast's converter")
+                encoded, texts = ValueEncoder._encode_with_feast(values, value_type)
+            columns.append((feature.name, encoded, texts))
+
+        table = f"{self.project}_{view.name}"
+        created = created_ts if created_ts is not None else [None] * len(keys)
+        conn = self._connect()
+        try:
+            available = set(self._columns(conn, table))
+            if not available:
+                raise RuntimeError(f"Online table {table} does not exist; run feast apply")
+            with_num = "value_num" in available
+            names = ["entity_key", "feature_name", "value", "value_text"] + (["value_num"] if with_num else [])
+            names += ["event_ts", "created_ts"]
+            updates = ", ".join(f"{c} = excluded.{c}" for c in names if c not in ("entity_key", "feature_name"))
+            sql = (f'INSERT INTO "{table}" ({", ".join(names)}) VALUES ({", ".join("?" * len(names))}) '
+                   f"ON CONFLICT(entity_key, feature_name) DO UPDATE SET {updates}")
+
+            for start in range(0, len(keys), batch_size):
+                stop = start + batch_size
+                rows: List[Tuple] = []
+                for name, encoded, texts in columns:
+                    parts = [keys[start:stop], repeat(name), encoded[start:stop], texts[start:stop]]
+                    if with_num:
+                        parts.append([_as_number(t) for t in texts[start:stop]])
+                    parts += [event_ts[start:stop], created[start:stop]]
+                    rows.extend(zip(*parts))
+                with conn:
+                    conn.executemany(sql, rows)
+        finally:
+            conn.close()
+        return len(keys)
+
+
+def _as_number(text: Optional[str]) -> Optional[float]:
+    try:
+        return float(text) if text is not None else None
+    except ValueError:
+        return None
+
+
+class FeastOnlineWriter:
+    """Writes through FeatureStore.write_to_online_store, one call per batch (any online store)"""
+
+    def __init__(self, store: 'FeatureStore'):
+        self.store = store
+
+    def write(self, view: 'FeatureView', df: 'pd.DataFrame', event_ts: List[datetime],
+              created_ts: Optional[List[datetime]], batch_size: int) -> int:
+        for start in range(0, len(df), batch_size):
+            self.store.write_to_online_store(view.name, df.iloc[start:start + batch_size])
+        return len(df)
+
+
+class BackendOnlineWriter:
+    """Writes to an alternative online backend (see src/features/online_backends.py)"""
+
+    def __init__(self, store: 'FeatureStore', backend: 'OnlineBackend'):
+        self.project = store.project
+        self.backend = backend
+
+    def write(self, view: 'FeatureView', df: 'pd.DataFrame', event_ts: List[datetime],
+              created_ts: Optional[List[datetime]], batch_size: int) -> int:
+        from src.features.online_backends import ViewCodec
+
+        codec = ViewCodec(self.project, view)
+        seconds = np.array(event_ts, dtype="datetime64[us]").astype(np.int64) / 1e6
+        return self.backend.write_view(
+            codec,
+            [df[key].tolist() for key in codec.join_keys],
+            seconds,
+            df[codec.features].to_numpy(dtype=np.float64, na_value=np.nan),
+            batch_size,
+        )
+
+
+def create_online_writer(store: 'FeatureStore', backend: Optional['OnlineBackend'] = None):
+    """
+    Writer for the online store that serves reads
+
+    The alternative backend when one is configured, then bulk SQLite writes when the
+    online store is Feast's SQLite store, else Feast's own write path
+    """
+    if backend is not None:
+        return BackendOnlineWriter(store, backend)
+    if SqliteOnlineWriter.supports(store):
+        return SqliteOnlineWriter(store)
+    return FeastOnlineWriter(store)
+
+
+class IncrementalMaterializer:
+    """Materializes the offline rows added since the previous run of each feature view"""
+
+    def __init__(
+        self,
+        feature_store: 'FraudFeatureStore',
+        state_path: Optional[str] = None,
+        batch_size: int = 10000,
+        views: Optional[Sequence[str]] = None,
+        writer=None
+    ):
+        """
+        Initialize the materializer
+
+        Args:
+            feature_store: Feature store whose online store is written (and whose
+                in-process cache is invalidated for the views written)
+            state_path: State file. Defaults to data/materialization_state.json in the
+                feature repository (materialization_state.<backend>.json when the
+                feature store serves from an alternative online backend)
+            batch_size: Entities per online store transaction
+            views: Feature views to materialize. Defaults to every online view with a
+                Parquet batch source
+            writer: Online store writer. Defaults to create_online_writer()
+        """
+        self.feature_store = feature_store
+        self.store = feature_store.store
+        self.repo_path = Path(feature_store.repo_path)
+        backend = feature_store.online_backend
+        if state_path is None:
+            # High-water marks belong to the store written; switching backends starts over
+            name = "materialization_state.json" if backend is None else f"materialization_state.{backend.name}.json"
+            state_path = str(self.repo_path / "data" / name)
+        self.state = MaterializationState(state_path)
+        self.batch_size = batch_size
+        self.view_names = list(views) if views else None
+        self.writer = writer or create_online_writer(self.store, backend)
+
+    def feature_views(self) -> List['FeatureView']:
+        """Online feature views materialized by this instance"""
+        views = [view for view in self.store.list_feature_views() if view.online and view.batch_source is not None]
+        if self.view_names is not None:
+            unknown = set(self.view_names) - {view.name for view in views}
+            if unknown:
+                raise ValueError(f"Unknown or offline-only feature views: {sorted(unknown)}")
+            views = [view for view in views if view.name in self.view_names]
+        return views
+
+    def _source_path(self, view: 'FeatureView') -> Path:
+        path = Path(view.batch_source.path)
+        return path if path.is_absolute() else (self.repo_path / path).resolve()
+
+    @staticmethod
+    def _source_files(root: Path) -> List[Path]:
+        if root.is_dir():
+            return sorted(
+                path for path in root.rglob("*.parquet")
+                if path.is_file() and not any(part.startswith(("_", ".")) for part in path.relative_to(root).parts)
+            )
+        return [root] if root.exists() else []
+
+    @staticmethod
+    def _max_timestamp(path: Path, column: str) -> Optional[datetime]:
+        """Newest value of a timestamp column from Parquet statistics (None when unknown)"""
+        import pyarrow.parquet as pq
+
+        metadata = pq.ParquetFile(path).metadata
+        names = [metadata.schema.column(i).name for i in range(metadata.num_columns)]
+        if column not in names:
+            return None
+        index = names.index(column)
+        newest = None
+        for group in range(metadata.num_row_groups):
+            stats = metadata.row_group(group).column(index).statistics
+            if stats is None or not stats.has_min_max or not isinstance(stats.max, datetime):
+                return None
+            value = _utc(stats.max)
+            newest = value if newest is None or value > newest else newest
+        return newest
+
+    def _scan(self, view: 'FeatureView', root: Path, files: List[Path],
+              start: Optional[datetime], end: datetime) -> 'pd.DataFrame':
+        """Rows of files with start < timestamp <= end, source columns renamed to feature names"""
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        source = view.batch_source
+        mapping = dict(source.field_mapping or {})
+        inverse = {target: name for name, target in mapping.items()}
+        wanted = list(view.join_keys) + [feature.name for feature in view.features]
+        timestamp_columns = [source.timestamp_field] + ([source.created_timestamp_column]
+                                                        if source.created_timestamp_column else [])
+        columns = [inverse.get(name, name) for name in wanted] + timestamp_columns
+
+        if root.is_dir():
+            dataset = ds.dataset([str(f) for f in files], format="parquet", partitioning="hive",
+                                 partition_base_dir=str(root))
+        else:
+            dataset = ds.dataset([str(f) for f in files], format="parquet")
+        field_type = dataset.schema.field(source.timestamp_field).type
+
+        def scalar(value: datetime):
+            tz = getattr(field_type, "tz", None)
+            return pa.scalar(value if tz else value.replace(tzinfo=None), type=field_type)
+
+        timestamp = ds.field(source.timestamp_field)
+        condition = timestamp <= scalar(end)
+        if start is not None:
+            condition = condition & (timestamp > scalar(start))
+        df = dataset.to_table(columns=columns, filter=condition).to_pandas()
+        return df.rename(columns=mapping)
+
+    def _view_window(self, view: 'FeatureView', view_state: Dict[str, Any], end: datetime,
+                     full: bool) -> Optional[datetime]:
+        """Exclusive lower bound: the high-water mark, or the TTL window on first/full runs"""
+        mark = None if full else _parse_time(view_state.get("high_water_mark"))
+        if mark is not None:
+            return mark
+        if view.ttl and view.ttl.total_seconds() > 0:
+            return end - view.ttl
+        return None
+
+    def materialize_view(self, view: 'FeatureView', view_state: Dict[str, Any], end: datetime,
+                         full: bool = False) -> Dict[str, Any]:
+        """
+        Materialize one feature view, updating view_state in place
+
+        Returns:
+            Report: files scanned/skipped, rows read and written, timings, rows/sec
+        """
+        import pandas as pd
+
+        started = time.perf_counter()
+        source = view.batch_source
+        root = self._source_path(view)
+        start = self._view_window(view, view_state, end, full)
+        mark = None if full else _parse_time(view_state.get("high_water_mark"))
+
+        known = view_state.get("files", {}) if not full else {}
+        fingerprints: Dict[str, Dict[str, Any]] = {}
+        to_scan: List[Path] = []
+        for path in self._source_files(root):
+            stat = path.stat()
+            name = str(path.relative_to(root)) if root.is_dir() else path.name
+            previous = known.get(name)
+            if (previous and previous["size"] == stat.st_size and previous["mtime_ns"] == stat.st_mtime_ns
+                    and mark is not None and previous.get("max_timestamp")
+                    and _parse_time(previous["max_timestamp"]) <= mark):
+                fingerprints[name] = previous
+                continue
+            fingerprints[name] = {
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "max_timestamp": _isoformat(self._max_timestamp(path, source.timestamp_field)),
+            }
+            to_scan.append(path)
+
+        report: Dict[str, Any] = {
+            "files": len(fingerprints),
+            "files_scanned": len(to_scan),
+            "start": _isoformat(start),
+            "end": _isoformat(end),
+            "rows_read": 0,
+            "rows_written": 0,
+        }
+        written = 0
+        newest = mark
+        if to_scan:
+            df = self._scan(view, root, to_scan, start, end)
+            report["rows_read"] = len(df)
+            report["read_s"] = time.perf_counter() - started
+            if len(df):
+                # Latest row per entity, as Feast's materialization keeps
+                order = [source.timestamp_field] + ([source.created_timestamp_column]
+                                                    if source.created_timestamp_column else [])
+                df = df.sort_values(order, kind="stable").drop_duplicates(list(view.join_keys), keep="last")
+                df = df.reset_index(drop=True)
+
+                def naive_utc(column: str) -> List[datetime]:
+                    values = pd.DatetimeIndex(pd.to_datetime(df[column], utc=True)).tz_localize(None)
+                    return list(values.to_pydatetime())
+
+                write_started = time.perf_counter()
+                created = naive_utc(source.created_timestamp_column) if source.created_timestamp_column else None
+                written = self.writer.write(view, df, naive_utc(source.timestamp_field), created, self.batch_size)
+                report["write_s"] = time.perf_counter() - write_started
+                batch_newest = _utc(pd.to_datetime(df[source.timestamp_field], utc=True).max().to_pydatetime())
+                newest = batch_newest if newest is None or batch_newest > newest else newest
+
+        elapsed = time.perf_counter() - started
+        report.update(rows_written=written, seconds=elapsed, rows_per_sec=report["rows_read"] / max(elapsed, 1e-9),
+                      high_water_mark=_isoformat(newest))
+        view_state["files"] = fingerprints
+        view_state["high_water_mark"] = _isoformat(newest)
+        view_state["last_run"] = {key: report[key] for key in ("end", "rows_read", "rows_written", "seconds")}
+        if written:
+            view_state["generation"] = view_state.get("generation", 0) + 1
+        return report
+
+    def run(self, end: Optional[datetime] = None, full: bool = False, blocking: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Materialize every view's new rows up to end
+
+        Args:
+            end: Newest event time to load (default: now). Later rows wait for a later run
+            full: Ignore high-water marks and reload each view's TTL window
+            blocking: Wait when another process is materializing; otherwise return None
+
+        Returns:
+            Per-view reports plus totals, or None when skipped because of another run
+        """
+        end = _utc(end) or datetime.now(timezone.utc)
+        with self.state.lock(blocking) as acquired:
+            if not acquired:
+                logger.info("Materialization already running in another process, skipping")
+                return None
+            started = time.perf_counter()
+            state = self.state.load()
+            reports: Dict[str, Any] = {}
+            for view in self.feature_views():
+                view_state = state["views"].setdefault(view.name, {})
+                report = self.materialize_view(view, view_state, end, full)
+                reports[view.name] = report
+                # Save after each view so a failure keeps the progress of the others
+                self.state.save(state)
+                if report["rows_written"]:
+                    self.feature_store.invalidate_cache(view.name)
+                log = logger.info if report["files_scanned"] else logger.debug
+                log(
+                    f"Materialized {view.name}: {report['rows_written']:,} entities from {report['rows_read']:,} rows "
+                    f"({report['files_scanned']}/{report['files']} files scanned) in {report['seconds']:.2f}s "
+                    f"({report['rows_per_sec']:,.0f} rows/s), high-water mark {report['high_water_mark']}"
+                )
+        elapsed = time.perf_counter() - started
+        rows = sum(report["rows_read"] for report in reports.values())
+        return {
+            "views": reports,
+            "rows_read": rows,
+            "rows_written": sum(report["rows_written"] for report in reports.values()),
+            "seconds": elapsed,
+            "rows_per_sec": rows / max(elapsed, 1e-9),
+        }
+
+
+class MaterializationJob:
+    """Runs an IncrementalMaterializer periodically on a daemon thread
+
+    Runs are skipped while another process holds the state lock. Whichever process
+    writes, every job sees the views' generation counters change in the state file and
+    invalidates its own feature store cache for them.
+    """
+
+    def __init__(self, materializer: IncrementalMaterializer, interval_s: float = 300.0,
+                 on_error: Optional[Callable[[Exception], None]] = None):
+        """
+        Initialize the job
+
+        Args:
+            materializer: Materializer to run
+            interval_s: Seconds between runs
+            on_error: Called with the exception of a failed run (after logging it)
+        """
+        if interval_s <= 0:
+            raise ValueError("interval_s must be positive")
+        self.materializer = materializer
+        self.interval_s = interval_s
+        self.on_error = on_error
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._generations: Dict[str, int] = {}
+        self.runs = 0
+        self.failures = 0
+        self.last_report: Optional[Dict[str, Any]] = None
+        self.last_error: Optional[str] = None
+
+    def _sync_cache(self):
+        """Invalidate cached rows of views another process has written since the last check"""
+        generations = self.materializer.state.generations()
+        for view, generation in generations.items():
+            if view in self._generations and self._generations[view] != generation:
+                self.materializer.feature_store.invalidate_cache(view)
+        self._generations = generations
+
+    def run_once(self) -> Optional[Dict[str, Any]]:
+        """One run (skipped when another process is materializing)"""
+        try:
+            report = self.materializer.run(blocking=False)
+            if report is not None:
+                self.runs += 1
+                self.last_report = report
+                self.last_error = None
+            self._sync_cache()
+            return report
+        except Exception as e:
+            self.failures += 1
+            self.last_error = str(e)
+            logger.error(f"Materialization failed: {e}")
+            if self.on_error is not None:
+                self.on_error(e)
+            return None
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self.run_once()
+            self._stop.wait(self.interval_s)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        try:
+            self._generations = self.materializer.state.generations()
+        except (OSError, ValueError):
+            self._generations = {}
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="materialization", daemon=True)
+        self._thread.start()
+
+    def join(self, timeout: Optional[float] = None):
+        """Block until the job is stopped"""
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stop(self, timeout: float = 30.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "interval_s": self.interval_s,
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "last_rows_read": self.last_report["rows_read"] if self.last_report else None,
+            "last_rows_per_sec": self.last_report["rows_per_sec"] if self.last_report else None,
+        }
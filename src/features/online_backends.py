@@ -0,0 +1,527 @@
+"""
+Alternative online store backends
+Serve online features from Redis or an embedded memory-mapped key-value file instead
+of Feast's online store
+
+Feast's SQLite online store serializes writes and builds protobuf entity keys and
+values for every lookup. The backends here keep one record per entity and feature
+view: the event timestamp followed by the view's numeric features as float64, under a
+plain-text key. A lookup for many entities and several views is a single multi-get
+(one Redis round trip, or one pass over the memory-mapped table).
+
+Records are written by incremental materialization and push_features; Feast's own
+materialize() and online store are not involved. Feature views must have numeric
+features (Int32/Int64/Float32/Float64/Bool); integers beyond 2**53 lose precision.
+"""
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple
+import fcntl
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import zlib
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from feast import FeatureView
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+NUMERIC_TYPES = {"INT32", "INT64", "FLOAT", "DOUBLE", "BOOL"}
+
+
+class ViewCodec:
+    """Keys and records of one feature view
+
+    Keys are '<project>:<view>:<schema fingerprint>:<join key values>'; a change to the
+    view's entities or features changes the fingerprint, so records written for an
+    older definition are never misread (they read as missing until rematerialized).
+    """
+
+    def __init__(self, project: str, view: 'FeatureView'):
+        self.name = view.name
+        self.join_keys = list(view.join_keys)
+        self.join_key_types = {column.name: column.dtype.to_value_type().name
+                               for column in view.entity_columns if column.name in self.join_keys}
+        self.features = [feature.name for feature in view.features]
+        self.index = {name: i for i, name in enumerate(self.features)}
+        self.kinds = [feature.dtype.to_value_type().name for feature in view.features]
+        unsupported = [name for name, kind in zip(self.features, self.kinds) if kind not in NUMERIC_TYPES]
+        if unsupported:
+            raise ValueError(f"Feature view {view.name} has non-numeric features {unsupported}; "
+                             "alternative online backends store numeric features only")
+        fingerprint = zlib.crc32(json.dumps([self.join_keys, self.features, self.kinds]).encode())
+        self.prefix = f"{project}:{view.name}:{fingerprint:08x}:"
+        self.width = 8 * (len(self.features) + 1)
+        self._float32 = [i for i, kind in enumerate(self.kinds) if kind == "FLOAT"]
+
+    def key(self, entity_row: Dict[str, Any]) -> bytes:
+        return (self.prefix + "|".join(str(entity_row[k]) for k in self.join_keys)).encode()
+
+    def keys(self, join_key_values: Sequence[Sequence[Any]]) -> List[bytes]:
+        """Keys for columns of join key values (one sequence per join key)"""
+        prefix = self.prefix
+        if len(join_key_values) == 1:
+            return [(prefix + str(value)).encode() for value in join_key_values[0]]
+        return [(prefix + "|".join(map(str, values))).encode() for values in zip(*join_key_values)]
+
+    def pack(self, event_ts: np.ndarray, values: np.ndarray) -> List[bytes]:
+        """
+        Encode records
+
+        Args:
+            event_ts: Event time per row, seconds since the epoch
+            values: (rows, features) values in feature order; NaN for missing
+
+        Returns:
+            One record per row
+        """
+        values = np.array(values, dtype=np.float64)
+        if self._float32:
+            # Served as Feast serves Float32 features: the float32 value widened
+            values[:, self._float32] = values[:, self._float32].astype(np.float32)
+        buffer = np.column_stack([np.asarray(event_ts, dtype=np.float64), values]).astype("<f8").tobytes()
+        width = self.width
+        return [buffer[i:i + width] for i in range(0, len(buffer), width)]
+
+    def unpack(self, records: Sequence[Optional[bytes]]) -> np.ndarray:
+        """
+        Decode records into a (rows, features) float64 array
+
+        Missing records and records of a different width come back as all-NaN rows.
+        Like Feast's online stores, view TTLs are not applied to reads (they bound the
+        materialization window).
+        """
+        out = np.full((len(records), len(self.features)), np.nan)
+        present = [i for i, record in enumerate(records) if record is not None and len(record) == self.width]
+        if not present:
+            return out
+        block = np.frombuffer(b"".join(records[i] for i in present), dtype="<f8").reshape(len(present), -1)
+        out[present] = block[:, 1:]
+        return out
+
+    def join_key_value(self, name: str, value: Any) -> Any:
+        """An entity row value converted to the join key's type, as Feast echoes it"""
+        kind = self.join_key_types.get(name)
+        if value is None or kind is None:
+            return value
+        if kind == "STRING":
+            return str(value)
+        if kind in ("INT32", "INT64"):
+            return int(value)
+        return value
+
+    def to_python(self, name: str, value: float) -> Any:
+        """A decoded value as Feast returns it (int for integer features, None when missing)"""
+        if value != value:
+            return None
+        kind = self.kinds[self.index[name]]
+        if kind in ("INT32", "INT64"):
+            return int(value)
+        if kind == "BOOL":
+            return bool(value)
+        return float(value)
+
+
+class OnlineBackend:
+    """Byte key-value store behind FraudFeatureStore's online reads
+
+    Subclasses implement get_many and set_many; both must be safe to call from
+    several threads.
+    """
+
+    name = "base"
+
+    def get_many(self, keys: Sequence[bytes]) -> List[Optional[bytes]]:
+        """Values for keys, None where absent, in one round trip"""
+        raise NotImplementedError
+
+    def set_many(self, items: Sequence[Tuple[bytes, bytes]]):
+        """Store key-value pairs"""
+        raise NotImplementedError
+
+    def ping(self) -> bool:
+        return True
+
+    def close(self):
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name}
+
+    def write_view(self, codec: ViewCodec, join_key_values: Sequence[Sequence[Any]], event_ts: np.ndarray,
+                   values: np.ndarray, batch_size: int = 10000) -> int:
+        """
+        Store the latest values of a feature view's entities
+
+        Args:
+            codec: Codec of the feature view
+            join_key_values: One sequence of values per join key
+            event_ts: Event time per entity, seconds since the epoch
+            values: (entities, features) values in codec.features order
+            batch_size: Entities per set_many call
+
+        Returns:
+            Entities written
+        """
+        keys = codec.keys(join_key_values)
+        records = codec.pack(event_ts, values)
+        for start in range(0, len(keys), batch_size):
+            self.set_many(list(zip(keys[start:start + batch_size], records[start:start + batch_size])))
+        return len(keys)
+
+
+class RedisOnlineBackend(OnlineBackend):
+    """Records in Redis (or any server speaking its protocol, e.g. LocalRespServer)
+
+    Lookups are MGET commands of at most chunk_size keys sent in one pipeline, so a
+    request for any number of entities costs one network round trip. Connections come
+    from a bounded pool shared by all threads.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str = "redis://localhost:6379/0", pool_size: int = 16,
+                 socket_timeout: Optional[float] = 1.0, chunk_size: int = 1000):
+        """
+        Initialize the backend
+
+        Args:
+            url: Redis URL
+            pool_size: Maximum open connections
+            socket_timeout: Seconds to wait for a reply before failing the lookup
+            chunk_size: Keys per MGET (bounds the time the server spends on one command)
+        """
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError("RedisOnlineBackend requires redis: pip install redis") from e
+        self.url = url
+        self.chunk_size = chunk_size
+        # RESP2: replies to MGET/MSET are the same, and older servers and the stand-in speak it
+        self.pool = redis.ConnectionPool.from_url(url, max_connections=pool_size, socket_timeout=socket_timeout,
+                                                  socket_connect_timeout=socket_timeout, protocol=2)
+        self.client = redis.Redis(connection_pool=self.pool)
+
+    def get_many(self, keys: Sequence[bytes]) -> List[Optional[bytes]]:
+        if not keys:
+            return []
+        if len(keys) <= self.chunk_size:
+            return self.client.mget(keys)
+        pipe = self.client.pipeline(transaction=False)
+        for start in range(0, len(keys), self.chunk_size):
+            pipe.mget(keys[start:start + self.chunk_size])
+        return [value for chunk in pipe.execute() for value in chunk]
+
+    def set_many(self, items: Sequence[Tuple[bytes, bytes]]):
+        pipe = self.client.pipeline(transaction=False)
+        for start in range(0, len(items), self.chunk_size):
+            pipe.mset(dict(items[start:start + self.chunk_size]))
+        pipe.execute()
+
+    def ping(self) -> bool:
+        return bool(self.client.ping())
+
+    def close(self):
+        self.pool.disconnect()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, "pool_size": self.pool.max_connections, "chunk_size": self.chunk_size}
+
+
+class MmapKVStore:
+    """Embedded key-value file, memory-mapped for lock-free reads by many processes
+
+    Layout: a 64-byte header, an open-addressing table of (hash, offset) slots and an
+    append-only region of (key length, value length, key, value) records. Writers hold
+    an flock on '<path>.lock', append the record and then publish its offset in the
+    slot, so readers never see a partial record; they verify the key of every record
+    they follow. When the table gets too full, or too much of the data region is
+    superseded values, the writer rebuilds the file under a temporary name, renames it
+    over the original and flags the old file as retired; readers then reopen the path.
+    """
+
+    MAGIC = b"FDKVMAP1"
+    # magic, slots, data start, data end, live entries, superseded bytes, retired
+    HEADER = struct.Struct("<8sQQQQQQ")
+    HEADER_SIZE = 64
+    SLOT = struct.Struct("<QQ")
+    RECORD = struct.Struct("<II")
+    MAX_LOAD = 0.7
+
+    def __init__(self, path: str, initial_slots: int = 1 << 17):
+        """
+        Open (or create) the store
+
+        Args:
+            path: Data file
+            initial_slots: Hash table slots of a new file (rounded up to a power of two)
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.initial_slots = 1 << max(4, (max(initial_slots, 16) - 1).bit_length())
+        self._lock = threading.Lock()
+        self._fd: Optional[int] = None
+        self._map: Optional[mmap.mmap] = None
+        with self._write_lock():
+            if not self.path.exists():
+                self._create(self.path, self.initial_slots)
+        self._open()
+
+    # File management
+
+    def _create(self, path: Path, slots: int, size_hint: int = 0):
+        data_start = self.HEADER_SIZE + slots * self.SLOT.size
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.new")
+        with open(tmp, "wb") as f:
+            f.write(self.HEADER.pack(self.MAGIC, slots, data_start, data_start, 0, 0, 0))
+            f.truncate(data_start + max(size_hint, 1 << 20))
+        os.replace(tmp, path)
+
+    def _open(self):
+        if self._map is not None:
+            self._map.close()
+            os.close(self._fd)
+        self._fd = os.open(self.path, os.O_RDWR)
+        self._map = mmap.mmap(self._fd, 0)
+        magic, self._slots, self._data_start, *_ = self.HEADER.unpack_from(self._map, 0)
+        if magic != self.MAGIC:
+            raise ValueError(f"{self.path} is not a key-value store file")
+        self._mask = self._slots - 1
+
+    def _remap(self):
+        self._map.close()
+        self._map = mmap.mmap(self._fd, 0)
+
+    def _header(self) -> Tuple:
+        return self.HEADER.unpack_from(self._map, 0)
+
+    def _write_lock(self):
+        return _FileLock(self.path.with_name(self.path.name + ".lock"))
+
+    @staticmethod
+    def _hash(key: bytes) -> int:
+        return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little")
+
+    # Reads
+
+    def _find(self, key: bytes, h: int) -> Tuple[int, int]:
+        """(slot index, record offset) of key, or (first empty slot index, 0)"""
+        view = self._map
+        size = len(view)
+        index = h & self._mask
+        slot_unpack = self.SLOT.unpack_from
+        record_unpack = self.RECORD.unpack_from
+        base = self.HEADER_SIZE
+        for _ in range(self._slots):
+            slot_hash, offset = slot_unpack(view, base + index * 16)
+            if offset == 0:
+                return index, 0
+            if slot_hash == h:
+                if offset + 8 > size:
+                    self._remap()
+                    view, size = self._map, len(self._map)
+                key_length, _ = record_unpack(view, offset)
+                start = offset + 8
+                if start + key_length <= size and view[start:start + key_length] == key:
+                    return index, offset
+            index = (index + 1) & self._mask
+        return -1, 0
+
+    def _value(self, offset: int) -> bytes:
+        key_length, value_length = self.RECORD.unpack_from(self._map, offset)
+        start = offset + 8 + key_length
+        if start + value_length > len(self._map):
+            self._remap()
+        return self._map[start:start + value_length]
+
+    def get_many(self, keys: Sequence[bytes]) -> List[Optional[bytes]]:
+        with self._lock:
+            if self._header()[6]:
+                self._open()
+            out: List[Optional[bytes]] = []
+            for key in keys:
+                _, offset = self._find(key, self._hash(key))
+                out.append(self._value(offset) if offset else None)
+            return out
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._header()[4]
+
+    # Writes
+
+    def set_many(self, items: Sequence[Tuple[bytes, bytes]]):
+        if not items:
+            return
+        with self._write_lock(), self._lock:
+            if self._header()[6]:
+                self._open()
+            _, slots, data_start, data_end, live, superseded, _ = self._header()
+            needed = slots
+            while live + len(items) > self.MAX_LOAD * needed:
+                needed *= 2
+            if needed != slots:
+                self._rebuild(needed)
+                _, slots, data_start, data_end, live, superseded, _ = self._header()
+
+            appended = sum(self.RECORD.size + len(k) + len(v) for k, v in items)
+            self._reserve(data_end + appended)
+            # Records first, then the slots pointing at them
+            records = bytearray()
+            offsets = []
+            for key, value in items:
+                offsets.append(data_end + len(records))
+                records += self.RECORD.pack(len(key), len(value)) + key + value
+            os.pwrite(self._fd, records, data_end)
+            for (key, value), offset in zip(items, offsets):
+                h = self._hash(key)
+                index, previous = self._find(key, h)
+                if previous:
+                    key_length, value_length = self.RECORD.unpack_from(self._map, previous)
+                    superseded += self.RECORD.size + key_length + value_length
+                    os.pwrite(self._fd, struct.pack("<Q", offset), self.HEADER_SIZE + index * 16 + 8)
+                else:
+                    os.pwrite(self._fd, self.SLOT.pack(h, offset), self.HEADER_SIZE + index * 16)
+                    live += 1
+            data_end += appended
+            self._write_header(slots, data_start, data_end, live, superseded)
+            if superseded > (1 << 24) and superseded > (data_end - data_start) // 2:
+                self._rebuild(slots)
+
+    def _write_header(self, slots: int, data_start: int, data_end: int, live: int, superseded: int, retired: int = 0):
+        os.pwrite(self._fd, self.HEADER.pack(self.MAGIC, slots, data_start, data_end, live, superseded, retired), 0)
+
+    def _reserve(self, end: int):
+        size = os.fstat(self._fd).st_size
+        if end > size:
+            os.ftruncate(self._fd, max(end, size * 2))
+        if end > len(self._map):
+            self._remap()
+
+    def _rebuild(self, slots: int):
+        """Copy live records into a new file with the given slot count and swap it in"""
+        _, old_slots, _, data_end, live, _, _ = self._header()
+        entries = []
+        for index in range(old_slots):
+            _, offset = self.SLOT.unpack_from(self._map, self.HEADER_SIZE + index * 16)
+            if offset:
+                key_length, value_length = self.RECORD.unpack_from(self._map, offset)
+                start = offset + 8
+                entries.append((self._map[start:start + key_length],
+                                self._map[start + key_length:start + key_length + value_length]))
+        tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.rebuild")
+        self._create(tmp, slots, size_hint=sum(8 + len(k) + len(v) for k, v in entries) * 2)
+        rebuilt = MmapKVStore.__new__(MmapKVStore)
+        rebuilt.path = tmp
+        rebuilt._fd, rebuilt._map = None, None
+        rebuilt._open()
+        data_start = rebuilt._data_start
+        records = bytearray()
+        mask = slots - 1
+        table = bytearray(slots * 16)
+        for key, value in entries:
+            h = self._hash(key)
+            index = h & mask
+            while struct.unpack_from("<Q", table, index * 16 + 8)[0]:
+                index = (index + 1) & mask
+            self.SLOT.pack_into(table, index * 16, h, data_start + len(records))
+            records += self.RECORD.pack(len(key), len(value)) + key + value
+        rebuilt._reserve(data_start + len(records))
+        os.pwrite(rebuilt._fd, bytes(table), self.HEADER_SIZE)
+        os.pwrite(rebuilt._fd, bytes(records), data_start)
+        rebuilt._write_header(slots, data_start, data_start + len(records), len(entries), 0)
+        rebuilt._map.close()
+        os.close(rebuilt._fd)
+        os.replace(tmp, self.path)
+        # Readers of the old file notice the flag and reopen the path
+        self._write_header(old_slots, self._data_start, data_end, live, 0, retired=1)
+        self._open()
+        logger.info(f"Rebuilt {self.path.name}: {len(entries):,} entries, {slots:,} slots")
+
+    def close(self):
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                os.close(self._fd)
+                self._map = None
+
+
+class _FileLock:
+    """Exclusive flock on a sidecar file, serializing writers across processes"""
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    def __enter__(self):
+        self._handle = open(self.path, "a")
+        fcntl.flock(self._handle, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        fcntl.flock(self._handle, fcntl.LOCK_UN)
+        self._handle.close()
+
+
+class MmapOnlineBackend(OnlineBackend):
+    """Records in an MmapKVStore file, for single-node deployments without a server"""
+
+    name = "mmap"
+
+    def __init__(self, path: str = str(PROJECT_ROOT / "feature_store" / "data" / "online_store.kv"),
+                 initial_slots: int = 1 << 17):
+        self.store = MmapKVStore(path, initial_slots)
+
+    def get_many(self, keys: Sequence[bytes]) -> List[Optional[bytes]]:
+        return self.store.get_many(keys)
+
+    def set_many(self, items: Sequence[Tuple[bytes, bytes]]):
+        self.store.set_many(items)
+
+    def ping(self) -> bool:
+        return self.store.path.exists()
+
+    def close(self):
+        self.store.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, "path": str(self.store.path), "entries": len(self.store)}
+
+
+def create_online_backend(config: Dict[str, Any]) -> Optional[OnlineBackend]:
+    """
+    Build a backend from configs/online_store.yaml
+
+    Args:
+        config: Configuration with a 'backend' of feast, redis or mmap and a section
+            per backend (relative mmap paths are resolved against the project root)
+
+    Returns:
+        Configured backend, or None for Feast's own online store
+    """
+    backend = config.get("backend", "feast")
+    if backend == "feast":
+        return None
+    if backend == "redis":
+        redis_config = config.get("redis") or {}
+        return RedisOnlineBackend(
+            url=redis_config.get("url", "redis://localhost:6379/0"),
+            pool_size=redis_config.get("pool_size", 16),
+            socket_timeout=redis_config.get("socket_timeout_seconds", 1.0),
+            chunk_size=redis_config.get("chunk_size", 1000),
+        )
+    if backend == "mmap":
+        mmap_config = config.get("mmap") or {}
+        path = Path(mmap_config.get("path", "feature_store/data/online_store.kv"))
+        return MmapOnlineBackend(
+            path=str(path if path.is_absolute() else PROJECT_ROOT / path),
+            initial_slots=mmap_config.get("initial_slots", 1 << 17),
+        )
+    raise ValueError(f"Unknown online store backend: {backend}")
+
@@ -0,0 +1,221 @@
+"""
+Local stand-in for a Redis server
+A small in-memory server speaking the Redis protocol (RESP2), enough for
+RedisOnlineBackend, tests and benchmarks on machines without Redis
+
+Supports PING, ECHO, GET, MGET, SET, MSET, DEL, EXISTS, DBSIZE, FLUSHDB/FLUSHALL,
+SELECT, INFO and CLIENT (accepted and ignored). Data lives in one dictionary shared by
+all connections and is lost when the server stops; it is not a production store.
+
+Usage:
+    server = LocalRespServer()  # port 0 picks a free port
+    server.start()
+    backend = RedisOnlineBackend(server.url)
+    ...
+    server.stop()
+
+    python -m src.features.resp_server --port 6379
+"""
+from typing import Dict, List, Optional
+import argparse
+import logging
+import socketserver
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """Reads RESP arrays of bulk strings and answers each command in order"""
+
+    # Pipelined replies are written back to back; don't hold them for ACKs
+    disable_nagle_algorithm = True
+
+    def handle(self):
+        while True:
+            try:
+                command = self._read_command()
+            except (ConnectionError, ValueError):
+                return
+            if command is None:
+                return
+            reply = self.server.store.execute(command)
+            self.wfile.write(reply)
+            if command and command[0].upper() == b"QUIT":
+                return
+
+    def _read_command(self) -> Optional[List[bytes]]:
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            # Inline command (e.g. typed into telnet)
+            return line.split()
+        args = []
+        for _ in range(int(line[1:])):
+            header = self.rfile.readline()
+            if not header.startswith(b"$"):
+                raise ValueError("Expected a bulk string")
+            length = int(header[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+
+def _bulk(value: Optional[bytes]) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+def _integer(value: int) -> bytes:
+    return b":%d\r\n" % value
+
+
+OK = b"+OK\r\n"
+
+
+class _Store:
+    """Command dispatch over a locked dictionary"""
+
+    def __init__(self):
+        self.data: Dict[bytes, bytes] = {}
+        self.lock = threading.Lock()
+
+    def execute(self, command: List[bytes]) -> bytes:
+        if not command:
+            return b"-ERR empty command\r\n"
+        name, args = command[0].upper().decode(), command[1:]
+        handler = getattr(self, f"_cmd_{name.lower()}", None)
+        if handler is None:
+            return f"-ERR unknown command '{name}'\r\n".encode()
+        try:
+            return handler(args)
+        except (IndexError, ValueError):
+            return f"-ERR wrong number of arguments for '{name.lower()}' command\r\n".encode()
+
+    def _cmd_ping(self, args):
+        return _bulk(args[0]) if args else b"+PONG\r\n"
+
+    def _cmd_echo(self, args):
+        return _bulk(args[0])
+
+    def _cmd_get(self, args):
+        return _bulk(self.data.get(args[0]))
+
+    def _cmd_mget(self, args):
+        if not args:
+            raise ValueError
+        data = self.data
+        return b"*%d\r\n" % len(args) + b"".join(_bulk(data.get(key)) for key in args)
+
+    def _cmd_set(self, args):
+        # Expiry and condition options are accepted and ignored
+        with self.lock:
+            self.data[args[0]] = args[1]
+        return OK
+
+    def _cmd_mset(self, args):
+        if not args or len(args) % 2:
+            raise ValueError
+        with self.lock:
+            self.data.update(zip(args[0::2], args[1::2]))
+        return OK
+
+    def _cmd_del(self, args):
+        with self.lock:
+            return _integer(sum(self.data.pop(key, None) is not None for key in args))
+
+    def _cmd_exists(self, args):
+        return _integer(sum(key in self.data for key in args))
+
+    def _cmd_dbsize(self, args):
+        return _integer(len(self.data))
+
+    def _cmd_flushdb(self, args):
+        with self.lock:
+            self.data.clear()
+        return OK
+
+    _cmd_flushall = _cmd_flushdb
+
+    def _cmd_select(self, args):
+        return OK
+
+    def _cmd_client(self, args):
+        return OK
+
+    def _cmd_quit(self, args):
+        return OK
+
+    def _cmd_info(self, args):
+        return _bulk(f"# Server\r\nredis_version:7.0.0\r\nredis_mode:standalone\r\n"
+                     f"# Keyspace\r\ndb0:keys={len(self.data)}\r\n".encode())
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class LocalRespServer:
+    """In-process server on a background thread"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        """
+        Initialize the server
+
+        Args:
+            host: Interface to listen on
+            port: TCP port (0 picks a free one; see .port after start())
+        """
+        self.host = host
+        self.port = port
+        self._server: Optional[_Server] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"redis://{self.host}:{self.port}/0"
+
+    def start(self) -> 'LocalRespServer':
+        self._server = _Server((self.host, self.port), _Handler)
+        self._server.store = _Store()
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="resp-server", daemon=True)
+        self._thread.start()
+        logger.info(f"Local RESP server listening on {self.host}:{self.port}")
+        return self
+
+    def join(self):
+        """Block until the server is stopped"""
+        if self._thread is not None:
+            self._thread.join()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> 'LocalRespServer':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in Redis server (in-memory)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6379)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    server = LocalRespServer(args.host, args.port).start()
+    try:
+        server.join()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
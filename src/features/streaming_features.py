@@ -0,0 +1,415 @@
+"""
+Streaming velocity features
+Per-entity sliding-window aggregates over transaction amounts with amortized O(1) updates
+
+Definitions (shared with the batch builder so training and serving agree):
+- For an event at time t, window aggregates cover the entity's events with timestamps
+  in (t - window, t], including the event itself
+- amt_zscore_7d is (amt - mean) / std over the entity's *earlier* events in
+  (t - 7d, t] (population std); 0.0 with fewer than two earlier events or zero spread
+- secs_since_last is t minus the entity's previous event time, capped at
+  SECS_SINCE_LAST_CAP (also used when there is no previous event)
+
+A row is the entity's state right after an event and is stamped ROW_VISIBLE_DELAY_S
+after it on both paths. Point-in-time joins are inclusive, so the training row of a
+transaction is the state after the entity's previous event (never one that includes the
+transaction), and the latest row in the online store is exactly what the same join
+returns for the entity's next transaction.
+"""
+from collections import OrderedDict, deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import math
+import threading
+import time
+
+import pandas as pd
+
+# Sliding windows, in seconds
+VELOCITY_WINDOWS = {"1h": 3600, "24h": 86400}
+
+# History window the amount z-score compares against
+ZSCORE_WINDOW = ("7d", 7 * 86400)
+
+# Spreads below this count as zero when computing z-scores
+ZSCORE_MIN_STD = 1e-9
+
+# Rows become visible this long after their event, so a point-in-time join at an event's
+# own time returns the state before it
+ROW_VISIBLE_DELAY_S = 0.001
+
+# secs_since_last saturates here; entities idle this long carry no information and can be evicted
+SECS_SINCE_LAST_CAP = 7 * 86400
+
+# Entity key column and feature name prefix per entity
+VELOCITY_ENTITIES = {
+    "customer": {"key": "cc_num", "prefix": "cust"},
+    "merchant": {"key": "merchant", "prefix": "merch"},
+}
+
+
+def velocity_feature_names(prefix: str, windows: Optional[Dict[str, float]] = None) -> List[str]:
+    """
+    Feature names produced for one entity type, in a fixed order
+
+    Args:
+        prefix: Feature name prefix (e.g. 'cust')
+        windows: Window name -> seconds. Defaults to VELOCITY_WINDOWS
+
+    Returns:
+        Ordered feature names
+    """
+    names = []
+    for window in (windows or VELOCITY_WINDOWS):
+        names += [
+            f"{prefix}_txn_count_{window}",
+            f"{prefix}_amt_sum_{window}",
+            f"{prefix}_amt_mean_{window}",
+            f"{prefix}_amt_max_{window}",
+        ]
+    names.append(f"{prefix}_amt_zscore_{ZSCORE_WINDOW[0]}")
+    names.append(f"{prefix}_secs_since_last")
+    return names
+
+
+def event_time(event: Dict[str, Any]) -> Optional[float]:
+    """Epoch seconds of a transaction event from 'unix_time' or 'timestamp'/'trans_date_trans_time'"""
+    if event.get("unix_time") is not None:
+        return float(event["unix_time"])
+    for field in ("timestamp", "trans_date_trans_time"):
+        value = event.get(field)
+        if value is None:
+            continue
+        if isinstance(value, (int, float)):
+            return float(value)
+        return pd.Timestamp(value).timestamp()
+    return None
+
+
+def amount_zscore(amount: float, count: int, total: float, total_sq: float) -> float:
+    """
+    Z-score of amount against earlier events given their count, sum and sum of squares
+
+    Args:
+        amount: Current transaction amount
+        count: Number of earlier events in the history window
+        total: Sum of their amounts
+        total_sq: Sum of their squared amounts
+
+    Returns:
+        (amount - mean) / std, or 0.0 when count < 2 or the spread is ~zero
+    """
+    if count < 2:
+        return 0.0
+    mean = total / count
+    variance = total_sq / count - mean * mean
+    if variance <= ZSCORE_MIN_STD * ZSCORE_MIN_STD:
+        return 0.0
+    return (amount - mean) / math.sqrt(variance)
+
+
+class _EntityState:
+    """Ring buffer of (timestamp, amount) plus per-window running aggregates for one entity
+
+    Events get increasing sequence numbers and live at ring[seq & mask]. Each window keeps
+    the sequence number of its oldest event, running sums of amounts and squared amounts,
+    and a monotonic deque of sequence numbers for the running max. The ring only retains
+    the longest window.
+    """
+
+    __slots__ = ("times", "amounts", "mask", "next_seq", "starts", "sums", "squares", "maxes", "last_time",
+                 "latest")
+
+    def __init__(self, n_windows: int, capacity: int = 8):
+        self.times = [0.0] * capacity
+        self.amounts = [0.0] * capacity
+        self.mask = capacity - 1
+        self.next_seq = 0
+        self.starts = [0] * n_windows
+        self.sums = [0.0] * n_windows
+        self.squares = [0.0] * n_windows
+        self.maxes = [deque() for _ in range(n_windows)]
+        self.last_time: Optional[float] = None
+        self.latest: Optional[List[float]] = None  # Feature values after the last event
+
+    def _grow(self, oldest: int):
+        """Double the ring, keeping live entries at their sequence positions"""
+        capacity = (self.mask + 1) * 2
+        times, amounts = [0.0] * capacity, [0.0] * capacity
+        for seq in range(oldest, self.next_seq):
+            times[seq & (capacity - 1)] = self.times[seq & self.mask]
+            amounts[seq & (capacity - 1)] = self.amounts[seq & self.mask]
+        self.times, self.amounts, self.mask = times, amounts, capacity - 1
+
+    def add(self, timestamp: float, amount: float, windows: List[float]) -> List[Tuple[int, float, float, float]]:
+        """
+        Append an event and slide every window forward
+
+        Returns:
+            Per window: (count, sum, sum of squares, max) including the new event
+        """
+        oldest = min(self.starts) if self.starts else self.next_seq
+        if self.next_seq - oldest > self.mask:
+            self._grow(oldest)
+        seq = self.next_seq
+        self.times[seq & self.mask] = timestamp
+        self.amounts[seq & self.mask] = amount
+        self.next_seq += 1
+
+        results = []
+        for i, window in enumerate(windows):
+            start = self.starts[i]
+            total = self.sums[i] + amount
+            squares = self.squares[i] + amount * amount
+            # Evict events at or before t - window
+            cutoff = timestamp - window
+            while start < seq and self.times[start & self.mask] <= cutoff:
+                evicted = self.amounts[start & self.mask]
+                total -= evicted
+                squares -= evicted * evicted
+                start += 1
+            if start == seq:
+                # Window holds only the new event: reset accumulated rounding
+                total, squares = amount, amount * amount
+            maxes = self.maxes[i]
+            while maxes and maxes[0] < start:
+                maxes.popleft()
+            while maxes and self.amounts[maxes[-1] & self.mask] <= amount:
+                maxes.pop()
+            maxes.append(seq)
+            self.starts[i], self.sums[i], self.squares[i] = start, total, squares
+            results.append((seq + 1 - start, total, squares, self.amounts[maxes[0] & self.mask]))
+        self.last_time = timestamp
+        return results
+
+
+class VelocityFeatureEngine:
+    """Sliding-window velocity aggregates for one entity type (e.g. per cc_num)"""
+
+    def __init__(
+        self,
+        prefix: str = "cust",
+        windows: Optional[Dict[str, float]] = None,
+        max_entities: int = 1_000_000,
+        idle_seconds: float = SECS_SINCE_LAST_CAP
+    ):
+        """
+        Initialize the engine
+
+        Args:
+            prefix: Feature name prefix
+            windows: Window name -> length in seconds. Defaults to VELOCITY_WINDOWS
+            max_entities: Hard cap on tracked entities; least recently seen are evicted first
+            idle_seconds: Entities without events for this long are evicted. Lossless as
+                long as it is at least the longest window, ZSCORE_WINDOW and SECS_SINCE_LAST_CAP
+        """
+        self.prefix = prefix
+        self.windows = dict(windows or VELOCITY_WINDOWS)
+        # The z-score history window is tracked as one more window after the reported ones
+        self._window_lengths = list(self.windows.values()) + [ZSCORE_WINDOW[1]]
+        self.max_entities = max_entities
+        self.idle_seconds = idle_seconds
+        self.feature_names = velocity_feature_names(prefix, self.windows)
+        self._states: "OrderedDict[Any, _EntityState]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._watermark = float("-inf")
+        self.evicted = 0
+        self.late_events = 0
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def update(self, entity: Any, timestamp: float, amount: float) -> Dict[str, Any]:
+        """
+        Record an event and return the entity's features as of that event
+
+        Events older than the entity's latest event are aggregated at the latest time.
+
+        Args:
+            entity: Entity key (e.g. a cc_num)
+            timestamp: Event time in epoch seconds
+            amount: Transaction amount
+
+        Returns:
+            Feature name -> value
+        """
+        with self._lock:
+            state = self._states.get(entity)
+            if state is None:
+                state = _EntityState(len(self._window_lengths))
+                self._states[entity] = state
+            else:
+                self._states.move_to_end(entity)
+            if state.last_time is not None and timestamp < state.last_time:
+                self.late_events += 1
+                timestamp = state.last_time
+            previous = state.last_time
+            aggregates = state.add(timestamp, amount, self._window_lengths)
+            values = []
+            for count, total, _, maximum in aggregates[:-1]:
+                values += [count, total, total / count, maximum]
+            count, total, squares, _ = aggregates[-1]
+            values.append(amount_zscore(amount, count - 1, total - amount, squares - amount * amount))
+            gap = SECS_SINCE_LAST_CAP if previous is None else min(timestamp - previous, SECS_SINCE_LAST_CAP)
+            values.append(float(gap))
+            state.latest = values
+            if timestamp > self._watermark:
+                self._watermark = timestamp
+            self._evict()
+        return dict(zip(self.feature_names, values))
+
+    def latest(self, entity: Any) -> Optional[Dict[str, Any]]:
+        """
+        Features after the entity's most recent event: the row an online lookup for its
+        next transaction returns
+
+        Args:
+            entity: Entity key (e.g. a cc_num)
+
+        Returns:
+            Feature name -> value, or None for an unknown (or evicted) entity
+        """
+        with self._lock:
+            state = self._states.get(entity)
+            if state is None or state.latest is None:
+                return None
+            return dict(zip(self.feature_names, state.latest))
+
+    def _evict(self):
+        """Drop least recently seen entities over the cap or idle past idle_seconds (lock held)"""
+        while len(self._states) > self.max_entities:
+            self._states.popitem(last=False)
+            self.evicted += 1
+        horizon = self._watermark - self.idle_seconds
+        while self._states:
+            entity, state = next(iter(self._states.items()))
+            if state.last_time is None or state.last_time > horizon:
+                break
+            self._states.popitem(last=False)
+            self.evicted += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Tracked entity count and eviction counters"""
+        return {
+            "entities": len(self._states),
+            "evicted": self.evicted,
+            "late_events": self.late_events,
+            "watermark": self._watermark,
+        }
+
+
+class VelocityFeatureUpdater:
+    """Feeds transaction events through per-customer and per-merchant engines and
+    pushes the latest values to the Feast online store"""
+
+    def __init__(
+        self,
+        feature_store=None,
+        max_entities: int = 1_000_000,
+        flush_interval_s: float = 1.0
+    ):
+        """
+        Initialize the updater
+
+        Args:
+            feature_store: FraudFeatureStore to push into. None only computes features
+            max_entities: Entity cap per engine
+            flush_interval_s: Minimum seconds between pushes to the online store
+        """
+        self.feature_store = feature_store
+        self.flush_interval_s = flush_interval_s
+        self.engines = {
+            entity: VelocityFeatureEngine(spec["prefix"], max_entities=max_entities)
+            for entity, spec in VELOCITY_ENTITIES.items()
+        }
+        self._pending: Dict[str, Dict[Any, Dict[str, Any]]] = {entity: {} for entity in VELOCITY_ENTITIES}
+        self._last_flush = time.monotonic()
+        self.pushed_rows = 0
+
+    def observe(self, event: Dict[str, Any], default_time: Optional[float] = None) -> Dict[str, float]:
+        """
+        Update every engine with one transaction event
+
+        Args:
+            event: Transaction with cc_num, merchant, amt and a timestamp field
+            default_time: Epoch seconds used when the event carries no timestamp
+
+        Returns:
+            Combined customer and merchant features for the event
+        """
+        timestamp = event_time(event)
+        if timestamp is None:
+            timestamp = default_time if default_time is not None else time.time()
+        amount = float(event["amt"])
+        features: Dict[str, float] = {}
+        for entity, spec in VELOCITY_ENTITIES.items():
+            key = event.get(spec["key"])
+            if key is None:
+                continue
+            values = self.engines[entity].update(str(key), timestamp, amount)
+            features.update(values)
+            self._pending[entity][str(key)] = {
+                spec["key"]: str(key),
+                "timestamp": timestamp + ROW_VISIBLE_DELAY_S,
+                **values,
+            }
+        return features
+
+    def latest(self, event: Dict[str, Any]) -> Dict[str, float]:
+        """
+        Velocity features a transaction sees before it is observed: the latest rows of its
+        customer and merchant, as an online lookup returns them
+
+        Args:
+            event: Transaction with cc_num and merchant
+
+        Returns:
+            Combined customer and merchant features; NaN for entities without events
+        """
+        features: Dict[str, float] = {}
+        for entity, spec in VELOCITY_ENTITIES.items():
+            engine = self.engines[entity]
+            key = event.get(spec["key"])
+            values = engine.latest(str(key)) if key is not None else None
+            features.update(values or dict.fromkeys(engine.feature_names, math.nan))
+        return features
+
+    def observe_many(self, events: Iterable[Dict[str, Any]]) -> List[Dict[str, float]]:
+        """Update engines with several events in order"""
+        return [self.observe(event) for event in events]
+
+    def maybe_flush(self):
+        """Push pending rows if the flush interval has elapsed"""
+        if time.monotonic() - self._last_flush >= self.flush_interval_s:
+            self.flush()
+
+    def flush(self) -> int:
+        """
+        Push the latest features per entity to the online store
+
+        Each row is the entity's state after its latest event, stamped
+        ROW_VISIBLE_DELAY_S after the event.
+
+        Returns:
+            Number of rows pushed
+        """
+        self._last_flush = time.monotonic()
+        pushed = 0
+        for entity, rows in self._pending.items():
+            if not rows:
+                continue
+            self._pending[entity] = {}
+            if self.feature_store is None:
+                continue
+            df = pd.DataFrame(list(rows.values()))
+            df["timestamp"] = pd.to_datetime(df["timestamp"], unit="s", utc=True)
+            self.feature_store.push_features(f"{entity}_velocity_push", df)
+            pushed += len(df)
+        self.pushed_rows += pushed
+        return pushed
+
+    def stats(self) -> Dict[str, Any]:
+        """Engine stats and push counters"""
+        return {
+            "pushed_rows": self.pushed_rows,
+            **{entity: engine.stats() for entity, engine in self.engines.items()},
+        }
@@ -0,0 +1,171 @@
+"""
+Local model artifact cache
+Versioned on-disk copies of registry models in a fast-loading, memory-mappable format
+"""
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import time
+
+logger = logging.getLogger(__name__)
+
+MODEL_FILE = "model.joblib"
+META_FILE = "meta.json"
+
+
+def _dir_name(version: str) -> str:
+    """Filesystem-safe directory name for a version id (e.g. 'run/ab12' -> 'run-ab12')"""
+    return re.sub(r"[^A-Za-z0-9._-]", "-", version)
+
+
+class ModelArtifactCache:
+    """Model versions stored as uncompressed joblib files under <cache_dir>/<namespace>/<version>/
+
+    Uncompressed joblib keeps every NumPy array (coefficients, tree node tables) as a raw
+    buffer that load(mmap=True) maps read-only instead of copying. Entries are written to
+    a temporary directory and renamed into place, so readers never see partial entries.
+    """
+
+    def __init__(self, cache_dir: str = ".model_cache", max_versions: int = 3):
+        """
+        Initialize the cache
+
+        Args:
+            cache_dir: Root directory
+            max_versions: Versions kept per namespace by prune()
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_versions = max_versions
+
+    def path(self, namespace: str, version: str) -> Path:
+        """Directory of one cached version"""
+        return self.cache_dir / namespace / _dir_name(version)
+
+    def has(self, namespace: str, version: str) -> bool:
+        """True if a complete entry exists"""
+        return (self.path(namespace, version) / META_FILE).exists()
+
+    def _entries(self, namespace: str) -> List[Dict[str, Any]]:
+        root = self.cache_dir / namespace
+        if not root.is_dir():
+            return []
+        entries = []
+        for meta_path in root.glob(f"*/{META_FILE}"):
+            try:
+                entries.append(json.loads(meta_path.read_text()))
+            except (OSError, ValueError):
+                continue
+        return entries
+
+    def versions(self, namespace: str) -> List[str]:
+        """
+        Cached versions, oldest first
+
+        Numeric (registry) versions sort numerically after any non-numeric ones,
+        which sort by the time they were cached.
+        """
+        def order(meta: Dict[str, Any]):
+            version = meta["version"]
+            return (1, int(version), 0.0) if version.isdigit() else (0, 0, meta.get("cached_at", 0.0))
+
+        return [meta["version"] for meta in sorted(self._entries(namespace), key=order)]
+
+    def load(self, namespace: str, version: str, mmap: bool = True) -> Tuple[Any, Dict[str, Any]]:
+        """
+        Load a cached model
+
+        Args:
+            namespace: Cache namespace (one per model source)
+            version: Version id
+            mmap: Memory-map array data read-only instead of reading it into memory
+
+        Returns:
+            (model, metadata)
+        """
+        import joblib
+
+        entry = self.path(namespace, version)
+        meta = json.loads((entry / META_FILE).read_text())
+        model = joblib.load(entry / MODEL_FILE, mmap_mode="r" if mmap else None)
+        return model, meta
+
+    def meta(self, namespace: str, version: str) -> Optional[Dict[str, Any]]:
+        """Metadata of a cached version without loading the model, or None on a miss"""
+        try:
+            return json.loads((self.path(namespace, version) / META_FILE).read_text())
+        except (OSError, ValueError):
+            return None
+
+    def update_meta(self, namespace: str, version: str, **fields) -> bool:
+        """
+        Merge fields into a cached version's metadata (atomic rename)
+
+        Returns:
+            False if the version is not cached
+        """
+        meta = self.meta(namespace, version)
+        if meta is None:
+            return False
+        meta_path = self.path(namespace, version) / META_FILE
+        tmp = meta_path.with_name(f".{META_FILE}.{os.getpid()}")
+        tmp.write_text(json.dumps({**meta, **fields}, indent=2))
+        os.replace(tmp, meta_path)
+        return True
+
+    def store(self, namespace: str, version: str, model: Any, meta: Optional[Dict[str, Any]] = None) -> Path:
+        """
+        Write a model version to the cache atomically
+
+        Args:
+            namespace: Cache namespace
+            version: Version id
+            model: Fitted estimator
+            meta: Extra metadata (source URI, threshold, ...)
+
+        Returns:
+            Entry directory
+        """
+        import joblib
+
+        target = self.path(namespace, version)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = Path(tempfile.mkdtemp(prefix=f".{target.name}.", dir=target.parent))
+        try:
+            joblib.dump(model, tmp / MODEL_FILE)
+            meta = {**(meta or {}), "version": version, "cached_at": time.time(),
+                    "model_class": type(model).__name__}
+            (tmp / META_FILE).write_text(json.dumps(meta, indent=2))
+            if target.exists():
+                shutil.rmtree(target)
+            os.replace(tmp, target)
+        except Exception:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        return target
+
+    def remove(self, namespace: str, version: str):
+        """Delete one cached version"""
+        shutil.rmtree(self.path(namespace, version), ignore_errors=True)
+
+    def prune(self, namespace: str, keep: Optional[List[str]] = None) -> List[str]:
+        """
+        Delete all but the newest max_versions versions (and any in keep)
+
+        Args:
+            namespace: Cache namespace
+            keep: Versions to keep regardless of age (e.g. the one being served)
+
+        Returns:
+            Deleted versions
+        """
+        versions = self.versions(namespace)
+        retained = set(versions[-self.max_versions:]) | set(keep or [])
+        removed = [version for version in versions if version not in retained]
+        for version in removed:
+            self.remove(namespace, version)
+        return removed
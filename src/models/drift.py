@@ -0,0 +1,362 @@
+"""
+Drift monitoring
+Constant-memory input and score sketches compared against a training-time reference
+
+At training time build_reference_profile() bins every model feature and the fraud
+probability at reference quantiles and stores the cut points and bin proportions as
+drift_profile.json in the model's MLflow run. While serving, DriftMonitor counts live
+rows into the same bins and reports PSI and (binned) KS statistics per feature and for
+the score.
+
+Counting is lock-free: every thread owns its count arrays and only ever writes those;
+readers sum across threads. Counts live in a ring of time windows, so statistics cover
+the last windows * window_seconds and memory stays threads x windows x features x bins.
+"""
+from bisect import bisect_right
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import logging
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from src.models.inference import FEATURE_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+PROFILE_FORMAT = 1
+PROFILE_ARTIFACT = "drift_profile.json"
+SCORE_NAME = "fraud_probability"
+
+# Rule-of-thumb PSI bands: below 0.1 stable, 0.1-0.25 moderate shift, above significant
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+
+# Floor for empty-bin proportions so PSI stays finite
+EPSILON = 1e-4
+
+
+def _cut_points(values: np.ndarray, bins: int) -> List[float]:
+    """
+    Interior bin boundaries: one bin per value for discrete columns with at most
+    `bins` distinct values, reference quantiles otherwise
+    """
+    values = values[np.isfinite(values)]
+    if len(values) == 0:
+        return []
+    unique = np.unique(values)
+    if len(unique) <= bins:
+        return ((unique[:-1] + unique[1:]) / 2).tolist()
+    quantiles = np.quantile(values, np.arange(1, bins) / bins)
+    return np.unique(quantiles).tolist()
+
+
+def _proportions(values: np.ndarray, cuts: List[float]) -> List[float]:
+    counts = np.bincount(np.searchsorted(cuts, values, side="right"), minlength=len(cuts) + 1)
+    return (counts / max(counts.sum(), 1)).tolist()
+
+
+def build_reference_profile(
+    features: np.ndarray,
+    scores: np.ndarray,
+    columns: Optional[List[str]] = None,
+    bins: int = 20,
+    max_rows: int = 200_000,
+    seed: int = 42
+) -> Dict[str, Any]:
+    """
+    Bin the training distribution of every feature and of the model's scores
+
+    Args:
+        features: (n, k) feature matrix in columns order
+        scores: n fraud probabilities from the model being profiled
+        columns: Feature names. Defaults to FEATURE_COLUMNS
+        bins: Bins per feature (fewer for discrete features with fewer values)
+        max_rows: Rows sampled to compute the profile
+        seed: Sampling seed
+
+    Returns:
+        JSON-serializable profile
+    """
+    columns = list(columns or FEATURE_COLUMNS)
+    if len(features) > max_rows:
+        rows = np.sort(np.random.default_rng(seed).choice(len(features), max_rows, replace=False))
+        features, scores = features[rows], scores[rows]
+    profile = {
+        "format": PROFILE_FORMAT,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "rows": int(len(features)),
+        "features": {},
+    }
+    for i, name in enumerate(columns):
+        values = np.asarray(features[:, i], dtype=np.float64)
+        cuts = _cut_points(values, bins)
+        profile["features"][name] = {"cuts": cuts, "proportions": _proportions(values, cuts)}
+    scores = np.asarray(scores, dtype=np.float64)
+    cuts = _cut_points(scores, bins)
+    profile["score"] = {"cuts": cuts, "proportions": _proportions(scores, cuts)}
+    return profile
+
+
+def load_reference_profile(model_uri: str) -> Optional[Dict[str, Any]]:
+    """
+    Find the reference profile stored with a model
+
+    Args:
+        model_uri: 'models:/...', 'runs:/...' or a local model file; local files use a
+            '<stem>.drift_profile.json' or 'drift_profile.json' file next to them
+
+    Returns:
+        Profile, or None if the model has none
+    """
+    if model_uri.startswith(("models:/", "runs:/")):
+        import mlflow
+        from src.utils.mlflow_utils import get_model_run_id
+
+        run_id = get_model_run_id(model_uri)
+        if run_id is None:
+            return None
+        with tempfile.TemporaryDirectory() as tmp:
+            try:
+                path = mlflow.artifacts.download_artifacts(run_id=run_id, artifact_path=PROFILE_ARTIFACT, dst_path=tmp)
+            except Exception as e:
+                logger.info(f"No drift profile for {model_uri}: {e}")
+                return None
+            return _read_profile(path, model_uri)
+    else:
+        model_path = Path(model_uri)
+        candidates = [model_path.with_name(f"{model_path.stem}.{PROFILE_ARTIFACT}"),
+                      model_path.with_name(PROFILE_ARTIFACT)]
+        path = next((str(p) for p in candidates if p.exists()), None)
+        if path is None:
+            return None
+        return _read_profile(path, model_uri)
+
+
+def _read_profile(path: str, model_uri: str) -> Optional[Dict[str, Any]]:
+    with open(path) as f:
+        profile = json.load(f)
+    if profile.get("format") != PROFILE_FORMAT:
+        logger.warning(f"Ignoring drift profile for {model_uri} with format {profile.get('format')}")
+        return None
+    return profile
+
+
+def population_stability_index(expected: np.ndarray, actual: np.ndarray) -> float:
+    """PSI between two bin-proportion vectors"""
+    expected = np.maximum(expected, EPSILON)
+    actual = np.maximum(actual, EPSILON)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def binned_ks(expected: np.ndarray, actual: np.ndarray) -> float:
+    """Kolmogorov-Smirnov distance evaluated at the bin boundaries"""
+    return float(np.max(np.abs(np.cumsum(expected) - np.cumsum(actual)))) if len(expected) else 0.0
+
+
+class _Reference:
+    """Immutable binning of one profile; swapped as a whole so observers never mix two"""
+
+    def __init__(self, profile: Dict[str, Any], columns: List[str], model_version: Optional[str]):
+        missing = [name for name in columns if name not in profile["features"]]
+        if missing:
+            raise ValueError(f"Drift profile has no bins for {missing}")
+        sections = [profile["features"][name] for name in columns] + [profile["score"]]
+        self.profile = profile
+        self.model_version = model_version
+        self.cuts = [list(section["cuts"]) for section in sections]
+        self.cut_arrays = [np.asarray(cuts, dtype=np.float64) for cuts in self.cuts]
+        self.proportions = [np.asarray(section["proportions"], dtype=np.float64) for section in sections]
+        self.shape = (len(sections), max(len(cuts) for cuts in self.cuts) + 1)
+        self.started_at = time.time()
+
+
+class _ThreadCounts:
+    """One thread's counts: a ring of windows x (features + score) x bins
+
+    Batches are added into NumPy arrays; single rows into flat Python lists, where an
+    increment costs a fraction of a NumPy item update.
+    """
+
+    def __init__(self, reference: _Reference, windows: int):
+        self.reference = reference
+        self.epochs = [-1] * windows
+        self.counts = np.zeros((windows,) + reference.shape, dtype=np.int64)
+        self.singles = [[0] * (reference.shape[0] * reference.shape[1]) for _ in range(windows)]
+
+    def total(self, slot: int) -> np.ndarray:
+        return self.counts[slot] + np.asarray(self.singles[slot], dtype=np.int64).reshape(self.reference.shape)
+
+
+class DriftMonitor:
+    """Per-thread binned sketches of live features and scores, compared with a reference profile"""
+
+    def __init__(
+        self,
+        window_seconds: float = 300,
+        windows: int = 12,
+        min_rows: int = 500,
+        columns: Optional[List[str]] = None
+    ):
+        """
+        Initialize the monitor (inactive until a profile is set)
+
+        Args:
+            window_seconds: Length of one counting window
+            windows: Windows kept; statistics cover windows * window_seconds
+            min_rows: Rows needed before a drift status other than insufficient_data is reported
+            columns: Feature names in model input order. Defaults to FEATURE_COLUMNS
+        """
+        self.window_seconds = window_seconds
+        self.windows = windows
+        self.min_rows = min_rows
+        self.columns = list(columns or FEATURE_COLUMNS)
+        self._reference: Optional[_Reference] = None
+        self._local = threading.local()
+        self._threads: List[_ThreadCounts] = []
+        self._lock = threading.Lock()  # Guards _threads membership only
+
+    @property
+    def active(self) -> bool:
+        return self._reference is not None
+
+    @property
+    def model_version(self) -> Optional[str]:
+        reference = self._reference
+        return reference.model_version if reference is not None else None
+
+    def set_profile(self, profile: Optional[Dict[str, Any]], model_version: Optional[str] = None):
+        """
+        Compare against a new reference profile and start counting from zero
+
+        Args:
+            profile: Profile from build_reference_profile (None stops monitoring)
+            model_version: Label of the model the profile belongs to
+        """
+        reference = _Reference(profile, self.columns, model_version) if profile is not None else None
+        with self._lock:
+            # Threads notice the new reference on their next observe() and start fresh arrays
+            self._reference = reference
+            self._threads = []
+
+    def _thread_counts(self, reference: _Reference, epoch: int) -> Tuple[_ThreadCounts, int]:
+        """The calling thread's counts and the slot of the current window"""
+        state = getattr(self._local, "state", None)
+        if state is None or state.reference is not reference:
+            state = _ThreadCounts(reference, self.windows)
+            with self._lock:
+                if self._reference is not reference:
+                    return state, 0  # Lost a race with set_profile; count into a throwaway
+                self._threads.append(state)
+            self._local.state = state
+        slot = epoch % self.windows
+        if state.epochs[slot] != epoch:
+            state.epochs[slot] = -1  # Readers skip the slot while it is cleared
+            state.counts[slot] = 0
+            state.singles[slot] = [0] * len(state.singles[slot])
+            state.epochs[slot] = epoch
+        return state, slot
+
+    def observe(self, features: np.ndarray, scores: np.ndarray):
+        """
+        Count scored rows (called on the scoring path)
+
+        Args:
+            features: (n, k) model input matrix in columns order
+            scores: n fraud probabilities
+        """
+        reference = self._reference
+        if reference is None or len(scores) == 0:
+            return
+        state, slot = self._thread_counts(reference, int(time.time() // self.window_seconds))
+        bins = reference.shape[1]
+        if len(scores) == 1:
+            # Single rows (the /predict path): bisect over short lists beats NumPy call overhead
+            row = features[0].tolist()
+            cuts, singles = reference.cuts, state.singles[slot]
+            for j, value in enumerate(row):
+                singles[j * bins + bisect_right(cuts[j], value)] += 1
+            singles[len(row) * bins + bisect_right(cuts[-1], float(scores[0]))] += 1
+            return
+        counts = state.counts[slot]
+        for j in range(len(self.columns)):
+            counts[j] += np.bincount(np.searchsorted(reference.cut_arrays[j], features[:, j], side="right"),
+                                     minlength=bins)
+        counts[-1] += np.bincount(np.searchsorted(reference.cut_arrays[-1], scores, side="right"),
+                                  minlength=bins)
+
+    def counts(self) -> np.ndarray:
+        """Counts summed over threads and the windows still in range: (features + score) x bins"""
+        with self._lock:
+            reference, threads = self._reference, list(self._threads)
+        if reference is None:
+            return np.zeros((0, 0), dtype=np.int64)
+        total = np.zeros(reference.shape, dtype=np.int64)
+        oldest = int(time.time() // self.window_seconds) - self.windows + 1
+        for state in threads:
+            for slot, epoch in enumerate(list(state.epochs)):
+                if epoch >= oldest:
+                    total += state.total(slot)
+        return total
+
+    def _statistics(self, name: str, counts: np.ndarray, reference: np.ndarray) -> Dict[str, Any]:
+        rows = int(counts.sum())
+        actual = counts / rows if rows else np.zeros_like(reference)
+        psi = population_stability_index(reference, actual) if rows else None
+        if rows < self.min_rows:
+            status = "insufficient_data"
+        elif psi >= PSI_SIGNIFICANT:
+            status = "significant"
+        elif psi >= PSI_MODERATE:
+            status = "moderate"
+        else:
+            status = "stable"
+        return {
+            "name": name,
+            "rows": rows,
+            "psi": psi,
+            "ks": binned_ks(reference, actual) if rows else None,
+            "status": status,
+            "reference": reference.tolist(),
+            "live": actual.tolist(),
+        }
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Drift statistics over the retained windows
+
+        Returns:
+            Model version, window span, row count and PSI/KS/status per feature and for the score
+        """
+        reference = self._reference
+        if reference is None:
+            return {"active": False, "model_version": None}
+        counts = self.counts()
+        if counts.shape != reference.shape:
+            return self.report()  # The profile changed while counting; report the new one
+        names = self.columns + [SCORE_NAME]
+        stats = [self._statistics(name, counts[i, :len(reference.proportions[i])], reference.proportions[i])
+                 for i, name in enumerate(names)]
+        span = self.window_seconds * self.windows
+        return {
+            "active": True,
+            "model_version": reference.model_version,
+            "profile_created_at": reference.profile.get("created_at"),
+            "window_seconds": span,
+            "since": max(reference.started_at, time.time() - span),
+            "rows": stats[-1]["rows"],
+            "features": stats[:-1],
+            "score": stats[-1],
+        }
+
+    def psi(self) -> Dict[str, float]:
+        """PSI per monitored name (features and fraud_probability) once min_rows were seen, for metrics"""
+        report = self.report()
+        if not report["active"]:
+            return {}
+        return {s["name"]: s["psi"] for s in report["features"] + [report["score"]]
+                if s["status"] != "insufficient_data"}
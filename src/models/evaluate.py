@@ -0,0 +1,436 @@
+"""
+Model evaluation
+Single-pass, constant-memory evaluation over score histograms
+
+Scores are binned as they stream in: one histogram of fraud rows and one of
+legitimate rows over fixed probability bins. Every threshold metric follows from
+cumulative sums over the bins, so a single pass yields ROC-AUC, PR-AUC (average
+precision) and precision/recall/cost at every threshold, in O(bins) memory however
+many rows are evaluated. Histograms from different shards or workers merge by addition.
+
+Bin k holds scores in (k / bins, (k + 1) / bins], so "flag bins >= k" is exactly
+FraudScorer's "probability > k / bins" (scores of 0 or below share bin 0, so only the
+threshold 0 counts them as flagged). Metrics at thresholds on the bin grid are exact;
+the AUCs treat scores within a bin as ties (bins=100000 puts the error below 1e-5 for
+typical score distributions).
+"""
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import logging
+import math
+import time
+
+import numpy as np
+
+from src.models.inference import DEFAULT_THRESHOLD, FEATURE_COLUMNS, FraudScorer, load_model
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BINS = 100_000
+LABEL_COLUMN = "is_fraud"
+
+
+class ScoreHistogram:
+    """Per-class counts of scores over uniform probability bins"""
+
+    def __init__(self, bins: int = DEFAULT_BINS):
+        """
+        Initialize an empty histogram
+
+        Args:
+            bins: Number of probability bins (threshold resolution is 1 / bins)
+        """
+        if bins < 1:
+            raise ValueError(f"bins must be positive, got {bins}")
+        self.bins = bins
+        # Bin edges, equal to ThresholdCurve.thresholds
+        self.edges = np.arange(bins + 1) / bins
+        self.positives = np.zeros(bins, dtype=np.float64)
+        self.negatives = np.zeros(bins, dtype=np.float64)
+        self.rows = 0
+
+    def _bin(self, scores: np.ndarray) -> np.ndarray:
+        scores = np.asarray(scores, dtype=np.float64)
+        index = np.ceil(scores * self.bins).astype(np.int64) - 1
+        np.clip(index, 0, self.bins - 1, out=index)
+        # scores * bins rounds, which can land a score one bin off near an edge; compare with
+        # the edges themselves so that bin k holds exactly the scores > edges[k]
+        index -= (scores <= self.edges[index]) & (index > 0)
+        index += (scores > self.edges[index + 1]) & (index < self.bins - 1)
+        return index
+
+    def update(self, labels: np.ndarray, scores: np.ndarray, weights: Optional[np.ndarray] = None):
+        """
+        Add a chunk of scored rows
+
+        Args:
+            labels: Binary labels (1 = fraud)
+            scores: Fraud probabilities in [0, 1]
+            weights: Optional sample weights (e.g. 1 / rate for downsampled negatives)
+        """
+        labels = np.asarray(labels)
+        if len(labels) != len(scores):
+            raise ValueError(f"{len(labels)} labels for {len(scores)} scores")
+        index = self._bin(scores)
+        positive = labels == 1
+        pos_weights = None if weights is None else np.asarray(weights, dtype=np.float64)[positive]
+        neg_weights = None if weights is None else np.asarray(weights, dtype=np.float64)[~positive]
+        self.positives += np.bincount(index[positive], weights=pos_weights, minlength=self.bins)
+        self.negatives += np.bincount(index[~positive], weights=neg_weights, minlength=self.bins)
+        self.rows += len(labels)
+
+    def merge(self, other: "ScoreHistogram") -> "ScoreHistogram":
+        """Add another histogram's counts in place"""
+        if other.bins != self.bins:
+            raise ValueError(f"Cannot merge histograms with {other.bins} and {self.bins} bins")
+        self.positives += other.positives
+        self.negatives += other.negatives
+        self.rows += other.rows
+        return self
+
+    def curve(self, cost_false_positive: float = 1.0, cost_false_negative: float = 1.0) -> "ThresholdCurve":
+        """Metrics at every bin threshold"""
+        return ThresholdCurve.from_histogram(self, cost_false_positive, cost_false_negative)
+
+
+@dataclass
+class ThresholdCurve:
+    """Confusion counts and metrics at thresholds 0, 1/bins, ..., 1 (flag when score > threshold)"""
+    thresholds: np.ndarray
+    tp: np.ndarray
+    fp: np.ndarray
+    fn: np.ndarray
+    tn: np.ndarray
+    cost_false_positive: float = 1.0
+    cost_false_negative: float = 1.0
+
+    @classmethod
+    def from_histogram(
+        cls,
+        histogram: ScoreHistogram,
+        cost_false_positive: float = 1.0,
+        cost_false_negative: float = 1.0
+    ) -> "ThresholdCurve":
+        # Reverse cumulative sums: rows flagged at threshold k / bins are those in bins >= k
+        tp = np.append(np.cumsum(histogram.positives[::-1])[::-1], 0.0)
+        fp = np.append(np.cumsum(histogram.negatives[::-1])[::-1], 0.0)
+        positives, negatives = tp[0], fp[0]
+        return cls(
+            thresholds=np.arange(histogram.bins + 1) / histogram.bins,
+            tp=tp, fp=fp, fn=positives - tp, tn=negatives - fp,
+            cost_false_positive=cost_false_positive,
+            cost_false_negative=cost_false_negative,
+        )
+
+    @property
+    def positives(self) -> float:
+        return float(self.tp[0])
+
+    @property
+    def negatives(self) -> float:
+        return float(self.fp[0])
+
+    @property
+    def precision(self) -> np.ndarray:
+        # 0 where nothing is flagged, like sklearn's precision_score
+        flagged = self.tp + self.fp
+        return np.divide(self.tp, flagged, out=np.zeros_like(self.tp), where=flagged > 0)
+
+    @property
+    def recall(self) -> np.ndarray:
+        return self.tp / self.positives if self.positives else np.zeros_like(self.tp)
+
+    @property
+    def false_positive_rate(self) -> np.ndarray:
+        return self.fp / self.negatives if self.negatives else np.zeros_like(self.fp)
+
+    @property
+    def f1(self) -> np.ndarray:
+        denominator = 2 * self.tp + self.fp + self.fn
+        return np.divide(2 * self.tp, denominator, out=np.zeros_like(self.tp), where=denominator > 0)
+
+    @property
+    def cost(self) -> np.ndarray:
+        return self.fp * self.cost_false_positive + self.fn * self.cost_false_negative
+
+    def roc_auc(self) -> float:
+        """Area under the ROC curve (trapezoidal, ties within a bin count half)"""
+        if not self.positives or not self.negatives:
+            return float("nan")
+        fpr, tpr = self.false_positive_rate[::-1], self.recall[::-1]
+        return float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1]) / 2))
+
+    def average_precision(self) -> float:
+        """PR-AUC as average precision: sum over thresholds of recall gained x precision"""
+        if not self.positives:
+            return float("nan")
+        recall = self.recall
+        return float(np.sum((recall[:-1] - recall[1:]) * self.precision[:-1]))
+
+    def index(self, threshold: float) -> int:
+        """Index of the bin threshold at or just above a probability threshold"""
+        return int(min(np.searchsorted(self.thresholds, threshold, side="left"), len(self.thresholds) - 1))
+
+    def at(self, threshold: float) -> Dict[str, float]:
+        """
+        Confusion counts and metrics at one threshold
+
+        Args:
+            threshold: Decision threshold (rounded up to the bin grid)
+
+        Returns:
+            threshold, tp/fp/fn/tn, precision, recall, f1, false_positive_rate,
+            accuracy, flagged_rate and cost
+        """
+        i = self.index(threshold)
+        total = self.positives + self.negatives
+        return {
+            "threshold": float(self.thresholds[i]),
+            "tp": float(self.tp[i]), "fp": float(self.fp[i]),
+            "fn": float(self.fn[i]), "tn": float(self.tn[i]),
+            "precision": float(self.precision[i]),
+            "recall": float(self.recall[i]),
+            "f1": float(self.f1[i]),
+            "false_positive_rate": float(self.false_positive_rate[i]),
+            "accuracy": float((self.tp[i] + self.tn[i]) / total) if total else float("nan"),
+            "flagged_rate": float((self.tp[i] + self.fp[i]) / total) if total else float("nan"),
+            "cost": float(self.cost[i]),
+        }
+
+    def best_f1(self) -> Dict[str, float]:
+        """Metrics at the threshold with the highest F1"""
+        return self.at(self.thresholds[int(np.argmax(self.f1))])
+
+    def min_cost(self) -> Dict[str, float]:
+        """Metrics at the threshold with the lowest cost"""
+        return self.at(self.thresholds[int(np.argmin(self.cost))])
+
+    def sweep(self, step: float = 0.01) -> List[Dict[str, float]]:
+        """Metrics at thresholds 0, step, 2 * step, ..., 1"""
+        count = int(round(1 / step))
+        return [self.at(i / count) for i in range(count + 1)]
+
+
+class StreamingEvaluator:
+    """Accumulates a score histogram chunk by chunk and reports threshold metrics"""
+
+    def __init__(
+        self,
+        bins: int = DEFAULT_BINS,
+        threshold: float = DEFAULT_THRESHOLD,
+        cost_false_positive: float = 1.0,
+        cost_false_negative: float = 1.0
+    ):
+        """
+        Initialize the evaluator
+
+        Args:
+            bins: Probability bins (threshold resolution is 1 / bins)
+            threshold: Decision threshold for the headline precision/recall/F1
+            cost_false_positive: Cost of flagging a legitimate transaction
+            cost_false_negative: Cost of missing a fraudulent one
+        """
+        self.histogram = ScoreHistogram(bins)
+        self.threshold = threshold
+        self.cost_false_positive = cost_false_positive
+        self.cost_false_negative = cost_false_negative
+
+    def update(self, labels: np.ndarray, scores: np.ndarray, weights: Optional[np.ndarray] = None):
+        """Add a chunk of labels and fraud probabilities"""
+        self.histogram.update(labels, scores, weights)
+
+    def update_features(self, scorer: FraudScorer, features: np.ndarray, labels: np.ndarray):
+        """Score a chunk of FEATURE_COLUMNS rows and add it"""
+        self.histogram.update(labels, scorer.predict_proba(features))
+
+    def merge(self, other: "StreamingEvaluator") -> "StreamingEvaluator":
+        self.histogram.merge(other.histogram)
+        return self
+
+    def curve(self) -> ThresholdCurve:
+        return self.histogram.curve(self.cost_false_positive, self.cost_false_negative)
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Summary metrics from everything seen so far
+
+        Returns:
+            Row and class counts, roc_auc, pr_auc, metrics at the configured threshold
+            and at the best-F1 and minimum-cost thresholds
+        """
+        curve = self.curve()
+        return {
+            "rows": self.histogram.rows,
+            "positives": curve.positives,
+            "negatives": curve.negatives,
+            "roc_auc": curve.roc_auc(),
+            "pr_auc": curve.average_precision(),
+            "at_threshold": curve.at(self.threshold),
+            "best_f1": curve.best_f1(),
+            "min_cost": curve.min_cost(),
+        }
+
+
+def report_metrics(report: Dict[str, Any], prefix: str = "test_") -> Dict[str, float]:
+    """
+    Flatten a report into MLflow metric names
+
+    Args:
+        report: StreamingEvaluator.report() output
+        prefix: Prepended to every name
+
+    Returns:
+        e.g. test_roc_auc, test_pr_auc, test_precision, test_best_f1_threshold, test_min_cost
+    """
+    metrics = {"roc_auc": report["roc_auc"], "pr_auc": report["pr_auc"],
+               "rows": report["rows"], "positives": report["positives"]}
+    at = report["at_threshold"]
+    metrics.update({name: at[name] for name in
+                    ("threshold", "precision", "recall", "f1", "accuracy", "false_positive_rate", "cost")})
+    metrics.update(best_f1=report["best_f1"]["f1"], best_f1_threshold=report["best_f1"]["threshold"],
+                   min_cost=report["min_cost"]["cost"], min_cost_threshold=report["min_cost"]["threshold"])
+    return {f"{prefix}{name}": float(value) for name, value in metrics.items() if not math.isnan(value)}
+
+
+def iter_parquet_batches(
+    path: str,
+    score_column: Optional[str] = None,
+    batch_size: int = 250_000,
+    files: Optional[List[str]] = None
+) -> Iterable[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Stream (labels, features or scores) chunks from a Parquet file or dataset
+
+    Args:
+        path: Parquet file or dataset directory
+        score_column: Read precomputed probabilities from this column instead of features
+        batch_size: Rows per chunk
+        files: Only these data files of the dataset
+
+    Yields:
+        (labels, values): values is an (n, k) float64 feature matrix, or n scores
+    """
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(files or path, format="parquet", partitioning="hive")
+    columns = [score_column] if score_column else list(FEATURE_COLUMNS)
+    for batch in dataset.to_batches(columns=columns + [LABEL_COLUMN], batch_size=batch_size):
+        if batch.num_rows == 0:
+            continue
+        labels = batch.column(LABEL_COLUMN).to_numpy(zero_copy_only=False)
+        if score_column:
+            yield labels, batch.column(score_column).to_numpy(zero_copy_only=False)
+        else:
+            features = np.empty((batch.num_rows, len(columns)), dtype=np.float64)
+            for i, name in enumerate(columns):
+                features[:, i] = batch.column(name).to_numpy(zero_copy_only=False)
+            yield labels, features
+
+
+# Worker state, set once per process by _init_worker
+_worker_scorer: Optional[FraudScorer] = None
+
+
+def _init_worker(model_uri: Optional[str]):
+    global _worker_scorer
+    _worker_scorer = FraudScorer(load_model(model_uri)) if model_uri else None
+
+
+def _evaluate_files(files: List[str], score_column: Optional[str], bins: int, batch_size: int) -> ScoreHistogram:
+    """Histogram of one group of data files, computed in a worker"""
+    histogram = ScoreHistogram(bins)
+    for labels, values in iter_parquet_batches(files[0], score_column, batch_size, files):
+        histogram.update(labels, values if score_column else _worker_scorer.predict_proba(values))
+    return histogram
+
+
+def evaluate_parquet(
+    path: str,
+    evaluator: StreamingEvaluator,
+    model_uri: Optional[str] = None,
+    scorer: Optional[FraudScorer] = None,
+    score_column: Optional[str] = None,
+    workers: int = 1,
+    batch_size: int = 250_000
+) -> Dict[str, Any]:
+    """
+    Evaluate a labelled Parquet dataset in one pass
+
+    Either scores FEATURE_COLUMNS with a model, or reads precomputed scores (e.g.
+    batch_predict.py output with is_fraud passed through) from score_column.
+    With workers > 1, data files are spread over a process pool that loads model_uri
+    once per worker; their histograms are merged into the evaluator.
+
+    Args:
+        path: Parquet file or dataset directory with is_fraud
+        evaluator: Evaluator to accumulate into
+        model_uri: Model to score with (required for workers > 1 unless score_column is set)
+        scorer: In-process scorer (workers == 1)
+        score_column: Column of precomputed fraud probabilities
+        workers: Worker processes
+        batch_size: Rows per chunk
+
+    Returns:
+        evaluator.report() plus elapsed seconds and rows/sec
+    """
+    from src.models.predict import _parquet_files
+
+    start = time.perf_counter()
+    bins = evaluator.histogram.bins
+    files = _parquet_files(path)
+    if not files:
+        raise ValueError(f"No Parquet files found at {path}")
+    if workers > 1 and len(files) > 1:
+        if score_column is None and model_uri is None:
+            raise ValueError("Parallel evaluation needs a model_uri or a score_column")
+        groups = [files[i::workers] for i in range(min(workers, len(files)))]
+        with ProcessPoolExecutor(max_workers=len(groups), initializer=_init_worker,
+                                 initargs=(None if score_column else model_uri,)) as pool:
+            for histogram in pool.map(_evaluate_files, groups, [score_column] * len(groups),
+                                      [bins] * len(groups), [batch_size] * len(groups)):
+                evaluator.histogram.merge(histogram)
+    else:
+        if score_column is None and scorer is None:
+            if model_uri is None:
+                raise ValueError("Evaluation needs a model_uri, a scorer or a score_column")
+            scorer = FraudScorer(load_model(model_uri))
+        for labels, values in iter_parquet_batches(path, score_column, batch_size, files):
+            if score_column:
+                evaluator.update(labels, values)
+            else:
+                evaluator.update_features(scorer, values, labels)
+
+    report = evaluator.report()
+    elapsed = time.perf_counter() - start
+    report.update(elapsed_s=elapsed, rows_per_sec=report["rows"] / max(elapsed, 1e-9))
+    logger.info(f"Evaluated {report['rows']:,} rows in {elapsed:.1f}s ({report['rows_per_sec']:,.0f} rows/s): "
+                f"ROC-AUC {report['roc_auc']:.4f}, PR-AUC {report['pr_auc']:.4f}")
+    return report
+
+
+def log_evaluation(
+    evaluator: StreamingEvaluator,
+    run_id: str,
+    prefix: str = "test_",
+    sweep_step: float = 0.01,
+    report: Optional[Dict[str, Any]] = None
+):
+    """
+    Log metrics and the threshold sweep to a specific MLflow run
+
+    Args:
+        evaluator: Evaluator holding the accumulated histogram
+        run_id: Run that produced the evaluated model (see get_model_run_id)
+        prefix: Metric name prefix
+        sweep_step: Threshold spacing of the logged sweep table
+        report: Precomputed evaluator.report()
+    """
+    import pandas as pd
+    from src.utils.mlflow_utils import log_artifact_text, log_metrics_to_run
+
+    report = report or evaluator.report()
+    log_metrics_to_run(run_id, report_metrics(report, prefix))
+    sweep = pd.DataFrame(evaluator.curve().sweep(sweep_step))
+    log_artifact_text(run_id, sweep.to_csv(index=False), f"evaluation/{prefix}threshold_sweep.csv")
+    logger.info(f"Logged {prefix}* metrics and threshold sweep to run {run_id}")
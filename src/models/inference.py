@@ -0,0 +1,279 @@
+"""
+Model inference utilities
+Single-pass fraud scoring with a configurable decision threshold
+"""
+from pathlib import Path
+from typing import Any, Callable, Optional, Tuple
+import copy
+import logging
+import math
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Model input columns, in training order
+FEATURE_COLUMNS = ['amt', 'city_pop', 'category_encoded', 'gender_encoded', 'state_encoded']
+
+# Probability above which a transaction is labelled fraud (sklearn's predict() cut-off)
+DEFAULT_THRESHOLD = 0.5
+
+# Maximum absolute probability difference tolerated between the fast path and sklearn
+PARITY_TOLERANCE = 1e-9
+
+
+class LinearKernel:
+    """Dot-plus-sigmoid scoring over coefficients extracted from a linear model"""
+
+    def __init__(self, coef: np.ndarray, intercept: float):
+        """
+        Initialize the kernel
+
+        Args:
+            coef: Coefficient vector of length k (signed towards the fraud class)
+            intercept: Intercept (signed towards the fraud class)
+        """
+        self.coef = np.ascontiguousarray(coef, dtype=np.float64).ravel()
+        self.intercept = float(intercept)
+        self.n_features = self.coef.shape[0]
+        self._coef_list = self.coef.tolist()
+
+    def predict_proba_row(self, row) -> float:
+        """
+        Fraud probability for a single row
+
+        Args:
+            row: Sequence of k feature values
+
+        Returns:
+            Fraud probability
+        """
+        z = self.intercept
+        for weight, value in zip(self._coef_list, row):
+            z += weight * value
+        # Numerically stable logistic function
+        if z >= 0:
+            return 1.0 / (1.0 + math.exp(-z))
+        e = math.exp(z)
+        return e / (1.0 + e)
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        """
+        Fraud probabilities for a feature matrix
+
+        Args:
+            features: (n, k) matrix
+
+        Returns:
+            New array of n fraud probabilities, owned by the caller
+        """
+        features = np.asarray(features, dtype=np.float64)
+        n = features.shape[0]
+        if n == 1:
+            return np.array([self.predict_proba_row(features[0])])
+        # The logits array is the only allocation; the sigmoid runs in place on it
+        out = features @ self.coef
+        out += self.intercept
+        # 1 / (1 + exp(-z)) in place; exp overflow yields inf and a probability of exactly 0
+        np.negative(out, out=out)
+        with np.errstate(over="ignore"):
+            np.exp(out, out=out)
+        out += 1.0
+        np.reciprocal(out, out=out)
+        return out
+
+
+def extract_linear_kernel(model, fraud_column: int = 1) -> Optional[LinearKernel]:
+    """
+    Extract a LinearKernel from a supported binary linear classifier
+
+    Supported: LogisticRegression and SGDClassifier with a logistic loss.
+
+    Args:
+        model: Fitted estimator
+        fraud_column: predict_proba column holding the fraud class
+
+    Returns:
+        LinearKernel, or None if the estimator is not supported
+    """
+    from sklearn.linear_model import LogisticRegression, SGDClassifier
+
+    if type(model) is SGDClassifier:
+        if model.loss not in ("log_loss", "log"):
+            return None
+    elif type(model) is not LogisticRegression:
+        return None
+    coef = getattr(model, "coef_", None)
+    intercept = getattr(model, "intercept_", None)
+    if coef is None or intercept is None or coef.shape[0] != 1 or len(model.classes_) != 2:
+        return None
+    # predict_proba column 1 is sigmoid(z); column 0 is sigmoid(-z)
+    sign = 1.0 if fraud_column == 1 else -1.0
+    return LinearKernel(sign * coef[0], sign * intercept[0])
+
+
+def check_parity(model, kernel: LinearKernel, fraud_column: int = 1, n_rows: int = 512) -> float:
+    """
+    Compare kernel probabilities with sklearn's predict_proba on a probe matrix
+
+    Args:
+        model: Estimator the kernel was extracted from
+        kernel: Extracted kernel
+        fraud_column: predict_proba column holding the fraud class
+        n_rows: Number of probe rows
+
+    Returns:
+        Maximum absolute probability difference across batch and single-row paths
+    """
+    rng = np.random.default_rng(0)
+    # Probe rows whose logits spread around the decision boundary (z ~ N(0, 4^2))
+    coef = kernel.coef
+    scale = 4.0 / (np.maximum(np.abs(coef), 1e-12) * np.sqrt(kernel.n_features))
+    offset = -kernel.intercept * coef / max(float(coef @ coef), 1e-24)
+    probe = rng.normal(size=(n_rows, kernel.n_features)) * scale + offset
+    expected = model.predict_proba(probe)[:, fraud_column]
+    batch_diff = np.max(np.abs(kernel.predict_proba(probe) - expected))
+    row_diff = max(abs(kernel.predict_proba_row(row) - p) for row, p in zip(probe[:32], expected[:32]))
+    return float(max(batch_diff, row_diff))
+
+
+class FraudScorer:
+    """Scores transactions with one probability computation and thresholds the result
+
+    Supported linear models are scored with a NumPy dot-plus-sigmoid kernel; anything
+    else goes through sklearn's predict_proba. A prebuilt kernel (e.g. one over shared
+    memory-mapped parameters) can be passed instead, in which case model may be None.
+    Batches larger than the kernel's max_rows go to sklearn, loading the model through
+    model_loader on first use when none was given.
+    """
+
+    def __init__(self, model, threshold: float = DEFAULT_THRESHOLD, fast_path: bool = True, kernel=None,
+                 model_loader: Optional[Callable[[], Any]] = None):
+        """
+        Initialize the scorer
+
+        Args:
+            model: Fitted binary classifier exposing predict_proba (None with kernel)
+            threshold: Decision threshold applied to the fraud probability
+            fast_path: Use the linear kernel when the model supports it
+            kernel: Ready kernel with predict_proba(features), used as-is
+            model_loader: Returns the fitted model for batches above kernel.max_rows
+                (with kernel and no model)
+        """
+        if not 0.0 <= threshold <= 1.0:
+            raise ValueError(f"Decision threshold must be in [0, 1], got {threshold}")
+        self.model = model
+        self.threshold = float(threshold)
+        self._model_loader = model_loader
+        self._model_lock = threading.Lock()
+        self._fraud_column = self._fraud_column_of(model)
+        if kernel is not None:
+            self.kernel = kernel
+        elif model is None:
+            raise ValueError("FraudScorer needs a model or a kernel")
+        else:
+            self.kernel = self._build_kernel() if fast_path else None
+
+    @staticmethod
+    def _fraud_column_of(model) -> int:
+        classes = list(getattr(model, "classes_", [0, 1]))
+        return classes.index(1) if 1 in classes else len(classes) - 1
+
+    def _sklearn_model(self):
+        """The fitted model, loaded through model_loader on first use (None if unavailable)"""
+        if self.model is None and self._model_loader is not None:
+            with self._model_lock:
+                if self.model is None:
+                    model = self._model_loader()
+                    self._fraud_column = self._fraud_column_of(model)
+                    self.model = model
+        return self.model
+
+    def _build_kernel(self) -> Optional[LinearKernel]:
+        """Extract the linear kernel, keeping it only if it reproduces sklearn"""
+        try:
+            kernel = extract_linear_kernel(self.model, self._fraud_column)
+            if kernel is None:
+                return None
+            diff = check_parity(self.model, kernel, self._fraud_column)
+        except Exception as e:
+            logger.warning(f"Linear fast path unavailable, using sklearn: {e}")
+            return None
+        if diff > PARITY_TOLERANCE:
+            logger.warning(f"Linear fast path disagrees with sklearn by {diff:.3g}, using sklearn")
+            return None
+        return kernel
+
+    def with_threshold(self, threshold: float) -> "FraudScorer":
+        """
+        Scorer sharing this one's model and kernel with another decision threshold
+
+        Args:
+            threshold: Decision threshold applied to the fraud probability
+
+        Returns:
+            New FraudScorer
+        """
+        if not 0.0 <= threshold <= 1.0:
+            raise ValueError(f"Decision threshold must be in [0, 1], got {threshold}")
+        scorer = copy.copy(self)
+        scorer.threshold = float(threshold)
+        return scorer
+
+    @property
+    def fast_path(self) -> bool:
+        """Whether scoring goes through a NumPy kernel"""
+        return self.kernel is not None
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        """
+        Compute fraud probabilities
+
+        Args:
+            features: (n, k) matrix in FEATURE_COLUMNS order
+
+        Returns:
+            Array of n fraud probabilities
+        """
+        kernel = self.kernel
+        if kernel is not None:
+            max_rows = getattr(kernel, "max_rows", None)
+            if max_rows is None or len(features) <= max_rows:
+                return kernel.predict_proba(features)
+            model = self._sklearn_model()
+            if model is None:
+                return kernel.predict_proba(features)
+            return model.predict_proba(features)[:, self._fraud_column]
+        return self.model.predict_proba(features)[:, self._fraud_column]
+
+    def score(self, features: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Score a feature matrix with a single model call
+
+        Args:
+            features: (n, k) matrix in FEATURE_COLUMNS order
+
+        Returns:
+            Tuple of (is_fraud labels, fraud probabilities)
+        """
+        probabilities = self.predict_proba(features)
+        return probabilities > self.threshold, probabilities
+
+
+def load_model(model_uri: str):
+    """
+    Load a fitted model from a local pickle or an MLflow model URI
+
+    Args:
+        model_uri: Path to a .pkl/.joblib file, or an MLflow URI such as
+            'models:/fraud_detector/3' or 'runs:/<run_id>/model'
+
+    Returns:
+        Fitted estimator
+    """
+    if model_uri.endswith((".pkl", ".joblib")) and Path(model_uri).exists():
+        import joblib
+        return joblib.load(model_uri)
+    import mlflow.sklearn
+    return mlflow.sklearn.load_model(model_uri)
@@ -0,0 +1,749 @@
+"""
+Model lifecycle management
+Background discovery of new model versions, off-request-path loading and warm-up,
+and atomic swaps of the serving model
+"""
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import hashlib
+import logging
+import threading
+import time
+
+import numpy as np
+
+from src.models.artifact_cache import ModelArtifactCache
+from src.models.inference import DEFAULT_THRESHOLD, FEATURE_COLUMNS, PARITY_TOLERANCE, FraudScorer, load_model
+from src.models.shared_params import (
+    UNSUPPORTED,
+    SharedParamStore,
+    build_kernel,
+    check_kernel_parity,
+    export_model_params,
+)
+
+logger = logging.getLogger(__name__)
+
+MODEL_FILE_SUFFIXES = (".pkl", ".joblib")
+
+
+@dataclass(frozen=True)
+class ModelHandle:
+    """An immutable, warmed-up model ready to serve
+
+    Requests read the manager's current handle once and use it throughout, so a swap
+    never mixes two models (or a model and another version's label) within one request.
+    """
+    model: Any
+    scorer: FraudScorer
+    version: str                  # Source-specific version id (e.g. '3', 'run/ab12cd34')
+    label: str                    # Reported as model_version in responses
+    uri: str
+    loaded_at: float              # Epoch seconds the handle became available
+    load_seconds: float
+    warmup_seconds: float
+    from_cache: bool = False
+    segment: Optional[str] = None  # Shared parameter segment key when scoring from shared memory
+
+    def info(self) -> Dict[str, Any]:
+        """JSON-serializable description"""
+        return {
+            "version": self.version,
+            "label": self.label,
+            "uri": self.uri,
+            "loaded_at": self.loaded_at,
+            "load_seconds": self.load_seconds,
+            "warmup_seconds": self.warmup_seconds,
+            "threshold": self.scorer.threshold,
+            "fast_path": self.scorer.fast_path,
+            "from_cache": self.from_cache,
+            "shared_segment": self.segment,
+        }
+
+
+class ModelSource(ABC):
+    """Where model versions come from"""
+
+    @abstractmethod
+    def list_versions(self) -> List[str]:
+        """Available versions, oldest first"""
+
+    @abstractmethod
+    def uri(self, version: str) -> str:
+        """Location load_model() accepts for a version"""
+
+    def label(self, version: str) -> str:
+        """Human-readable version reported by the API"""
+        return version
+
+    def threshold(self, version: str) -> Optional[float]:
+        """Decision threshold stored with a version, if any"""
+        return None
+
+    @property
+    def cache_namespace(self) -> Optional[str]:
+        """Artifact cache namespace for this source's versions; None when not worth caching"""
+        return None
+
+    @property
+    def shared_namespace(self) -> str:
+        """Shared parameter store namespace; identifies the source across processes"""
+        return self.cache_namespace or type(self).__name__
+
+    def fingerprint(self, version: str) -> str:
+        """Key that changes whenever a version's content can have changed"""
+        return version
+
+    def ping(self) -> bool:
+        """Whether the source is reachable (blocking)"""
+        return True
+
+    def latest(self) -> Optional[str]:
+        """Newest available version"""
+        versions = self.list_versions()
+        return versions[-1] if versions else None
+
+
+class MlflowRegistrySource(ModelSource):
+    """Versions of a model in the MLflow registry, falling back to the latest run's model"""
+
+    def __init__(
+        self,
+        model_name: str = "fraud_detector",
+        tracking_uri: Optional[str] = None,
+        experiment_name: str = "fraud_detection"
+    ):
+        """
+        Initialize the source
+
+        Args:
+            model_name: Registered model name
+            tracking_uri: MLflow tracking URI. None keeps the current setting
+            experiment_name: Experiment searched when nothing is registered
+        """
+        self.model_name = model_name
+        self.tracking_uri = tracking_uri
+        self.experiment_name = experiment_name
+        self._mlflow_client = None
+
+    @property
+    def _client(self):
+        """MLflow client, created (and mlflow imported) on first registry access"""
+        if self._mlflow_client is None:
+            import mlflow
+
+            if self.tracking_uri:
+                mlflow.set_tracking_uri(self.tracking_uri)
+            self._mlflow_client = mlflow.tracking.MlflowClient()
+        return self._mlflow_client
+
+    @property
+    def cache_namespace(self) -> Optional[str]:
+        registry = hashlib.sha1((self.tracking_uri or "default").encode()).hexdigest()[:8]
+        return f"mlflow-{self.model_name}-{registry}"
+
+    def ping(self) -> bool:
+        self._client.search_registered_models(max_results=1)
+        return True
+
+    def list_versions(self) -> List[str]:
+        versions = self._client.search_model_versions(f"name='{self.model_name}'")
+        if versions:
+            return [str(v) for v in sorted(int(v.version) for v in versions)]
+        # Nothing registered: serve the model logged by the most recent run
+        experiment = self._client.get_experiment_by_name(self.experiment_name)
+        if experiment:
+            runs = self._client.search_runs(
+                experiment_ids=[experiment.experiment_id],
+                order_by=["start_time DESC"],
+                max_results=1
+            )
+            if runs:
+                return [f"run/{runs[0].info.run_id}"]
+        return []
+
+    def uri(self, version: str) -> str:
+        if version.startswith("run/"):
+            return f"runs:/{version[4:]}/model"
+        return f"models:/{self.model_name}/{version}"
+
+    def label(self, version: str) -> str:
+        if version.startswith("run/"):
+            return f"run/{version[4:12]}"
+        return f"{self.model_name}/v{version}"
+
+    def threshold(self, version: str) -> Optional[float]:
+        if version.startswith("run/"):
+            return None
+        from src.utils.mlflow_utils import get_decision_threshold
+        return get_decision_threshold(self.model_name, version, client=self._client)
+
+
+class LocalDirectorySource(ModelSource):
+    """Model files in a local directory, one version per file or per subdirectory
+
+    Versions are '<name>.pkl'/'<name>.joblib' files, or subdirectories holding one such
+    file. Numeric names sort numerically, others by modification time. Files modified in
+    the last settle_seconds are ignored so half-copied models are never picked up.
+    """
+
+    def __init__(self, path: str, model_name: str = "fraud_detector", settle_seconds: float = 2.0):
+        """
+        Initialize the source
+
+        Args:
+            path: Directory to watch
+            model_name: Prefix for reported labels
+            settle_seconds: Minimum age of a model file before it is considered
+        """
+        self.path = Path(path)
+        self.model_name = model_name
+        self.settle_seconds = settle_seconds
+
+    def _files(self) -> Dict[str, Path]:
+        files = {}
+        if not self.path.is_dir():
+            return files
+        horizon = time.time() - self.settle_seconds
+        for entry in self.path.iterdir():
+            if entry.name.startswith((".", "_")):
+                continue
+            if entry.is_file() and entry.suffix in MODEL_FILE_SUFFIXES:
+                candidate, version = entry, entry.stem
+            elif entry.is_dir():
+                candidates = sorted(p for p in entry.iterdir() if p.suffix in MODEL_FILE_SUFFIXES)
+                if not candidates:
+                    continue
+                candidate, version = candidates[0], entry.name
+            else:
+                continue
+            if candidate.stat().st_mtime <= horizon:
+                files[version] = candidate
+        return files
+
+    def ping(self) -> bool:
+        return self.path.is_dir()
+
+    def list_versions(self) -> List[str]:
+        files = self._files()
+
+        def order(version: str):
+            return (0, int(version), 0.0) if version.isdigit() else (1, 0, files[version].stat().st_mtime)
+
+        return sorted(files, key=order)
+
+    def uri(self, version: str) -> str:
+        files = self._files()
+        if version not in files:
+            raise KeyError(f"No model file for version {version} in {self.path}")
+        return str(files[version])
+
+    def label(self, version: str) -> str:
+        return f"{self.model_name}/{version}"
+
+    @property
+    def shared_namespace(self) -> str:
+        directory = hashlib.sha1(str(self.path.resolve()).encode()).hexdigest()[:8]
+        return f"local-{self.model_name}-{directory}"
+
+    def fingerprint(self, version: str) -> str:
+        # A file can be replaced under the same name; its mtime tells the copies apart
+        return f"{version}-{Path(self.uri(version)).stat().st_mtime_ns}"
+
+
+def create_model_source(config: Dict[str, Any]) -> ModelSource:
+    """
+    Build a model source from the 'model_manager' section of api_config.yaml
+
+    Args:
+        config: Section with 'source' of mlflow or local
+
+    Returns:
+        Configured ModelSource
+    """
+    source = config.get("source", "mlflow")
+    if source == "mlflow":
+        return MlflowRegistrySource(
+            model_name=config.get("model_name", "fraud_detector"),
+            tracking_uri=config.get("tracking_uri"),
+        )
+    if source == "local":
+        return LocalDirectorySource(
+            config.get("local_dir", "models"),
+            config.get("model_name", "fraud_detector"),
+            settle_seconds=config.get("settle_seconds", 2.0),
+        )
+    raise ValueError(f"Unknown model source: {source}")
+
+
+class ModelManager:
+    """Owns the serving model: loads, warms up and atomically swaps versions
+
+    A background thread polls the source and switches to the newest version unless a
+    version is pinned. Loading and warm-up happen on that thread (or the caller's, for
+    admin actions); the swap itself is a single reference assignment.
+    """
+
+    def __init__(
+        self,
+        source: ModelSource,
+        threshold: Optional[float] = None,
+        fast_path: bool = True,
+        poll_interval_s: float = 30.0,
+        warmup_rows: int = 256,
+        history_size: int = 3,
+        cache: Optional[ModelArtifactCache] = None,
+        prefer_cache: bool = True,
+        shared_store: Optional[SharedParamStore] = None
+    ):
+        """
+        Initialize the manager
+
+        Args:
+            source: Where versions come from
+            threshold: Decision threshold override. None uses the source's stored
+                threshold, else DEFAULT_THRESHOLD
+            fast_path: Passed to FraudScorer
+            poll_interval_s: Seconds between source polls (0 disables polling)
+            warmup_rows: Rows scored before a new version goes live (0 disables warm-up)
+            history_size: Previously served handles kept warm for instant rollback
+            cache: Local artifact cache; versions found there load without the source
+            prefer_cache: On load() without a version, serve the newest cached version
+                immediately and leave checking the source to the background poll
+            shared_store: Host-wide parameter segments; supported models are exported
+                once and every worker process scores from the same read-only mapping
+        """
+        self.source = source
+        self.threshold = threshold
+        self.fast_path = fast_path
+        self.poll_interval_s = poll_interval_s
+        self.warmup_rows = warmup_rows
+        self.history_size = history_size
+        self.cache = cache if source.cache_namespace is not None else None
+        self.prefer_cache = prefer_cache
+        self.shared_store = shared_store if fast_path else None
+
+        self._current: Optional[ModelHandle] = None
+        self._history: List[ModelHandle] = []
+        self._pinned: Optional[str] = None
+        self._failed: Dict[str, str] = {}
+        self._released: List[str] = []  # Segments of handles dropped from history
+        self._swap_callbacks: List[Callable[[Optional[ModelHandle], ModelHandle], None]] = []
+        # Serializes loads and swaps; never taken on the request path
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.swaps = 0
+        self.last_poll: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    @property
+    def current(self) -> Optional[ModelHandle]:
+        """The serving handle (lock-free read)"""
+        return self._current
+
+    @property
+    def pinned(self) -> Optional[str]:
+        return self._pinned
+
+    def on_swap(self, callback: Callable[[Optional[ModelHandle], ModelHandle], None]):
+        """Register callback(old_handle, new_handle), run after every swap"""
+        self._swap_callbacks.append(callback)
+
+    def _source_threshold(self, version: str, fallback: Optional[float] = None) -> Optional[float]:
+        """Threshold stored with a version at the source, or fallback when the source is unreachable"""
+        try:
+            return self.source.threshold(version)
+        except Exception as e:
+            logger.warning(f"Could not read decision threshold for {version}, using {fallback}: {e}")
+            return fallback
+
+    def _local_threshold(self, version: str, fallback: Optional[float] = None) -> Optional[float]:
+        """Threshold from this process's artifact cache entry, else from the source"""
+        meta = self.cache.meta(self.source.cache_namespace, version) if self.cache is not None else None
+        if meta is not None:
+            return meta.get("threshold")
+        return self._source_threshold(version, fallback)
+
+    def _load_cached(self, version: str) -> Optional[Tuple[Any, str, Optional[float]]]:
+        """(model, uri, stored threshold) from the artifact cache, or None on a miss"""
+        namespace = self.source.cache_namespace
+        if self.cache is None or not self.cache.has(namespace, version):
+            return None
+        try:
+            model, meta = self.cache.load(namespace, version)
+        except Exception as e:
+            logger.warning(f"Dropping unreadable cached model {version}: {e}")
+            self.cache.remove(namespace, version)
+            return None
+        return model, meta.get("uri", str(self.cache.path(namespace, version))), meta.get("threshold")
+
+    def _load_from_source(self, version: str) -> Tuple[Any, str, Optional[float]]:
+        """(model, uri, stored threshold) from the source, written through to the cache"""
+        uri = self.source.uri(version)
+        model = load_model(uri)
+        threshold = self._source_threshold(version)
+        if self.cache is not None:
+            namespace = self.source.cache_namespace
+            try:
+                self.cache.store(namespace, version, model, {"uri": uri, "threshold": threshold})
+                current = self._current
+                self.cache.prune(namespace, keep=[version] + ([current.version] if current else []))
+            except Exception as e:
+                logger.warning(f"Could not cache model {version}: {e}")
+        return model, uri, threshold
+
+    def _load_private(self, version: str) -> Any:
+        """Per-process model for batches too large for a shared kernel"""
+        logger.info(f"Loading model {version} for large batches")
+        cached = self._load_cached(version)
+        return (cached if cached is not None else self._load_from_source(version))[0]
+
+    def _warm_up(self, scorer: FraudScorer):
+        """Score synthetic rows through single-row and batch paths; fail on bad output"""
+        rng = np.random.default_rng(0)
+        # Stay within the kernel's batch size so warm-up does not load the sklearn fallback
+        rows = min(self.warmup_rows, getattr(scorer.kernel, "max_rows", None) or self.warmup_rows)
+        features = np.abs(rng.normal(size=(rows, len(FEATURE_COLUMNS)))) * 10
+        for rows in (features[:1], features):
+            _, probabilities = scorer.score(np.ascontiguousarray(rows))
+            if not np.all(np.isfinite(probabilities)) or np.any((probabilities < 0) | (probabilities > 1)):
+                raise ValueError("Warm-up produced invalid probabilities")
+
+    def _resolve_threshold(self, stored_threshold: Optional[float]) -> float:
+        if self.threshold is not None:
+            return float(self.threshold)
+        return DEFAULT_THRESHOLD if stored_threshold is None else float(stored_threshold)
+
+    def _export_shared(self, version: str, key: str) -> Optional[Tuple[Any, str, Optional[float], bool]]:
+        """
+        Publish a version's parameters as a shared segment (shared store lock held)
+
+        Returns:
+            (model, uri, stored threshold, from_cache) when the model was loaded here
+            but cannot be shared, else None
+        """
+        cached = self._load_cached(version)
+        model, uri, stored_threshold = cached if cached is not None else self._load_from_source(version)
+        meta = {"version": version, "uri": uri, "threshold": stored_threshold, "model_class": type(model).__name__}
+        namespace = self.source.shared_namespace
+        classes = list(getattr(model, "classes_", [0, 1]))
+        fraud_column = classes.index(1) if 1 in classes else len(classes) - 1
+        try:
+            exported = export_model_params(model, fraud_column)
+            if exported is not None:
+                kind, arrays, params = exported
+                diff = check_kernel_parity(model, build_kernel(kind, arrays, params), fraud_column)
+                if diff > PARITY_TOLERANCE:
+                    logger.warning(f"Shared kernel for {version} disagrees with sklearn by {diff:.3g}")
+                    exported = None
+        except Exception as e:
+            logger.warning(f"Could not export parameters of {version}: {e}")
+            exported = None
+        if exported is None:
+            # Record the decision so other workers load the model directly instead of retrying
+            self.shared_store.publish(namespace, key, UNSUPPORTED, meta=meta)
+            return model, uri, stored_threshold, cached is not None
+        kind, arrays, params = exported
+        self.shared_store.publish(namespace, key, kind, arrays, {**meta, **params, "parity_diff": diff})
+        logger.info(f"Published shared parameters for {version} ({kind}, "
+                    f"{sum(a.nbytes for a in arrays.values()):,} bytes)")
+        return None
+
+    def _prepare_shared(self, version: str) -> Tuple[Optional[FraudScorer], Any, str, bool, Optional[str]]:
+        """
+        Scorer over the version's shared segment, creating the segment if no worker has yet
+
+        Returns:
+            (scorer, model, uri, from_cache, segment key); scorer is None when the model
+            must be loaded per process, and model is set if it was loaded along the way
+        """
+        store, namespace = self.shared_store, self.source.shared_namespace
+        key = self.source.fingerprint(version)
+        if not store.exists(namespace, key):
+            with store.lock(namespace):
+                if not store.exists(namespace, key):
+                    loaded = self._export_shared(version, key)
+                    if loaded is not None:
+                        model, uri, stored_threshold, from_cache = loaded
+                        scorer = FraudScorer(model, threshold=self._resolve_threshold(stored_threshold))
+                        return scorer, model, uri, from_cache, None
+        kind, arrays, meta = store.open(namespace, key)
+        if kind == UNSUPPORTED:
+            return None, None, meta["uri"], False, None
+        # Lease before use so another worker's gc() cannot collect the segment meanwhile
+        store.acquire(namespace, key)
+        # The segment's threshold is the exporting worker's; each process uses its own
+        # cached copy of the tag (read from the source only when it has none)
+        scorer = FraudScorer(
+            None,
+            threshold=self._resolve_threshold(self._local_threshold(version, meta.get("threshold"))),
+            kernel=build_kernel(kind, arrays, meta),
+            model_loader=lambda: self._load_private(version),
+        )
+        return scorer, None, meta["uri"], True, key
+
+    def prepare(self, version: str) -> ModelHandle:
+        """
+        Load and warm up a version without making it live
+
+        With a shared store, supported models are scored from the host-wide read-only
+        segment and the handle carries no sklearn model.
+
+        Args:
+            version: Source version id
+
+        Returns:
+            Ready-to-serve handle
+        """
+        start = time.perf_counter()
+        scorer, model, segment, from_cache = None, None, None, False
+        if self.shared_store is not None:
+            try:
+                scorer, model, uri, from_cache, segment = self._prepare_shared(version)
+            except Exception as e:
+                logger.warning(f"Shared parameters unavailable for {version}, loading per process: {e}")
+        if scorer is None:
+            cached = self._load_cached(version)
+            model, uri, stored_threshold = cached if cached is not None else self._load_from_source(version)
+            from_cache = cached is not None
+            scorer = FraudScorer(model, threshold=self._resolve_threshold(stored_threshold), fast_path=self.fast_path)
+        loaded = time.perf_counter()
+        if self.warmup_rows:
+            try:
+                self._warm_up(scorer)
+            except Exception:
+                if segment is not None:
+                    self.shared_store.release(self.source.shared_namespace, segment)
+                raise
+        warmed = time.perf_counter()
+        return ModelHandle(
+            model=model,
+            scorer=scorer,
+            version=version,
+            label=self.source.label(version),
+            uri=uri,
+            loaded_at=time.time(),
+            load_seconds=loaded - start,
+            warmup_seconds=warmed - loaded,
+            from_cache=from_cache,
+            segment=segment,
+        )
+
+    def _update_leases(self, old: Optional[ModelHandle]):
+        """Lease the live and warm segments, release the rest and collect unused ones"""
+        if self.shared_store is None:
+            return
+        namespace = self.source.shared_namespace
+        live = [h.segment for h in [self._current] + self._history if h is not None and h.segment]
+        try:
+            for segment in live:
+                self.shared_store.acquire(namespace, segment)
+            if old is not None and old.segment and old.segment not in live:
+                self.shared_store.release(namespace, old.segment)
+            for segment in self._released:
+                if segment not in live:
+                    self.shared_store.release(namespace, segment)
+            self._released = []
+            removed = self.shared_store.gc(namespace, keep=live)
+            if removed:
+                logger.info(f"Removed unused shared parameter segments: {removed}")
+        except OSError as e:
+            logger.warning(f"Shared parameter lease update failed: {e}")
+
+    def _swap(self, handle: ModelHandle):
+        """Make a handle live (lock held)"""
+        old = self._current
+        self._current = handle
+        if old is not None and old.version != handle.version:
+            self._history = [h for h in self._history if h.version != handle.version and h.version != old.version]
+            self._history.append(old)
+            if len(self._history) > self.history_size:
+                self._released.extend(h.segment for h in self._history[:-self.history_size] if h.segment)
+                del self._history[:len(self._history) - self.history_size]
+        self.swaps += 1
+        self._update_leases(old)
+        logger.info(f"Serving model {handle.label} (load {handle.load_seconds:.3f}s, "
+                    f"warm-up {handle.warmup_seconds:.3f}s, threshold {handle.scorer.threshold})")
+        for callback in self._swap_callbacks:
+            try:
+                callback(old, handle)
+            except Exception as e:
+                logger.error(f"Model swap callback failed: {e}")
+
+    def activate(self, version: str) -> ModelHandle:
+        """
+        Load, warm up and swap to a version (a no-op if it is already live)
+
+        Args:
+            version: Source version id
+
+        Returns:
+            The live handle
+        """
+        with self._lock:
+            if self._current is not None and self._current.version == version:
+                return self._current
+            try:
+                handle = self.prepare(version)
+            except Exception as e:
+                self._failed[version] = str(e)
+                self.last_error = f"{version}: {e}"
+                raise
+            self._failed.pop(version, None)
+            self._swap(handle)
+            return handle
+
+    def load(self, version: Optional[str] = None) -> ModelHandle:
+        """
+        Initial load: a specific version (pinned) or the newest available
+
+        Args:
+            version: Version to pin, or None for the latest
+
+        Returns:
+            The live handle
+        """
+        if version is not None:
+            return self.pin(version)
+        if self.prefer_cache and self.cache is not None:
+            cached = self.cache.versions(self.source.cache_namespace)
+            if cached:
+                # Start from the cached artifact and its stored threshold without touching
+                # the source; the next poll picks up a newer version or an edited tag
+                return self.activate(cached[-1])
+        latest = self.source.latest()
+        if latest is None:
+            raise RuntimeError("No model versions available")
+        return self.activate(latest)
+
+    def refresh_threshold(self) -> Optional[ModelHandle]:
+        """
+        Re-read the live version's stored threshold and swap in a rescored handle if it changed
+
+        The model and its warm-up are reused; only the scorer's threshold differs.
+
+        Returns:
+            The new handle if the threshold changed, else None
+        """
+        if self.threshold is not None or self._current is None:
+            return None
+        with self._lock:
+            current = self._current
+            stored_threshold = self._source_threshold(current.version, current.scorer.threshold)
+            threshold = self._resolve_threshold(stored_threshold)
+            if threshold == current.scorer.threshold:
+                return None
+            logger.info(f"Decision threshold of {current.label} changed: "
+                        f"{current.scorer.threshold} -> {threshold}")
+            if self.cache is not None:
+                # So the next start from the cache serves the edited threshold
+                self.cache.update_meta(self.source.cache_namespace, current.version, threshold=stored_threshold)
+            handle = replace(current, scorer=current.scorer.with_threshold(threshold))
+            self._swap(handle)
+            return handle
+
+    def poll(self) -> Optional[ModelHandle]:
+        """
+        Check the source once: swap to a newer version if one appeared, else pick up
+        a changed decision threshold of the live version
+
+        Returns:
+            The new handle if a swap happened, else None
+        """
+        self.last_poll = time.time()
+        current = self._current
+        if self._pinned is None:
+            latest = self.source.latest()
+            if latest is not None and (current is None or latest != current.version) and latest not in self._failed:
+                logger.info(f"New model version available: {latest}")
+                return self.activate(latest)
+        return self.refresh_threshold()
+
+    def pin(self, version: str) -> ModelHandle:
+        """
+        Serve a specific version until unpinned; background polling stops swapping
+
+        Args:
+            version: Version id (a recent previous version is swapped back instantly)
+
+        Returns:
+            The live handle
+        """
+        with self._lock:
+            self._failed.pop(version, None)
+            warm = next((h for h in self._history if h.version == version), None)
+            if warm is not None and (self._current is None or self._current.version != version):
+                self._swap(warm)
+                # The warm handle kept the threshold it was loaded with
+                self.refresh_threshold()
+            elif warm is None:
+                self.activate(version)
+            self._pinned = version
+            return self._current
+
+    def unpin(self):
+        """Resume following the newest version on the next poll"""
+        with self._lock:
+            self._pinned = None
+            self._failed.clear()
+
+    def rollback(self) -> ModelHandle:
+        """
+        Swap back to the previously served version and pin it
+
+        Returns:
+            The live handle
+        """
+        with self._lock:
+            if not self._history:
+                raise RuntimeError("No previous model version to roll back to")
+            return self.pin(self._history[-1].version)
+
+    def _poll_loop(self):
+        while not self._stop.wait(self.poll_interval_s):
+            try:
+                self.poll()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                logger.warning(f"Model poll failed: {e}")
+
+    def start(self):
+        """Start background polling"""
+        if self.poll_interval_s <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._poll_loop, name="model-manager", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Stop background polling and release shared parameter leases"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        if self.shared_store is not None:
+            namespace = self.source.shared_namespace
+            for handle in [self._current] + self._history:
+                if handle is not None and handle.segment:
+                    self.shared_store.release(namespace, handle.segment)
+
+    def status(self) -> Dict[str, Any]:
+        """Active version, load timings, pin state and rollback candidates"""
+        current = self._current
+        return {
+            "active": current.info() if current is not None else None,
+            "pinned": self._pinned,
+            "previous": [h.info() for h in reversed(self._history)],
+            "swaps": self.swaps,
+            "polling": self._thread is not None and self._thread.is_alive(),
+            "poll_interval_s": self.poll_interval_s,
+            "last_poll": self.last_poll,
+            "last_error": self.last_error,
+            "failed_versions": dict(self._failed),
+            "shared_segments": (self.shared_store.stats(self.source.shared_namespace)
+                                if self.shared_store is not None else None),
+        }
@@ -0,0 +1,345 @@
+"""
+Batch prediction
+Out-of-core scoring of Parquet/CSV inputs sharded across a process pool
+
+Input is split into shards (Parquet row groups, or fixed-size CSV chunks). Each worker
+process loads the model once and writes the shard's scores into a hive-partitioned
+output dataset (event_date=YYYY-MM-DD/part-<shard>.parquet). Files appear atomically and
+a shard is marked done once all its files are written, so a rerun after a crash skips
+finished shards and rewrites the same files for the rest.
+"""
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import json
+import logging
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.models.inference import DEFAULT_THRESHOLD, FEATURE_COLUMNS, FraudScorer, load_model
+
+logger = logging.getLogger(__name__)
+
+# Input columns copied to the output when present
+DEFAULT_PASSTHROUGH_COLUMNS = ["trans_num", "cc_num", "timestamp"]
+
+MANIFEST_NAME = "_manifest.json"
+SUCCESS_NAME = "_SUCCESS"
+# Per-shard completion markers; a leading underscore keeps readers out of the directory
+DONE_DIR = "_done"
+
+# Output partition column derived from the timestamp column, and the value for rows without one
+EVENT_DATE = "event_date"
+DEFAULT_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+
+@dataclass
+class Shard:
+    """A unit of work: row groups of one Parquet file, or one chunk of a CSV"""
+    shard_id: int
+    path: str
+    row_groups: Optional[List[int]] = None  # Parquet only
+    rows: Optional[int] = None              # Known up front for Parquet
+
+    @property
+    def output_name(self) -> str:
+        return f"part-{self.shard_id:06d}.parquet"
+
+    @property
+    def marker_name(self) -> str:
+        return f"part-{self.shard_id:06d}.done"
+
+
+def _parquet_files(path: str) -> List[str]:
+    """Data files of a Parquet file or (hive-partitioned) directory, in a stable order"""
+    root = Path(path)
+    if root.is_file():
+        return [str(root)]
+    return sorted(
+        str(p) for p in root.rglob("*.parquet")
+        if p.is_file() and not any(part.startswith(("_", ".")) for part in p.relative_to(root).parts)
+    )
+
+
+def plan_parquet_shards(path: str, row_groups_per_shard: int = 1) -> List[Shard]:
+    """
+    Split a Parquet input into shards using file metadata only
+
+    Args:
+        path: Parquet file or dataset directory
+        row_groups_per_shard: Consecutive row groups scored together
+
+    Returns:
+        Shards in a deterministic order
+    """
+    shards = []
+    for file in _parquet_files(path):
+        metadata = pq.ParquetFile(file).metadata
+        for start in range(0, metadata.num_row_groups, row_groups_per_shard):
+            groups = list(range(start, min(start + row_groups_per_shard, metadata.num_row_groups)))
+            rows = sum(metadata.row_group(i).num_rows for i in groups)
+            shards.append(Shard(len(shards), file, groups, rows))
+    return shards
+
+
+def iter_csv_shards(path: str, chunksize: int) -> Iterator[Tuple[Shard, pd.DataFrame]]:
+    """
+    Stream a CSV as chunk-sized shards
+
+    Args:
+        path: CSV file
+        chunksize: Rows per shard
+
+    Yields:
+        (shard, chunk) pairs
+    """
+    with pd.read_csv(path, chunksize=chunksize) as reader:
+        for i, chunk in enumerate(reader):
+            yield Shard(i, path, rows=len(chunk)), chunk
+
+
+# Per-process state set by _init_worker
+_worker_scorer: Optional[FraudScorer] = None
+_worker_encoders = None
+_worker_settings: Dict[str, Any] = {}
+
+
+def _init_worker(model_uri: str, threshold: float, settings: Dict[str, Any]):
+    """Load the model (and encoders, if any) once per worker process"""
+    global _worker_scorer, _worker_encoders, _worker_settings
+    _worker_scorer = FraudScorer(load_model(model_uri), threshold=threshold)
+    if settings.get("encoders_path"):
+        from src.data.batch.preprocessing import CategoricalEncoders
+        _worker_encoders = CategoricalEncoders.load(settings["encoders_path"])
+    _worker_settings = settings
+
+
+def score_frame(
+    df: pd.DataFrame,
+    scorer: FraudScorer,
+    model_version: str,
+    passthrough: List[str],
+    encoders=None
+) -> pd.DataFrame:
+    """
+    Score a DataFrame of transactions
+
+    Args:
+        df: Transactions with FEATURE_COLUMNS, or raw columns when encoders is given
+        scorer: Scorer to use
+        model_version: Version label written with every score
+        passthrough: Input columns to copy to the output when present
+        encoders: Optional CategoricalEncoders for raw categorical inputs
+
+    Returns:
+        DataFrame with passthrough columns, fraud_probability, is_fraud and model_version
+    """
+    if encoders is not None and not set(FEATURE_COLUMNS) <= set(df.columns):
+        df = encoders.transform(df)
+    features = np.ascontiguousarray(df[FEATURE_COLUMNS].to_numpy(dtype=np.float64))
+    is_fraud, probabilities = scorer.score(features)
+    out = df[[column for column in passthrough if column in df.columns]].reset_index(drop=True)
+    out["fraud_probability"] = probabilities
+    out["is_fraud"] = is_fraud
+    out["model_version"] = model_version
+    return out
+
+
+def _write_atomic(df: pd.DataFrame, path: Path, compression: str):
+    """Write a Parquet file under a temporary name, then rename it into place"""
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp, compression=compression)
+    os.replace(tmp, path)
+
+
+def event_dates(df: pd.DataFrame, timestamp_column: str = "timestamp") -> pd.Series:
+    """UTC event date (YYYY-MM-DD) of every row; DEFAULT_PARTITION without a timestamp"""
+    if timestamp_column not in df.columns:
+        return pd.Series(DEFAULT_PARTITION, index=df.index)
+    dates = pd.to_datetime(df[timestamp_column], utc=True).dt.strftime("%Y-%m-%d")
+    return dates.fillna(DEFAULT_PARTITION)
+
+
+def _write_shard(scored: pd.DataFrame, shard: Shard, output_dir: Path, partition_by: Optional[str],
+                 compression: str):
+    """Write a shard's scores (one file per partition) and then its completion marker"""
+    if partition_by is None:
+        _write_atomic(scored, output_dir / shard.output_name, compression)
+    else:
+        for value, rows in scored.groupby(event_dates(scored), sort=True):
+            directory = output_dir / f"{partition_by}={value}"
+            directory.mkdir(exist_ok=True)
+            _write_atomic(rows, directory / shard.output_name, compression)
+    (output_dir / DONE_DIR / shard.marker_name).touch()
+
+
+def _score_shard(shard: Shard, chunk: Optional[pd.DataFrame] = None) -> Tuple[int, int, float]:
+    """
+    Score one shard in a worker and write its output file
+
+    Returns:
+        (shard_id, rows, seconds)
+    """
+    start = time.perf_counter()
+    settings = _worker_settings
+    if chunk is None:
+        columns = FEATURE_COLUMNS + settings["passthrough"]
+        if _worker_encoders is not None:
+            columns += list(_worker_encoders.classes)
+        parquet = pq.ParquetFile(shard.path)
+        available = set(parquet.schema_arrow.names)
+        chunk = parquet.read_row_groups(shard.row_groups, columns=[c for c in columns if c in available]).to_pandas()
+    scored = score_frame(chunk, _worker_scorer, settings["model_version"], settings["passthrough"], _worker_encoders)
+    _write_shard(scored, shard, Path(settings["output_dir"]), settings["partition_by"], settings["compression"])
+    return shard.shard_id, len(scored), time.perf_counter() - start
+
+
+class BatchPredictor:
+    """Shards an input dataset across worker processes and writes scores to Parquet"""
+
+    def __init__(
+        self,
+        model_uri: str,
+        output_dir: str,
+        model_version: str = "unknown",
+        threshold: float = DEFAULT_THRESHOLD,
+        workers: Optional[int] = None,
+        chunksize: int = 250_000,
+        row_groups_per_shard: int = 1,
+        compression: str = "zstd",
+        passthrough: Optional[List[str]] = None,
+        encoders_path: Optional[str] = None,
+        partition_by: Optional[str] = EVENT_DATE
+    ):
+        """
+        Initialize the predictor
+
+        Args:
+            model_uri: Model to load in every worker (see load_model)
+            output_dir: Output dataset directory
+            model_version: Version label written with every score
+            threshold: Decision threshold for is_fraud
+            workers: Worker processes. Defaults to the CPU count
+            chunksize: Rows per shard for CSV inputs
+            row_groups_per_shard: Row groups per shard for Parquet inputs
+            compression: Output Parquet compression codec
+            passthrough: Input columns copied to the output. Defaults to DEFAULT_PASSTHROUGH_COLUMNS
+            encoders_path: CategoricalEncoders JSON for inputs with raw categorical columns
+            partition_by: Hive partition column of the output, holding the UTC date of the
+                timestamp column. None writes flat part files
+        """
+        self.model_uri = model_uri
+        self.output_dir = Path(output_dir)
+        self.model_version = model_version
+        self.threshold = threshold
+        self.workers = workers or os.cpu_count() or 1
+        self.chunksize = chunksize
+        self.row_groups_per_shard = row_groups_per_shard
+        self.compression = compression
+        self.passthrough = list(passthrough or DEFAULT_PASSTHROUGH_COLUMNS)
+        self.encoders_path = encoders_path
+        self.partition_by = partition_by
+
+    def _check_manifest(self, input_path: str, overwrite: bool):
+        """Refuse to resume into output written for a different input, model or sharding"""
+        manifest = {
+            "input": str(Path(input_path).resolve()),
+            "model_uri": self.model_uri,
+            "model_version": self.model_version,
+            "threshold": self.threshold,
+            "chunksize": self.chunksize,
+            "row_groups_per_shard": self.row_groups_per_shard,
+            "partition_by": self.partition_by,
+        }
+        path = self.output_dir / MANIFEST_NAME
+        if path.exists() and not overwrite:
+            existing = json.loads(path.read_text())
+            if existing != manifest:
+                raise ValueError(f"{self.output_dir} holds output from a different run "
+                                 f"({existing}); use a new output directory or overwrite")
+        if overwrite:
+            for file in self.output_dir.rglob("part-*.parquet"):
+                file.unlink()
+            for marker in (self.output_dir / DONE_DIR).glob("part-*.done"):
+                marker.unlink()
+            (self.output_dir / SUCCESS_NAME).unlink(missing_ok=True)
+        path.write_text(json.dumps(manifest, indent=2))
+
+    def run(self, input_path: str, overwrite: bool = False) -> Dict[str, Any]:
+        """
+        Score every shard of the input that has no output yet
+
+        Args:
+            input_path: Parquet file/directory or CSV file
+            overwrite: Discard existing output instead of resuming
+
+        Returns:
+            Summary with shard and row counts, elapsed seconds and rows/sec
+        """
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self._check_manifest(input_path, overwrite)
+        (self.output_dir / DONE_DIR).mkdir(exist_ok=True)
+        done = {p.name for p in (self.output_dir / DONE_DIR).glob("part-*.done")}
+        is_csv = Path(input_path).suffix.lower() in (".csv", ".gz")
+
+        if is_csv:
+            shards = iter_csv_shards(input_path, self.chunksize)
+        else:
+            shards = ((shard, None) for shard in plan_parquet_shards(input_path, self.row_groups_per_shard))
+
+        settings = {
+            "output_dir": str(self.output_dir),
+            "model_version": self.model_version,
+            "passthrough": self.passthrough,
+            "compression": self.compression,
+            "encoders_path": self.encoders_path,
+            "partition_by": self.partition_by,
+        }
+        summary = {"shards": 0, "skipped": 0, "rows": 0}
+        start = last_report = time.perf_counter()
+        # Bound in-flight shards so CSV chunks waiting for a worker cannot pile up in memory
+        max_pending = self.workers * 2
+        with ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(self.model_uri, self.threshold, settings),
+        ) as pool:
+            pending = set()
+
+            def drain(block: bool):
+                nonlocal last_report
+                finished, _ = wait(pending, timeout=None if block else 0, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    pending.discard(future)
+                    _, rows, _ = future.result()
+                    summary["shards"] += 1
+                    summary["rows"] += rows
+                now = time.perf_counter()
+                if now - last_report >= 10:
+                    last_report = now
+                    logger.info(f"{summary['shards']} shards, {summary['rows']:,} rows "
+                                f"({summary['rows'] / (now - start):,.0f} rows/s)")
+
+            for shard, chunk in shards:
+                if shard.marker_name in done:
+                    summary["skipped"] += 1
+                    continue
+                while len(pending) >= max_pending:
+                    drain(block=True)
+                pending.add(pool.submit(_score_shard, shard, chunk))
+            while pending:
+                drain(block=True)
+
+        elapsed = time.perf_counter() - start
+        (self.output_dir / SUCCESS_NAME).touch()
+        summary.update(elapsed_s=elapsed, rows_per_sec=summary["rows"] / max(elapsed, 1e-9))
+        logger.info(f"Scored {summary['rows']:,} rows in {summary['shards']} shards "
+                    f"({summary['skipped']} already done) in {elapsed:.1f}s "
+                    f"({summary['rows_per_sec']:,.0f} rows/s)")
+        return summary
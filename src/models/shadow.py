@@ -0,0 +1,413 @@
+"""
+Shadow scoring
+Challenger models scored off the request path, logged next to the champion's scores
+
+Requests are answered by the champion as usual; ShadowScorer.submit() then hands the
+scored rows to a bounded in-memory queue without waiting. A dispatcher thread drains the
+queue into batches and sends them to a separate (niced) worker process, which loads the
+challenger models once, scores every batch with each of them and appends the
+champion/challenger probability pairs to a ShadowLog. Challenger scoring therefore never
+holds the serving process's GIL or delays a response; when the worker falls behind, the
+queue fills and further rows are dropped (shed) and counted instead of buffered.
+
+The log is a directory of Arrow IPC stream files with one row per (transaction,
+challenger); read_shadow_log() loads it for offline comparison.
+"""
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import logging
+import multiprocessing
+import os
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+LOG_SCHEMA_FIELDS = [
+    ("ts", "timestamp"),
+    ("trans_num", "string"),
+    ("champion_version", "string"),
+    ("champion_probability", "float64"),
+    ("challenger_version", "string"),
+    ("challenger_probability", "float64"),
+]
+SEGMENT_PREFIX = "shadow-"
+SEGMENT_SUFFIX = ".arrow"
+
+
+def _log_schema():
+    import pyarrow as pa
+    types = {"timestamp": pa.timestamp("ms", tz="UTC"), "string": pa.string(), "float64": pa.float64()}
+    return pa.schema([(name, types[kind]) for name, kind in LOG_SCHEMA_FIELDS])
+
+
+class ShadowLog:
+    """Append-only columnar log of champion/challenger score pairs
+
+    Rows go to Arrow IPC stream files ('shadow-<start time>-<pid>-<n>.arrow'), one record
+    batch per append, written through to the OS so a crash loses at most the batch being
+    written. A new file is started every max_rows_per_file rows; files are never rewritten.
+    """
+
+    def __init__(self, directory: str, max_rows_per_file: int = 1_000_000):
+        """
+        Initialize the log
+
+        Args:
+            directory: Directory for the segment files (created if missing)
+            max_rows_per_file: Rows per segment before the next one is started
+        """
+        self.directory = Path(directory)
+        self.max_rows_per_file = max_rows_per_file
+        self.schema = _log_schema()
+        self._sink = None
+        self._writer = None
+        self._rows_in_file = 0
+        self._segments = 0
+
+    def _open_segment(self):
+        import pyarrow as pa
+        self.directory.mkdir(parents=True, exist_ok=True)
+        started = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        self._segments += 1
+        path = self.directory / f"{SEGMENT_PREFIX}{started}-{os.getpid()}-{self._segments}{SEGMENT_SUFFIX}"
+        self._sink = pa.OSFile(str(path), "wb")
+        self._writer = pa.ipc.new_stream(self._sink, self.schema)
+        self._rows_in_file = 0
+        logger.info(f"Shadow log segment {path}")
+
+    def append(self, columns: Dict[str, Any]):
+        """
+        Append rows
+
+        Args:
+            columns: Column name -> values for every field of the log schema
+        """
+        import pyarrow as pa
+        batch = pa.RecordBatch.from_arrays(
+            [pa.array(columns[field.name], type=field.type) for field in self.schema], schema=self.schema
+        )
+        if self._writer is None or self._rows_in_file >= self.max_rows_per_file:
+            self.close()
+            self._open_segment()
+        self._writer.write_batch(batch)
+        self._sink.flush()
+        self._rows_in_file += batch.num_rows
+
+    def close(self):
+        """Finish the current segment (the next append starts a new one)"""
+        if self._writer is not None:
+            self._writer.close()
+            self._sink.close()
+            self._writer = self._sink = None
+
+
+def read_shadow_log(directory: str):
+    """
+    Read every segment of a shadow log into one Arrow table
+
+    A segment still being written (or cut short by a crash) contributes the record
+    batches that were completely written.
+
+    Args:
+        directory: ShadowLog directory
+
+    Returns:
+        pyarrow.Table with the log schema, ordered by segment file name
+    """
+    import pyarrow as pa
+    batches = []
+    for path in sorted(Path(directory).glob(f"{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}")):
+        try:
+            reader = pa.ipc.open_stream(pa.memory_map(str(path)))
+        except (pa.ArrowInvalid, OSError) as e:
+            logger.warning(f"Skipping unreadable shadow log segment {path}: {e}")
+            continue
+        while True:
+            try:
+                batches.append(reader.read_next_batch())
+            except StopIteration:
+                break
+            except (pa.ArrowInvalid, OSError):
+                logger.warning(f"Shadow log segment {path} ends in a partial batch")
+                break
+    return pa.Table.from_batches(batches, schema=_log_schema())
+
+
+def _shadow_worker(conn, challengers: List[Tuple[str, str]], settings: Dict[str, Any]):
+    """Worker process: load the challengers, then score and log batches until told to stop"""
+    logging.basicConfig(level=logging.INFO)
+    try:
+        # Leave the CPU to the serving processes whenever they want it: SCHED_IDLE only runs
+        # on otherwise idle cores; a lower nice value is the fallback elsewhere
+        os.sched_setscheduler(0, os.SCHED_IDLE, os.sched_param(0))
+    except (AttributeError, OSError):
+        try:
+            os.nice(settings["niceness"])
+        except (AttributeError, OSError):
+            pass
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(1)
+        if settings.get("tracking_uri"):
+            import mlflow
+            mlflow.set_tracking_uri(settings["tracking_uri"])
+        from src.models.inference import FraudScorer, load_model
+        scorers = [(label, FraudScorer(load_model(uri))) for label, uri in challengers]
+        log = ShadowLog(settings["log_dir"], settings["max_rows_per_file"])
+    except Exception as e:
+        conn.send(("error", f"{type(e).__name__}: {e}"))
+        return
+    conn.send(("ready", [label for label, _ in scorers]))
+
+    while True:
+        batch = conn.recv()
+        if batch is None:
+            break
+        timestamps, trans_nums, features, champion_versions, champion_probabilities = batch
+        try:
+            columns = {name: [] for name, _ in LOG_SCHEMA_FIELDS}
+            for label, scorer in scorers:
+                columns["challenger_probability"].append(scorer.predict_proba(features))
+                columns["challenger_version"].append(np.full(len(features), label, dtype=object))
+            k = len(scorers)
+            log.append({
+                "ts": np.tile(timestamps, k),
+                "trans_num": trans_nums * k,
+                "champion_version": np.tile(champion_versions, k),
+                "champion_probability": np.tile(champion_probabilities, k),
+                "challenger_version": np.concatenate(columns["challenger_version"]),
+                "challenger_probability": np.concatenate(columns["challenger_probability"]),
+            })
+            conn.send(("ok", len(features)))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+    log.close()
+
+
+class ShadowScorer:
+    """Scores challenger models on the traffic the champion serves, without slowing it down
+
+    submit() only appends to a bounded queue; batching, the hand-off to the worker
+    process and logging happen on a dispatcher thread, with one batch in flight at a time.
+    """
+
+    def __init__(
+        self,
+        challengers: Sequence[Tuple[str, str]],
+        log_dir: str,
+        max_queue_rows: int = 20_000,
+        batch_size: int = 512,
+        max_wait_ms: float = 50.0,
+        max_rows_per_file: int = 1_000_000,
+        tracking_uri: Optional[str] = None,
+        niceness: int = 10,
+    ):
+        """
+        Initialize the scorer
+
+        Args:
+            challengers: (version label, model URI) of every challenger (see load_model)
+            log_dir: ShadowLog directory
+            max_queue_rows: Rows waiting for the worker beyond which new rows are shed
+            batch_size: Rows sent to the worker as soon as this many are queued
+            max_wait_ms: Longest a queued row waits for the batch to fill
+            max_rows_per_file: Rows per shadow log segment
+            tracking_uri: MLflow tracking URI for registry URIs. None keeps the default
+            niceness: Scheduling priority decrease of the worker process
+        """
+        if not challengers:
+            raise ValueError("ShadowScorer needs at least one challenger")
+        self.challengers = [(str(label), str(uri)) for label, uri in challengers]
+        self.max_queue_rows = max_queue_rows
+        self.batch_size = batch_size
+        self.max_wait_s = max_wait_ms / 1000.0
+        self._settings = {
+            "log_dir": str(log_dir),
+            "max_rows_per_file": max_rows_per_file,
+            "tracking_uri": tracking_uri,
+            "niceness": niceness,
+        }
+        self._queue: deque = deque()
+        self._queued_rows = 0
+        self._condition = threading.Condition()
+        self._stopping = False
+        self._accepting = False
+        self._thread: Optional[threading.Thread] = None
+        self._process = None
+        self._conn = None
+        self._stats = {"submitted": 0, "shed": 0, "scored": 0, "failed": 0, "batches": 0}
+        self.state = "stopped"
+        self.error: Optional[str] = None
+
+    def submit(self, trans_nums: Sequence[str], features: np.ndarray, probabilities: np.ndarray,
+               champion_version: str) -> bool:
+        """
+        Queue champion-scored rows for the challengers (never blocks)
+
+        Args:
+            trans_nums: Transaction ids, one per row (a list or an Arrow string array)
+            features: (n, k) matrix the champion scored
+            probabilities: Champion fraud probabilities
+            champion_version: Champion version label
+
+        Returns:
+            Whether the rows were queued; False means they were shed
+        """
+        n = len(features)
+        item = (time.time(), trans_nums, features, probabilities, champion_version)
+        with self._condition:
+            if not self._accepting or self._queued_rows + n > self.max_queue_rows:
+                self._stats["shed"] += n
+                return False
+            self._queue.append(item)
+            self._queued_rows += n
+            self._stats["submitted"] += n
+            if self._queued_rows >= self.batch_size or len(self._queue) == 1:
+                self._condition.notify()
+        return True
+
+    def _next_batch(self) -> Optional[List[tuple]]:
+        """Wait for queued rows and take up to batch_size of them (None once stopped and drained)"""
+        with self._condition:
+            while not self._queue:
+                if self._stopping:
+                    return None
+                self._condition.wait()
+            deadline = self._queue[0][0] + self.max_wait_s
+            while self._queued_rows < self.batch_size and not self._stopping:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            items, rows = [], 0
+            while self._queue and (not items or rows + len(self._queue[0][2]) <= self.batch_size):
+                item = self._queue.popleft()
+                items.append(item)
+                rows += len(item[2])
+            self._queued_rows -= rows
+        return items
+
+    @staticmethod
+    def _to_message(items: List[tuple]) -> tuple:
+        timestamps, trans_nums, champion_versions = [], [], []
+        for ts, ids, features, _, version in items:
+            ids = ids.to_pylist() if hasattr(ids, "to_pylist") else list(ids)
+            trans_nums.extend(ids)
+            timestamps.append(np.full(len(features), int(ts * 1000), dtype=np.int64))
+            champion_versions.append(np.full(len(features), version, dtype=object))
+        return (
+            np.concatenate(timestamps).astype("datetime64[ms]"),
+            trans_nums,
+            np.concatenate([item[2] for item in items]),
+            np.concatenate(champion_versions),
+            np.concatenate([np.asarray(item[3], dtype=np.float64) for item in items]),
+        )
+
+    def _receive(self) -> tuple:
+        """Next message from the worker, failing if the worker process exits"""
+        while not self._conn.poll(1.0):
+            if not self._process.is_alive():
+                raise RuntimeError(f"shadow worker exited with code {self._process.exitcode}")
+        return self._conn.recv()
+
+    def _fail(self, error: str):
+        with self._condition:
+            self.state, self.error = "failed", error
+            self._accepting = False
+            dropped = self._queued_rows
+            self._queue.clear()
+            self._queued_rows = 0
+            self._stats["failed"] += dropped
+        logger.error(f"❌ Shadow scoring stopped: {error}")
+
+    def _run(self):
+        try:
+            status, detail = self._receive()
+        except (RuntimeError, EOFError, OSError) as e:
+            status, detail = "error", str(e)
+        if status != "ready":
+            self._fail(f"could not load challengers: {detail}")
+            return
+        with self._condition:
+            self.state = "running"
+        logger.info(f"✅ Shadow scoring {', '.join(detail)}")
+
+        while True:
+            items = self._next_batch()
+            if items is None:
+                break
+            rows = sum(len(item[2]) for item in items)
+            try:
+                self._conn.send(self._to_message(items))
+                status, detail = self._receive()
+            except (RuntimeError, EOFError, OSError) as e:
+                with self._condition:
+                    self._stats["failed"] += rows
+                self._fail(str(e))
+                return
+            with self._condition:
+                if status == "ok":
+                    self._stats["scored"] += rows
+                    self._stats["batches"] += 1
+                else:
+                    self._stats["failed"] += rows
+            if status != "ok":
+                logger.warning(f"Shadow batch of {rows} rows failed: {detail}")
+        try:
+            self._conn.send(None)
+        except OSError:
+            pass
+
+    def start(self):
+        """Start the worker process and dispatcher thread; challengers load in the background"""
+        if self._thread is not None:
+            return
+        context = multiprocessing.get_context("spawn")
+        self._conn, child_conn = context.Pipe()
+        self._process = context.Process(
+            target=_shadow_worker, args=(child_conn, self.challengers, self._settings),
+            name="shadow-scorer", daemon=True,
+        )
+        self._process.start()
+        child_conn.close()
+        with self._condition:
+            self._stopping = False
+            self._accepting = True
+            self.state = "loading"
+        self._thread = threading.Thread(target=self._run, name="shadow-dispatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Stop accepting rows, send what is queued if time allows, and stop the worker"""
+        if self._thread is None:
+            return
+        with self._condition:
+            self._accepting = False
+            self._stopping = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+        self._process.join(max(timeout - 1.0, 0.5))
+        if self._process.is_alive():
+            self._process.terminate()
+            self._process.join(1.0)
+        self._conn.close()
+        self._thread = None
+        with self._condition:
+            if self.state != "failed":
+                self.state = "stopped"
+
+    def stats(self) -> Dict[str, Any]:
+        """Row counts (submitted, shed, scored, failed), batches, queued rows and state"""
+        with self._condition:
+            return {
+                **self._stats,
+                "queued": self._queued_rows,
+                "state": self.state,
+                "error": self.error,
+                "challengers": [label for label, _ in self.challengers],
+            }
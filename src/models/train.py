@@ -0,0 +1,561 @@
+"""
+Model training
+Hyperparameter and model-family search over time-ordered CV folds, in parallel
+
+The training set is read from Parquet straight into compact NumPy arrays (float32
+features, int8 labels) sorted by event time. Negatives can be downsampled with
+weight correction: kept negatives get weight 1 / rate, so the weighted class
+balance - and the fitted probabilities - match the full data.
+
+Fold boundaries and the downsampling mask are computed once. The arrays are written
+to a scratch directory as .npy files that every worker process memory-maps, so
+candidates share one copy of the data in the page cache instead of each worker
+unpickling its own. Trials are logged to MLflow from the parent process as they
+finish; the best candidate is refit on all rows and registered.
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+import itertools
+import json
+import logging
+import os
+import random
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from src.models.inference import FEATURE_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+LABEL_COLUMN = "is_fraud"
+TIMESTAMP_COLUMN = "timestamp"
+
+# Fixed estimator settings per model family; searched parameters are merged over these.
+# Estimators stay single-threaded: parallelism comes from running trials side by side,
+# and serving scores one small batch at a time.
+MODEL_FAMILIES = {
+    "logistic": ("sklearn.linear_model", "LogisticRegression",
+                 {"max_iter": 1000, "solver": "lbfgs"}),
+    "random_forest": ("sklearn.ensemble", "RandomForestClassifier", {"n_jobs": 1}),
+    "gradient_boosting": ("sklearn.ensemble", "GradientBoostingClassifier", {}),
+    "hist_gradient_boosting": ("sklearn.ensemble", "HistGradientBoostingClassifier",
+                               {"early_stopping": False}),
+}
+
+# Metrics computed on every validation fold; the search ranks by one of them
+SCORING_METRICS = ("average_precision", "roc_auc", "log_loss")
+
+
+@dataclass
+class TrainingData:
+    """Training rows sorted by event time"""
+    features: np.ndarray    # (n, k) float32, C-contiguous
+    labels: np.ndarray      # (n,) int8
+    timestamps: np.ndarray  # (n,) int64 nanoseconds since the epoch (UTC)
+    columns: List[str] = field(default_factory=lambda: list(FEATURE_COLUMNS))
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    @property
+    def nbytes(self) -> int:
+        return self.features.nbytes + self.labels.nbytes + self.timestamps.nbytes
+
+
+@dataclass
+class Fold:
+    """One expanding-window split of the time-sorted rows: train on [0, train_end), validate on [val_start, val_end)"""
+    train_end: int
+    val_start: int
+    val_end: int
+
+
+@dataclass
+class Candidate:
+    """A model family and one point of its parameter grid"""
+    trial_id: int
+    family: str
+    params: Dict[str, Any]
+
+    @property
+    def name(self) -> str:
+        settings = ",".join(f"{k}={v}" for k, v in sorted(self.params.items()))
+        return f"{self.family}[{settings}]"
+
+
+def load_training_data(
+    path: str,
+    columns: Optional[List[str]] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None
+) -> TrainingData:
+    """
+    Read a Parquet file or (month-partitioned) dataset into compact arrays
+
+    Only the feature, label and timestamp columns are read, and values are cast in
+    Arrow before conversion, so the pandas/float64 copy of the table is never built.
+
+    Args:
+        path: Parquet file or dataset directory (prepare_feast_data.py output)
+        columns: Feature columns, in model order. Defaults to FEATURE_COLUMNS
+        start: Keep rows at or after this timestamp (ISO format, UTC)
+        end: Keep rows before this timestamp (ISO format, UTC)
+
+    Returns:
+        TrainingData sorted by timestamp
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+
+    columns = list(columns or FEATURE_COLUMNS)
+    dataset = ds.dataset(path, format="parquet", partitioning="hive")
+    filters = []
+    if start is not None:
+        filters.append(ds.field(TIMESTAMP_COLUMN) >= pa.scalar(_timestamp(start), pa.timestamp("ns", "UTC")))
+    if end is not None:
+        filters.append(ds.field(TIMESTAMP_COLUMN) < pa.scalar(_timestamp(end), pa.timestamp("ns", "UTC")))
+    expression = None
+    for condition in filters:
+        expression = condition if expression is None else expression & condition
+    table = dataset.to_table(columns=columns + [LABEL_COLUMN, TIMESTAMP_COLUMN], filter=expression)
+
+    timestamps = pc.cast(table[TIMESTAMP_COLUMN], pa.timestamp("ns", "UTC")).to_numpy().view(np.int64)
+    order = np.argsort(timestamps, kind="stable")
+    features = np.empty((table.num_rows, len(columns)), dtype=np.float32)
+    for i, name in enumerate(columns):
+        # Unsafe cast: integers above 2**24 (e.g. city_pop) round to the nearest float32
+        features[:, i] = pc.cast(table[name], pa.float32(), safe=False).to_numpy()[order]
+    labels = pc.cast(table[LABEL_COLUMN], pa.int8()).to_numpy()[order]
+    data = TrainingData(features, labels, timestamps[order], columns)
+    logger.info(f"Loaded {len(data):,} rows ({data.nbytes / 2**20:.1f} MiB, "
+                f"fraud rate {labels.mean() if len(labels) else 0:.4%}) from {path}")
+    return data
+
+
+def _timestamp(value: str) -> int:
+    """ISO timestamp (naive values are UTC) as nanoseconds since the epoch"""
+    import pandas as pd
+
+    ts = pd.Timestamp(value)
+    return (ts.tz_localize("UTC") if ts.tzinfo is None else ts).value
+
+
+def downsample_negatives(labels: np.ndarray, rate: float, seed: int = 42) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Keep every fraud row and a random fraction of legitimate rows
+
+    Args:
+        labels: Binary labels
+        rate: Fraction of negatives kept (1.0 keeps everything)
+        seed: Random seed; the same seed keeps the same rows
+
+    Returns:
+        (keep mask, sample weights) - weights are 1 / rate for negatives and 1 for positives
+    """
+    if not 0 < rate <= 1:
+        raise ValueError(f"Negative sample rate must be in (0, 1], got {rate}")
+    positive = labels == 1
+    if rate == 1:
+        return np.ones(len(labels), dtype=bool), np.ones(len(labels), dtype=np.float32)
+    rng = np.random.default_rng(seed)
+    keep = positive | (rng.random(len(labels)) < rate)
+    weights = np.where(positive, 1.0, 1.0 / rate).astype(np.float32)
+    return keep, weights
+
+
+def time_series_folds(n_rows: int, n_splits: int = 4, gap: int = 0) -> List[Fold]:
+    """
+    Expanding-window folds over time-sorted rows (sklearn's TimeSeriesSplit layout)
+
+    Args:
+        n_rows: Number of rows
+        n_splits: Number of folds
+        gap: Rows skipped between the end of training and the start of validation
+
+    Returns:
+        Folds, earliest validation window first
+    """
+    from sklearn.model_selection import TimeSeriesSplit
+
+    folds = []
+    for train, val in TimeSeriesSplit(n_splits=n_splits, gap=gap).split(np.empty((n_rows, 1))):
+        folds.append(Fold(int(train[-1]) + 1, int(val[0]), int(val[-1]) + 1))
+    return folds
+
+
+def build_candidates(
+    search_space: Dict[str, Dict[str, List[Any]]],
+    max_candidates: Optional[int] = None,
+    seed: int = 42
+) -> List[Candidate]:
+    """
+    Expand per-family parameter grids into candidates
+
+    Args:
+        search_space: {family: {param: [values]}} (the search section of model_params.yaml)
+        max_candidates: Random subset size when the full grid is larger
+        seed: Seed for the random subset
+
+    Returns:
+        Candidates with sequential trial ids
+    """
+    points = []
+    for family, grid in search_space.items():
+        if family not in MODEL_FAMILIES:
+            raise ValueError(f"Unknown model family: {family} (expected one of {sorted(MODEL_FAMILIES)})")
+        grid = grid or {}
+        names = sorted(grid)
+        for values in itertools.product(*(grid[name] if isinstance(grid[name], list) else [grid[name]]
+                                          for name in names)):
+            points.append((family, dict(zip(names, values))))
+    if max_candidates is not None and len(points) > max_candidates:
+        points = random.Random(seed).sample(points, max_candidates)
+    return [Candidate(i, family, params) for i, (family, params) in enumerate(points)]
+
+
+def create_estimator(family: str, params: Dict[str, Any], seed: int = 42):
+    """
+    Instantiate an unfitted estimator of a model family
+
+    Args:
+        family: Key of MODEL_FAMILIES
+        params: Parameters merged over the family's fixed settings
+        seed: random_state for estimators that take one
+
+    Returns:
+        sklearn estimator
+    """
+    import importlib
+
+    module, name, fixed = MODEL_FAMILIES[family]
+    cls = getattr(importlib.import_module(module), name)
+    settings = {**fixed, **params}
+    if "random_state" in cls().get_params():
+        settings.setdefault("random_state", seed)
+    return cls(**settings)
+
+
+def score_predictions(labels: np.ndarray, probabilities: np.ndarray) -> Dict[str, float]:
+    """Validation metrics (NaN when a fold holds a single class)"""
+    from sklearn.metrics import average_precision_score, log_loss, roc_auc_score
+
+    if labels.min() == labels.max():
+        return {name: float("nan") for name in SCORING_METRICS}
+    return {
+        "average_precision": float(average_precision_score(labels, probabilities)),
+        "roc_auc": float(roc_auc_score(labels, probabilities)),
+        "log_loss": float(log_loss(labels, probabilities, labels=[0, 1])),
+    }
+
+
+def _reset_peak_rss() -> bool:
+    """Reset the process's resident-set high-water mark (Linux); False where unsupported"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb() -> float:
+    """Resident-set high-water mark of this process in MiB"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# Worker state, set once per process by _init_worker
+_worker_arrays: Dict[str, np.ndarray] = {}
+_worker_folds: List[Fold] = []
+_worker_seed = 42
+
+
+def _init_worker(data_dir: str, folds: List[Fold], seed: int):
+    """Memory-map the shared arrays and pin BLAS/OpenMP pools to one thread"""
+    global _worker_folds, _worker_seed
+    from threadpoolctl import threadpool_limits
+
+    threadpool_limits(1)
+    for name in ("features", "labels", "keep", "weights"):
+        _worker_arrays[name] = np.load(os.path.join(data_dir, f"{name}.npy"), mmap_mode="r")
+    _worker_folds = folds
+    _worker_seed = seed
+
+
+def _run_trial(candidate: Candidate) -> Dict[str, Any]:
+    """Fit and score one candidate on every fold"""
+    return evaluate_candidate(candidate, _worker_arrays, _worker_folds, _worker_seed)
+
+
+def evaluate_candidate(
+    candidate: Candidate,
+    arrays: Dict[str, np.ndarray],
+    folds: List[Fold],
+    seed: int = 42
+) -> Dict[str, Any]:
+    """
+    Cross-validate one candidate
+
+    Training rows are the kept rows of each fold's window, weighted to undo the
+    downsampling; validation rows are the whole next window, at the natural fraud rate.
+
+    Args:
+        candidate: Model family and parameters
+        arrays: features, labels, keep (downsampling mask) and weights arrays
+        folds: Shared fold boundaries
+        seed: random_state for the estimators
+
+    Returns:
+        Trial result: mean and per-fold metrics, wall-clock seconds and the peak resident
+        memory of the process during the trial (since the worker started where the
+        high-water mark cannot be reset)
+    """
+    features, labels = arrays["features"], arrays["labels"]
+    keep, weights = arrays["keep"], arrays["weights"]
+    _reset_peak_rss()
+    start = time.perf_counter()
+    fold_metrics = []
+    for fold in folds:
+        train = np.flatnonzero(keep[:fold.train_end])
+        estimator = create_estimator(candidate.family, candidate.params, seed)
+        fit_start = time.perf_counter()
+        estimator.fit(features[train], labels[train], sample_weight=weights[train])
+        fit_seconds = time.perf_counter() - fit_start
+        probabilities = estimator.predict_proba(features[fold.val_start:fold.val_end])[:, 1]
+        metrics = score_predictions(np.asarray(labels[fold.val_start:fold.val_end]), probabilities)
+        metrics.update(fit_seconds=fit_seconds, train_rows=len(train))
+        fold_metrics.append(metrics)
+
+    result = {
+        "trial_id": candidate.trial_id,
+        "family": candidate.family,
+        "params": candidate.params,
+        "folds": fold_metrics,
+        "wall_seconds": time.perf_counter() - start,
+        "peak_memory_mb": _peak_rss_mb(),
+    }
+    for name in SCORING_METRICS + ("fit_seconds",):
+        values = [m[name] for m in fold_metrics if not np.isnan(m[name])]
+        result[name] = float(np.mean(values)) if values else float("nan")
+    return result
+
+
+def trusted_types(model) -> Optional[List[str]]:
+    """
+    Types MLflow's skops serializer must be told to trust to save a model fitted here
+
+    Tree ensembles store their nodes in sklearn.tree._tree.Tree, which skops refuses by
+    default. The model was fitted in this process, so whatever it references is trusted.
+    """
+    try:
+        import skops.io
+    except ImportError:
+        return None
+    return skops.io.get_untrusted_types(data=skops.io.dumps(model)) or None
+
+
+class TrainingPipeline:
+    """Searches model families and parameters in parallel, logs every trial and registers the winner"""
+
+    def __init__(
+        self,
+        search_space: Dict[str, Dict[str, List[Any]]],
+        workers: Optional[int] = None,
+        cv_splits: int = 4,
+        cv_gap: int = 0,
+        negative_sample_rate: float = 1.0,
+        scoring: str = "average_precision",
+        max_candidates: Optional[int] = None,
+        seed: int = 42,
+        model_name: str = "fraud_detector",
+        log_to_mlflow: bool = True,
+        profile_rows: int = 200_000
+    ):
+        """
+        Initialize the pipeline
+
+        Args:
+            search_space: {family: {param: [values]}} grids, see build_candidates
+            workers: Trial processes. Defaults to the CPU count
+            cv_splits: Time-ordered validation folds
+            cv_gap: Rows left out between each training window and its validation window
+            negative_sample_rate: Fraction of legitimate rows kept for fitting (weight-corrected)
+            scoring: Metric the search maximizes (log_loss is minimized)
+            max_candidates: Random subset of the grid to try. Defaults to the full grid
+            seed: Seed for downsampling, candidate sampling and estimators
+            model_name: Registered model name for the winner
+            log_to_mlflow: Log trials and register the model (needs an active tracking setup)
+            profile_rows: Rows sampled for the drift reference profile stored with the model
+        """
+        if scoring not in SCORING_METRICS:
+            raise ValueError(f"Unknown scoring metric: {scoring} (expected one of {SCORING_METRICS})")
+        self.candidates = build_candidates(search_space, max_candidates, seed)
+        if not self.candidates:
+            raise ValueError("The search space has no candidates")
+        self.workers = workers or os.cpu_count() or 1
+        self.cv_splits = cv_splits
+        self.cv_gap = cv_gap
+        self.negative_sample_rate = negative_sample_rate
+        self.scoring = scoring
+        self.seed = seed
+        self.model_name = model_name
+        self.log_to_mlflow = log_to_mlflow
+        self.profile_rows = profile_rows
+
+    def _rank_key(self, result: Dict[str, Any]) -> float:
+        value = result[self.scoring]
+        if np.isnan(value):
+            return float("-inf")
+        return -value if self.scoring == "log_loss" else value
+
+    def search(self, data: TrainingData) -> List[Dict[str, Any]]:
+        """
+        Cross-validate every candidate across the worker pool
+
+        Args:
+            data: Time-sorted training data
+
+        Returns:
+            Trial results, best first
+        """
+        folds = time_series_folds(len(data), self.cv_splits, self.cv_gap)
+        keep, weights = downsample_negatives(data.labels, self.negative_sample_rate, self.seed)
+        logger.info(f"Searching {len(self.candidates)} candidates x {len(folds)} folds on "
+                    f"{self.workers} workers ({int(keep.sum()):,} of {len(data):,} rows kept for fitting)")
+
+        data_dir = tempfile.mkdtemp(prefix="fraud-train-")
+        results = []
+        try:
+            for name, array in (("features", data.features), ("labels", data.labels),
+                                ("keep", keep), ("weights", weights)):
+                np.save(os.path.join(data_dir, f"{name}.npy"), array)
+            with ProcessPoolExecutor(
+                max_workers=min(self.workers, len(self.candidates)),
+                initializer=_init_worker,
+                initargs=(data_dir, folds, self.seed),
+            ) as pool:
+                futures = [pool.submit(_run_trial, candidate) for candidate in self.candidates]
+                for future in as_completed(futures):
+                    result = future.result()
+                    results.append(result)
+                    logger.info(f"Trial {result['trial_id']} {result['family']} {result['params']}: "
+                                f"{self.scoring}={result[self.scoring]:.4f} in {result['wall_seconds']:.1f}s, "
+                                f"peak {result['peak_memory_mb']:.1f} MiB")
+                    if self.log_to_mlflow:
+                        self._log_trial(result)
+        finally:
+            shutil.rmtree(data_dir, ignore_errors=True)
+        results.sort(key=self._rank_key, reverse=True)
+        return results
+
+    def _log_trial(self, result: Dict[str, Any]):
+        """One nested MLflow run per trial"""
+        import mlflow
+        from src.utils.mlflow_utils import log_metrics, log_model_params
+
+        with mlflow.start_run(run_name=f"trial-{result['trial_id']:03d}-{result['family']}", nested=True):
+            log_model_params({"model_family": result["family"], **result["params"]})
+            metrics = {name: result[name] for name in SCORING_METRICS + ("fit_seconds",)
+                       if not np.isnan(result[name])}
+            metrics.update(wall_seconds=result["wall_seconds"], peak_memory_mb=result["peak_memory_mb"])
+            for i, fold in enumerate(result["folds"]):
+                metrics.update({f"fold{i}_{name}": fold[name] for name in SCORING_METRICS
+                                if not np.isnan(fold[name])})
+            log_metrics(metrics)
+
+    def fit_final(self, data: TrainingData, best: Dict[str, Any]):
+        """Refit the winning candidate on every row (downsampled and weighted as in the search)"""
+        keep, weights = downsample_negatives(data.labels, self.negative_sample_rate, self.seed)
+        estimator = create_estimator(best["family"], best["params"], self.seed)
+        start = time.perf_counter()
+        estimator.fit(data.features[keep], data.labels[keep], sample_weight=weights[keep])
+        logger.info(f"Refit {best['family']} on {int(keep.sum()):,} rows in {time.perf_counter() - start:.1f}s")
+        return estimator
+
+    def run(self, data: TrainingData, run_name: str = "hyperparameter_search") -> Dict[str, Any]:
+        """
+        Search, refit the best candidate and register it
+
+        Args:
+            data: Time-sorted training data
+            run_name: Name of the parent MLflow run
+
+        Returns:
+            Summary with the ranked trials, the best trial, the fitted model and timings
+        """
+        start = time.perf_counter()
+        if not self.log_to_mlflow:
+            results = self.search(data)
+            model = self.fit_final(data, results[0])
+            return self._summary(results, model, start)
+
+        import mlflow
+        from src.utils.mlflow_utils import log_dataset_info, log_metrics, log_model_params, register_model
+
+        with mlflow.start_run(run_name=run_name) as run:
+            log_dataset_info(data.features, data.labels)
+            log_model_params({
+                "candidates": len(self.candidates),
+                "cv_splits": self.cv_splits,
+                "cv_gap": self.cv_gap,
+                "negative_sample_rate": self.negative_sample_rate,
+                "scoring": self.scoring,
+                "workers": self.workers,
+                "seed": self.seed,
+            })
+            results = self.search(data)
+            best = results[0]
+            model = self.fit_final(data, best)
+            log_model_params({f"best_{k}": v for k, v in {"model_family": best["family"], **best["params"]}.items()})
+            log_metrics({f"best_{name}": best[name] for name in SCORING_METRICS if not np.isnan(best[name])})
+            model_info = register_model(model, self.model_name, skops_trusted_types=trusted_types(model))
+            self._log_drift_profile(data, best, run.info.run_id)
+            summary = self._summary(results, model, start)
+            log_metrics({"search_seconds": summary["elapsed_s"]})
+            summary.update(run_id=run.info.run_id, model_uri=model_info.model_uri)
+        return summary
+
+    def _log_drift_profile(self, data: TrainingData, best: Dict[str, Any], run_id: str):
+        """
+        Store a held-out feature and score distribution with the model for drift monitoring
+
+        In-sample scores of the final model are overconfident (a random forest nearly
+        memorizes its training rows), so the profile is built from out-of-fold scores:
+        the best candidate is refit on the last time-ordered CV training window and
+        scores the validation window after it, the rows closest to what serving sees.
+        """
+        from src.models.drift import PROFILE_ARTIFACT, build_reference_profile
+        from src.utils.mlflow_utils import log_artifact_text
+
+        fold = time_series_folds(len(data), self.cv_splits, self.cv_gap)[-1]
+        keep, weights = downsample_negatives(data.labels, self.negative_sample_rate, self.seed)
+        train = np.flatnonzero(keep[:fold.train_end])
+        estimator = create_estimator(best["family"], best["params"], self.seed)
+        estimator.fit(data.features[train], data.labels[train], sample_weight=weights[train])
+
+        rows = np.arange(fold.val_start, fold.val_end)
+        if len(rows) > self.profile_rows:
+            rows = np.sort(np.random.default_rng(self.seed).choice(rows, self.profile_rows, replace=False))
+        features = data.features[rows].astype(np.float64)
+        scores = estimator.predict_proba(features)[:, list(estimator.classes_).index(1)]
+        profile = build_reference_profile(features, scores, data.columns, max_rows=self.profile_rows, seed=self.seed)
+        log_artifact_text(run_id, json.dumps(profile), PROFILE_ARTIFACT)
+        logger.info(f"Logged drift profile from {len(rows):,} out-of-fold rows")
+
+    def _summary(self, results: List[Dict[str, Any]], model, start: float) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - start
+        logger.info(f"Best of {len(results)} trials: {results[0]['family']} {results[0]['params']} "
+                    f"({self.scoring}={results[0][self.scoring]:.4f}); {elapsed:.1f}s total")
+        return {"trials": results, "best": results[0], "model": model, "elapsed_s": elapsed}
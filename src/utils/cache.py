@@ -0,0 +1,123 @@
+"""
+In-process caching utilities
+Bounded, thread-safe LRU cache with per-entry time-to-live
+"""
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+import threading
+import time
+
+# Sentinel returned by get() when a key is absent or expired
+MISSING = object()
+
+
+class TTLCache:
+    """Size-bounded LRU cache whose entries expire after a per-entry TTL"""
+
+    def __init__(self, maxsize: int = 10000, default_ttl: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize the cache
+
+        Args:
+            maxsize: Maximum number of entries before least-recently-used eviction
+            default_ttl: Seconds an entry stays valid when set() gets no ttl. None means no expiry
+            clock: Monotonic time source in seconds
+        """
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self.default_ttl = default_ttl
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        """
+        Look up a key, refreshing its LRU position on a hit
+
+        Args:
+            key: Cache key
+            default: Value returned on a miss
+
+        Returns:
+            Cached value, or default when absent or expired
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at >= self._clock():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+                self.expirations += 1
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """
+        Insert or replace a key, evicting the least recently used entries when full
+
+        Args:
+            key: Cache key
+            value: Value to store
+            ttl: Seconds until expiry. Defaults to default_ttl; None means no expiry
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+        expires_at = float("inf") if ttl is None else self._clock() + ttl
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, predicate: Optional[Callable[[Hashable], bool]] = None) -> int:
+        """
+        Drop entries explicitly
+
+        Args:
+            predicate: Drop only keys for which this returns True. None drops everything
+
+        Returns:
+            Number of entries dropped
+        """
+        with self._lock:
+            if predicate is None:
+                dropped = len(self._data)
+                self._data.clear()
+            else:
+                keys = [key for key in self._data if predicate(key)]
+                for key in keys:
+                    del self._data[key]
+                dropped = len(keys)
+            self.invalidations += dropped
+            return dropped
+
+    def clear(self):
+        """Drop every entry"""
+        self.invalidate()
+
+    def stats(self) -> Dict[str, Any]:
+        """Size and hit/miss counters"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
@@ -0,0 +1,48 @@
+"""
+Configuration utilities for fraud detection project
+"""
+from pathlib import Path
+from typing import Any, Dict, Optional
+import copy
+import os
+
+import yaml
+
+# Project-level configs/ directory (overridable with FRAUD_CONFIG_DIR)
+CONFIG_DIR = Path(__file__).resolve().parents[2] / "configs"
+
+
+def load_config(name: str, config_dir: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Load a YAML configuration file from the configs directory
+
+    Args:
+        name: Config file name, with or without the .yaml suffix
+        config_dir: Directory to read from. Defaults to FRAUD_CONFIG_DIR or configs/
+
+    Returns:
+        Parsed configuration. Missing or empty files yield an empty dict
+    """
+    base = Path(config_dir or os.getenv("FRAUD_CONFIG_DIR", str(CONFIG_DIR)))
+    path = base / (name if name.endswith((".yaml", ".yml")) else f"{name}.yaml")
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return yaml.safe_load(f) or {}
+
+
+def get_section(config: Dict[str, Any], section: str, defaults: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Get a config section merged over its defaults
+
+    Args:
+        config: Full configuration dictionary
+        section: Name of the top-level section
+        defaults: Default values for every supported key
+
+    Returns:
+        New dictionary with defaults overridden by configured values
+    """
+    merged = copy.deepcopy(defaults)
+    merged.update(config.get(section) or {})
+    return merged
@@ -0,0 +1,349 @@
+"""
+Serving metrics
+Low-overhead counters and fixed-bucket histograms rendered in the Prometheus text format
+
+Recording a value is a bisect over a small bucket tuple plus two list updates under a
+lock, so instrumentation can stay on in production. Values reported by other
+components (pool occupancy, cache hit rates, the serving model) are collected through
+callbacks when /metrics is scraped rather than being pushed on every request.
+"""
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import math
+import threading
+import time
+
+Labels = Tuple[str, ...]
+
+# Seconds; covers sub-100us kernel calls up to slow Feast lookups
+LATENCY_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+# Rows per model call or request
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Labels = (), value: float = 1):
+        """
+        Add to the counter
+
+        Args:
+            labels: Label values in labelnames order
+            value: Non-negative increment
+        """
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + value
+
+    def value(self, labels: Labels = ()) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in sorted(values):
+            lines.append(f"{self.name}{_label_text(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Histogram over fixed bucket upper bounds, one series per label combination"""
+
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float] = LATENCY_BUCKETS,
+                 labelnames: Sequence[str] = ()):
+        """
+        Initialize the histogram
+
+        Args:
+            name: Metric name
+            documentation: HELP text
+            buckets: Increasing bucket upper bounds; +Inf is added implicitly
+            labelnames: Label names
+        """
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        self.labelnames = tuple(labelnames)
+        # labels -> [per-bucket counts (last is +Inf), sum]
+        self._series: Dict[Labels, List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, labels: Labels = ()):
+        """
+        Record one value
+
+        Args:
+            value: Observed value (seconds, rows, ...)
+            labels: Label values in labelnames order
+        """
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def snapshot(self, labels: Labels = ()) -> Dict[str, Any]:
+        """Non-cumulative bucket counts, count and sum of one series"""
+        with self._lock:
+            series = self._series.get(labels)
+            counts = list(series[0]) if series else [0] * (len(self.buckets) + 1)
+            total = series[1] if series else 0.0
+        return {"buckets": self.buckets, "counts": counts, "count": sum(counts), "sum": total}
+
+    def quantile(self, q: float, labels: Labels = ()) -> Optional[float]:
+        """
+        Estimate a quantile by linear interpolation inside its bucket
+
+        Returns:
+            Estimated value, or None for an empty series
+        """
+        snap = self.snapshot(labels)
+        if not snap["count"]:
+            return None
+        rank = q * snap["count"]
+        seen = 0
+        for i, count in enumerate(snap["counts"]):
+            if count and seen + count >= rank:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def label_sets(self) -> List[Labels]:
+        with self._lock:
+            return list(self._series)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        for labels, counts, total in sorted(series):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_label_text(self.labelnames, labels, le)} {cumulative}")
+            text = _label_text(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{text} {_format_value(total)}")
+            lines.append(f"{self.name}_count{text} {cumulative}")
+        return lines
+
+
+class CallbackMetric:
+    """Gauge or counter whose values are read from a callback at scrape time"""
+
+    def __init__(self, name: str, documentation: str, fn: Callable[[], Any],
+                 labelnames: Sequence[str] = (), kind: str = "gauge"):
+        """
+        Initialize the metric
+
+        Args:
+            name: Metric name
+            documentation: HELP text
+            fn: Returns a number, or a dict of label-value tuples -> number
+            labelnames: Label names
+            kind: 'gauge' or 'counter'
+        """
+        self.name = name
+        self.documentation = documentation
+        self.fn = fn
+        self.labelnames = tuple(labelnames)
+        self.kind = kind
+
+    def render(self) -> List[str]:
+        try:
+            values = self.fn()
+        except Exception:
+            return []  # A broken collector must not fail the whole scrape
+        if values is None:
+            return []
+        if not isinstance(values, dict):
+            values = {(): values}
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for labels, value in sorted(values.items()):
+            lines.append(f"{self.name}{_label_text(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class MetricsRegistry:
+    """Ordered collection of metrics rendered together"""
+
+    def __init__(self, prefix: str = ""):
+        self.prefix = prefix
+        self._metrics: Dict[str, Any] = {}
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(self.prefix + name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, buckets: Sequence[float] = LATENCY_BUCKETS,
+                  labelnames: Sequence[str] = ()) -> Histogram:
+        return self._register(Histogram(self.prefix + name, documentation, buckets, labelnames))
+
+    def callback(self, name: str, documentation: str, fn: Callable[[], Any],
+                 labelnames: Sequence[str] = (), kind: str = "gauge") -> CallbackMetric:
+        """Register (or replace) a metric collected from fn at scrape time"""
+        metric = CallbackMetric(self.prefix + name, documentation, fn, labelnames, kind)
+        self._metrics[metric.name] = metric
+        return metric
+
+    def get(self, name: str):
+        return self._metrics.get(self.prefix + name)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class RequestTimer:
+    """Per-request timestamps used to derive the validation and serialization stages"""
+    __slots__ = ("endpoint", "start", "handler_start", "handler_end")
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.start = time.perf_counter()
+        self.handler_start: Optional[float] = None
+        self.handler_end: Optional[float] = None
+
+
+# Set by the metrics middleware for the duration of each HTTP request
+current_request: ContextVar[Optional[RequestTimer]] = ContextVar("current_request", default=None)
+
+# Endpoint label for work not tied to one request (coalesced batches, background jobs)
+INTERNAL_ENDPOINT = "internal"
+
+
+class _StageTimer:
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram: Histogram, labels: Labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, self.labels)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class ServingMetrics:
+    """The API's metric set: request counts and latency, per-stage timings, Feast
+    fallbacks and batch sizes, plus scrape-time collectors registered by the app
+
+    Stages: validation (body read and request parsing), feast_lookup,
+    feature_assembly, scoring and serialization (response model and JSON encoding).
+    """
+
+    def __init__(self, enabled: bool = True, prefix: str = "fraud_api_"):
+        """
+        Initialize the metric set
+
+        Args:
+            enabled: Record anything at all; disabled recording is a no-op
+            prefix: Metric name prefix
+        """
+        self.enabled = enabled
+        self.registry = MetricsRegistry(prefix)
+        self.requests = self.registry.counter(
+            "requests_total", "HTTP requests by endpoint, method and status code",
+            ("endpoint", "method", "status"))
+        self.latency = self.registry.histogram(
+            "request_duration_seconds", "End-to-end HTTP request latency", LATENCY_BUCKETS, ("endpoint",))
+        self.stages = self.registry.histogram(
+            "stage_duration_seconds", "Time spent per request stage", LATENCY_BUCKETS, ("endpoint", "stage"))
+        self.feast_fallbacks = self.registry.counter(
+            "feast_fallbacks_total", "Predictions that used request data instead of Feast values "
+            "(error: lookup failed, missing: entity absent from the online store)", ("reason",))
+        self.batch_sizes = self.registry.histogram(
+            "scoring_batch_rows", "Rows per model call", SIZE_BUCKETS, ("endpoint",))
+
+    @staticmethod
+    def endpoint() -> str:
+        """Endpoint label of the request being handled, or INTERNAL_ENDPOINT"""
+        timer = current_request.get()
+        return timer.endpoint if timer is not None else INTERNAL_ENDPOINT
+
+    def stage(self, name: str):
+        """Context manager timing one stage of the current request"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _StageTimer(self.stages, (self.endpoint(), name))
+
+    def observe_stage(self, name: str, seconds: float, endpoint: Optional[str] = None):
+        if self.enabled:
+            self.stages.observe(seconds, (endpoint or self.endpoint(), name))
+
+    def observe_batch(self, rows: int):
+        if self.enabled:
+            self.batch_sizes.observe(rows, (self.endpoint(),))
+
+    def feast_fallback(self, reason: str):
+        if self.enabled:
+            self.feast_fallbacks.inc((reason,))
+
+    def collect(self, name: str, documentation: str, fn: Callable[[], Any],
+                labelnames: Sequence[str] = (), kind: str = "gauge"):
+        """Register a scrape-time collector (see CallbackMetric)"""
+        self.registry.callback(name, documentation, fn, labelnames, kind)
+
+    def render(self) -> str:
+        return self.registry.render()
@@ -3,7 +3,11 @@ MLflow utilities for fraud detection project
 """
 import mlflow
 import mlflow.sklearn
-from typing import Dict, Any, Optional
+import time
+from typing import Dict, Any, Optional, Tuple
+
+# Registered model tag holding the fraud decision threshold
+THRESHOLD_TAG = "decision_threshold"
 
 
 def setup_mlflow(tracking_uri: str = "./mlruns", experiment_name: str = "fraud_detection"):
@@ -56,7 +60,7 @@ def log_metrics(metrics: Dict[str, float]):
     mlflow.log_metrics(metrics)
 
 
-def register_model(model, model_name: str = "fraud_detector", artifact_path: str = "model"):
+def register_model(model, model_name: str = "fraud_detector", artifact_path: str = "model", **kwargs):
     """
     Log and register model in MLflow
     
@@ -64,6 +68,7 @@ def register_model(model, model_name: str = "fraud_detector", artifact_path: str
         model: Trained model
         model_name: Name for model registry
         artifact_path: Path to save model artifact
+        **kwargs: Passed to mlflow.sklearn.log_model (e.g. skops_trusted_types)
     
     Returns:
         Model info
@@ -71,10 +76,80 @@ def register_model(model, model_name: str = "fraud_detector", artifact_path: str
     return mlflow.sklearn.log_model(
         model,
         artifact_path,
-        registered_model_name=model_name
+        registered_model_name=model_name,
+        **kwargs
     )
 
 
+def log_metrics_to_run(run_id: str, metrics: Dict[str, float]):
+    """
+    Log metrics to a specific run, whether or not it is active
+
+    Args:
+        run_id: Target run
+        metrics: Dictionary of metric names and values
+    """
+    from mlflow.entities import Metric
+
+    timestamp = int(time.time() * 1000)
+    client = mlflow.tracking.MlflowClient()
+    client.log_batch(run_id, metrics=[Metric(name, float(value), timestamp, 0) for name, value in metrics.items()])
+
+
+def log_artifact_text(run_id: str, text: str, artifact_file: str):
+    """
+    Store text (e.g. a CSV table) as an artifact of a specific run
+
+    Args:
+        run_id: Target run
+        text: File contents
+        artifact_file: Path of the artifact within the run
+    """
+    mlflow.tracking.MlflowClient().log_text(run_id, text, artifact_file)
+
+
+def resolve_model_version(model_uri: str) -> Optional[Tuple[str, str]]:
+    """
+    Pin a registry URI to a concrete version
+
+    Args:
+        model_uri: 'models:/<name>/<version|stage|latest>'
+
+    Returns:
+        (name, version) or None for URIs outside the registry
+    """
+    if not model_uri.startswith("models:/"):
+        return None
+    name, _, version = model_uri[len("models:/"):].partition("/")
+    if not version.isdigit():
+        client = mlflow.tracking.MlflowClient()
+        versions = client.search_model_versions(f"name='{name}'")
+        if version not in ("", "latest"):
+            versions = [v for v in versions if v.current_stage == version]
+        if not versions:
+            raise ValueError(f"No versions of {name} match {version or 'latest'}")
+        version = str(max(int(v.version) for v in versions))
+    return name, version
+
+
+def get_model_run_id(model_uri: str) -> Optional[str]:
+    """
+    Run that produced a model
+
+    Args:
+        model_uri: 'runs:/<run_id>/...' or 'models:/<name>/<version|stage|latest>'
+
+    Returns:
+        Run id, or None for URIs that do not point at a tracked run
+    """
+    if model_uri.startswith("runs:/"):
+        return model_uri[len("runs:/"):].split("/", 1)[0]
+    resolved = resolve_model_version(model_uri)
+    if resolved is None:
+        return None
+    return mlflow.tracking.MlflowClient().get_model_version(*resolved).run_id
+
+
 def load_production_model(model_name: str = "fraud_detector", stage: str = "Production"):
     """
     Load model from MLflow registry
@@ -110,3 +185,56 @@ def get_latest_run(experiment_name: str = "fraud_detection"):
         if not runs.empty:
             return runs.iloc[0]
     return None
+
+
+def set_decision_threshold(
+    threshold: float,
+    model_name: str = "fraud_detector",
+    version: Optional[str] = None
+):
+    """
+    Store the decision threshold as a tag on a registered model version
+
+    Args:
+        threshold: Fraud probability above which a transaction is flagged
+        model_name: Name of the registered model
+        version: Model version to tag. If None, tags the highest version
+    """
+    client = mlflow.tracking.MlflowClient()
+    if version is None:
+        versions = client.search_model_versions(f"name='{model_name}'")
+        if not versions:
+            raise ValueError(f"No registered versions found for {model_name}")
+        version = str(max(int(v.version) for v in versions))
+    client.set_model_version_tag(model_name, str(version), THRESHOLD_TAG, str(threshold))
+
+
+def get_decision_threshold(
+    model_name: str = "fraud_detector",
+    version: Optional[str] = None,
+    default: Optional[float] = None,
+    client: Optional[Any] = None
+) -> Optional[float]:
+    """
+    Read the decision threshold stored with a registered model
+
+    The version tag takes precedence over a tag on the registered model itself.
+
+    Args:
+        model_name: Name of the registered model
+        version: Model version to read. If None, only the registered model tag is checked
+        default: Value returned when no threshold is stored
+        client: MlflowClient to use. Defaults to one for the current tracking URI
+
+    Returns:
+        Stored threshold or default
+    """
+    client = client or mlflow.tracking.MlflowClient()
+    if version is not None:
+        tags = client.get_model_version(model_name, str(version)).tags
+        if THRESHOLD_TAG in tags:
+            return float(tags[THRESHOLD_TAG])
+    tags = client.get_registered_model(model_name).tags
+    if THRESHOLD_TAG in tags:
+        return float(tags[THRESHOLD_TAG])
+    return default
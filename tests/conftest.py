@@ -0,0 +1,45 @@
+"""
+Shared fixtures: small fitted models and model directories for the manager and API tests
+"""
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.linear_model import LogisticRegression
+
+
+def fit_model(seed: int = 0) -> LogisticRegression:
+    """Logistic regression over the five model input columns"""
+    rng = np.random.default_rng(seed)
+    features = np.column_stack([
+        rng.lognormal(4, 1.2, 500),
+        rng.lognormal(8, 2, 500),
+        rng.integers(0, 14, 500),
+        rng.integers(0, 2, 500),
+        rng.integers(0, 51, 500),
+    ]).astype(np.float64)
+    labels = (0.01 * features[:, 0] - 0.2 * features[:, 2] + rng.normal(size=500) > 0.5).astype(int)
+    return LogisticRegression(max_iter=1000).fit(features, labels)
+
+
+def write_model(directory: Path, version: str, model) -> Path:
+    """Save a model as '<version>.joblib', the layout LocalDirectorySource reads"""
+    path = Path(directory) / f"{version}.joblib"
+    joblib.dump(model, path)
+    return path
+
+
+@pytest.fixture(scope="session")
+def fitted_models():
+    """Three distinct fitted models"""
+    return [fit_model(seed) for seed in range(3)]
+
+
+@pytest.fixture
+def model_dir(tmp_path, fitted_models):
+    """Directory holding version 1"""
+    directory = tmp_path / "models"
+    directory.mkdir()
+    write_model(directory, "1", fitted_models[0])
+    return directory
@@ -0,0 +1,32 @@
+"""
+API test fixtures: the app serving a local model directory, without running startup
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api import app as app_module
+from src.api.score_cache import ScoreCache
+from src.models.manager import LocalDirectorySource, ModelManager
+
+
+@pytest.fixture
+def manager(model_dir):
+    manager = ModelManager(LocalDirectorySource(model_dir, settle_seconds=0), poll_interval_s=0, warmup_rows=0)
+    manager.load()
+    yield manager
+    manager.stop()
+
+
+@pytest.fixture
+def api(manager, monkeypatch):
+    """The app module with the test model live, a fresh score cache and no coalescing"""
+    monkeypatch.setattr(app_module, "model_manager", manager)
+    monkeypatch.setattr(app_module, "score_cache", ScoreCache(maxsize=1000, window_seconds=60))
+    monkeypatch.setattr(app_module, "coalescer", None)
+    monkeypatch.setattr(app_module, "shadow_scorer", None)
+    return app_module
+
+
+@pytest.fixture
+def client(api):
+    return TestClient(api.app)
@@ -0,0 +1,210 @@
+"""
+Tests that the codec endpoints keep the public contract of schemas.py
+
+Every /predict and /predict/batch case is sent both to the app and to a reference app that
+declares the Pydantic models as FastAPI parameters and response_model, scoring with the
+same model: status codes and response bodies must be identical byte for byte.
+"""
+import json
+
+import numpy as np
+import pyarrow as pa
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.api.codec import ARROW_MEDIA_TYPE, NDJSON_MEDIA_TYPE
+from src.api.schemas import (
+    BatchPredictionRequest,
+    BatchPredictionResponse,
+    PredictionResponse,
+    TransactionRequest,
+)
+from src.models.inference import FEATURE_COLUMNS
+
+TRANSACTION = {
+    "trans_num": "txn_1",
+    "cc_num": "1234567890123456",
+    "merchant": "Amazon",
+    "amt": 49.99,
+    "city_pop": 50000,
+    "category_encoded": 8,
+    "gender_encoded": 1,
+    "state_encoded": 5,
+}
+
+
+def transaction(**changes):
+    body = {**TRANSACTION, **changes}
+    return {key: value for key, value in body.items() if value is not ...}
+
+
+@pytest.fixture
+def reference(manager):
+    """The endpoints as plain Pydantic-validated FastAPI routes"""
+    app = FastAPI()
+
+    def score(transactions):
+        features = np.array([[getattr(t, name) for name in FEATURE_COLUMNS] for t in transactions], dtype=np.float64)
+        return manager.current.scorer.score(features)
+
+    @app.post("/predict", response_model=PredictionResponse)
+    def predict(request: TransactionRequest):
+        labels, probabilities = score([request])
+        return {"trans_num": request.trans_num, "is_fraud": bool(labels[0]),
+                "fraud_probability": float(probabilities[0]), "model_version": manager.current.label}
+
+    @app.post("/predict/batch", response_model=BatchPredictionResponse)
+    def predict_batch(request: BatchPredictionRequest):
+        labels, probabilities = score(request.transactions)
+        return {
+            "predictions": [
+                {"trans_num": t.trans_num, "is_fraud": bool(label), "fraud_probability": float(probability),
+                 "model_version": manager.current.label}
+                for t, label, probability in zip(request.transactions, labels, probabilities)
+            ],
+            "model_version": manager.current.label,
+        }
+
+    return TestClient(app)
+
+
+def assert_same_response(client, reference, path, content, content_type="application/json"):
+    headers = {"content-type": content_type} if content_type is not None else {}
+    expected = reference.post(path, content=content, headers=headers)
+    actual = client.post(path, content=content, headers=headers)
+    assert actual.status_code == expected.status_code, actual.text
+    assert actual.content == expected.content
+    return actual
+
+
+def encode(body):
+    return json.dumps(body).encode() if not isinstance(body, bytes) else body
+
+
+@pytest.mark.parametrize("body", [
+    transaction(),
+    transaction(trans_num="tx-é✓ \"quoted\""),
+    transaction(amt=50),                        # int for a float field
+    transaction(amt="12.5", city_pop="300"),    # numbers as strings: Pydantic coerces
+    transaction(category_encoded=3.0),          # integral float for an int field
+    transaction(extra_field="ignored"),
+    transaction(amt=1e-300),
+], ids=["plain", "unicode", "int-amt", "string-numbers", "integral-float", "extra-field", "tiny-amt"])
+def test_predict_valid_bodies_match_pydantic(client, reference, body):
+    response = assert_same_response(client, reference, "/predict", encode(body))
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize("body", [
+    transaction(amt=...),
+    transaction(amt=-1.0),
+    transaction(city_pop=1.5),
+    transaction(amt="abc"),
+    transaction(trans_num=123),
+    transaction(cc_num=None),
+    [TRANSACTION],
+    "just a string",
+    b"",
+    b"{not json",
+], ids=["missing", "negative", "fractional-int", "bad-number", "int-trans-num", "null-string",
+        "array", "string", "empty", "malformed"])
+def test_predict_invalid_bodies_match_pydantic(client, reference, body):
+    response = assert_same_response(client, reference, "/predict", encode(body))
+    assert response.status_code == 422
+
+
+@pytest.mark.parametrize("content_type", [
+    "text/plain", None, "application/vnd.api+json", "application/json; charset=utf-8", "application/x-www-form-urlencoded",
+])
+def test_predict_content_types_match_pydantic(client, reference, content_type):
+    assert_same_response(client, reference, "/predict", encode(transaction()), content_type)
+
+
+@pytest.mark.parametrize("body", [
+    {"transactions": [transaction(trans_num=f"t{i}", amt=10.0 * i) for i in range(5)]},
+    {"transactions": [transaction(), transaction(trans_num="t2", amt="7")]},
+    {"transactions": []},
+    {"transactions": [transaction(), transaction(amt=-5)]},
+    {"transactions": "nope"},
+    {},
+], ids=["valid", "coerced", "empty", "one-invalid", "not-a-list", "missing"])
+def test_batch_matches_pydantic(client, reference, body):
+    assert_same_response(client, reference, "/predict/batch", encode(body))
+
+
+def test_batch_errors_locate_the_transaction(client):
+    body = {"transactions": [transaction(), transaction(amt=-5)]}
+    detail = client.post("/predict/batch", json=body).json()["detail"]
+    assert [error["loc"] for error in detail] == [["body", "transactions", 1, "amt"]]
+
+
+def test_ndjson_bulk_matches_single_predictions(client, manager):
+    transactions = [transaction(trans_num=f"t{i}", amt=5.0 * i + 0.5) for i in range(20)]
+    body = "\n".join(json.dumps(t) for t in transactions) + "\n\n"
+
+    response = client.post("/predict/bulk", content=body, headers={"content-type": NDJSON_MEDIA_TYPE})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == NDJSON_MEDIA_TYPE
+    assert response.headers["x-model-version"] == manager.current.label
+    lines = response.content.splitlines()
+    # Same matrix as one batch call, so the probabilities are bit-identical
+    expected = client.post("/predict/batch", json={"transactions": transactions}).json()["predictions"]
+    assert len(lines) == len(expected)
+    for line, prediction in zip(lines, expected):
+        assert line == PredictionResponse(**prediction).model_dump_json().encode()
+
+
+def test_ndjson_bulk_reports_errors_per_line(client):
+    body = "\n".join([json.dumps(transaction()), json.dumps(transaction(amt=-1)), "{bad"])
+
+    response = client.post("/predict/bulk", content=body, headers={"content-type": NDJSON_MEDIA_TYPE})
+
+    assert response.status_code == 422
+    locs = [error["loc"] for error in response.json()["detail"]]
+    assert locs[0] == ["body", 1, "amt"]
+    assert locs[1][:2] == ["body", 2]
+
+
+def arrow_stream(table):
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def test_arrow_bulk_matches_batch_predictions(client, manager):
+    transactions = [transaction(trans_num=f"t{i}", amt=3.0 * i + 0.25) for i in range(10)]
+    table = pa.table({name: [t[name] for t in transactions] for name in ["trans_num"] + FEATURE_COLUMNS})
+
+    response = client.post("/predict/bulk", content=arrow_stream(table), headers={"content-type": ARROW_MEDIA_TYPE})
+
+    assert response.status_code == 200
+    result = pa.ipc.open_stream(response.content).read_all()
+    assert result.schema.metadata[b"model_version"] == manager.current.label.encode()
+    expected = client.post("/predict/batch", json={"transactions": transactions}).json()["predictions"]
+    assert result.column("trans_num").to_pylist() == [p["trans_num"] for p in expected]
+    assert result.column("is_fraud").to_pylist() == [p["is_fraud"] for p in expected]
+    assert result.column("fraud_probability").to_pylist() == [p["fraud_probability"] for p in expected]
+
+
+def test_arrow_bulk_reports_missing_and_invalid_columns(client):
+    table = pa.table({"trans_num": ["a", "b"], "amt": [1.0, -2.0], "city_pop": [1, 2],
+                      "category_encoded": [1.5, 2.0], "gender_encoded": [0, 1]})
+
+    response = client.post("/predict/bulk", content=arrow_stream(table), headers={"content-type": ARROW_MEDIA_TYPE})
+
+    assert response.status_code == 422
+    locs = {tuple(error["loc"]) for error in response.json()["detail"]}
+    assert locs == {("body", 1, "amt"), ("body", 0, "category_encoded"), ("body", "state_encoded")}
+
+
+def test_bulk_rejects_other_content_types_and_oversized_requests(client, api, monkeypatch):
+    assert client.post("/predict/bulk", json=[transaction()]).status_code == 415
+
+    monkeypatch.setitem(api.batching_config, "max_bulk_size", 2)
+    body = "\n".join(json.dumps(transaction(trans_num=f"t{i}")) for i in range(3))
+    response = client.post("/predict/bulk", content=body, headers={"content-type": NDJSON_MEDIA_TYPE})
+    assert response.status_code == 413
+
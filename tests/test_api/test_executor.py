@@ -0,0 +1,141 @@
+"""
+Tests for BoundedExecutor: load shedding at capacity and slot accounting for cancelled callers
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.api.executor import BoundedExecutor, PoolSaturatedError
+
+TRANSACTION = {"cc_num": "1", "merchant": "m", "amt": 10.0, "city_pop": 1,
+               "category_encoded": 1, "gender_encoded": 0, "state_encoded": 1}
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached")
+        time.sleep(0.005)
+
+
+class Gate:
+    """Blocking task body: records starts, then waits until opened"""
+
+    def __init__(self):
+        self.started = threading.Semaphore(0)
+        self.opened = threading.Event()
+
+    def __call__(self, value=None):
+        self.started.release()
+        assert self.opened.wait(5)
+        return value
+
+
+@pytest.fixture
+def pool():
+    pool = BoundedExecutor("test", max_workers=1, max_queue_depth=1)
+    yield pool
+    pool.shutdown(wait=False)
+
+
+def test_rejects_beyond_workers_plus_queue_depth(pool):
+    gate = Gate()
+
+    async def run():
+        tasks = [asyncio.create_task(pool.run(gate, i)) for i in range(2)]
+        await asyncio.sleep(0.01)
+        assert pool.stats()["in_flight"] == 2 and pool.stats()["queued"] == 1
+        with pytest.raises(PoolSaturatedError, match="capacity 2"):
+            await pool.run(gate, 2)
+        gate.opened.set()
+        return await asyncio.gather(*tasks)
+
+    assert asyncio.run(run()) == [0, 1]
+    stats = pool.stats()
+    assert stats["in_flight"] == 0 and stats["completed"] == 2 and stats["rejected"] == 1
+
+
+def test_cancelled_caller_keeps_the_slot_until_the_task_finishes(pool):
+    gate = Gate()
+
+    async def run():
+        running = asyncio.create_task(pool.run(gate, "running"))
+        queued = asyncio.create_task(pool.run(gate, "queued"))
+        await asyncio.to_thread(gate.started.acquire)
+        await asyncio.sleep(0.01)
+
+        running.cancel()
+        queued.cancel()
+        for task in (running, queued):
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        # The queued task never started and is dropped; the running one still holds its worker
+        assert pool.stats()["in_flight"] == 1
+        blocked = asyncio.create_task(pool.run(gate, "next"))
+        await asyncio.sleep(0.01)
+        with pytest.raises(PoolSaturatedError):
+            await pool.run(gate, "rejected")
+
+        gate.opened.set()
+        return await blocked
+
+    assert asyncio.run(run()) == "next"
+    wait_for(lambda: pool.stats()["in_flight"] == 0)
+
+
+def test_exceptions_free_the_slot(pool):
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        asyncio.run(pool.run(fail))
+    assert pool.stats()["in_flight"] == 0
+
+
+def test_saturated_scoring_pool_sheds_load_with_retry_after(api, client, monkeypatch):
+    workers, depth = 1, 2
+    monkeypatch.setitem(api.executor_config, "scoring_workers", workers)
+    monkeypatch.setitem(api.executor_config, "scoring_queue_depth", depth)
+    pool = BoundedExecutor("scoring", workers, depth)
+    monkeypatch.setattr(api, "scoring_pool", pool)
+    gate = Gate()
+    score_features = api.score_features
+
+    def blocked(features, handle=None):
+        gate()
+        return score_features(features, handle)
+
+    monkeypatch.setattr(api, "score_features", blocked)
+
+    responses = {}
+
+    def post(trans_num):
+        responses[trans_num] = client.post("/predict", json={"trans_num": trans_num, **TRANSACTION})
+
+    threads = [threading.Thread(target=post, args=(f"t{i}",)) for i in range(workers + depth)]
+    for thread in threads:
+        thread.start()
+    wait_for(lambda: pool.stats()["in_flight"] == workers + depth)
+
+    rejected = client.post("/predict", json={"trans_num": "overflow", **TRANSACTION})
+    batch = client.post("/predict/batch", json={"transactions": [{"trans_num": "b", **TRANSACTION}]})
+
+    gate.opened.set()
+    for thread in threads:
+        thread.join(5)
+
+    for response in (rejected, batch):
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == str(api.executor_config["retry_after_seconds"])
+        assert "scoring pool saturated" in response.json()["detail"]
+    assert [responses[f"t{i}"].status_code for i in range(workers + depth)] == [200] * (workers + depth)
+    wait_for(lambda: pool.stats()["in_flight"] == 0)
+    assert pool.stats()["rejected"] == 2
+
+    # Capacity is back once the workers finish
+    assert client.post("/predict", json={"trans_num": "after", **TRANSACTION}).status_code == 200
+    pool.shutdown(wait=False)
@@ -0,0 +1,198 @@
+"""
+Tests for ScoreCache: replay window, key separation, in-flight dedup and invalidation on swaps
+"""
+import asyncio
+
+import pytest
+
+from src.api.score_cache import ScoreCache
+from tests.conftest import write_model
+
+ROW = [49.99, 50000, 8, 1, 5]
+
+
+class Clock:
+    """Manually advanced time source"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class Scorer:
+    """score() stand-in counting its calls; optionally waits for release before answering"""
+
+    def __init__(self, release=None):
+        self.calls = 0
+        self.release = release
+
+    def __call__(self, value):
+        async def score():
+            self.calls += 1
+            if self.release is not None:
+                await self.release.wait()
+            return value
+        return score
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def cache(clock):
+    cache = ScoreCache(maxsize=100, window_seconds=60)
+    cache.cache._clock = clock
+    return cache
+
+
+def test_replays_inside_the_window_and_rescores_after_it(cache, clock):
+    scorer = Scorer()
+    key = ScoreCache.key("/predict", "t1", ROW, "m/1")
+
+    assert asyncio.run(cache.get_or_score(key, scorer(b"first"))) == b"first"
+    clock.now += 59
+    assert asyncio.run(cache.get_or_score(key, scorer(b"second"))) == b"first"
+    assert scorer.calls == 1
+
+    clock.now += 2
+    assert asyncio.run(cache.get_or_score(key, scorer(b"third"))) == b"third"
+    assert scorer.calls == 2
+    assert cache.stats()["expirations"] == 1
+
+
+def test_keys_separate_endpoint_features_and_version():
+    key = ScoreCache.key("/predict", "t1", ROW, "m/1")
+
+    assert key == ScoreCache.key("/predict", "t1", list(ROW), "m/1")
+    assert len({
+        key,
+        ScoreCache.key("/predict/with-feast", "t1", ROW, "m/1"),
+        ScoreCache.key("/predict", "t2", ROW, "m/1"),
+        ScoreCache.key("/predict", "t1", [50.0] + ROW[1:], "m/1"),
+        ScoreCache.key("/predict", "t1", ROW, "m/2"),
+    }) == 5
+
+
+def test_reused_trans_num_with_other_features_is_scored(cache):
+    scorer = Scorer()
+
+    async def run():
+        first = await cache.get_or_score(ScoreCache.key("/predict", "t1", ROW, "m/1"), scorer(b"a"))
+        other = await cache.get_or_score(ScoreCache.key("/predict", "t1", [1.0] + ROW[1:], "m/1"), scorer(b"b"))
+        feast = await cache.get_or_score(ScoreCache.key("/predict/with-feast", "t1", ROW, "m/1"), scorer(b"c"))
+        return first, other, feast
+
+    assert asyncio.run(run()) == (b"a", b"b", b"c")
+    assert scorer.calls == 3
+
+
+def test_duplicates_in_flight_share_one_score(cache):
+    key = ScoreCache.key("/predict", "t1", ROW, "m/1")
+
+    async def run():
+        scorer = Scorer(release=asyncio.Event())
+        tasks = [asyncio.create_task(cache.get_or_score(key, scorer(f"r{i}".encode()))) for i in range(5)]
+        await asyncio.sleep(0.01)
+        assert cache.stats()["in_flight"] == 1
+        scorer.release.set()
+        return scorer.calls, await asyncio.gather(*tasks)
+
+    calls, results = asyncio.run(run())
+    assert calls == 1
+    assert results == [b"r0"] * 5
+    stats = cache.stats()
+    assert stats["coalesced"] == 4 and stats["in_flight"] == 0
+
+
+def test_failed_score_is_not_cached_and_waiters_rescore(cache):
+    key = ScoreCache.key("/predict", "t1", ROW, "m/1")
+
+    async def run():
+        gate = asyncio.Event()
+
+        async def failing():
+            await gate.wait()
+            raise RuntimeError("model error")
+
+        first = asyncio.create_task(cache.get_or_score(key, failing))
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(cache.get_or_score(key, Scorer()(b"retry")))
+        await asyncio.sleep(0.01)
+        gate.set()
+        with pytest.raises(RuntimeError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == b"retry"
+    assert len(cache.cache) == 0
+
+
+def test_invalidate_except_keeps_only_the_new_version(cache):
+    async def fill():
+        for version in ["m/1", "m/2"]:
+            for trans_num in ["t1", "t2"]:
+                await cache.get_or_score(ScoreCache.key("/predict", trans_num, ROW, version), Scorer()(version))
+
+    asyncio.run(fill())
+    assert cache.invalidate_except("m/2") == 2
+
+    scorer = Scorer()
+    assert asyncio.run(cache.get_or_score(ScoreCache.key("/predict", "t1", ROW, "m/2"), scorer("new"))) == "m/2"
+    assert asyncio.run(cache.get_or_score(ScoreCache.key("/predict", "t1", ROW, "m/1"), scorer("new"))) == "new"
+    assert scorer.calls == 1
+
+    assert cache.clear() == 3
+    assert len(cache.cache) == 0
+
+
+# ---------------------------------------------------------------------------
+# API replay
+# ---------------------------------------------------------------------------
+
+@pytest.fixture
+def scored(api, monkeypatch):
+    """Model calls made by the app"""
+    calls = []
+    score_features = api.score_features
+
+    def counting(features, handle=None):
+        calls.append(len(features))
+        return score_features(features, handle)
+
+    monkeypatch.setattr(api, "score_features", counting)
+    return calls
+
+
+def test_retried_transaction_gets_the_identical_response(client, scored):
+    body = {"trans_num": "retry-1", "cc_num": "1234567890123456", "merchant": "Amazon", "amt": 49.99,
+            "city_pop": 50000, "category_encoded": 8, "gender_encoded": 1, "state_encoded": 5}
+
+    first = client.post("/predict", json=body)
+    retry = client.post("/predict", json=body)
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.content == first.content
+    assert scored == [1]
+
+    assert client.post("/predict", json={**body, "amt": 50.0}).status_code == 200
+    assert scored == [1, 1]
+
+
+def test_model_swap_invalidates_replayed_responses(client, api, manager, scored, model_dir, fitted_models):
+    manager.on_swap(lambda old, new: api.score_cache.invalidate_except(new.label))
+    body = {"trans_num": "retry-2", "cc_num": "1", "merchant": "m", "amt": 10.0,
+            "city_pop": 1, "category_encoded": 1, "gender_encoded": 0, "state_encoded": 1}
+    first = client.post("/predict", json=body).json()
+
+    write_model(model_dir, "2", fitted_models[1])
+    manager.poll()
+    second = client.post("/predict", json=body).json()
+
+    assert first["model_version"] == "fraud_detector/1"
+    assert second["model_version"] == "fraud_detector/2"
+    assert scored == [1, 1]
+    assert len(api.score_cache.cache) == 1
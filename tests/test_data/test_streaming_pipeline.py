@@ -0,0 +1,102 @@
+"""
+Tests for the threaded streaming pipeline: delivery, commits and failure shutdown
+"""
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from src.data.streaming.consumer import InMemorySource
+from src.data.streaming.processor import InMemorySink, StreamingPipeline
+
+# Longest a pipeline run may take before the test treats it as hung
+RUN_TIMEOUT_S = 20
+
+
+class StubScorer:
+    """Scores every row 0.9 after delay_s; raises on the fail_on-th call only"""
+
+    def __init__(self, fail_on=None, delay_s=0.0):
+        self.fail_on = fail_on
+        self.delay_s = delay_s
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def score(self, features):
+        with self._lock:
+            self.calls += 1
+            calls = self.calls
+        time.sleep(self.delay_s)
+        if calls == self.fail_on:
+            raise ValueError("scorer exploded")
+        probabilities = np.full(len(features), 0.9)
+        return probabilities > 0.5, probabilities
+
+
+def events(n):
+    return [
+        {"trans_num": f"t{i}", "amt": 10.0 + i, "city_pop": 1000, "category_encoded": 1,
+         "gender_encoded": 0, "state_encoded": 3}
+        for i in range(n)
+    ]
+
+
+def run_with_timeout(pipeline, **kwargs):
+    """Run the pipeline on a thread; returns (finished, result, error)"""
+    outcome = {}
+
+    def target():
+        try:
+            outcome["result"] = pipeline.run(**kwargs)
+        except BaseException as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(RUN_TIMEOUT_S)
+    return not thread.is_alive(), outcome.get("result"), outcome.get("error")
+
+
+def test_scores_every_record_and_commits():
+    source, sink = InMemorySource(events(50) + ["not json"]), InMemorySink()
+    pipeline = StreamingPipeline(source, StubScorer(), sink, model_version="7", batch_size=8,
+                                 workers=2, queue_size=2, metrics_interval_s=0)
+
+    finished, result, error = run_with_timeout(pipeline)
+
+    assert finished and error is None
+    assert sorted(r["trans_num"] for r in sink.results) == sorted(f"t{i}" for i in range(50))
+    assert all(r["model_version"] == "7" and r["is_fraud"] for r in sink.results)
+    assert result["records_in"] == 51 and result["records_invalid"] == 1
+    assert source.committed == {0: 51}
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_scorer_failure_raises_instead_of_hanging(workers):
+    source, sink = InMemorySource(events(500)), InMemorySink()
+    # Slow scorers keep the one-slot inbox full when the reader tries to hand over _DONE
+    pipeline = StreamingPipeline(source, StubScorer(fail_on=3, delay_s=0.3), sink, batch_size=4,
+                                 workers=workers, queue_size=1, metrics_interval_s=0)
+
+    finished, _, error = run_with_timeout(pipeline)
+
+    assert finished, "pipeline hung after a scorer failure"
+    assert isinstance(error, RuntimeError)
+    assert isinstance(error.__cause__, ValueError)
+    # The failed batch and everything after it stay uncommitted for redelivery
+    assert source.committed.get(0, 0) < 500
+
+
+def test_sink_failure_raises_instead_of_hanging():
+    class FailingSink(InMemorySink):
+        def write(self, results):
+            raise OSError("disk full")
+
+    pipeline = StreamingPipeline(InMemorySource(events(500)), StubScorer(), FailingSink(),
+                                 batch_size=4, workers=2, queue_size=1, metrics_interval_s=0)
+
+    finished, _, error = run_with_timeout(pipeline)
+
+    assert finished
+    assert isinstance(error, OSError)
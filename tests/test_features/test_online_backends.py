@@ -0,0 +1,250 @@
+"""
+Tests for the alternative online store backends: the MmapKVStore file format, ViewCodec
+records and parity of the mmap and Redis backends with Feast's SQLite online store
+"""
+import multiprocessing
+import os
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.features.online_backends import MmapKVStore
+
+FEATURE_STORE_YAML = """project: parity
+registry: data/registry.db
+provider: local
+online_store:
+    type: sqlite
+    path: data/online_store.db
+offline_store:
+    type: file
+entity_key_serialization_version: 3
+"""
+
+
+def header(store):
+    """(slots, data start, data end, live entries, superseded bytes, retired)"""
+    return store._header()[1:]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = MmapKVStore(str(tmp_path / "store.kv"), initial_slots=16)
+    yield store
+    store.close()
+
+
+# ---------------------------------------------------------------------------
+# MmapKVStore
+# ---------------------------------------------------------------------------
+
+def test_get_returns_what_was_set(store, tmp_path):
+    items = [(f"key:{i}".encode(), os.urandom(i % 7 * 8)) for i in range(10)]
+    store.set_many(items)
+
+    assert store.get_many([key for key, _ in items]) == [value for _, value in items]
+    assert store.get_many([b"absent", b""]) == [None, None]
+    assert len(store) == 10
+
+    # A second handle (e.g. another worker) reads the same file
+    reopened = MmapKVStore(str(tmp_path / "store.kv"))
+    assert reopened.get_many([b"key:3"]) == [items[3][1]]
+    reopened.close()
+
+
+def test_overwrite_supersedes_the_old_record(store):
+    store.set_many([(b"a", b"x" * 16), (b"b", b"y" * 8)])
+    _, _, end, live, superseded, _ = header(store)
+    assert (live, superseded) == (2, 0)
+
+    store.set_many([(b"a", b"z" * 24)])
+
+    _, _, new_end, live, superseded, _ = header(store)
+    assert live == 2 and len(store) == 2
+    assert superseded == MmapKVStore.RECORD.size + 1 + 16
+    assert new_end == end + MmapKVStore.RECORD.size + 1 + 24
+    assert store.get_many([b"a", b"b"]) == [b"z" * 24, b"y" * 8]
+
+
+def test_duplicate_keys_in_one_write_keep_the_last_value(store):
+    store.set_many([(b"a", b"1"), (b"a", b"2")])
+
+    assert store.get_many([b"a"]) == [b"2"]
+    assert len(store) == 1
+
+
+def test_rebuild_when_the_table_gets_too_full(store):
+    inode = os.stat(store.path).st_ino
+    limit = int(MmapKVStore.MAX_LOAD * 16)
+    store.set_many([(f"k{i}".encode(), b"v") for i in range(limit)])
+    assert header(store)[0] == 16 and os.stat(store.path).st_ino == inode
+
+    store.set_many([(f"k{i}".encode(), str(i).encode()) for i in range(limit, 3 * limit)])
+
+    slots, *_, retired = header(store)
+    assert slots == 64 and retired == 0
+    assert os.stat(store.path).st_ino != inode
+    assert len(store) == 3 * limit
+    assert store.get_many([f"k{i}".encode() for i in range(3 * limit)]) == \
+        [b"v"] * limit + [str(i).encode() for i in range(limit, 3 * limit)]
+
+
+def test_rebuild_when_most_of_the_data_is_superseded(store):
+    value = b"x" * (1 << 20)
+    store.set_many([(b"small", b"keep")])
+    inode = os.stat(store.path).st_ino
+
+    for _ in range(16):
+        store.set_many([(b"big", value)])
+    # 15 MB superseded: under the 16 MB floor, so no rebuild yet
+    assert header(store)[4] > 15 * (1 << 20) and os.stat(store.path).st_ino == inode
+
+    store.set_many([(b"big", value), (b"big", b"final")])
+
+    _, start, end, live, superseded, _ = header(store)
+    assert os.stat(store.path).st_ino != inode
+    assert superseded == 0 and live == 2
+    assert end - start == 2 * MmapKVStore.RECORD.size + len(b"small") + len(b"keep") + len(b"big") + len(b"final")
+    assert store.get_many([b"big", b"small"]) == [b"final", b"keep"]
+
+
+def _reader(path, ready, rebuilt, results):
+    """Reader process: read, wait for the writer to rebuild, read again through the same handle"""
+    store = MmapKVStore(path)
+    results.put(store.get_many([b"a", b"new"]))
+    ready.set()
+    rebuilt.wait(30)
+    results.put(store.get_many([b"a", b"new", b"k40"]))
+    store.close()
+
+
+def test_reader_in_another_process_reopens_after_a_rebuild(store):
+    store.set_many([(b"a", b"before")])
+    context = multiprocessing.get_context("spawn")
+    ready, rebuilt, results = context.Event(), context.Event(), context.Queue()
+    reader = context.Process(target=_reader, args=(str(store.path), ready, rebuilt, results))
+    reader.start()
+    try:
+        assert ready.wait(60)
+        assert results.get(timeout=5) == [b"before", None]
+
+        store.set_many([(f"k{i}".encode(), str(i).encode()) for i in range(50)])
+        store.set_many([(b"a", b"after"), (b"new", b"row")])
+        assert header(store)[0] > 16
+        rebuilt.set()
+
+        assert results.get(timeout=30) == [b"after", b"row", b"40"]
+    finally:
+        reader.join(30)
+    assert reader.exitcode == 0
+
+
+# ---------------------------------------------------------------------------
+# Feature view records and backend parity
+# ---------------------------------------------------------------------------
+
+@pytest.fixture(scope="module")
+def feast_repo(tmp_path_factory):
+    """Feast repository with one view of Int64/Float64/Float32 features fed by a push source"""
+    feast = pytest.importorskip("feast")
+    from feast.types import Float32, Float64, Int64
+
+    repo = tmp_path_factory.mktemp("feast_repo")
+    (repo / "data").mkdir()
+    (repo / "feature_store.yaml").write_text(FEATURE_STORE_YAML)
+    history = pd.DataFrame({"card": [0], "event_timestamp": pd.to_datetime([0], unit="s", utc=True),
+                            "count": [0], "total": [0.0], "ratio": [0.0]})
+    history.to_parquet(repo / "data" / "card.parquet")
+
+    card = feast.Entity(name="card", join_keys=["card"])
+    source = feast.FileSource(path=str(repo / "data" / "card.parquet"), timestamp_field="event_timestamp")
+    push = feast.PushSource(name="card_push", batch_source=source)
+    view = feast.FeatureView(
+        name="card_stats", entities=[card], ttl=timedelta(days=1), source=push, online=True,
+        schema=[feast.Field(name="card", dtype=Int64), feast.Field(name="count", dtype=Int64),
+                feast.Field(name="total", dtype=Float64), feast.Field(name="ratio", dtype=Float32)],
+    )
+    service = feast.FeatureService(name="card_service", features=[view])
+    feast.FeatureStore(repo_path=str(repo)).apply([card, source, push, view, service])
+    return repo
+
+
+@pytest.fixture(scope="module")
+def codec(feast_repo):
+    from feast import FeatureStore
+    from src.features.online_backends import ViewCodec
+
+    store = FeatureStore(repo_path=str(feast_repo))
+    return ViewCodec(store.project, store.get_feature_view("card_stats"))
+
+
+def test_codec_round_trips_values_and_missing_records(codec, store):
+    values = np.array([[3, 1.5, 0.1], [np.nan, np.nan, np.nan], [7, 1e10 + 0.1, 1 / 3]])
+    keys = codec.keys([[1, 2, 3]])
+    store.set_many(list(zip(keys, codec.pack(np.array([10.0, 20.0, 30.0]), values))))
+
+    decoded = codec.unpack(store.get_many(keys + codec.keys([[4]])))
+
+    assert codec.features == ["count", "total", "ratio"]
+    np.testing.assert_array_equal(decoded[:3, :2], values[:, :2])
+    # Float32 features come back as the widened float32 value, as Feast serves them
+    np.testing.assert_array_equal(decoded[[0, 2], 2], np.float32([0.1, 1 / 3]).astype(np.float64))
+    assert np.isnan(decoded[1]).all() and np.isnan(decoded[3]).all()
+    assert [codec.to_python(name, value) for name, value in zip(codec.features, decoded[0])] == \
+        [3, 1.5, float(np.float32(0.1))]
+    assert codec.to_python("total", np.nan) is None
+
+
+def test_codec_treats_records_of_another_width_as_missing(codec):
+    record = codec.pack(np.array([1.0]), np.array([[1.0, 2.0, 3.0]]))[0]
+
+    decoded = codec.unpack([record[:-8], record + b"\0" * 8, record])
+
+    assert np.isnan(decoded[:2]).all()
+    np.testing.assert_array_equal(decoded[2], [1.0, 2.0, np.float32(3.0)])
+
+
+def test_backends_serve_the_same_matrix_as_sqlite(feast_repo, tmp_path):
+    pytest.importorskip("redis")
+    from src.features.feast_utils import FraudFeatureStore
+    from src.features.online_backends import MmapOnlineBackend, RedisOnlineBackend
+    from src.features.resp_server import LocalRespServer
+
+    rng = np.random.default_rng(0)
+    n = 200
+    rows = pd.DataFrame({
+        "card": np.arange(n),
+        "event_timestamp": pd.Timestamp.now(tz="UTC").floor("s") - pd.to_timedelta(rng.integers(0, 3600, n), unit="s"),
+        "count": rng.integers(0, 1000, n),
+        "total": np.where(rng.random(n) < 0.2, np.nan, rng.lognormal(5, 2, n)),
+        "ratio": rng.random(n),
+    })
+    # Older rows pushed together with the newer ones: the newest row per entity wins
+    stale = rows.iloc[:20].assign(event_timestamp=lambda df: df["event_timestamp"] - pd.Timedelta(minutes=5),
+                                  count=-1)
+    entity_rows = [{"card": int(card)} for card in rng.permutation(n + 10)]
+
+    def lookup(backend):
+        store = FraudFeatureStore(repo_path=str(feast_repo), cache_size=0, online_backend=backend)
+        try:
+            store.push_features("card_push", rows)
+            if backend is not None:
+                store.push_features("card_push", pd.concat([stale, rows.iloc[:20]]))
+            return store.get_online_feature_matrix(entity_rows, "card_service")
+        finally:
+            store.close()
+
+    server = LocalRespServer().start()
+    try:
+        expected = lookup(None)
+        mmap_matrix = lookup(MmapOnlineBackend(str(tmp_path / "online_store.kv"), initial_slots=16))
+        redis_matrix = lookup(RedisOnlineBackend(server.url))
+    finally:
+        server.stop()
+
+    assert expected.shape == (n + 10, 3)
+    assert np.isnan(expected[[i for i, row in enumerate(entity_rows) if row["card"] >= n]]).all()
+    np.testing.assert_array_equal(mmap_matrix, expected)
+    np.testing.assert_array_equal(redis_matrix, expected)
@@ -0,0 +1,149 @@
+"""
+Tests for the as-of semantics of the velocity features on the streaming and batch paths
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.features.batch_features import check_streaming_parity, compute_entity_features
+from src.features.streaming_features import (
+    ROW_VISIBLE_DELAY_S,
+    SECS_SINCE_LAST_CAP,
+    VELOCITY_ENTITIES,
+    VelocityFeatureEngine,
+    VelocityFeatureUpdater,
+    velocity_feature_names,
+)
+
+T0 = 1_600_000_000.0
+
+
+def transactions(events):
+    """(cc_num, seconds, amt) tuples as a transactions frame"""
+    df = pd.DataFrame(events, columns=["cc_num", "unix_time", "amt"])
+    df["timestamp"] = pd.to_datetime(df["unix_time"], unit="s", utc=True)
+    df["merchant"] = "m"
+    return df
+
+
+class RecordingStore:
+    """Online store stand-in: keeps the latest pushed row per entity key"""
+
+    def __init__(self):
+        self.rows = {entity: {} for entity in VELOCITY_ENTITIES}
+
+    def push_features(self, push_source_name, df):
+        entity = push_source_name[:-len("_velocity_push")]
+        key = VELOCITY_ENTITIES[entity]["key"]
+        for row in df.to_dict("records"):
+            self.rows[entity][row[key]] = row
+
+
+@pytest.fixture
+def engine():
+    return VelocityFeatureEngine("cust")
+
+
+def test_first_event_counts_itself(engine):
+    features = engine.update("a", T0, 50.0)
+
+    assert features["cust_txn_count_1h"] == 1
+    assert features["cust_amt_sum_24h"] == 50.0
+    assert features["cust_amt_max_24h"] == 50.0
+    assert features["cust_amt_zscore_7d"] == 0.0
+    assert features["cust_secs_since_last"] == SECS_SINCE_LAST_CAP
+
+
+def test_update_includes_the_event_and_scores_it_against_earlier_ones(engine):
+    engine.update("a", T0, 10.0)
+    engine.update("a", T0 + 60, 30.0)
+    features = engine.update("a", T0 + 120, 500.0)
+
+    assert features["cust_txn_count_1h"] == 3
+    assert features["cust_amt_sum_1h"] == 540.0
+    assert features["cust_amt_max_1h"] == 500.0
+    assert features["cust_amt_zscore_7d"] == pytest.approx((500.0 - 20.0) / 10.0)
+    assert features["cust_secs_since_last"] == 60.0
+
+
+def test_latest_is_the_row_after_the_last_event(engine):
+    assert engine.latest("a") is None
+    engine.update("a", T0, 10.0)
+    last = engine.update("a", T0 + 600, 30.0)
+
+    assert engine.latest("a") == last
+    assert engine.latest("b") is None
+
+
+def test_batch_matches_stream_including_ties():
+    rng = np.random.default_rng(0)
+    n = 600
+    seconds = T0 + np.sort(rng.integers(0, 3 * 86400, n)).astype(float)
+    # Same-second events of one entity and events exactly one window apart
+    seconds[100:104] = seconds[100]
+    seconds[200] = seconds[199] + 3600
+    cards = rng.choice(["a", "b", "c"], n)
+    cards[100:104] = "a"
+    cards[199:201] = "b"
+    df = transactions(list(zip(cards, seconds, rng.lognormal(3, 1, n).round(2))))
+
+    features = compute_entity_features(df, "cc_num", "cust")
+    result = check_streaming_parity(df, features, "customer", max_entities=3)
+    assert result["rows"] == n
+
+
+def test_batch_rows_become_visible_after_their_transaction():
+    df = transactions([("a", T0, 10.0), ("a", T0 + 60, 30.0)])
+
+    features = compute_entity_features(df, "cc_num", "cust")
+    delay = pd.Timedelta(seconds=ROW_VISIBLE_DELAY_S)
+    assert (features["timestamp"] - df["timestamp"] == delay).all()
+    assert features["cust_txn_count_1h"].tolist() == [1, 2]
+
+
+def test_online_lookup_matches_offline_row_of_the_next_transaction():
+    rng = np.random.default_rng(1)
+    n = 400
+    # Distinct seconds: same-second transactions only see each other online
+    seconds = T0 + np.sort(rng.choice(10 * 86400, n, replace=False)).astype(float)
+    df = transactions(list(zip(rng.choice(["a", "b", "c", "d"], n), seconds,
+                               rng.lognormal(3, 1, n).round(2))))
+    df["merchant"] = rng.choice(["m1", "m2"], n)
+
+    for entity, spec in VELOCITY_ENTITIES.items():
+        key, prefix = spec["key"], spec["prefix"]
+        names = velocity_feature_names(prefix)
+        offline = compute_entity_features(df, key, prefix).sort_values("timestamp", kind="mergesort")
+        # Point-in-time join of every transaction, as the training set builder does it
+        joined = pd.merge_asof(
+            df[[key, "timestamp"]].assign(**{key: df[key].astype(str)}),
+            offline, on="timestamp", by=key, direction="backward", allow_exact_matches=True,
+            tolerance=pd.Timedelta(days=7),
+        )
+
+        # Look each transaction up online before the stream observes it
+        store = RecordingStore()
+        updater = VelocityFeatureUpdater(feature_store=store)
+        online = []
+        for event in df.to_dict("records"):
+            row = store.rows[entity].get(str(event[key]))
+            online.append([row[name] for name in names] if row else [np.nan] * len(names))
+            updater.observe(event)
+            updater.flush()
+
+        np.testing.assert_allclose(np.array(online, dtype=np.float64),
+                                   joined[names].to_numpy(dtype=np.float64), rtol=1e-9, atol=1e-9)
+
+
+def test_updater_pushes_the_state_after_each_event():
+    store = RecordingStore()
+    updater = VelocityFeatureUpdater(feature_store=store)
+    first = updater.observe({"cc_num": 1, "merchant": "m", "amt": 10.0, "unix_time": T0})
+    assert np.isnan(updater.latest({"cc_num": 2, "merchant": "x"})["cust_txn_count_1h"])
+    assert updater.latest({"cc_num": 1, "merchant": "m"}) == first
+
+    updater.observe({"cc_num": 1, "merchant": "m", "amt": 20.0, "unix_time": T0 + 30})
+    assert updater.flush() == 2
+    pushed = store.rows["customer"]["1"]
+    assert pushed["timestamp"] == pd.Timestamp(T0 + 30 + ROW_VISIBLE_DELAY_S, unit="s", tz="UTC")
+    assert pushed["cust_txn_count_1h"] == 2 and pushed["cust_secs_since_last"] == 30.0
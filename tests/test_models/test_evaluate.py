@@ -0,0 +1,117 @@
+"""
+Tests for the single-pass histogram evaluation: AUCs against sklearn, threshold
+metrics against FraudScorer's decision rule and merging of partial histograms
+"""
+import numpy as np
+import pytest
+from sklearn.metrics import average_precision_score, roc_auc_score
+
+from src.models.evaluate import ScoreHistogram, StreamingEvaluator
+from src.models.inference import FraudScorer
+from tests.conftest import fit_model
+
+
+def scored_rows(n=200_000, fraud_rate=0.05, separation=2.0, seed=0):
+    """Labels and fraud probabilities; separation 0 gives uninformative scores"""
+    rng = np.random.default_rng(seed)
+    labels = (rng.random(n) < fraud_rate).astype(int)
+    scores = 1 / (1 + np.exp(-(rng.normal(size=n) + separation * labels - 2)))
+    return labels, scores
+
+
+@pytest.mark.parametrize("separation", [0.0, 1.0, 3.0])
+def test_aucs_match_sklearn(separation):
+    labels, scores = scored_rows(separation=separation)
+    histogram = ScoreHistogram()
+    histogram.update(labels, scores)
+    curve = histogram.curve()
+
+    assert curve.roc_auc() == pytest.approx(roc_auc_score(labels, scores), abs=1e-5)
+    assert curve.average_precision() == pytest.approx(average_precision_score(labels, scores), abs=1e-5)
+
+
+def test_weighted_aucs_match_sklearn():
+    labels, scores = scored_rows(separation=1.5, seed=1)
+    weights = np.where(labels == 1, 1.0, 20.0)  # Negatives downsampled 1 in 20
+    histogram = ScoreHistogram()
+    histogram.update(labels, scores, weights)
+    curve = histogram.curve()
+
+    assert curve.roc_auc() == pytest.approx(roc_auc_score(labels, scores, sample_weight=weights), abs=1e-5)
+    assert curve.average_precision() == pytest.approx(
+        average_precision_score(labels, scores, sample_weight=weights), abs=1e-5)
+
+
+@pytest.mark.parametrize("bins", [10, 100, 1000, 100_000])
+def test_at_threshold_flags_strictly_greater_scores_at_bin_edges(bins):
+    grid = np.arange(bins + 1) / bins
+    # Every edge, and the floats just below and above it
+    scores = np.clip(np.concatenate([grid, np.nextafter(grid, -1), np.nextafter(grid, 2)]), 0, 1)
+    labels = np.arange(len(scores)) % 2
+    histogram = ScoreHistogram(bins)
+    histogram.update(labels, scores)
+    curve = histogram.curve()
+
+    # Every edge of the small grids; for the large one, decimal thresholds and a sample.
+    # Threshold 0 is left out: scores of 0 share bin 0 and count as flagged there
+    checked = grid[1:] if bins <= 1000 else np.concatenate([
+        [0.07, 0.29, 0.3, 0.57, 0.7], np.random.default_rng(0).choice(grid[1:], 200)])
+    for threshold in checked:
+        flagged = scores > threshold
+        metrics = curve.at(threshold)
+        assert metrics["threshold"] == threshold
+        assert metrics["tp"] == np.sum(flagged & (labels == 1))
+        assert metrics["fp"] == np.sum(flagged & (labels == 0))
+        assert metrics["fn"] == np.sum(~flagged & (labels == 1))
+        assert metrics["tn"] == np.sum(~flagged & (labels == 0))
+
+
+def test_at_threshold_matches_fraud_scorer_decisions():
+    model = fit_model(3)
+    rng = np.random.default_rng(3)
+    features = np.column_stack([rng.lognormal(4, 1.2, 5000), rng.lognormal(8, 2, 5000), rng.integers(0, 14, 5000),
+                                rng.integers(0, 2, 5000), rng.integers(0, 51, 5000)]).astype(np.float64)
+    labels = rng.integers(0, 2, 5000)
+    evaluator = StreamingEvaluator(bins=1000)
+    evaluator.update_features(FraudScorer(model), features, labels)
+    curve = evaluator.curve()
+
+    for threshold in [0.1, 0.25, 0.5, 0.75, 0.9]:
+        decisions, _ = FraudScorer(model, threshold=threshold).score(features)
+        metrics = curve.at(threshold)
+        assert metrics["tp"] == np.sum(decisions & (labels == 1))
+        assert metrics["fp"] == np.sum(decisions & (labels == 0))
+
+
+def test_thresholds_between_edges_round_up_to_the_grid():
+    curve = ScoreHistogram(100).curve()
+
+    assert curve.at(0.301)["threshold"] == 0.31
+    assert curve.at(0.3 + 1e-15)["threshold"] == 0.31
+    assert curve.at(-0.5)["threshold"] == 0.0
+    assert curve.at(2.0)["threshold"] == 1.0
+
+
+def test_merge_equals_a_single_pass():
+    labels, scores = scored_rows(n=30_000, separation=1.0, seed=2)
+    weights = np.where(labels == 1, 1.0, 10.0)
+    single = StreamingEvaluator(bins=1000, threshold=0.3)
+    single.update(labels, scores, weights)
+
+    shards = []
+    for part in np.array_split(np.arange(len(labels)), 3):
+        shard = StreamingEvaluator(bins=1000, threshold=0.3)
+        for chunk in np.array_split(part, 4):
+            shard.update(labels[chunk], scores[chunk], weights[chunk])
+        shards.append(shard)
+    merged = shards[0].merge(shards[1]).merge(shards[2])
+
+    np.testing.assert_array_equal(merged.histogram.positives, single.histogram.positives)
+    np.testing.assert_array_equal(merged.histogram.negatives, single.histogram.negatives)
+    assert merged.histogram.rows == single.histogram.rows == len(labels)
+    assert merged.report() == single.report()
+
+
+def test_merge_rejects_other_bin_counts():
+    with pytest.raises(ValueError):
+        ScoreHistogram(100).merge(ScoreHistogram(1000))
@@ -0,0 +1,127 @@
+"""
+Tests for the linear fast path of FraudScorer
+"""
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+
+from src.models.inference import (
+    PARITY_TOLERANCE,
+    FraudScorer,
+    LinearKernel,
+    extract_linear_kernel,
+)
+
+
+@pytest.fixture(scope="module")
+def training_data():
+    rng = np.random.default_rng(0)
+    features = np.column_stack([
+        rng.lognormal(4, 1.2, 2000),
+        rng.lognormal(8, 2, 2000),
+        rng.integers(0, 14, 2000),
+        rng.integers(0, 2, 2000),
+        rng.integers(0, 51, 2000),
+    ]).astype(np.float64)
+    logits = 0.01 * features[:, 0] - 0.2 * features[:, 2] + rng.normal(size=2000)
+    labels = (logits > np.quantile(logits, 0.9)).astype(int)
+    return features, labels
+
+
+@pytest.fixture(scope="module")
+def logistic(training_data):
+    features, labels = training_data
+    return LogisticRegression(max_iter=1000).fit(features, labels)
+
+
+def test_predict_proba_matches_sklearn(logistic, training_data):
+    features, _ = training_data
+    kernel = extract_linear_kernel(logistic)
+
+    expected = logistic.predict_proba(features)[:, 1]
+    np.testing.assert_allclose(kernel.predict_proba(features), expected, rtol=0, atol=PARITY_TOLERANCE)
+
+
+def test_predict_proba_row_matches_sklearn(logistic, training_data):
+    features, _ = training_data
+    kernel = extract_linear_kernel(logistic)
+
+    expected = logistic.predict_proba(features[:100])[:, 1]
+    rows = np.array([kernel.predict_proba_row(row) for row in features[:100]])
+    np.testing.assert_allclose(rows, expected, rtol=0, atol=PARITY_TOLERANCE)
+    # A one-row matrix takes the row path
+    np.testing.assert_allclose(kernel.predict_proba(features[:1]), expected[:1], rtol=0, atol=PARITY_TOLERANCE)
+
+
+def test_predict_proba_extreme_logits_stay_finite():
+    kernel = LinearKernel(np.array([1.0, -1.0]), 0.0)
+    features = np.array([[1000.0, 0.0], [0.0, 1000.0], [0.0, 0.0]])
+
+    probabilities = kernel.predict_proba(features)
+    np.testing.assert_array_equal(probabilities, [1.0, 0.0, 0.5])
+    assert kernel.predict_proba_row(features[0]) == 1.0
+    assert kernel.predict_proba_row(features[1]) == 0.0
+
+
+def test_predict_proba_returns_independent_arrays(logistic, training_data):
+    features, _ = training_data
+    kernel = extract_linear_kernel(logistic)
+
+    first = kernel.predict_proba(features[:10])
+    snapshot = first.copy()
+    kernel.predict_proba(features[10:20])
+    np.testing.assert_array_equal(first, snapshot)
+
+
+def test_fraud_column_zero_flips_the_kernel(training_data):
+    features, labels = training_data
+    # Class 1 first: predict_proba column 0 holds the fraud class
+    model = LogisticRegression(max_iter=1000).fit(features, np.where(labels == 1, 1, 2))
+    scorer = FraudScorer(model)
+
+    assert scorer.fast_path
+    np.testing.assert_allclose(scorer.predict_proba(features), model.predict_proba(features)[:, 0],
+                               rtol=0, atol=PARITY_TOLERANCE)
+
+
+def test_scorer_uses_kernel_for_logistic(logistic, training_data):
+    features, _ = training_data
+    scorer = FraudScorer(logistic, threshold=0.3)
+
+    assert isinstance(scorer.kernel, LinearKernel)
+    labels, probabilities = scorer.score(features)
+    np.testing.assert_allclose(probabilities, logistic.predict_proba(features)[:, 1], rtol=0, atol=PARITY_TOLERANCE)
+    np.testing.assert_array_equal(labels, probabilities > 0.3)
+
+
+@pytest.mark.parametrize("make_model", [
+    lambda: RandomForestClassifier(n_estimators=5, random_state=0),
+    lambda: SGDClassifier(loss="modified_huber", random_state=0),
+])
+def test_unsupported_models_fall_back_to_sklearn(make_model, training_data):
+    features, labels = training_data
+    model = make_model().fit(features, labels)
+
+    assert extract_linear_kernel(model) is None
+    scorer = FraudScorer(model)
+    assert not scorer.fast_path
+    np.testing.assert_array_equal(scorer.predict_proba(features), model.predict_proba(features)[:, 1])
+
+
+def test_fast_path_disabled_uses_sklearn(logistic, training_data):
+    features, _ = training_data
+    scorer = FraudScorer(logistic, fast_path=False)
+
+    assert not scorer.fast_path
+    np.testing.assert_array_equal(scorer.predict_proba(features), logistic.predict_proba(features)[:, 1])
+
+
+def test_with_threshold_shares_the_kernel(logistic):
+    scorer = FraudScorer(logistic)
+    changed = scorer.with_threshold(0.2)
+
+    assert changed.threshold == 0.2 and scorer.threshold == 0.5
+    assert changed.kernel is scorer.kernel
+    with pytest.raises(ValueError):
+        scorer.with_threshold(1.5)
@@ -0,0 +1,190 @@
+"""
+Tests for ModelManager: polling, pinning, rollback, failed loads, history and the admin routes
+"""
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from src.models.manager import LocalDirectorySource, ModelManager
+from tests.conftest import write_model
+
+
+class TaggedDirectorySource(LocalDirectorySource):
+    """Local directory with per-version decision thresholds, like registry tags"""
+
+    def __init__(self, path, thresholds=None):
+        super().__init__(path, settle_seconds=0)
+        self.thresholds = dict(thresholds or {})
+
+    def threshold(self, version):
+        return self.thresholds.get(version)
+
+
+def broken_model(model):
+    """Copy of a fitted model whose probabilities are NaN, so warm-up rejects it"""
+    broken = type(model)(**model.get_params())
+    broken.classes_ = model.classes_
+    broken.coef_ = np.full_like(model.coef_, np.nan)
+    broken.intercept_ = model.intercept_.copy()
+    return broken
+
+
+@pytest.fixture
+def manager(model_dir):
+    manager = ModelManager(TaggedDirectorySource(model_dir), poll_interval_s=0, warmup_rows=16)
+    manager.load()
+    yield manager
+    manager.stop()
+
+
+def test_load_serves_the_newest_version(model_dir, fitted_models):
+    write_model(model_dir, "2", fitted_models[1])
+    manager = ModelManager(TaggedDirectorySource(model_dir), poll_interval_s=0)
+
+    handle = manager.load()
+    assert handle.version == "2" and manager.current is handle
+    assert handle.label == "fraud_detector/2"
+
+
+def test_poll_swaps_to_a_newer_version(manager, model_dir, fitted_models):
+    swaps = []
+    manager.on_swap(lambda old, new: swaps.append((old.version, new.version)))
+    assert manager.poll() is None
+
+    write_model(model_dir, "2", fitted_models[1])
+    handle = manager.poll()
+
+    assert handle.version == "2" and manager.current is handle
+    assert swaps == [("1", "2")]
+    status = manager.status()
+    assert status["active"]["version"] == "2"
+    assert [h["version"] for h in status["previous"]] == ["1"]
+
+
+def test_pin_suppresses_polls_until_unpinned(manager, model_dir, fitted_models):
+    manager.pin("1")
+    write_model(model_dir, "2", fitted_models[1])
+
+    assert manager.poll() is None
+    assert manager.current.version == "1" and manager.pinned == "1"
+
+    manager.unpin()
+    assert manager.poll().version == "2"
+
+
+def test_rollback_swaps_back_to_the_warm_handle(manager, model_dir, fitted_models):
+    first = manager.current
+    write_model(model_dir, "2", fitted_models[1])
+    manager.poll()
+
+    handle = manager.rollback()
+
+    assert handle is first  # Not reloaded
+    assert manager.pinned == "1"
+    assert [h["version"] for h in manager.status()["previous"]] == ["2"]
+
+
+def test_rollback_without_history_fails(manager):
+    with pytest.raises(RuntimeError):
+        manager.rollback()
+
+
+def test_failed_warm_up_leaves_the_old_handle_live(manager, model_dir, fitted_models):
+    first = manager.current
+    write_model(model_dir, "2", broken_model(fitted_models[1]))
+
+    with pytest.raises(ValueError, match="Warm-up"):
+        manager.poll()
+
+    assert manager.current is first
+    assert "2" in manager.status()["failed_versions"]
+    # A failed version is not retried on every poll
+    assert manager.poll() is None
+
+    write_model(model_dir, "3", fitted_models[2])
+    assert manager.poll().version == "3"
+
+
+def test_history_is_trimmed_to_history_size(model_dir, fitted_models):
+    manager = ModelManager(TaggedDirectorySource(model_dir), poll_interval_s=0, warmup_rows=0, history_size=2)
+    for version in ["1", "2", "3", "4", "5"]:
+        write_model(model_dir, version, fitted_models[int(version) % 3])
+        manager.activate(version)
+
+    assert manager.current.version == "5"
+    assert [h["version"] for h in manager.status()["previous"]] == ["4", "3"]
+    assert manager.swaps == 5
+
+
+def test_refresh_threshold_swaps_the_same_model(model_dir):
+    source = TaggedDirectorySource(model_dir, {"1": 0.3})
+    manager = ModelManager(source, poll_interval_s=0, warmup_rows=0)
+    first = manager.load()
+    assert first.scorer.threshold == 0.3
+    swaps = []
+    manager.on_swap(lambda old, new: swaps.append((old, new)))
+
+    assert manager.refresh_threshold() is None
+    source.thresholds["1"] = 0.7
+    handle = manager.poll()
+
+    assert handle.version == "1" and handle.scorer.threshold == 0.7
+    assert handle.model is first.model and handle.scorer.kernel is first.scorer.kernel
+    assert swaps == [(first, handle)]
+    assert manager.status()["previous"] == []
+
+
+def test_threshold_override_ignores_the_source(model_dir):
+    source = TaggedDirectorySource(model_dir, {"1": 0.3})
+    manager = ModelManager(source, threshold=0.9, poll_interval_s=0, warmup_rows=0)
+
+    assert manager.load().scorer.threshold == 0.9
+    source.thresholds["1"] = 0.1
+    assert manager.refresh_threshold() is None
+
+
+# ---------------------------------------------------------------------------
+# Admin routes
+# ---------------------------------------------------------------------------
+
+ADMIN_ROUTES = [
+    ("get", "/admin/model", None),
+    ("get", "/admin/shadow", None),
+    ("post", "/admin/model/pin", {"version": "1"}),
+    ("post", "/admin/model/unpin", None),
+    ("post", "/admin/model/rollback", None),
+    ("post", "/admin/model/refresh", None),
+]
+
+
+@pytest.fixture
+def admin_client(manager, monkeypatch):
+    from src.api import app as app_module
+
+    monkeypatch.setattr(app_module, "model_manager", manager)
+    return TestClient(app_module.app)
+
+
+@pytest.mark.parametrize("method,path,body", ADMIN_ROUTES)
+def test_admin_routes_are_disabled_without_admin_token(admin_client, manager, monkeypatch, method, path, body):
+    monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+
+    kwargs = {"json": body} if body is not None else {}
+    response = getattr(admin_client, method)(path, headers={"X-Admin-Token": "anything"}, **kwargs)
+    assert response.status_code == 403
+    assert manager.swaps == 1 and manager.pinned is None
+
+
+def test_admin_routes_check_the_token(admin_client, manager, model_dir, fitted_models, monkeypatch):
+    monkeypatch.setenv("ADMIN_TOKEN", "s3cret")
+
+    assert admin_client.get("/admin/model").status_code == 401
+    assert admin_client.get("/admin/model", headers={"X-Admin-Token": "wrong"}).status_code == 401
+
+    headers = {"X-Admin-Token": "s3cret"}
+    write_model(model_dir, "2", fitted_models[1])
+    assert admin_client.post("/admin/model/refresh", headers=headers).json()["active"]["version"] == "2"
+    status = admin_client.post("/admin/model/rollback", headers=headers).json()
+    assert status["active"]["version"] == "1" and status["pinned"] == "1"
+    assert admin_client.post("/admin/model/pin", json={"version": "9"}, headers=headers).status_code == 400
+    assert admin_client.post("/admin/model/unpin", headers=headers).json()["pinned"] is None